@@ -0,0 +1,177 @@
+"""Asynchronous versions of the I/O-bound photo endpoints, served by asgi.py.
+
+The paths, parameters and responses are those of the same endpoints in
+routes.py; every other endpoint is served by the Flask app.
+"""
+import asyncio
+from datetime import datetime
+from typing import Union, Dict
+from quart import Blueprint, Response, request, jsonify
+from api.v1.routes import (
+    get_photo_service, parse_photo_search_criteria, parse_pagination, parse_upload_metadata
+)
+from core.services.photo_service import DEFAULT_PAGE_SIZE
+from core.services.async_photo_service import AsyncPhotoService
+from core.services.async_storage_service import AsyncStorageService
+from core.infrastructure.async_db import create_async_database_engine
+from utils.config import config
+
+async_api = Blueprint('async_api', __name__)
+_async_photo_service = None
+
+def get_async_photo_service():
+    global _async_photo_service
+    if _async_photo_service is None:
+        _async_photo_service = AsyncPhotoService(
+            create_async_database_engine(config.database.url, config.database),
+            AsyncStorageService(),
+            get_photo_service()
+        )
+    return _async_photo_service
+
+async def close_async_photo_service():
+    global _async_photo_service
+    if _async_photo_service is not None:
+        await _async_photo_service.close()
+        _async_photo_service = None
+
+def create_response(
+    success: bool,
+    data: Union[Dict, None] = None,
+    error: Union[Dict, None] = None,
+    status_code: int = 200
+) -> tuple:
+    response = {
+        "success": success,
+        "timestamp": datetime.now().isoformat()
+    }
+
+    if data is not None:
+        response["data"] = data
+    if error is not None:
+        response["error"] = error
+
+    return jsonify(response), status_code
+
+@async_api.route("/photos", methods=["POST"])
+async def upload_photo_route():
+    try:
+        files = await request.files
+        photo_file = files.get('photo')
+        if not photo_file:
+            return create_response(
+                success=False,
+                error={
+                    "code": "NO_PHOTO_PROVIDED",
+                    "message": "No photo provided"
+                },
+                status_code=400
+            )
+
+        metadata = parse_upload_metadata(await request.form)
+        result = await get_async_photo_service().upload_photo(photo_file.read(), photo_file.filename, metadata)
+        return create_response(success=True, data=result)
+    except ValueError as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "VALIDATION_ERROR",
+                "message": str(e)
+            },
+            status_code=400
+        )
+    except Exception as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "INTERNAL_ERROR",
+                "message": str(e)
+            },
+            status_code=500
+        )
+
+@async_api.route("/photos/<int:photo_id>/content", methods=["GET"])
+async def get_photo_content_route(photo_id):
+    """Stream the photo file from storage, chunk by chunk."""
+    try:
+        chunks, content_type, length = await get_async_photo_service().get_photo_content(photo_id)
+        return Response(
+            chunks,
+            mimetype=content_type,
+            headers={'Content-Length': str(length), 'Cache-Control': 'private, max-age=3600'}
+        )
+    except ValueError as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "NOT_FOUND",
+                "message": str(e)
+            },
+            status_code=404
+        )
+    except Exception as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "INTERNAL_ERROR",
+                "message": str(e)
+            },
+            status_code=500
+        )
+
+@async_api.route("/photos/search", methods=["GET"])
+async def search_photos_route():
+    """
+    Search or filter photos based on query parameters (see routes.search_photos_route).
+
+    With facets=true the photo and facet queries run concurrently.
+    """
+    try:
+        query = request.args.get('q', '')
+        search_criteria = parse_photo_search_criteria(request.args)
+        page, per_page = parse_pagination(request.args)
+        sort = request.args.get('sort', 'date')
+
+        photo_service = get_async_photo_service()
+
+        # Free-text terms and structured criteria are combined in a single query
+        if query:
+            photos = photo_service.search_photos(
+                query,
+                search_criteria,
+                page=page or 1,
+                per_page=per_page or DEFAULT_PAGE_SIZE,
+                sort=sort
+            )
+        # If we have search criteria but no query, list the matching photos
+        elif search_criteria:
+            photos = photo_service.get_photos(search_criteria, page=page, per_page=per_page, sort=sort)
+        # If we have neither, return empty list
+        else:
+            photos = asyncio.sleep(0, result=[])
+
+        if request.args.get('facets', 'false').lower() == 'true':
+            photos, facets = await asyncio.gather(photos, photo_service.get_photo_facets(search_criteria, query))
+            results = {'photos': photos, 'facets': facets}
+        else:
+            results = await photos
+
+        return create_response(success=True, data=results)
+    except ValueError as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "INVALID_PARAMETER",
+                "message": str(e)
+            },
+            status_code=400
+        )
+    except Exception as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "SEARCH_ERROR",
+                "message": str(e)
+            },
+            status_code=500
+        )
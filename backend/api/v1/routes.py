@@ -1,10 +1,15 @@
+import json
 from datetime import datetime, timezone, date
 from typing import Union, Dict, Any
-from flask import Blueprint, request, jsonify, send_from_directory
+from flask import Blueprint, Response, request, jsonify, send_from_directory, stream_with_context
 from core.services.service_context import ServiceContext
-from core.services.photo_service import PhotoService
-from core.services.person_service import PersonService
-from core.services.service_exceptions import NotFoundException
+from core.services.photo_service import PhotoService, DEFAULT_PAGE_SIZE, EXPOSURE_RANGES
+from core.services.person_service import PersonService, DEFAULT_LINEAGE_DEPTH, DEFAULT_TREE_DEPTH, TREE_CHUNK_SIZE
+from core.services.gedcom_service import GedcomService
+from core.infrastructure.gedcom import decode_lines
+from core.services.duplicate_service import DuplicateService, DEFAULT_REVIEW_LIMIT
+from core.services.upload_service import UploadService, check_upload_metadata
+from core.services.service_exceptions import NotFoundException, ConflictException
 
 # Define upload folder for development only
 UPLOAD_FOLDER = 'uploads'
@@ -13,6 +18,9 @@ api = Blueprint('api', __name__)
 _service_context = None
 _photo_service = None
 _person_service = None
+_gedcom_service = None
+_duplicate_service = None
+_upload_service = None
 
 def get_service_context():
     global _service_context
@@ -32,6 +40,24 @@ def get_person_service():
         _person_service = PersonService(get_service_context())
     return _person_service
 
+def get_gedcom_service():
+    global _gedcom_service
+    if _gedcom_service is None:
+        _gedcom_service = GedcomService(get_service_context())
+    return _gedcom_service
+
+def get_duplicate_service():
+    global _duplicate_service
+    if _duplicate_service is None:
+        _duplicate_service = DuplicateService(get_service_context())
+    return _duplicate_service
+
+def get_upload_service():
+    global _upload_service
+    if _upload_service is None:
+        _upload_service = UploadService(get_service_context(), get_photo_service())
+    return _upload_service
+
 def create_response(
     success: bool,
     data: Union[Dict, None] = None,
@@ -50,6 +76,63 @@ def create_response(
         
     return jsonify(response), status_code
 
+def parse_photo_search_criteria(args=None) -> Dict[str, Any]:
+    """Parse the structured photo search criteria from the query string (request.args by default)."""
+    args = request.args if args is None else args
+    search_criteria = {}
+
+    if args.getlist('tags[]'):
+        search_criteria['tags'] = args.getlist('tags[]')
+
+    if args.getlist('people[]'):
+        search_criteria['people'] = [
+            int(person_id) for person_id in args.getlist('people[]')
+        ]
+
+    if args.get('start_date'):
+        search_criteria['start_date'] = datetime.fromisoformat(args.get('start_date'))
+
+    if args.get('end_date'):
+        search_criteria['end_date'] = datetime.fromisoformat(args.get('end_date'))
+
+    if args.get('location'):
+        search_criteria['location'] = args.get('location')
+
+    for name in ('camera_make', 'camera_model'):
+        if args.get(name):
+            search_criteria[name] = args.get(name)
+
+    for name, (column_name, _) in EXPOSURE_RANGES.items():
+        if args.get(name):
+            parse = int if column_name == 'iso' else float
+            search_criteria[name] = parse(args.get(name))
+
+    return search_criteria
+
+def parse_pagination(args=None) -> tuple:
+    """Parse the optional page and per_page query parameters (of request.args by default)."""
+    args = request.args if args is None else args
+    page = args.get('page')
+    per_page = args.get('per_page')
+    return (
+        int(page) if page else None,
+        int(per_page) if per_page else None
+    )
+
+def parse_upload_metadata(form) -> Dict[str, Any]:
+    """Parse the metadata of a photo upload from its form data."""
+    return {
+        'title': form.get('title'),
+        'description': form.get('description'),
+        'tags': form.getlist('tags[]'),
+        'people': form.getlist('people[]'),
+        'location': {
+            'name': form.get('location_name'),
+            'latitude': float(form.get('latitude')) if form.get('latitude') else None,
+            'longitude': float(form.get('longitude')) if form.get('longitude') else None
+        } if form.get('latitude') and form.get('longitude') else None
+    }
+
 @api.route("/photos", methods=["POST"])
 def upload_photo_route():
     try:
@@ -65,19 +148,7 @@ def upload_photo_route():
                 status_code=400
             )
 
-        # Parse metadata from form data
-        metadata = {
-            'title': request.form.get('title'),
-            'description': request.form.get('description'),
-            'tags': request.form.getlist('tags[]'),
-            'people': request.form.getlist('people[]'),
-            'location': {
-                'name': request.form.get('location_name'),
-                'latitude': float(request.form.get('latitude')) if request.form.get('latitude') else None,
-                'longitude': float(request.form.get('longitude')) if request.form.get('longitude') else None
-            } if request.form.get('latitude') and request.form.get('longitude') else None
-        }
-
+        metadata = parse_upload_metadata(request.form)
         result = photo_service.upload_photo(photo_file, metadata)
         return create_response(success=True, data=result)
     except ValueError as e:
@@ -99,36 +170,154 @@ def upload_photo_route():
             status_code=500
         )
 
+@api.route("/photos/uploads", methods=["POST"])
+def create_upload_route():
+    """
+    Start a resumable upload of {"filename", "size"} with the photo metadata
+    ("title", "description", "tags", "people", "location"); the response gives
+    the upload id and the chunkSize of the chunks to send.
+    """
+    def create(service):
+        body = request.get_json(silent=True) or {}
+        metadata = check_upload_metadata({
+            'title': body.get('title'),
+            'description': body.get('description'),
+            'tags': body.get('tags') or [],
+            'people': body.get('people') or [],
+            'location': body.get('location')
+        })
+        return service.create_upload(body.get('filename'), body.get('size'), metadata)
+    return _upload_response(create, status_code=201)
+
+@api.route("/photos/uploads/<upload_id>", methods=["GET"])
+def get_upload_route(upload_id):
+    """State of an upload; its offset (also in the Upload-Offset header, and for HEAD) is where to resume."""
+    return _upload_response(lambda service: service.get_upload(upload_id))
+
+@api.route("/photos/uploads/<upload_id>", methods=["PATCH"])
+def upload_chunk_route(upload_id):
+    """
+    Store the request body as the chunk starting at the Upload-Offset header.
+
+    The Content-Length must be the size of the chunk: the body is only read
+    once it is checked, and requests without it (chunked encoding) are refused.
+    """
+    def upload_chunk(service):
+        offset = request.headers.get('Upload-Offset', type=int)
+        if offset is None:
+            raise ValueError("The Upload-Offset header must give the offset of the chunk")
+        return service.upload_chunk(upload_id, offset, request.stream, request.content_length)
+    return _upload_response(upload_chunk)
+
+@api.route("/photos/uploads/<upload_id>/complete", methods=["POST"])
+def complete_upload_route(upload_id):
+    """Assemble the chunks of an upload and create its photo; the response is the photo."""
+    return _upload_response(lambda service: service.complete_upload(upload_id))
+
+@api.route("/photos/uploads/<upload_id>", methods=["DELETE"])
+def abort_upload_route(upload_id):
+    """Abandon an upload and discard its chunks."""
+    return _upload_response(lambda service: service.abort_upload(upload_id))
+
+def _upload_response(operation, status_code: int = 200) -> tuple:
+    try:
+        result = operation(get_upload_service())
+        response = create_response(success=True, data=result, status_code=status_code)
+        if result is not None and 'offset' in result:
+            response[0].headers['Upload-Offset'] = str(result['offset'])
+            response[0].headers['Upload-Length'] = str(result['size'])
+        return response
+    except NotFoundException as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "NOT_FOUND",
+                "message": str(e)
+            },
+            status_code=404
+        )
+    except ConflictException as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "UPLOAD_CONFLICT",
+                "message": str(e)
+            },
+            status_code=409
+        )
+    except ValueError as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "VALIDATION_ERROR",
+                "message": str(e)
+            },
+            status_code=400
+        )
+    except Exception as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "INTERNAL_ERROR",
+                "message": str(e)
+            },
+            status_code=500
+        )
+
 @api.route("/photos", methods=["GET"])
 def get_photos_route():
     try:
         photo_service = get_photo_service()
-        
-        # Parse search criteria from query parameters
-        search_criteria = {}
-        
-        if request.args.getlist('tags[]'):
-            search_criteria['tags'] = request.args.getlist('tags[]')
-        
-        if request.args.getlist('people[]'):
-            search_criteria['people'] = [
-                int(person_id) for person_id in request.args.getlist('people[]')
-            ]
-        
-        if request.args.get('start_date'):
-            search_criteria['start_date'] = datetime.fromisoformat(
-                request.args.get('start_date')
-            )
-        
-        if request.args.get('end_date'):
-            search_criteria['end_date'] = datetime.fromisoformat(
-                request.args.get('end_date')
-            )
-        
-        if request.args.get('location'):
-            search_criteria['location'] = request.args.get('location')
+        search_criteria = parse_photo_search_criteria()
+        page, per_page = parse_pagination()
+
+        result = photo_service.get_photos(
+            search_criteria,
+            page=page,
+            per_page=per_page,
+            sort=request.args.get('sort', 'date')
+        )
+        if request.args.get('facets', 'false').lower() == 'true':
+            result = {
+                'photos': result,
+                'facets': photo_service.get_photo_facets(search_criteria)
+            }
+        return create_response(success=True, data=result)
+    except ValueError as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "VALIDATION_ERROR",
+                "message": str(e)
+            },
+            status_code=400
+        )
+    except Exception as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "INTERNAL_ERROR",
+                "message": str(e)
+            },
+            status_code=500
+        )
+
+@api.route("/photos/timeline", methods=["GET"])
+def get_timeline_route():
+    """
+    Count photos per year, month or day, optionally restricted by the same
+    criteria as GET /photos.
 
-        result = photo_service.get_photos(search_criteria)
+    Query Parameters:
+        granularity (str, optional): 'year', 'month' (default) or 'day'
+            Example: ?granularity=year
+    """
+    try:
+        photo_service = get_photo_service()
+        result = photo_service.get_timeline(
+            parse_photo_search_criteria(),
+            granularity=request.args.get('granularity', 'month')
+        )
         return create_response(success=True, data=result)
     except ValueError as e:
         return create_response(
@@ -149,6 +338,23 @@ def get_photos_route():
             status_code=500
         )
 
+@api.route("/photos/equipment", methods=["GET"])
+def get_equipment_stats_route():
+    """Count photos per camera and per camera maker (see PhotoService.get_equipment_stats)."""
+    try:
+        photo_service = get_photo_service()
+        result = photo_service.get_equipment_stats()
+        return create_response(success=True, data=result)
+    except Exception as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "INTERNAL_ERROR",
+                "message": str(e)
+            },
+            status_code=500
+        )
+
 @api.route("/photos/<int:photo_id>", methods=["GET"])
 def get_photo_route(photo_id):
     try:
@@ -174,6 +380,91 @@ def get_photo_route(photo_id):
             status_code=500
         )
 
+@api.route("/photos/<int:photo_id>/content", methods=["GET"])
+def get_photo_content_route(photo_id):
+    """Stream the photo file from storage, chunk by chunk."""
+    try:
+        chunks, content_type, length = get_photo_service().get_photo_content(photo_id)
+        return Response(
+            stream_with_context(chunks),
+            mimetype=content_type,
+            headers={'Content-Length': str(length), 'Cache-Control': 'private, max-age=3600'}
+        )
+    except ValueError as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "NOT_FOUND",
+                "message": str(e)
+            },
+            status_code=404
+        )
+    except Exception as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "INTERNAL_ERROR",
+                "message": str(e)
+            },
+            status_code=500
+        )
+
+@api.route("/photos/batch/tags", methods=["POST"])
+def tag_photos_route():
+    """Add {"tags": [...]} to every photo of {"photo_ids": [...]}."""
+    return _bulk_photo_response(lambda service, body: service.tag_photos(body.get('photo_ids'), body.get('tags')))
+
+@api.route("/photos/batch/tags", methods=["DELETE"])
+def untag_photos_route():
+    """Remove {"tags": [...]} from every photo of {"photo_ids": [...]}."""
+    return _bulk_photo_response(lambda service, body: service.untag_photos(body.get('photo_ids'), body.get('tags')))
+
+@api.route("/photos/batch/people", methods=["POST"])
+def add_people_to_photos_route():
+    """Link {"person_ids": [...]} to every photo of {"photo_ids": [...]}."""
+    return _bulk_photo_response(
+        lambda service, body: service.add_people_to_photos(body.get('photo_ids'), body.get('person_ids'))
+    )
+
+@api.route("/photos/batch/people", methods=["DELETE"])
+def remove_people_from_photos_route():
+    """Unlink {"person_ids": [...]} from every photo of {"photo_ids": [...]}."""
+    return _bulk_photo_response(
+        lambda service, body: service.remove_people_from_photos(body.get('photo_ids'), body.get('person_ids'))
+    )
+
+@api.route("/photos/batch", methods=["DELETE"])
+def delete_photos_route():
+    """Delete every photo of {"photo_ids": [...]}; repeat the call to resume after a failure."""
+    return _bulk_photo_response(lambda service, body: service.delete_photos(body.get('photo_ids')))
+
+def _bulk_photo_response(operation) -> tuple:
+    try:
+        photo_service = get_photo_service()
+        body = request.get_json(silent=True) or {}
+        result = operation(photo_service, body)
+        return create_response(success=True, data=result)
+    except ValueError as e:
+        error_code = "NOT_FOUND" if "not found" in str(e) else "VALIDATION_ERROR"
+        status_code = 404 if error_code == "NOT_FOUND" else 400
+        return create_response(
+            success=False,
+            error={
+                "code": error_code,
+                "message": str(e)
+            },
+            status_code=status_code
+        )
+    except Exception as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "INTERNAL_ERROR",
+                "message": str(e)
+            },
+            status_code=500
+        )
+
 @api.route("/photos/tags", methods=["GET"])
 def get_tags_route():
     try:
@@ -217,11 +508,31 @@ def search_photos_route():
         
         location (str, optional): Location name to filter by
             Example: ?location=Paris
+        
+        camera_make, camera_model (str, optional): Camera, case-insensitive
+            Example: ?camera_make=Nikon&camera_model=F3
+        
+        min_iso, max_iso, min_focal_length, max_focal_length, min_f_number,
+        max_f_number (number, optional): Exposure ranges
+            Example: ?min_iso=3200
+        
+        page (int, optional): 1-based page number (default 1 for free-text search)
+            Example: ?page=2
+        
+        per_page (int, optional): Page size (default 50, at most 200)
+            Example: ?per_page=100
+        
+        sort (str, optional): 'date' (most recent first, default) or 'relevance'
+            Example: ?sort=relevance
+        
+        facets (bool, optional): Also return facet counts for the result set
+            Example: ?facets=true
 
     Returns:
         JSON response containing:
         - success: bool
-        - data: List of photo dictionaries
+        - data: List of photo dictionaries, or when facets=true a dictionary
+          with 'photos' (the list) and 'facets' (see PhotoService.get_photo_facets)
         - error: Error details if success is false
 
     Examples:
@@ -236,39 +547,33 @@ def search_photos_route():
     """
     try:
         query = request.args.get('q', '')
-        
-        # Get additional search criteria
-        search_criteria = {}
-        
-        # Add date filters if provided
-        if request.args.get('start_date'):
-            search_criteria['start_date'] = datetime.fromisoformat(request.args.get('start_date'))
-        if request.args.get('end_date'):
-            search_criteria['end_date'] = datetime.fromisoformat(request.args.get('end_date'))
-            
-        # Add tag filters
-        if request.args.getlist('tags[]'):
-            search_criteria['tags'] = request.args.getlist('tags[]')
-            
-        # Add people filters
-        if request.args.getlist('people[]'):
-            search_criteria['people'] = [int(pid) for pid in request.args.getlist('people[]')]
-            
-        # Add location filter
-        if request.args.get('location'):
-            search_criteria['location'] = request.args.get('location')
+        search_criteria = parse_photo_search_criteria()
+        page, per_page = parse_pagination()
+        sort = request.args.get('sort', 'date')
 
         photo_service = get_photo_service()
         
+        # Free-text terms and structured criteria are combined in a single query
+        if query:
+            results = photo_service.search_photos(
+                query,
+                search_criteria,
+                page=page or 1,
+                per_page=per_page or DEFAULT_PAGE_SIZE,
+                sort=sort
+            )
         # If we have search criteria but no query, use get_photos
-        if search_criteria and not query:
-            results = photo_service.get_photos(search_criteria)
-        # If we have a query, use search_photos
-        elif query:
-            results = photo_service.search_photos(query)
+        elif search_criteria:
+            results = photo_service.get_photos(search_criteria, page=page, per_page=per_page, sort=sort)
         # If we have neither, return empty list
         else:
             results = []
+
+        if request.args.get('facets', 'false').lower() == 'true':
+            results = {
+                'photos': results,
+                'facets': photo_service.get_photo_facets(search_criteria, query)
+            }
             
         return create_response(success=True, data=results)
     except ValueError as e:
@@ -290,6 +595,73 @@ def search_photos_route():
             status_code=500
         )
 
+@api.route("/system/db-pool", methods=["GET"])
+def get_db_pool_route():
+    """
+    Database connection pool metrics: size, connections in use, saturation and
+    checkout wait times (see core.infrastructure.db_pool.pool_status).
+    """
+    try:
+        result = get_service_context().pool_status()
+        return create_response(success=True, data=result)
+    except Exception as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "INTERNAL_ERROR",
+                "message": str(e)
+            },
+            status_code=500
+        )
+
+@api.route("/system/slow-queries", methods=["GET"])
+def get_slow_queries_route():
+    """
+    Statements slower than the slow query threshold, aggregated by fingerprint
+    with their callers, parameter shapes and sampled plans
+    (see core.infrastructure.slow_queries).
+    """
+    try:
+        limit = request.args.get('limit', type=int)
+        if limit is not None and limit < 1:
+            raise ValueError("limit must be a positive integer")
+        result = get_service_context().slow_query_report(limit)
+        return create_response(success=True, data=result)
+    except ValueError as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "VALIDATION_ERROR",
+                "message": str(e)
+            },
+            status_code=400
+        )
+    except Exception as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "INTERNAL_ERROR",
+                "message": str(e)
+            },
+            status_code=500
+        )
+
+@api.route("/system/slow-queries", methods=["DELETE"])
+def clear_slow_queries_route():
+    """Forget the slow queries recorded so far, e.g. after adding an index."""
+    try:
+        get_service_context().clear_slow_queries()
+        return create_response(success=True)
+    except Exception as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "INTERNAL_ERROR",
+                "message": str(e)
+            },
+            status_code=500
+        )
+
 @api.route("/uploads/<path:filename>")
 def serve_photo(filename):
     """Serve uploaded photos (for development only, use S3 in production)"""
@@ -321,6 +693,52 @@ def add_person_route():
             status_code=500
         )
 
+@api.route("/persons/batch", methods=["POST"])
+def create_persons_route():
+    """Create the people of {"persons": [...], "all_or_nothing": false} in one transaction."""
+    return _batch_response(lambda service, body: service.create_persons(
+        body.get('persons'), all_or_nothing=bool(body.get('all_or_nothing'))
+    ))
+
+@api.route("/persons/batch", methods=["PATCH"])
+def update_persons_route():
+    """Apply the changes of {"persons": [{"id": 1, ...}], "all_or_nothing": false} in one transaction."""
+    return _batch_response(lambda service, body: service.update_persons(
+        body.get('persons'), all_or_nothing=bool(body.get('all_or_nothing'))
+    ))
+
+@api.route("/persons/batch", methods=["DELETE"])
+def delete_persons_route():
+    """Delete the people of {"ids": [...], "all_or_nothing": false} in one transaction."""
+    return _batch_response(lambda service, body: service.delete_persons(
+        body.get('ids'), all_or_nothing=bool(body.get('all_or_nothing'))
+    ))
+
+def _batch_response(operation) -> tuple:
+    try:
+        person_service = get_person_service()
+        body = request.get_json(silent=True) or {}
+        result = operation(person_service, body)
+        return create_response(success=True, data=result)
+    except ValueError as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "VALIDATION_ERROR",
+                "message": str(e)
+            },
+            status_code=400
+        )
+    except Exception as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "INTERNAL_ERROR",
+                "message": str(e)
+            },
+            status_code=500
+        )
+
 @api.route("/persons/<int:person_id>", methods=["PUT"])
 def update_person_route(person_id):
     try:
@@ -391,6 +809,393 @@ def get_person_route(person_id):
             status_code=500
         )
 
+@api.route("/persons/<int:person_id>/companions", methods=["GET"])
+def get_companions_route(person_id):
+    limit = request.args.get('limit', 10, type=int)
+    if limit < 1:
+        return create_response(
+            success=False,
+            error={
+                "code": "VALIDATION_ERROR",
+                "message": "limit must be a positive integer"
+            },
+            status_code=400
+        )
+    try:
+        person_service = get_person_service()
+        result = person_service.get_frequent_companions(person_id, limit=limit)
+        return create_response(success=True, data=result)
+    except ValueError as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "NOT_FOUND",
+                "message": str(e)
+            },
+            status_code=404
+        )
+    except Exception as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "INTERNAL_ERROR",
+                "message": str(e)
+            },
+            status_code=500
+        )
+
+@api.route("/persons/<int:person_id>/relationships", methods=["GET"])
+def get_relationships_route(person_id):
+    try:
+        person_service = get_person_service()
+        result = person_service.get_relationships(person_id)
+        return create_response(success=True, data=result)
+    except ValueError as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "NOT_FOUND",
+                "message": str(e)
+            },
+            status_code=404
+        )
+    except Exception as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "INTERNAL_ERROR",
+                "message": str(e)
+            },
+            status_code=500
+        )
+
+@api.route("/persons/<int:person_id>/relationships", methods=["POST"])
+def add_relationship_route(person_id):
+    """
+    Record a relationship. The JSON body contains relative_id and type
+    ('parent' when person_id is the parent of relative_id, or 'spouse').
+    """
+    try:
+        person_service = get_person_service()
+        data = request.get_json() or {}
+        if 'relative_id' not in data or 'type' not in data:
+            raise ValueError("Missing required fields: ['relative_id', 'type']")
+        result = person_service.add_relationship(person_id, int(data['relative_id']), data['type'])
+        return create_response(success=True, data=result)
+    except ValueError as e:
+        error_code = "NOT_FOUND" if "not found" in str(e) else "VALIDATION_ERROR"
+        status_code = 404 if error_code == "NOT_FOUND" else 400
+        return create_response(
+            success=False,
+            error={
+                "code": error_code,
+                "message": str(e)
+            },
+            status_code=status_code
+        )
+    except Exception as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "INTERNAL_ERROR",
+                "message": str(e)
+            },
+            status_code=500
+        )
+
+@api.route("/persons/<int:person_id>/relationships/<int:relative_id>", methods=["DELETE"])
+def remove_relationship_route(person_id, relative_id):
+    try:
+        person_service = get_person_service()
+        person_service.remove_relationship(person_id, relative_id, request.args.get('type', 'parent'))
+        return create_response(success=True)
+    except ValueError as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "NOT_FOUND",
+                "message": str(e)
+            },
+            status_code=404
+        )
+    except Exception as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "INTERNAL_ERROR",
+                "message": str(e)
+            },
+            status_code=500
+        )
+
+@api.route("/persons/<int:person_id>/ancestors", methods=["GET"])
+def get_ancestors_route(person_id):
+    return _lineage_response(person_id, 'ancestors')
+
+@api.route("/persons/<int:person_id>/descendants", methods=["GET"])
+def get_descendants_route(person_id):
+    return _lineage_response(person_id, 'descendants')
+
+def _lineage_response(person_id: int, lineage: str) -> tuple:
+    try:
+        person_service = get_person_service()
+        depth = int(request.args.get('depth', DEFAULT_LINEAGE_DEPTH))
+        if lineage == 'ancestors':
+            result = person_service.get_ancestors(person_id, max_depth=depth)
+        else:
+            result = person_service.get_descendants(person_id, max_depth=depth)
+        return create_response(success=True, data=result)
+    except ValueError as e:
+        error_code = "NOT_FOUND" if "not found" in str(e) else "VALIDATION_ERROR"
+        status_code = 404 if error_code == "NOT_FOUND" else 400
+        return create_response(
+            success=False,
+            error={
+                "code": error_code,
+                "message": str(e)
+            },
+            status_code=status_code
+        )
+    except Exception as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "INTERNAL_ERROR",
+                "message": str(e)
+            },
+            status_code=500
+        )
+
+@api.route("/persons/gedcom", methods=["POST"])
+def import_gedcom_route():
+    """Import the individuals and families of an uploaded GEDCOM file ('file' field)."""
+    try:
+        gedcom_service = get_gedcom_service()
+        gedcom_file = request.files.get('file')
+        if not gedcom_file:
+            return create_response(
+                success=False,
+                error={
+                    "code": "NO_FILE_PROVIDED",
+                    "message": "No GEDCOM file provided"
+                },
+                status_code=400
+            )
+        # Werkzeug spools large uploads to disk; decode them line by line, in the declared CHAR set
+        result = gedcom_service.import_gedcom(decode_lines(gedcom_file.stream))
+        return create_response(success=True, data=result)
+    except ValueError as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "VALIDATION_ERROR",
+                "message": str(e)
+            },
+            status_code=400
+        )
+    except Exception as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "IMPORT_ERROR",
+                "message": str(e)
+            },
+            status_code=500
+        )
+
+@api.route("/persons/gedcom", methods=["GET"])
+def export_gedcom_route():
+    """Stream every person and relationship as a GEDCOM file."""
+    gedcom_service = get_gedcom_service()
+    return Response(
+        stream_with_context(gedcom_service.export_gedcom()),
+        mimetype='text/x-gedcom',
+        headers={'Content-Disposition': 'attachment; filename=family-nexus.ged'}
+    )
+
+@api.route("/persons/duplicates", methods=["GET"])
+def get_duplicate_candidates_route():
+    """
+    List the pending duplicate candidates found by the last scan, most likely first.
+    
+    Query parameters:
+        min_score: Lowest score to return (0 to 1)
+        limit, offset: Paging
+    """
+    try:
+        duplicate_service = get_duplicate_service()
+        result = duplicate_service.get_duplicate_candidates(
+            min_score=float(request.args.get('min_score', 0)),
+            limit=int(request.args.get('limit', DEFAULT_REVIEW_LIMIT)),
+            offset=int(request.args.get('offset', 0))
+        )
+        return create_response(success=True, data=result)
+    except ValueError as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "VALIDATION_ERROR",
+                "message": str(e)
+            },
+            status_code=400
+        )
+    except Exception as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "INTERNAL_ERROR",
+                "message": str(e)
+            },
+            status_code=500
+        )
+
+@api.route("/persons/duplicates/<int:person_id>/<int:other_id>/dismiss", methods=["POST"])
+def dismiss_duplicate_route(person_id, other_id):
+    try:
+        duplicate_service = get_duplicate_service()
+        duplicate_service.dismiss_duplicate(person_id, other_id)
+        return create_response(success=True)
+    except ValueError as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "NOT_FOUND",
+                "message": str(e)
+            },
+            status_code=404
+        )
+    except Exception as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "INTERNAL_ERROR",
+                "message": str(e)
+            },
+            status_code=500
+        )
+
+@api.route("/persons/<int:person_id>/merge", methods=["POST"])
+def merge_persons_route(person_id):
+    """Merge the person of {"person_id": id} into this one."""
+    try:
+        person_service = get_person_service()
+        body = request.get_json(silent=True) or {}
+        merge_id = body.get('person_id')
+        if not isinstance(merge_id, int):
+            raise ValueError("person_id must be an integer")
+        result = person_service.merge_persons(person_id, merge_id)
+        return create_response(success=True, data=result)
+    except ValueError as e:
+        error_code = "NOT_FOUND" if "not found" in str(e) else "VALIDATION_ERROR"
+        status_code = 404 if error_code == "NOT_FOUND" else 400
+        return create_response(
+            success=False,
+            error={
+                "code": error_code,
+                "message": str(e)
+            },
+            status_code=status_code
+        )
+    except Exception as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "INTERNAL_ERROR",
+                "message": str(e)
+            },
+            status_code=500
+        )
+
+@api.route("/persons/<int:person_id>/tree", methods=["GET"])
+def get_family_tree_route(person_id):
+    """
+    Stream the laid-out family tree around a person as newline-delimited JSON.
+    
+    Query parameters:
+        depth: Generations to include above and below the person
+        chunk_size: Maximum number of nodes or edges per line
+    """
+    try:
+        person_service = get_person_service()
+        depth = int(request.args.get('depth', DEFAULT_TREE_DEPTH))
+        chunk_size = int(request.args.get('chunk_size', TREE_CHUNK_SIZE))
+        chunks = person_service.iter_tree_layout(person_id, depth=depth, chunk_size=chunk_size)
+        return Response((json.dumps(chunk) + '\n' for chunk in chunks), mimetype='application/x-ndjson')
+    except ValueError as e:
+        error_code = "NOT_FOUND" if "not found" in str(e) else "VALIDATION_ERROR"
+        status_code = 404 if error_code == "NOT_FOUND" else 400
+        return create_response(
+            success=False,
+            error={
+                "code": error_code,
+                "message": str(e)
+            },
+            status_code=status_code
+        )
+    except Exception as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "INTERNAL_ERROR",
+                "message": str(e)
+            },
+            status_code=500
+        )
+
+@api.route("/persons/<int:person_id>/kinship/<int:other_id>", methods=["GET"])
+def get_kinship_route(person_id, other_id):
+    """
+    Describe how two people are related, with their lowest common ancestors
+    and, for cousins, the cousin degree and generations removed.
+    """
+    try:
+        person_service = get_person_service()
+        result = person_service.get_kinship(person_id, other_id)
+        return create_response(success=True, data=result)
+    except ValueError as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "NOT_FOUND",
+                "message": str(e)
+            },
+            status_code=404
+        )
+    except Exception as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "INTERNAL_ERROR",
+                "message": str(e)
+            },
+            status_code=500
+        )
+
+@api.route("/persons/<int:person_id>/common-ancestors/<int:other_id>", methods=["GET"])
+def get_common_ancestors_route(person_id, other_id):
+    try:
+        person_service = get_person_service()
+        result = person_service.get_common_ancestors(person_id, other_id)
+        return create_response(success=True, data=result)
+    except ValueError as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "NOT_FOUND",
+                "message": str(e)
+            },
+            status_code=404
+        )
+    except Exception as e:
+        return create_response(
+            success=False,
+            error={
+                "code": "INTERNAL_ERROR",
+                "message": str(e)
+            },
+            status_code=500
+        )
+
 @api.route("/persons/<int:person_id>", methods=["DELETE"])
 def delete_person_route(person_id):
     try:
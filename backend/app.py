@@ -3,12 +3,16 @@ from flask import Flask
 from flask_cors import CORS
 from api.v1.routes import api
 from core.services.service_context import ServiceContext
+from core.infrastructure.instrumentation import RequestProfiler, init_instrumentation
 from utils.config import config
 
 def create_app():
     """Create and configure the Flask application.
     
     The database URL must be set in the DATABASE_URL environment variable.
+    Pre-fork servers should create it once in the master (see gunicorn.conf.py):
+    workers inherit the loaded modules and routes and only open their own
+    database and storage connections.
     """
     app = Flask(__name__)
     
@@ -19,7 +23,14 @@ def create_app():
     
     # Initialize ServiceContext
     service_context = ServiceContext()
-    service_context.initialize(app, config.database.url)
+    service_context.initialize(app, config.database.url, config.database)
+    
+    # Request metrics on /metrics, and profiles of sampled slow requests
+    profiler = None
+    if config.profile_sample_rate > 0:
+        profiler = RequestProfiler(config.profile_sample_rate, config.profile_slow_ms,
+                                   config.profile_dir, config.profiler)
+    init_instrumentation(app, profiler, config.metrics_dir)
     
     # Register routes
     app.register_blueprint(api, url_prefix='/api')
@@ -33,7 +44,15 @@ def create_app():
     
     return app
 
-app = create_app()
+def __getattr__(name):
+    """Create the module-level app on first access (`from app import app`, FLASK_APP=app:app).
+
+    Importing this module neither builds the app nor connects to the database.
+    """
+    if name == 'app':
+        globals()['app'] = create_app()
+        return globals()['app']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == '__main__':
-    app.run(debug=config.debug)
\ No newline at end of file
+    create_app().run(debug=config.debug)
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""ASGI serving mode: async upload, photo content and search endpoints.
+
+    uvicorn asgi:app --workers 4
+
+Needs the `asgi` extra (quart, uvicorn, a2wsgi, aiobotocore, asyncpg or
+aiosqlite, greenlet). Requests for the endpoints of api.v1.async_routes are
+handled on the event loop, so one worker serves many uploads and downloads
+waiting on S3 and PostgreSQL at once; every other request goes to the Flask
+app, run in a pool of WSGI_THREADS threads by a2wsgi. Both are recorded in the
+request metrics of the Flask app; with METRICS_DIR set, empty that directory
+before starting the workers.
+"""
+from a2wsgi import WSGIMiddleware
+from quart import Quart
+from werkzeug.exceptions import HTTPException
+from api.v1.async_routes import async_api, close_async_photo_service, get_async_photo_service
+from app import create_app
+from core.infrastructure.instrumentation import InstrumentationASGIMiddleware
+
+# Threads running the synchronous Flask endpoints in each worker
+WSGI_THREADS = 10
+
+def create_asgi_app(flask_app=None):
+    """Create the ASGI application combining the async endpoints and the Flask app."""
+    flask_app = flask_app or create_app()
+    async_app = Quart(__name__, static_folder=None)
+    async_app.register_blueprint(async_api, url_prefix='/api')
+
+    @async_app.before_serving
+    async def _open_connections():
+        get_async_photo_service()
+
+    @async_app.after_serving
+    async def _close_connections():
+        await close_async_photo_service()
+
+    wsgi_app = WSGIMiddleware(flask_app, workers=WSGI_THREADS)
+    async_routes = async_app.url_map.bind('')
+
+    def async_endpoint(scope):
+        try:
+            rule, _ = async_routes.match(scope['path'], method=scope['method'], return_rule=True)
+            return rule.rule
+        except HTTPException:
+            # Not an async endpoint (or not this method)
+            return None
+
+    # The Flask app measures its own requests; the async ones are measured here
+    instrumented_async_app = InstrumentationASGIMiddleware(
+        async_app, flask_app.extensions['instrumentation'], async_endpoint
+    )
+
+    async def application(scope, receive, send):
+        if scope['type'] == 'http':
+            if async_endpoint(scope) is None:
+                return await wsgi_app(scope, receive, send)
+            return await instrumented_async_app(scope, receive, send)
+        await async_app(scope, receive, send)
+
+    return application
+
+def __getattr__(name):
+    """Create the module-level app on first access (`uvicorn asgi:app`), as app.py does."""
+    if name == 'app':
+        globals()['app'] = create_asgi_app()
+        return globals()['app']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
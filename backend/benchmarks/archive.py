@@ -0,0 +1,311 @@
+"""Generate a synthetic family archive for the load tests and benchmarks.
+
+People are generated in households sharing a surname. Photos are taken at
+family events, each with a date, a place, a theme, a household and a few
+guests, so tags, people and places co-occur as in a real archive:
+    - tags are the event theme plus general tags drawn with a Zipf law
+    - cameras are drawn from CAMERAS, each event keeping its photographer's
+    - every photo has the date and GPS position of its event
+The rollups (timeline, camera counts, person index) are rebuilt afterwards.
+
+With --with-files each photo also gets a small JPEG carrying the same EXIF
+in the bucket of the STORAGE_* settings (MinIO), so that /photos/<id>/content
+works. The load test (benchmarks.load_test) can use a moto server instead.
+
+Usage:
+    BENCHMARK_DATABASE_URL=postgresql://... python -m benchmarks.archive --photos 20000 --people 2000
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from io import BytesIO
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.common import backend_dir, create_benchmark_app
+from benchmarks.bench_person_search import GIVEN_NAMES, SURNAMES
+from PIL import Image
+from PIL.TiffImagePlugin import IFDRational
+from sqlalchemy import delete, func, insert, select
+from core.models.db import db
+from core.models.person import Person
+from core.models.photo import Photo, photo_people, photo_tags
+from core.models.tag import Tag
+from core.infrastructure.phonetic import phonetic_key
+from core.services.aggregate_index import rebuild_camera_counts, rebuild_person_index, rebuild_timeline
+from core.services.storage_service import StorageService, public_url
+from utils.config import config
+
+# Event themes and the tags their photos carry
+THEMES = {
+    'wedding': ['wedding', 'church', 'ceremony', 'dress'],
+    'christmas': ['christmas', 'tree', 'gifts', 'dinner'],
+    'birthday': ['birthday', 'cake', 'party'],
+    'holiday': ['holiday', 'beach', 'sea', 'sunset'],
+    'hiking': ['hiking', 'mountain', 'lake', 'nature'],
+    'graduation': ['graduation', 'school', 'diploma'],
+    'reunion': ['reunion', 'garden', 'lunch'],
+    'baptism': ['baptism', 'church', 'baby']
+}
+# General tags, most frequent first (drawn with a Zipf law)
+GENERAL_TAGS = ['family', 'portrait', 'outdoor', 'kids', 'grandparents', 'friends', 'summer', 'winter',
+                'food', 'dog', 'car', 'house', 'black and white', 'scan', 'village', 'city', 'snow',
+                'bicycle', 'music', 'dance', 'boat', 'train', 'market', 'cousins', 'old']
+PLACES = [('Lyon', 45.764, 4.8357), ('Rouen', 49.4432, 1.0999), ('Nantes', 47.2184, -1.5536),
+          ('Arras', 50.291, 2.7775), ('Biarritz', 43.4832, -1.5586), ('Annecy', 45.8992, 6.1294),
+          ('Paris', 48.8566, 2.3522), ('Brest', 48.3904, -4.4861), ('Colmar', 48.0794, 7.3585),
+          ('Chamonix', 45.9237, 6.8694), ('Nice', 43.7102, 7.262), ('Dijon', 47.322, 5.0415)]
+# make, model, focal lengths (mm), first year sold
+CAMERAS = [('Canon', 'Canon EOS 5D Mark IV', (24, 35, 50, 85), 2016),
+           ('Nikon', 'NIKON D750', (24, 50, 70, 105), 2014),
+           ('Apple', 'iPhone 12', (4.2,), 2020),
+           ('Apple', 'iPhone 8', (3.99,), 2017),
+           ('samsung', 'SM-G991B', (5.4,), 2021),
+           ('Sony', 'ILCE-7M3', (28, 35, 55), 2018),
+           ('FUJIFILM', 'X-T3', (23, 35, 56), 2018),
+           ('Kodak', 'EasyShare C643', (6.0,), 2006)]
+APERTURES = (1.8, 2.0, 2.8, 4.0, 5.6, 8.0)
+EXPOSURES = (1 / 1000, 1 / 500, 1 / 250, 1 / 125, 1 / 60, 1 / 30)
+ISOS = (100, 200, 400, 800, 1600, 3200)
+
+def zipf_weights(count: int, exponent: float = 1.1) -> List[float]:
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+def ensure_schema(database_url: str) -> None:
+    """Bring the database to the head of the migrations, as the app requires."""
+    subprocess.run([sys.executable, '-m', 'alembic', 'upgrade', 'head'], cwd=backend_dir, check=True,
+                   env={**os.environ, 'DATABASE_URL': database_url}, capture_output=True)
+
+def reset_archive() -> None:
+    """Delete every row of the application tables."""
+    for table in reversed(db.metadata.sorted_tables):
+        db.session.execute(delete(table))
+    db.session.commit()
+
+def _bulk_insert_returning_ids(model, rows: List[Dict[str, Any]]) -> List[int]:
+    statement = insert(model).returning(model.id, sort_by_parameter_order=True)
+    return list(db.session.scalars(statement, rows))
+
+def generate_people(rng: random.Random, count: int) -> List[List[int]]:
+    """Insert count people in households sharing a surname. Returns the person IDs by household."""
+    rows, sizes = [], []
+    while len(rows) < count:
+        size = min(rng.randint(2, 6), count - len(rows))
+        last_name = rng.choice(SURNAMES)
+        household_year = rng.randint(1900, 1990)
+        for member in range(size):
+            # Two parents, then children a generation later
+            birth_year = household_year + (0 if member < 2 else rng.randint(20, 35))
+            first_name = rng.choice(GIVEN_NAMES)
+            rows.append({
+                'first_name': first_name,
+                'last_name': last_name,
+                'first_name_phonetic': phonetic_key(first_name),
+                'last_name_phonetic': phonetic_key(last_name),
+                'birth_date': date(birth_year, rng.randint(1, 12), rng.randint(1, 28)),
+                'death_date': date(birth_year + rng.randint(60, 95), 1, 1) if birth_year < 1940 else None,
+                'description': f"Born in {rng.choice(PLACES)[0]}",
+                'photo_count': 0
+            })
+        sizes.append(size)
+    ids = _bulk_insert_returning_ids(Person, rows)
+    households, offset = [], 0
+    for size in sizes:
+        households.append(ids[offset:offset + size])
+        offset += size
+    return households
+
+def generate_events(rng: random.Random, count: int, households: List[List[int]]) -> List[Dict[str, Any]]:
+    """Family events: date, place, theme, tags, people and camera of the photos taken there."""
+    general_weights = zipf_weights(len(GENERAL_TAGS))
+    events = []
+    for _ in range(count):
+        # Recent years hold most of the photos
+        year = max(1950, 2024 - int(rng.expovariate(1 / 12)))
+        theme = rng.choice(list(THEMES))
+        household = rng.choice(households)
+        guests = [person for other in rng.sample(households, min(2, len(households))) for person in other]
+        cameras = [camera for camera in CAMERAS if camera[3] <= year] or [CAMERAS[-1]]
+        events.append({
+            'start': datetime(year, rng.randint(1, 12), rng.randint(1, 28), rng.randint(8, 18), tzinfo=timezone.utc),
+            'place': rng.choice(PLACES),
+            'theme': theme,
+            'tags': THEMES[theme] + list(dict.fromkeys(rng.choices(GENERAL_TAGS, general_weights, k=3))),
+            'people': list(dict.fromkeys(household + rng.sample(guests, min(len(guests), rng.randint(0, 4))))),
+            'camera': rng.choice(cameras)
+        })
+    return events
+
+def photo_row(rng: random.Random, index: int, event: Dict[str, Any], key_prefix: str) -> Dict[str, Any]:
+    make, model, focal_lengths, _ = event['camera'] if rng.random() < 0.85 else rng.choice(CAMERAS)
+    place, latitude, longitude = event['place']
+    s3_key = f"{key_prefix}/{index:07d}.jpg"
+    return {
+        'file_name': f"IMG_{index:05d}.jpg",
+        's3_key': s3_key,
+        'url': public_url(config.storage.bucket_name, s3_key),
+        'title': f"{event['theme'].capitalize()} in {place}",
+        'upload_date': datetime.now(timezone.utc),
+        'date_taken': event['start'] + timedelta(minutes=rng.randint(0, 600)),
+        'author': None,
+        'location_name': place,
+        'latitude': round(latitude + rng.uniform(-0.02, 0.02), 6),
+        'longitude': round(longitude + rng.uniform(-0.02, 0.02), 6),
+        'camera_make': make,
+        'camera_model': model,
+        'focal_length': float(rng.choice(focal_lengths)),
+        'f_number': rng.choice(APERTURES),
+        'exposure_time': rng.choice(EXPOSURES),
+        'iso': rng.choice(ISOS)
+    }
+
+def _rational(value: float) -> IFDRational:
+    return IFDRational(round(value * 1000), 1000)
+
+def _dms(value: float) -> Tuple[IFDRational, IFDRational, IFDRational]:
+    value = abs(value)
+    degrees, minutes = int(value), int(value * 60) % 60
+    return IFDRational(degrees, 1), IFDRational(minutes, 1), _rational((value * 3600) % 60)
+
+def photo_jpeg(row: Dict[str, Any], rng: random.Random = None, size: Tuple[int, int] = (96, 72)) -> bytes:
+    """A small JPEG carrying the camera, exposure, date and GPS EXIF tags of a photo row."""
+    rng = rng or random.Random(row['s3_key'])
+    exif = Image.Exif()
+    exif[0x010F] = row['camera_make']
+    exif[0x0110] = row['camera_model']
+    taken = row['date_taken'].strftime('%Y:%m:%d %H:%M:%S')
+    exif[0x0132] = taken
+    details = exif.get_ifd(0x8769)
+    details[0x9003] = taken
+    details[0x829A] = IFDRational(1, round(1 / row['exposure_time']))
+    details[0x829D] = _rational(row['f_number'])
+    details[0x8827] = row['iso']
+    details[0x920A] = _rational(row['focal_length'])
+    gps = exif.get_ifd(0x8825)
+    gps[1], gps[2] = ('N' if row['latitude'] >= 0 else 'S'), _dms(row['latitude'])
+    gps[3], gps[4] = ('E' if row['longitude'] >= 0 else 'W'), _dms(row['longitude'])
+
+    image = Image.new('RGB', size, tuple(rng.randrange(256) for _ in range(3)))
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', exif=exif, quality=80)
+    return buffer.getvalue()
+
+def generate_photos(rng: random.Random, count: int, events: List[Dict[str, Any]], key_prefix: str,
+                    batch_size: int = 2000) -> List[Dict[str, Any]]:
+    """Insert count photos spread over events, with their tags and people. Returns the rows."""
+    db.session.execute(insert(Tag), [
+        {'name': name, 'created_at': datetime.utcnow()}
+        for name in sorted({tag for event in events for tag in event['tags']})
+    ])
+    all_rows = []
+    for offset in range(0, count, batch_size):
+        rows, links = [], []
+        for index in range(offset, min(offset + batch_size, count)):
+            # Events hold consecutive photos, as a camera roll does
+            event = events[index * len(events) // count]
+            rows.append(photo_row(rng, index, event, key_prefix))
+            tags = rng.sample(event['tags'], rng.randint(1, min(4, len(event['tags']))))
+            people = [] if rng.random() < 0.1 else rng.sample(event['people'], rng.randint(1, min(4, len(event['people']))))
+            links.append((tags, people))
+        ids = _bulk_insert_returning_ids(Photo, rows)
+        tag_rows = [{'photo_id': photo_id, 'tag_name': tag} for photo_id, (tags, _) in zip(ids, links) for tag in tags]
+        people_rows = [
+            {'photo_id': photo_id, 'person_id': person_id} for photo_id, (_, people) in zip(ids, links) for person_id in people
+        ]
+        db.session.execute(insert(photo_tags), tag_rows)
+        if people_rows:
+            db.session.execute(insert(photo_people), people_rows)
+        db.session.commit()
+        all_rows.extend(rows)
+    return all_rows
+
+def upload_files(storage: StorageService, rows: List[Dict[str, Any]], threads: int = 16) -> None:
+    """Put the JPEG of every photo row in the bucket."""
+    storage._ensure_bucket_exists()
+    client = storage.s3_client
+
+    def upload(row):
+        client.put_object(Bucket=storage.bucket_name, Key=row['s3_key'], Body=photo_jpeg(row),
+                          ContentType='image/jpeg')
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(upload, rows))
+
+def generate_archive(photos: int, people: int, seed: int = 7, storage: StorageService = None) -> Dict[str, Any]:
+    """
+    Fill the database of the current app context with a synthetic archive.
+
+    Returns:
+        Dictionary containing the seed, the generation time and the row counts
+    """
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    households = generate_people(rng, people)
+    events = generate_events(rng, max(1, photos // 25), households)
+    rows = generate_photos(rng, photos, events, key_prefix=f"archive-{seed}")
+    rebuild_timeline(db.session)
+    rebuild_camera_counts(db.session)
+    rebuild_person_index(db.session)
+    db.session.commit()
+    if storage is not None:
+        upload_files(storage, rows)
+    return {
+        'seed': seed,
+        'generation_s': round(time.perf_counter() - start, 1),
+        **archive_counts()
+    }
+
+def archive_counts() -> Dict[str, int]:
+    return {
+        'photos': db.session.scalar(select(func.count()).select_from(Photo)),
+        'people': db.session.scalar(select(func.count()).select_from(Person))
+    }
+
+def archive_vocabulary() -> Dict[str, List]:
+    """Person IDs, tags, places and names of the archive in the database, to draw requests from."""
+    return {
+        'person_ids': list(db.session.scalars(select(Person.id).order_by(Person.id).limit(1000))),
+        'tags': list(db.session.scalars(select(Tag.name).order_by(Tag.name))),
+        'places': [place for place, _, _ in PLACES],
+        'surnames': list(SURNAMES),
+        'given_names': list(GIVEN_NAMES)
+    }
+
+def start_moto_server(port: int = 5055):
+    """Serve S3 from an in-process moto server and point the storage settings at it."""
+    from moto.server import ThreadedMotoServer
+
+    server = ThreadedMotoServer(ip_address='127.0.0.1', port=port)
+    server.start()
+    config.storage.endpoint = f"127.0.0.1:{port}"
+    config.storage.use_ssl = False
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--photos', type=int, default=5000, help='Photos to generate')
+    parser.add_argument('--people', type=int, default=500, help='People to generate')
+    parser.add_argument('--seed', type=int, default=7, help='Random seed; the same seed gives the same archive')
+    parser.add_argument('--reset', action='store_true', help='Delete every row of the database first')
+    parser.add_argument('--with-files', action='store_true', help='Also put a JPEG of each photo in the bucket')
+    args = parser.parse_args()
+
+    database_url = os.getenv('BENCHMARK_DATABASE_URL') or os.getenv('DATABASE_URL')
+    ensure_schema(database_url)
+    app = create_benchmark_app(database_url)
+    with app.app_context():
+        if args.reset:
+            reset_archive()
+        elif db.session.scalar(select(func.count()).select_from(Photo)):
+            parser.error("the database already holds photos; use --reset to replace them")
+        summary = generate_archive(args.photos, args.people, args.seed,
+                                   StorageService() if args.with_files else None)
+    print(json.dumps(summary, indent=2))
+
+if __name__ == '__main__':
+    main()
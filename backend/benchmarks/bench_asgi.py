@@ -0,0 +1,91 @@
+"""Benchmark the concurrency limits of the WSGI and ASGI serving modes.
+
+Starts the API with gunicorn (app:app, sync workers with threads) and with
+uvicorn (asgi:app), then requests --path from a growing number of concurrent
+clients. For each concurrency level it reports the throughput, latency
+percentiles and errors; the concurrency limit of a mode is the highest level
+whose p95 latency stays under --p95-budget-ms without errors.
+
+Both servers use the DATABASE_URL and STORAGE_* settings of the environment,
+with the same number of worker processes. Use an I/O-bound path such as a
+search with facets or /api/photos/<id>/content.
+
+Usage:
+    python -m benchmarks.bench_asgi --path "/api/photos/search?q=family&facets=true" --workers 2
+"""
+import argparse
+import json
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.common import backend_dir, server_command, summarize, wait_until_ready
+
+def run_level(url: str, concurrency: int, duration: float) -> dict:
+    """Request url from concurrency clients for duration seconds."""
+    latencies, errors = [], []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client():
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                ok = session.get(url, timeout=30).status_code < 500
+            except requests.RequestException:
+                ok = False
+            with lock:
+                (latencies if ok else errors).append((time.perf_counter() - start) * 1000)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(client)
+    result = {'requests': len(latencies), 'errors': len(errors),
+              'throughput_rps': round(len(latencies) / duration, 1)}
+    if latencies:
+        latencies.sort()
+        result.update(summarize(latencies))
+        result['p50_ms'] = round(latencies[len(latencies) // 2], 3)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--path', default='/api/photos/search?q=family&facets=true', help='Path requested')
+    parser.add_argument('--workers', type=int, default=2, help='Worker processes of each server')
+    parser.add_argument('--threads', type=int, default=4, help='Threads per gunicorn worker (WSGI mode)')
+    parser.add_argument('--concurrency', default='1,8,32,128,256', help='Comma-separated client counts')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per concurrency level')
+    parser.add_argument('--p95-budget-ms', type=float, default=500, help='Latency budget of the concurrency limit')
+    parser.add_argument('--modes', default='wsgi,asgi', help='Serving modes to compare')
+    parser.add_argument('--port', type=int, default=8765, help='Port of the server under test')
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(',')]
+    url = f"http://127.0.0.1:{args.port}{args.path}"
+    results = {}
+    for mode in args.modes.split(','):
+        server = subprocess.Popen(server_command(mode, args.workers, args.threads, args.port),
+                                  cwd=backend_dir, env=dict(os.environ))
+        try:
+            wait_until_ready(url)
+            levels_results = {level: run_level(url, level, args.duration) for level in levels}
+        finally:
+            server.terminate()
+            server.wait()
+        within_budget = [
+            level for level, result in levels_results.items()
+            if result['requests'] and not result['errors'] and result['p95_ms'] <= args.p95_budget_ms
+        ]
+        results[mode] = {
+            'concurrency_limit': max(within_budget, default=0),
+            'levels': levels_results
+        }
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Benchmark the duplicate-person scan on a synthetic population.
+
+Generates --people persons drawn from a pool of surnames and first names, with
+a share of them duplicated under a spelling variant and a shifted birth date,
+then times DuplicateService.scan_duplicates and reports how many comparisons
+blocking saved compared with scoring every pair.
+
+Usage:
+    BENCHMARK_DATABASE_URL=postgresql://... python -m benchmarks.bench_duplicates --people 100000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import date, timedelta
+
+from benchmarks.common import create_benchmark_app
+from sqlalchemy import insert
+from core.models.db import db
+from core.models.person import Person
+from core.models.duplicate_candidate import DuplicateCandidate
+from core.infrastructure.phonetic import phonetic_key
+from core.services.duplicate_service import DuplicateService
+from core.services.service_context import ServiceContext
+
+_SYLLABLES = ['ma', 'ri', 'jo', 'an', 'el', 'be', 'ga', 'lo', 'du', 'pon', 'ret', 'vin', 'cha', 'bel', 'mar', 'tin']
+
+def _name(rng: random.Random) -> str:
+    return ''.join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+
+def _variant(rng: random.Random, name: str) -> str:
+    """A plausible misspelling: a doubled, dropped or swapped letter."""
+    position = rng.randrange(1, len(name))
+    edit = rng.choice(('double', 'drop', 'swap'))
+    if edit == 'double':
+        return name[:position] + name[position - 1] + name[position:]
+    if edit == 'drop' and len(name) > 3:
+        return name[:position] + name[position + 1:]
+    return name[:position - 1] + name[position:position + 1] + name[position - 1:position] + name[position + 1:]
+
+def generate_people(count: int, duplicate_share: float, seed: int = 11, batch_size: int = 5000) -> int:
+    """Insert count people, duplicate_share of which duplicate another one. Returns the duplicates."""
+    rng = random.Random(seed)
+    surnames = [_name(rng) for _ in range(max(10, count // 40))]
+    first_names = [_name(rng) for _ in range(400)]
+    rows, duplicates = [], 0
+    while len(rows) < count:
+        if rows and rng.random() < duplicate_share:
+            source = rng.choice(rows)
+            first_name, last_name = _variant(rng, source['first_name']), source['last_name']
+            birth_date = source['birth_date'] + timedelta(days=rng.choice((0, 0, 1, 365)))
+            duplicates += 1
+        else:
+            first_name, last_name = rng.choice(first_names), rng.choice(surnames)
+            birth_date = date(1800, 1, 1) + timedelta(days=rng.randrange(200 * 365))
+        rows.append({
+            'first_name': first_name, 'last_name': last_name, 'birth_date': birth_date,
+            'first_name_phonetic': phonetic_key(first_name), 'last_name_phonetic': phonetic_key(last_name),
+            'photo_count': 0
+        })
+    for offset in range(0, count, batch_size):
+        db.session.execute(insert(Person), rows[offset:offset + batch_size])
+    db.session.commit()
+    return duplicates
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--people', type=int, default=100000, help='Number of synthetic people')
+    parser.add_argument('--duplicate-share', type=float, default=0.05, help='Share of people that are duplicates')
+    parser.add_argument('--database-url', help='Defaults to BENCHMARK_DATABASE_URL or DATABASE_URL')
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.database_url)
+    with app.app_context():
+        db.session.query(DuplicateCandidate).delete()
+        db.session.query(Person).delete()
+        db.session.commit()
+        duplicates = generate_people(args.people, args.duplicate_share)
+
+        start = time.perf_counter()
+        result = DuplicateService(ServiceContext()).scan_duplicates()
+        elapsed = time.perf_counter() - start
+        print(json.dumps({
+            **result,
+            'generatedDuplicates': duplicates,
+            'allPairs': args.people * (args.people - 1) // 2,
+            'scan_seconds': round(elapsed, 2)
+        }, indent=2))
+
+if __name__ == '__main__':
+    main()
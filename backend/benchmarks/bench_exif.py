@@ -0,0 +1,117 @@
+"""Benchmark EXIF extraction per file on a corpus of JPEG, PNG and HEIC-like samples.
+
+Generates camera-sized samples in memory (noise images so the compressed data
+is realistically large) carrying the same EXIF block with GPS, or reads the
+files of --corpus, then times core.infrastructure.exif_utils.extract_exif_data
+on each file against opening it with Pillow and resolving the same IFDs, which
+is what the previous implementation did. Pillow cannot open the HEIC samples,
+so they have no baseline.
+
+Usage:
+    python -m benchmarks.bench_exif --width 4000 --height 3000
+    python -m benchmarks.bench_exif --corpus /path/to/photos
+"""
+import argparse
+import json
+import os
+import struct
+from io import BytesIO
+
+from benchmarks.common import time_call
+from PIL import Image
+from PIL.TiffImagePlugin import IFDRational
+from core.infrastructure.exif_utils import extract_exif_data
+
+_EXIF_HEADER = b'Exif\x00\x00'
+
+def sample_exif() -> Image.Exif:
+    """An EXIF block with the camera, exposure and GPS tags a phone writes."""
+    exif = Image.Exif()
+    exif[0x010F] = 'Canon'
+    exif[0x0110] = 'Canon EOS 5D Mark IV'
+    exif[0x0132] = '2019:07:14 10:21:33'
+    exif[0x013B] = 'Jane Doe'
+    details = exif.get_ifd(0x8769)
+    details[0x9003] = '2019:07:14 10:21:33'
+    details[0x829A] = IFDRational(1, 250)
+    details[0x829D] = IFDRational(28, 10)
+    details[0x8827] = 200
+    details[0x920A] = IFDRational(35, 1)
+    # A maker note, the bulk of a real EXIF block, which is never resolved
+    details[0x927C] = bytes(range(256)) * 32
+    gps = exif.get_ifd(0x8825)
+    gps[1], gps[2] = 'N', (IFDRational(48, 1), IFDRational(51, 1), IFDRational(2958, 100))
+    gps[3], gps[4] = 'E', (IFDRational(2, 1), IFDRational(17, 1), IFDRational(40, 1))
+    return exif
+
+def heif_sample(tiff: bytes, image_data: bytes) -> bytes:
+    """A HEIF container with an Exif item and image_data in its mdat box."""
+    def box(box_type, payload, version=None):
+        if version is not None:
+            payload = bytes([version, 0, 0, 0]) + payload
+        return struct.pack('>L4s', 8 + len(payload), box_type) + payload
+
+    item = struct.pack('>L', len(_EXIF_HEADER)) + _EXIF_HEADER + tiff
+    ftyp = box(b'ftyp', b'heic' + b'\x00' * 4 + b'mif1heic')
+
+    def meta(offset):
+        infe = box(b'infe', struct.pack('>HH4s', 1, 0, b'Exif') + b'\x00', version=2)
+        iinf = box(b'iinf', struct.pack('>H', 1) + infe, version=0)
+        iloc = box(b'iloc', bytes([0x44, 0]) + struct.pack('>HHHHLL', 1, 1, 0, 1, offset, len(item)), version=0)
+        return box(b'meta', iinf + iloc, version=0)
+
+    mdat_offset = len(ftyp) + len(meta(0)) + 8
+    return ftyp + meta(mdat_offset) + box(b'mdat', item + image_data)
+
+def generate_corpus(width: int, height: int) -> dict:
+    """Sample files by format name."""
+    exif = sample_exif()
+    image = Image.effect_noise((width, height), 48).convert('RGB')
+    corpus = {}
+    for image_format in ('JPEG', 'PNG'):
+        buffer = BytesIO()
+        image.save(buffer, image_format, exif=exif)
+        corpus[image_format] = buffer.getvalue()
+    corpus['HEIC'] = heif_sample(exif.tobytes()[len(_EXIF_HEADER):], corpus['JPEG'])
+    return corpus
+
+def read_corpus(path: str) -> dict:
+    corpus = {}
+    for name in sorted(os.listdir(path)):
+        with open(os.path.join(path, name), 'rb') as photo:
+            corpus[name] = photo.read()
+    return corpus
+
+def pillow_exif(photo_file) -> dict:
+    """The previous extraction: open the image with Pillow and resolve the EXIF IFDs."""
+    exif = Image.open(photo_file).getexif()
+    return {**exif, **exif.get_ifd(0x8769), **exif.get_ifd(0x8825)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', help='Directory of photos to use instead of generated samples')
+    parser.add_argument('--width', type=int, default=4000, help='Width of the generated samples')
+    parser.add_argument('--height', type=int, default=3000, help='Height of the generated samples')
+    parser.add_argument('--repeat', type=int, default=50, help='Timed runs per file')
+    args = parser.parse_args()
+
+    corpus = read_corpus(args.corpus) if args.corpus else generate_corpus(args.width, args.height)
+    results = {}
+    for name, content in corpus.items():
+        photo = BytesIO(content)
+        result = {
+            'bytes': len(content),
+            'hasGps': extract_exif_data(photo).get('latitude') is not None,
+            'segment_parser': time_call(lambda: extract_exif_data(photo), repeat=args.repeat)
+        }
+        try:
+            pillow_exif(BytesIO(content))
+            result['pillow'] = time_call(lambda: pillow_exif(BytesIO(content)), repeat=args.repeat)
+            result['speedup'] = round(result['pillow']['median_ms'] / result['segment_parser']['median_ms'], 1)
+        except Exception as e:
+            result['pillow'] = f"unsupported: {e}"
+        results[name] = result
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
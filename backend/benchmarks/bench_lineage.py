@@ -0,0 +1,84 @@
+"""Benchmark ancestor/descendant traversal over a synthetic family tree.
+
+Builds a tree of --people persons spread over many generations (two parents per
+child drawn from the previous generation, so lineages overlap the way real
+pedigrees do), then times get_ancestors/get_descendants with the recursive CTE
+and with the in-memory relationship graph.
+
+Usage:
+    BENCHMARK_DATABASE_URL=postgresql://... python -m benchmarks.bench_lineage --people 50000
+"""
+import argparse
+import json
+import random
+
+from benchmarks.common import create_benchmark_app, time_call
+from sqlalchemy import insert
+from core.models.db import db
+from core.models.person import Person
+from core.models.relationship import Relationship, PARENT
+from core.services.person_service import PersonService, MAX_LINEAGE_DEPTH
+from core.services.relationship_graph import RelationshipGraph
+from core.services.service_context import ServiceContext
+
+def generate_tree(count: int, generation_size: int, seed: int = 7, batch_size: int = 5000) -> list:
+    """Insert count people in generations and link each to two parents of the previous one.
+
+    Returns:
+        List of generations, each a list of person ids
+    """
+    rng = random.Random(seed)
+    generations = []
+    created = 0
+    while created < count:
+        size = min(generation_size, count - created)
+        rows = [{'first_name': f"G{len(generations)}", 'last_name': f"P{created + i}",
+                 'photo_count': 0} for i in range(size)]
+        ids = []
+        for offset in range(0, size, batch_size):
+            result = db.session.execute(
+                insert(Person.__table__).returning(Person.__table__.c.id),
+                rows[offset:offset + batch_size]
+            )
+            ids.extend(row[0] for row in result)
+        if generations:
+            previous = generations[-1]
+            edges = []
+            for child_id in ids:
+                for parent_id in rng.sample(previous, 2):
+                    edges.append({'person_id': parent_id, 'relative_id': child_id, 'relationship_type': PARENT})
+            db.session.execute(insert(Relationship.__table__), edges)
+        db.session.commit()
+        generations.append(ids)
+        created += size
+    return generations
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--people', type=int, default=50000, help='Number of synthetic people')
+    parser.add_argument('--generation-size', type=int, default=2000, help='People per generation')
+    parser.add_argument('--repeat', type=int, default=20, help='Timed runs per traversal')
+    parser.add_argument('--database-url', help='Defaults to BENCHMARK_DATABASE_URL or DATABASE_URL')
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.database_url)
+    with app.app_context():
+        db.session.query(Relationship).delete()
+        db.session.query(Person).delete()
+        db.session.commit()
+        generations = generate_tree(args.people, args.generation_size)
+
+        service = PersonService(ServiceContext())
+        leaf, root = generations[-1][0], generations[0][0]
+        results = {'people': args.people, 'generations': len(generations)}
+        for mode in ('recursive_cte', 'memory_graph'):
+            service.graph = RelationshipGraph(ttl_seconds=3600) if mode == 'memory_graph' else None
+            results[mode] = {
+                'ancestors': time_call(lambda: service.get_ancestors(leaf, MAX_LINEAGE_DEPTH), repeat=args.repeat),
+                'descendants': time_call(lambda: service.get_descendants(root, 5), repeat=args.repeat),
+                'ancestor_count': len(service.get_ancestors(leaf, MAX_LINEAGE_DEPTH))
+            }
+        print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark batch person writes against the one-row-per-call path.
+
+Creates, updates and deletes --count people with create_person/update_person/
+delete_person (one commit each, as the single-person routes do), then with
+create_persons/update_persons/delete_persons in batches of --batch-size.
+
+Usage:
+    BENCHMARK_DATABASE_URL=postgresql://... python -m benchmarks.bench_person_batch --count 5000
+"""
+import argparse
+import json
+import time
+
+from benchmarks.common import create_benchmark_app
+from core.models.db import db
+from core.models.person import Person
+from core.services.person_service import PersonService
+from core.services.service_context import ServiceContext
+
+def _timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return round((time.perf_counter() - start) * 1000, 1)
+
+def _batches(items: list, size: int):
+    for offset in range(0, len(items), size):
+        yield items[offset:offset + size]
+
+def run_per_row(service: PersonService, people: list) -> dict:
+    ids = []
+    return {
+        'create_ms': _timed(lambda: ids.extend(service.create_person(dict(person))['id'] for person in people)),
+        'update_ms': _timed(lambda: [service.update_person(person_id, {'description': 'updated'}) for person_id in ids]),
+        'delete_ms': _timed(lambda: [service.delete_person(person_id) for person_id in ids])
+    }
+
+def run_batched(service: PersonService, people: list, batch_size: int) -> dict:
+    ids = []
+
+    def create():
+        for batch in _batches(people, batch_size):
+            ids.extend(result['id'] for result in service.create_persons(batch)['results'])
+
+    def update_all():
+        for batch in _batches(ids, batch_size):
+            service.update_persons([{'id': person_id, 'description': 'updated'} for person_id in batch])
+
+    def delete_all():
+        for batch in _batches(ids, batch_size):
+            service.delete_persons(batch)
+
+    return {'create_ms': _timed(create), 'update_ms': _timed(update_all), 'delete_ms': _timed(delete_all)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=5000, help='Number of people written by each path')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Items per batch call')
+    parser.add_argument('--database-url', help='Defaults to BENCHMARK_DATABASE_URL or DATABASE_URL')
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.database_url)
+    with app.app_context():
+        db.session.query(Person).delete()
+        db.session.commit()
+        service = PersonService(ServiceContext())
+        people = [{'first_name': f"First{i}", 'last_name': f"Last{i % 500}"} for i in range(args.count)]
+        per_row = run_per_row(service, people)
+        batched = run_batched(service, people, args.batch_size)
+        results = {
+            'count': args.count,
+            'batch_size': args.batch_size,
+            'per_row': per_row,
+            'batched': batched,
+            'speedup': {key: round(per_row[key] / batched[key], 1) if batched[key] else None for key in per_row}
+        }
+        print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
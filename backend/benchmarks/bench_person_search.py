@@ -0,0 +1,100 @@
+"""Benchmark PersonService.search_people over a synthetic genealogy.
+
+Generates people whose names are drawn from regional given names and surnames
+with the spelling drift found in old parish registers, then compares the plain
+ILIKE scan that search_people used to run with the trigram/phonetic search.
+
+Usage:
+    BENCHMARK_DATABASE_URL=postgresql://... python -m benchmarks.bench_person_search --people 100000
+"""
+import argparse
+import json
+import random
+from datetime import date
+
+from benchmarks.common import create_benchmark_app, time_call
+from sqlalchemy import insert, or_
+from core.models.db import db
+from core.models.person import Person
+from core.infrastructure.phonetic import phonetic_key
+from core.services.person_service import PersonService
+from core.services.service_context import ServiceContext
+
+GIVEN_NAMES = ['Jean', 'Pierre', 'Marie', 'Anne', 'Jacques', 'Louis', 'François', 'Catherine',
+               'Marguerite', 'Nicolas', 'Antoine', 'Jeanne', 'Étienne', 'Claude', 'Guillaume']
+SURNAMES = ['Marc', 'Martin', 'Bernard', 'Dubois', 'Thomas', 'Robert', 'Richard', 'Petit',
+            'Durand', 'Leroy', 'Moreau', 'Simon', 'Laurent', 'Lefebvre', 'Michel', 'Garnier']
+# Spelling drift seen in old records: (modern, archaic)
+VARIANTS = [('Jean', 'Jehan'), ('Marc', 'Marcq'), ('Lefebvre', 'Lefèvre'), ('Louis', 'Loys'),
+            ('Thomas', 'Thomaz'), ('Petit', 'Petitt'), ('Moreau', 'Moreaux'), ('Simon', 'Symon')]
+QUERIES = ['Jehan', 'Marcq', 'Lefevre', 'Symon Moreaux', 'Catherine Dubois', 'ann']
+
+def _drift(name: str, rng: random.Random) -> str:
+    for modern, archaic in VARIANTS:
+        if name == modern and rng.random() < 0.3:
+            return archaic
+    return name
+
+def generate_people(count: int, seed: int = 42, batch_size: int = 5000) -> None:
+    """Insert count synthetic people with executemany batches."""
+    rng = random.Random(seed)
+    statement = insert(Person.__table__)
+    for offset in range(0, count, batch_size):
+        rows = []
+        for _ in range(min(batch_size, count - offset)):
+            first_name = _drift(rng.choice(GIVEN_NAMES), rng)
+            last_name = _drift(rng.choice(SURNAMES), rng)
+            birth_year = rng.randint(1600, 1990)
+            rows.append({
+                'first_name': first_name,
+                'last_name': last_name,
+                'first_name_phonetic': phonetic_key(first_name),
+                'last_name_phonetic': phonetic_key(last_name),
+                'birth_date': date(birth_year, rng.randint(1, 12), rng.randint(1, 28)),
+                'description': f"Né à {rng.choice(['Lyon', 'Rouen', 'Nantes', 'Arras'])} vers {birth_year}",
+                'photo_count': 0
+            })
+        db.session.execute(statement, rows)
+        db.session.commit()
+
+def ilike_search(query: str, limit: int = 50):
+    """The search_people implementation this benchmark compares against."""
+    conditions = []
+    for term in query.split():
+        pattern = f"%{term}%"
+        conditions.append(or_(Person.first_name.ilike(pattern), Person.last_name.ilike(pattern),
+                              Person.description.ilike(pattern)))
+    return (db.session.query(Person).distinct().filter(or_(*conditions))
+            .order_by(Person.first_name, Person.last_name).limit(limit).all())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--people', type=int, default=100000, help='Number of synthetic people')
+    parser.add_argument('--repeat', type=int, default=20, help='Timed runs per query')
+    parser.add_argument('--database-url', help='Defaults to BENCHMARK_DATABASE_URL or DATABASE_URL')
+    parser.add_argument('--keep', action='store_true', help='Keep existing people instead of regenerating')
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.database_url)
+    with app.app_context():
+        if not args.keep:
+            db.session.query(Person).delete()
+            db.session.commit()
+            generate_people(args.people)
+            if db.engine.dialect.name == 'postgresql':
+                with db.engine.connect() as connection:
+                    connection.exec_driver_sql("ANALYZE people")
+
+        service = PersonService(ServiceContext())
+        results = {'people': db.session.query(Person).count(), 'queries': {}}
+        for query in QUERIES:
+            results['queries'][query] = {
+                'ilike': time_call(lambda: ilike_search(query), repeat=args.repeat),
+                'search_people': time_call(lambda: service.search_people(query), repeat=args.repeat),
+                'ilike_hits': len(ilike_search(query)),
+                'search_people_hits': len(service.search_people(query))
+            }
+        print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
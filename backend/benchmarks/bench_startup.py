@@ -0,0 +1,119 @@
+"""Benchmark worker cold start: import cost and time to first request.
+
+Profiles `import app` with `python -X importtime`, summing the self time of
+each module by top-level package, then starts fresh interpreters that create
+the app and serve a first request, timing each phase:
+- import: importing the app module and its routes
+- create: create_app(), which checks the schema revision
+- first request: the first request, which opens the database connection
+- forked first request: a worker forked from a process that already created
+  the app, as with gunicorn's preload_app (see gunicorn.conf.py)
+
+The database must be migrated to the head revision. Without
+BENCHMARK_DATABASE_URL (or DATABASE_URL) a temporary SQLite database is
+migrated and used.
+
+Usage:
+    python -m benchmarks.bench_startup --runs 10 --path /api/photos/tags
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from benchmarks.common import backend_dir, summarize
+
+# Run in each fresh interpreter; prints the phase timings as JSON
+_COLD_START = '''
+import json, os, sys, time
+start = time.perf_counter()
+import app as app_module
+imported = time.perf_counter()
+app = app_module.create_app()
+created = time.perf_counter()
+status = app.test_client().get(sys.argv[1]).status_code
+served = time.perf_counter()
+
+read_fd, write_fd = os.pipe()
+forked = time.perf_counter()
+if os.fork() == 0:
+    app.test_client().get(sys.argv[1])
+    os.write(write_fd, str(time.perf_counter() - forked).encode())
+    os._exit(0)
+os.close(write_fd)
+forked_first_request = float(os.read(read_fd, 64))
+os.wait()
+print(json.dumps({
+    'status': status,
+    'import': (imported - start) * 1000,
+    'create': (created - imported) * 1000,
+    'first_request': (served - created) * 1000,
+    'forked_first_request': forked_first_request * 1000
+}))
+'''
+
+def importtime_profile(env: dict, top: int) -> dict:
+    """Cumulative import time of `import app`, in total and by top-level package."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=backend_dir, env=env, capture_output=True, text=True, check=True
+    )
+    total_us = 0
+    modules = set()
+    packages = defaultdict(int)
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        module = name.strip()
+        modules.add(module)
+        packages[module.split('.')[0]] += int(self_us)
+        if module == 'app':
+            total_us = int(cumulative_us)
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+    return {
+        'total_ms': round(total_us / 1000, 3),
+        'packages_ms': {package: round(us / 1000, 3) for package, us in ranked[:top]},
+        # Loaded on first use only (StorageService.s3_client, benchmarks and tests)
+        'imported': {module: module in modules for module in ('boto3', 'botocore', 'PIL')}
+    }
+
+def migrated_sqlite(directory: str, env: dict) -> str:
+    database_url = f"sqlite:///{os.path.join(directory, 'startup.db')}"
+    subprocess.run([sys.executable, '-m', 'alembic', 'upgrade', 'head'], cwd=backend_dir,
+                   env={**env, 'DATABASE_URL': database_url}, capture_output=True, check=True)
+    return database_url
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help='Fresh interpreters started')
+    parser.add_argument('--path', default='/api/photos/tags', help='Path of the first request')
+    parser.add_argument('--top', type=int, default=10, help='Packages listed in the import profile')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    with tempfile.TemporaryDirectory() as directory:
+        env['DATABASE_URL'] = (
+            os.getenv('BENCHMARK_DATABASE_URL') or os.getenv('DATABASE_URL') or migrated_sqlite(directory, env)
+        )
+        results = {'importtime': importtime_profile(env, args.top)}
+
+        phases = defaultdict(list)
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            output = subprocess.run([sys.executable, '-c', _COLD_START, args.path], cwd=backend_dir,
+                                    env=env, capture_output=True, text=True, check=True).stdout
+            phases['process'].append((time.perf_counter() - start) * 1000)
+            timings = json.loads(output.splitlines()[-1])
+            results['status'] = timings.pop('status')
+            for phase, duration in timings.items():
+                phases[phase].append(duration)
+        results.update({phase: summarize(durations) for phase, durations in phases.items()})
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
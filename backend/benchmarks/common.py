@@ -0,0 +1,99 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks run against a real database given by BENCHMARK_DATABASE_URL (or
+DATABASE_URL) and are never part of the unit test suite.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List
+
+# Add the backend directory to the Python path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+import requests
+from flask import Flask
+from core.models.db import db
+
+def create_benchmark_app(database_url: str = None) -> Flask:
+    """Create a bare Flask app bound to the benchmark database, with all tables created."""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = (
+        database_url or os.getenv('BENCHMARK_DATABASE_URL') or os.getenv('DATABASE_URL')
+    )
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        if db.engine.dialect.name == 'postgresql':
+            with db.engine.begin() as connection:
+                connection.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        db.create_all()
+    return app
+
+def time_call(func: Callable, repeat: int = 20, warmup: int = 2) -> Dict[str, float]:
+    """Time func over several runs and summarize the durations in milliseconds."""
+    for _ in range(warmup):
+        func()
+    durations: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return summarize(durations)
+
+def summarize(durations: List[float]) -> Dict[str, float]:
+    """Summarize durations in milliseconds."""
+    durations = sorted(durations)
+    return {
+        'min_ms': round(durations[0], 3),
+        'median_ms': round(statistics.median(durations), 3),
+        'p95_ms': round(durations[min(len(durations) - 1, int(len(durations) * 0.95))], 3),
+        'max_ms': round(durations[-1], 3)
+    }
+
+def percentiles(durations: List[float]) -> Dict[str, float]:
+    """Latency percentiles (nearest rank) and mean of durations in milliseconds."""
+    durations = sorted(durations)
+
+    def rank(fraction: float) -> float:
+        return round(durations[min(len(durations) - 1, max(0, int(len(durations) * fraction + 0.5) - 1))], 3)
+
+    return {
+        'p50_ms': rank(0.50),
+        'p95_ms': rank(0.95),
+        'p99_ms': rank(0.99),
+        'mean_ms': round(statistics.fmean(durations), 3),
+        'max_ms': round(durations[-1], 3)
+    }
+
+def server_command(mode: str, workers: int, threads: int, port: int) -> list:
+    """Command serving the API with gunicorn (wsgi) or uvicorn (asgi) on 127.0.0.1:port."""
+    if mode == 'wsgi':
+        return [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--workers', str(workers),
+                '--threads', str(threads), '--bind', f"127.0.0.1:{port}", 'app:app']
+    return [sys.executable, '-m', 'uvicorn', 'asgi:app', '--workers', str(workers), '--port', str(port),
+            '--log-level', 'warning']
+
+def wait_until_ready(url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server did not start: {url}")
+
+def git_revision() -> Dict[str, object]:
+    """The commit being measured, so that results can be compared across commits."""
+    def git(*args):
+        return subprocess.run(['git', *args], cwd=backend_dir, capture_output=True, text=True).stdout.strip()
+
+    try:
+        return {'commit': git('rev-parse', 'HEAD') or None, 'dirty': bool(git('status', '--porcelain'))}
+    except OSError:
+        return {'commit': None, 'dirty': None}
@@ -0,0 +1,221 @@
+"""Load-test the API end to end on a synthetic family archive.
+
+Generates an archive (see benchmarks.archive) in the BENCHMARK_DATABASE_URL
+database, serves the API with gunicorn on that database, or uses --base-url,
+then drives the real routes with concurrent clients:
+    upload          POST /api/photos: a JPEG with EXIF, tags and people
+    list            GET /api/photos filtered by a tag or a person, any page
+    search          GET /api/photos/search for a tag or a place, with facets
+    person_search   GET /api/persons/search for a given name or a surname
+
+For each scenario and concurrency level it reports the requests, errors,
+throughput and p50/p95/p99 latencies as JSON, with the commit measured, so
+that the files written with --output can be compared across commits.
+
+Uploads need S3: the STORAGE_* settings (MinIO), or with --s3 moto a moto
+server started by the load test. Each run adds the uploaded photos to the
+archive; --reset regenerates it from scratch.
+
+Usage:
+    BENCHMARK_DATABASE_URL=postgresql://... python -m benchmarks.load_test --photos 20000 --people 2000
+    BENCHMARK_DATABASE_URL=sqlite:////tmp/load.db python -m benchmarks.load_test --reset --s3 moto --output load.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+import requests
+
+from benchmarks.archive import (
+    archive_counts, archive_vocabulary, ensure_schema, generate_archive, generate_events, photo_jpeg, photo_row,
+    reset_archive, start_moto_server
+)
+from benchmarks.common import backend_dir, create_benchmark_app, git_revision, percentiles, server_command, wait_until_ready
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from core.models.db import db
+from core.models.photo import Photo
+from core.services.storage_service import StorageService
+from utils.config import config
+
+# Upload payloads prepared before the timed runs, so that clients only send them
+UPLOAD_PAYLOADS = 64
+
+def upload_requests(rng: random.Random, vocabulary: Dict[str, List]) -> Callable[[random.Random], Dict[str, Any]]:
+    payloads = []
+    for index in range(UPLOAD_PAYLOADS):
+        people = rng.sample(vocabulary['person_ids'], min(3, len(vocabulary['person_ids'])))
+        event = generate_events(rng, 1, [people])[0]
+        row = photo_row(rng, index, event, 'load-test')
+        payloads.append({
+            'content': photo_jpeg(row, rng),
+            'data': {'title': row['title'], 'tags[]': event['tags'][:3], 'people[]': people[:2]}
+        })
+
+    def build(client_rng):
+        payload = client_rng.choice(payloads)
+        return {'method': 'POST', 'path': '/api/photos', 'data': payload['data'],
+                'files': {'photo': ('IMG_load.jpg', payload['content'], 'image/jpeg')}}
+    return build
+
+def list_requests(rng: random.Random, vocabulary: Dict[str, List]) -> Callable[[random.Random], Dict[str, Any]]:
+    def build(client_rng):
+        if client_rng.random() < 0.5:
+            params = {'tags[]': client_rng.choice(vocabulary['tags'])}
+        else:
+            params = {'people[]': client_rng.choice(vocabulary['person_ids'])}
+        params.update({'page': client_rng.randint(1, 5), 'per_page': 50})
+        return {'method': 'GET', 'path': '/api/photos', 'params': params}
+    return build
+
+def search_requests(rng: random.Random, vocabulary: Dict[str, List]) -> Callable[[random.Random], Dict[str, Any]]:
+    def build(client_rng):
+        terms = client_rng.choice((vocabulary['tags'], vocabulary['places']))
+        return {'method': 'GET', 'path': '/api/photos/search',
+                'params': {'q': client_rng.choice(terms), 'facets': 'true'}}
+    return build
+
+def person_search_requests(rng: random.Random, vocabulary: Dict[str, List]) -> Callable[[random.Random], Dict[str, Any]]:
+    def build(client_rng):
+        names = client_rng.choice((vocabulary['given_names'], vocabulary['surnames']))
+        return {'method': 'GET', 'path': '/api/persons/search', 'params': {'q': client_rng.choice(names)}}
+    return build
+
+SCENARIOS = {
+    'upload': upload_requests,
+    'list': list_requests,
+    'search': search_requests,
+    'person_search': person_search_requests
+}
+
+def run_level(base_url: str, build: Callable, concurrency: int, duration: float, seed: int) -> Dict[str, Any]:
+    """Send the requests of build from concurrency clients for duration seconds."""
+    latencies, errors = [], []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(client_id):
+        session = requests.Session()
+        client_rng = random.Random(seed * 1000 + client_id)
+        while time.monotonic() < deadline:
+            spec = build(client_rng)
+            start = time.perf_counter()
+            try:
+                response = session.request(spec['method'], base_url + spec['path'], params=spec.get('params'),
+                                           data=spec.get('data'), files=spec.get('files'), timeout=60)
+                error = None if response.status_code < 400 else f"{response.status_code}: {response.text[:200]}"
+            except requests.RequestException as e:
+                error = str(e)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with lock:
+                if error is None:
+                    latencies.append(elapsed_ms)
+                else:
+                    errors.append(error)
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(client, range(concurrency)))
+    elapsed = time.monotonic() - start
+
+    result = {'requests': len(latencies), 'errors': len(errors),
+              'throughput_rps': round(len(latencies) / elapsed, 1)}
+    if latencies:
+        result.update(percentiles(latencies))
+    if errors:
+        result['first_error'] = errors[0]
+    return result
+
+def prepare_archive(args, database_url: str) -> Dict[str, Any]:
+    """Generate the archive if needed and return its description and vocabulary."""
+    ensure_schema(database_url)
+    app = create_benchmark_app(database_url)
+    with app.app_context():
+        generation = None
+        if args.reset:
+            reset_archive()
+        if args.reset or not db.session.scalar(select(func.count()).select_from(Photo)):
+            storage = StorageService() if args.with_files else None
+            generation = generate_archive(args.photos, args.people, args.seed, storage)
+        return {'archive': {**archive_counts(), 'generation': generation}, 'vocabulary': archive_vocabulary()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--photos', type=int, default=5000, help='Photos of a generated archive')
+    parser.add_argument('--people', type=int, default=500, help='People of a generated archive')
+    parser.add_argument('--seed', type=int, default=7, help='Random seed of the archive and the clients')
+    parser.add_argument('--reset', action='store_true', help='Replace the archive in the database')
+    parser.add_argument('--with-files', action='store_true', help='Put the JPEG of each archive photo in S3')
+    parser.add_argument('--s3', choices=('minio', 'moto'), default='minio', help='S3 service of the uploads')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Comma-separated scenarios to run')
+    parser.add_argument('--concurrency', default='1,8,32', help='Comma-separated client counts')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per scenario and concurrency level')
+    parser.add_argument('--base-url', help='Load-test a running server instead of starting gunicorn')
+    parser.add_argument('--workers', type=int, default=2, help='Gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='Threads per gunicorn worker')
+    parser.add_argument('--port', type=int, default=8766, help='Port of the gunicorn server')
+    parser.add_argument('--output', help='Also write the JSON report to this file')
+    args = parser.parse_args()
+
+    scenarios = args.scenarios.split(',')
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    levels = [int(level) for level in args.concurrency.split(',')]
+    database_url = os.getenv('BENCHMARK_DATABASE_URL') or os.getenv('DATABASE_URL')
+
+    moto = start_moto_server() if args.s3 == 'moto' else None
+    prepared = prepare_archive(args, database_url)
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        base_url = f"http://127.0.0.1:{args.port}"
+        env = {**os.environ, 'DATABASE_URL': database_url, 'STORAGE_ENDPOINT': config.storage.endpoint,
+               'STORAGE_USE_SSL': str(config.storage.use_ssl).lower()}
+        server = subprocess.Popen(server_command('wsgi', args.workers, args.threads, args.port), cwd=backend_dir, env=env)
+
+    try:
+        wait_until_ready(f"{base_url}/api/photos/tags")
+        rng = random.Random(args.seed)
+        results = {}
+        for scenario in scenarios:
+            build = SCENARIOS[scenario](rng, prepared['vocabulary'])
+            results[scenario] = {
+                level: run_level(base_url, build, level, args.duration, args.seed) for level in levels
+            }
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        if moto is not None:
+            moto.stop()
+
+    report = {
+        'revision': git_revision(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'database': make_url(database_url).get_backend_name(),
+            's3': args.s3,
+            'server': args.base_url or {'mode': 'wsgi', 'workers': args.workers, 'threads': args.threads}
+        },
+        'archive': prepared['archive'],
+        'duration_s': args.duration,
+        'results': results
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as report_file:
+            report_file.write(output + '\n')
+    print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+"""Microbenchmarks of the hot service functions, gated against stored baselines.
+
+Times, per call:
+    - Photo.to_dict on a photo with tags and people
+    - extract_exif_data on small JPEG, PNG and HEIC samples
+    - allowed_file and secure_filename on typical upload names
+    - building and compiling (PostgreSQL) the get_photos and search_photos queries
+    - create_response serializing a page of photos
+
+Each benchmark runs enough calls to last about 0.2 s, --repeat times in each
+of --rounds rounds, and keeps the best time per call: slower repetitions
+measure interference from other processes, not the code. Machines differ,
+so every time is also divided by the time of a fixed pure-Python workload
+(calibration) measured alongside. --check compares these normalized times
+with the baselines of benchmarks/baselines/micro.json, measures the
+benchmarks that look slower than their baseline by more than --threshold
+once more, and exits with status 1 if they still are.
+
+Usage:
+    python -m benchmarks.micro                      # print the results
+    python -m benchmarks.micro --check              # fail on a regression
+    python -m benchmarks.micro --save-baseline      # record the current times as baselines
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+from datetime import datetime, timezone
+from io import BytesIO
+from types import SimpleNamespace
+from typing import Callable, Dict
+
+from benchmarks.common import backend_dir, git_revision
+from benchmarks.bench_exif import generate_corpus
+from flask import Flask
+from sqlalchemy.dialects import postgresql
+from werkzeug.utils import secure_filename
+from api.v1.routes import create_response
+from core.models.db import db
+from core.models.person import Person
+from core.models.photo import Photo
+from core.models.tag import Tag
+from core.infrastructure.exif_utils import extract_exif_data
+from core.services.photo_service import PhotoService, allowed_file
+
+BASELINE_PATH = os.path.join(backend_dir, 'benchmarks', 'baselines', 'micro.json')
+# Seconds each timed repetition lasts at least
+MIN_REPETITION_SECONDS = 0.2
+
+UPLOAD_NAMES = ['IMG_2041.JPG', 'Noël chez Mamie (2).jpeg', '../../etc/passwd', 'scan 1954 - mariage.png',
+                'photo.heic', 'DSC00012.jpg', 'vacances été 2019 ★.gif', 'README']
+SEARCH_CRITERIA = {
+    'tags': ['wedding', 'family'],
+    'people': [12, 57],
+    'start_date': datetime(1990, 1, 1),
+    'end_date': datetime(2020, 12, 31),
+    'location': 'Lyon',
+    'camera_make': 'Canon',
+    'min_iso': 200
+}
+
+def calibration() -> None:
+    """A fixed pure-Python workload, to normalize times across machines."""
+    total = 0
+    for value in range(2000):
+        total += len(str(value * value))
+    sorted(str(value) for value in range(500))
+
+def sample_photo(photo_id: int = 1) -> Photo:
+    photo = Photo(
+        file_name='IMG_2041.jpg', s3_key=f"{photo_id}.jpg", url=f"http://storage/photos/{photo_id}.jpg",
+        title='Wedding in Lyon', description='Church steps, after the ceremony',
+        date_taken=datetime(2019, 7, 14, 10, 21, 33, tzinfo=timezone.utc), location_name='Lyon',
+        latitude=45.764, longitude=4.8357, camera_make='Canon', camera_model='Canon EOS 5D Mark IV',
+        focal_length=35.0, f_number=2.8, exposure_time=1 / 250, iso=200,
+        tags=[Tag(name) for name in ('wedding', 'church', 'family')],
+        people=[Person('Jean', 'Martin'), Person('Marie', 'Martin')]
+    )
+    photo.id = photo_id
+    for person_id, person in enumerate(photo.people, start=1):
+        person.id = person_id
+    return photo
+
+def benchmarks() -> Dict[str, Callable[[], object]]:
+    """The benchmarked calls by name."""
+    photo = sample_photo()
+    corpus = generate_corpus(640, 480)
+    photo_service = PhotoService(SimpleNamespace(db=db))
+    dialect = postgresql.dialect()
+    app = Flask(__name__)
+    page = [sample_photo(photo_id).to_dict() for photo_id in range(1, 51)]
+
+    def compile_query(terms, sort):
+        def build_and_compile():
+            statement = photo_service._photo_statement(SEARCH_CRITERIA, terms, sort, 2, 50)
+            return str(statement.compile(dialect=dialect))
+        return build_and_compile
+
+    def serialize_page():
+        with app.app_context():
+            return create_response(success=True, data=page)[0].get_data()
+
+    cases = {
+        'photo_to_dict': photo.to_dict,
+        'validate_filenames': lambda: [allowed_file(secure_filename(name)) for name in UPLOAD_NAMES],
+        'get_photos_query': compile_query([], 'date'),
+        'search_photos_query': compile_query(['wedding', 'martin'], 'relevance'),
+        'create_response_page': serialize_page
+    }
+    for image_format, content in corpus.items():
+        cases[f"exif_{image_format.lower()}"] = lambda content=content: extract_exif_data(BytesIO(content))
+    return cases
+
+def run(cases: Dict[str, Callable[[], object]], repeat: int, rounds: int) -> Dict[str, float]:
+    """
+    Best time per call of each case, in microseconds.
+
+    The cases are measured in turn, rounds times, so that a burst of activity
+    on the machine slows one round of every case rather than every round of one.
+    """
+    timers = {}
+    for name, func in {'calibration': calibration, **cases}.items():
+        timer = timeit.Timer(func)
+        number, elapsed = timer.autorange()
+        timers[name] = (timer, max(number, int(number * MIN_REPETITION_SECONDS / max(elapsed, 1e-9))))
+
+    best = {name: float('inf') for name in timers}
+    for _ in range(rounds):
+        for name, (timer, number) in timers.items():
+            best[name] = min(best[name], min(timer.repeat(repeat=repeat, number=number)) / number * 1e6)
+    return best
+
+def results_of(times: Dict[str, float]) -> Dict[str, Dict[str, float]]:
+    return {
+        name: {'best_us': round(best_us, 3), 'normalized': round(best_us / times['calibration'], 5)}
+        for name, best_us in times.items()
+    }
+
+def compare(results: Dict[str, Dict[str, float]], baselines: Dict[str, Dict[str, float]],
+            threshold: float) -> Dict[str, Dict[str, object]]:
+    """Change of each normalized time against its baseline, flagging the regressions."""
+    comparison = {}
+    for name, result in results.items():
+        if name == 'calibration':
+            continue
+        baseline = baselines.get(name)
+        if baseline is None:
+            comparison[name] = {'status': 'new'}
+            continue
+        change = result['normalized'] / baseline['normalized'] - 1
+        comparison[name] = {
+            'change': round(change, 3),
+            'status': 'regression' if change > threshold else 'ok'
+        }
+    return comparison
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3, help='Timed repetitions per benchmark and round')
+    parser.add_argument('--rounds', type=int, default=3, help='Rounds over all the benchmarks')
+    parser.add_argument('--filter', help='Only run the benchmarks whose name contains this text')
+    parser.add_argument('--check', action='store_true', help='Exit with status 1 when a benchmark regressed')
+    parser.add_argument('--threshold', type=float, default=0.5,
+                        help='Allowed slowdown against the baseline, as a fraction (default 0.5)')
+    parser.add_argument('--save-baseline', action='store_true', help='Store the results as the new baselines')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='Baseline file')
+    args = parser.parse_args()
+
+    cases = {name: func for name, func in benchmarks().items() if not args.filter or args.filter in name}
+    times = run(cases, args.repeat, args.rounds)
+    results = results_of(times)
+    report = {'revision': git_revision(), 'results': results}
+
+    if args.save_baseline:
+        baselines = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding='utf-8') as baseline_file:
+                baselines = json.load(baseline_file)['benchmarks']
+        baselines.update(results)
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as baseline_file:
+            json.dump({
+                'recorded_at': datetime.now(timezone.utc).isoformat(),
+                'commit': report['revision']['commit'],
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'benchmarks': dict(sorted(baselines.items()))
+            }, baseline_file, indent=2)
+            baseline_file.write('\n')
+
+    regressions = []
+    if args.check:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            baselines = json.load(baseline_file)['benchmarks']
+        comparison = compare(results, baselines, args.threshold)
+        suspects = [name for name, entry in comparison.items() if entry['status'] == 'regression']
+        if suspects:
+            # Measure the suspects again before failing, keeping the best of both runs
+            retry = run({name: cases[name] for name in suspects}, args.repeat, args.rounds)
+            times = {name: min(best_us, retry.get(name, best_us)) for name, best_us in times.items()}
+            report['results'] = results = results_of(times)
+            comparison = compare(results, baselines, args.threshold)
+        report['comparison'] = comparison
+        regressions = [name for name, entry in comparison.items() if entry['status'] == 'regression']
+        report['regressions'] = regressions
+
+    print(json.dumps(report, indent=2))
+    if regressions:
+        print(f"Regressed by more than {args.threshold:.0%}: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
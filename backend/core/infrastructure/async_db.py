@@ -0,0 +1,60 @@
+"""Asynchronous database engine of the ASGI serving mode (see asgi.py).
+
+The async endpoints use the same database as the Flask app through an asyncio
+driver: asyncpg for PostgreSQL and aiosqlite for SQLite. Pool sizes and
+timeouts come from the same DatabaseConfig as the synchronous engine (see
+core.infrastructure.db_pool). SQLAlchemy's asyncio extension needs greenlet,
+so it is imported when the engine is created rather than with this module.
+"""
+from typing import Any, Dict
+from sqlalchemy.engine import make_url
+from utils.config import DatabaseConfig
+
+# Asyncio driver of each database backend
+ASYNC_DRIVERS = {'postgresql': 'asyncpg', 'sqlite': 'aiosqlite'}
+
+def async_database_url(database_url: str) -> str:
+    """
+    Rewrite a database URL to use the asyncio driver of its backend.
+
+    Raises:
+        ValueError: If the backend has no supported asyncio driver
+    """
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No asyncio driver for {backend} databases")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+def async_engine_options(database_url: str, database_config: DatabaseConfig) -> Dict[str, Any]:
+    """
+    Build the create_async_engine options matching engine_options.
+
+    asyncpg takes its timeouts as `timeout` and server settings instead of
+    libpq's connect_timeout and options.
+    """
+    options: Dict[str, Any] = {'pool_pre_ping': database_config.pool_pre_ping}
+    backend = make_url(database_url).get_backend_name()
+    if backend == 'sqlite':
+        return options
+
+    options.update({
+        'pool_size': database_config.pool_size,
+        'max_overflow': database_config.max_overflow,
+        'pool_timeout': database_config.pool_timeout,
+        'pool_recycle': database_config.pool_recycle
+    })
+    if backend == 'postgresql':
+        connect_args: Dict[str, Any] = {'timeout': database_config.connect_timeout}
+        if database_config.statement_timeout:
+            connect_args['server_settings'] = {'statement_timeout': str(database_config.statement_timeout)}
+        options['connect_args'] = connect_args
+    return options
+
+def create_async_database_engine(database_url: str, database_config: DatabaseConfig):
+    """Create the AsyncEngine of a database."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    return create_async_engine(
+        async_database_url(database_url), **async_engine_options(database_url, database_config)
+    )
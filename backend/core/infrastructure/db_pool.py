@@ -0,0 +1,126 @@
+"""Database connection pool settings and metrics.
+
+The engine options are built from utils.config.DatabaseConfig. On server
+databases the pool is an InstrumentedQueuePool, which records how long each
+checkout waited for a connection so that pool saturation is visible before
+requests start timing out.
+"""
+import threading
+import time
+from typing import Any, Dict
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from utils.config import DatabaseConfig
+
+class PoolMetrics:
+    """Thread-safe checkout counters of one connection pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_checkout(self, wait_seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += wait_seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'waitMsTotal': round(self.wait_seconds_total * 1000, 3),
+                'waitMsMax': round(self.wait_seconds_max * 1000, 3),
+                'waitMsAvg': round(self.wait_seconds_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0
+            }
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times every checkout.
+
+    The wait covers queueing for a free connection and opening a new one when
+    the pool grows, which is what a request actually waits for.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record_checkout(time.perf_counter() - start)
+        return connection
+
+def engine_options(database_url: str, database_config: DatabaseConfig) -> Dict[str, Any]:
+    """
+    Build the SQLALCHEMY_ENGINE_OPTIONS for a database.
+
+    SQLite keeps SQLAlchemy's default pools, which hold a single connection per
+    thread or file and take no sizing options; only pre-ping applies there.
+
+    Args:
+        database_url: SQLAlchemy database URL
+        database_config: Pool and timeout settings
+
+    Returns:
+        Keyword arguments for sqlalchemy.create_engine
+    """
+    options: Dict[str, Any] = {'pool_pre_ping': database_config.pool_pre_ping}
+    backend = make_url(database_url).get_backend_name()
+    if backend == 'sqlite':
+        return options
+
+    options.update({
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': database_config.pool_size,
+        'max_overflow': database_config.max_overflow,
+        'pool_timeout': database_config.pool_timeout,
+        'pool_recycle': database_config.pool_recycle
+    })
+    if backend == 'postgresql':
+        connect_args: Dict[str, Any] = {'connect_timeout': database_config.connect_timeout}
+        if database_config.statement_timeout:
+            connect_args['options'] = f"-c statement_timeout={database_config.statement_timeout}"
+        options['connect_args'] = connect_args
+    return options
+
+def pool_status(engine) -> Dict[str, Any]:
+    """
+    Current occupancy and checkout metrics of an engine's pool.
+
+    Returns:
+        Dictionary containing the pool class and, for queue pools:
+            - size: int - Connections kept open
+            - maxOverflow: int - Extra connections allowed under load
+            - checkedOut: int - Connections in use
+            - idle: int - Open connections waiting in the pool
+            - saturation: float - checkedOut / (size + maxOverflow)
+            - checkouts, timeouts, waitMsTotal, waitMsMax, waitMsAvg when instrumented
+    """
+    pool = engine.pool
+    status: Dict[str, Any] = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        status.update({
+            'size': pool.size(),
+            'maxOverflow': pool._max_overflow,
+            'checkedOut': pool.checkedout(),
+            'idle': pool.checkedin(),
+            'saturation': round(pool.checkedout() / capacity, 3) if capacity else 0.0
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        status.update(pool.metrics.snapshot())
+    return status
@@ -0,0 +1,76 @@
+"""Routing of read-only queries to a database replica.
+
+Service methods decorated with read_replica send their queries to the replica
+bind when one is configured. Everything else, and every query of a client that
+wrote recently, goes to the primary: a write pins the rest of the request to
+the primary, and init_replica_routing keeps the client on the primary for a
+stickiness window with a cookie, so clients always read their own writes even
+when the replica lags behind.
+"""
+import functools
+import time
+from contextvars import ContextVar
+from flask import Flask, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+REPLICA_BIND = 'replica'
+PRIMARY_UNTIL_COOKIE = 'primary_until'
+
+_replica_reads: ContextVar[bool] = ContextVar('replica_reads', default=False)
+_pinned_to_primary: ContextVar[bool] = ContextVar('pinned_to_primary', default=False)
+_wrote: ContextVar[bool] = ContextVar('wrote', default=False)
+
+class RoutingSession(Session):
+    """Session that sends the queries of read_replica methods to the replica bind."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or isinstance(clause, UpdateBase):
+                _wrote.set(True)
+                _pinned_to_primary.set(True)
+            elif _replica_reads.get() and not _pinned_to_primary.get():
+                replica = self._db.engines.get(REPLICA_BIND)
+                if replica is not None:
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def read_replica(method):
+    """Run a read-only service method against the replica, when there is one."""
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        token = _replica_reads.set(True)
+        try:
+            return method(*args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+    return wrapper
+
+def pinned_to_primary() -> bool:
+    """Whether read_replica methods currently read from the primary."""
+    return _pinned_to_primary.get()
+
+def init_replica_routing(app: Flask, stickiness_seconds: int) -> None:
+    """
+    Keep clients that write on the primary for stickiness_seconds.
+
+    Each request starts unpinned unless its primary_until cookie is still
+    valid; a request that writes sets that cookie in its response.
+    """
+    @app.before_request
+    def _pin_recent_writers():
+        _wrote.set(False)
+        try:
+            until = float(request.cookies.get(PRIMARY_UNTIL_COOKIE, 0))
+        except ValueError:
+            until = 0
+        _pinned_to_primary.set(until > time.time())
+
+    @app.after_request
+    def _stick_writers_to_primary(response):
+        if _wrote.get() and stickiness_seconds > 0:
+            response.set_cookie(
+                PRIMARY_UNTIL_COOKIE, f"{time.time() + stickiness_seconds:.3f}",
+                max_age=stickiness_seconds, httponly=True, samesite='Lax'
+            )
+        return response
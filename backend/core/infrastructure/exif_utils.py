@@ -1,78 +1,471 @@
+"""EXIF metadata extraction that reads only the metadata segment of a photo.
+
+The image itself is never decoded: the EXIF block is located by walking the
+container structure (JPEG markers, PNG chunks, ISO-BMFF boxes for HEIC/AVIF, or
+a bare TIFF header), read with a bounded number of bytes, and only the tags
+listed below are resolved.
+"""
+import struct
 from datetime import datetime
-from typing import Dict, Any, BinaryIO
-from PIL import Image, ExifTags
+from fractions import Fraction
+from io import BytesIO
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+# Upper bound on the bytes read for the EXIF block (a JPEG APP1 segment is at most 64 KB)
+MAX_EXIF_BYTES = 256 * 1024
+# Upper bound on the bytes skipped while looking for the EXIF block
+MAX_SCAN_BYTES = 16 * 1024 * 1024
+
+_EXIF_HEADER = b'Exif\x00\x00'
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# Tags resolved from IFD0, the Exif sub-IFD and the GPS sub-IFD
+_IFD0_TAGS = {0x010F: 'Make', 0x0110: 'Model', 0x0132: 'DateTime', 0x013B: 'Artist', 0x8298: 'Copyright'}
+_EXIF_TAGS = {
+    0x829A: 'ExposureTime', 0x829D: 'FNumber', 0x8827: 'ISOSpeedRatings',
+    0x9003: 'DateTimeOriginal', 0x9004: 'DateTimeDigitized', 0x920A: 'FocalLength'
+}
+_GPS_TAGS = {1: 'GPSLatitudeRef', 2: 'GPSLatitude', 3: 'GPSLongitudeRef', 4: 'GPSLongitude'}
+_EXIF_IFD_POINTER = 0x8769
+_GPS_IFD_POINTER = 0x8825
+
+# TIFF field type -> (struct code, size in bytes)
+_TIFF_TYPES = {
+    1: ('B', 1), 2: ('s', 1), 3: ('H', 2), 4: ('L', 4), 5: ('LL', 8),
+    7: ('B', 1), 9: ('l', 4), 10: ('ll', 8)
+}
 
 def extract_exif_data(photo_file: BinaryIO) -> Dict[str, Any]:
     """
     Extract EXIF data from a photo file.
-    
+
     Args:
-        photo_file: The photo file object
-    
+        photo_file: The photo file object (JPEG, PNG, TIFF or HEIC/AVIF)
+
     Returns:
-        Dictionary containing EXIF data:
+        Dictionary containing EXIF data, or an empty dictionary when the file has none:
             - date_taken: datetime
             - author: str
+            - copyright: str
             - camera_make: str
             - camera_model: str
             - focal_length: float
             - f_number: float
-            - exposure_time: str
+            - exposure_time: float (seconds)
             - iso: int
+            - latitude: float
+            - longitude: float
     """
     try:
-        # Reset file pointer to beginning before reading
         photo_file.seek(0)
-        img = Image.open(photo_file)
-        if not hasattr(img, '_getexif') or not img._getexif():
+        tiff = read_exif_block(photo_file)
+        if not tiff:
             return {}
-
-        exif = {
-            ExifTags.TAGS[k]: v
-            for k, v in img._getexif().items()
-            if k in ExifTags.TAGS
-        }
-
-        # Extract date taken
-        date_taken = None
-        if 'DateTimeOriginal' in exif:
-            try:
-                date_taken = datetime.strptime(exif['DateTimeOriginal'], '%Y:%m:%d %H:%M:%S')
-            except ValueError:
-                pass
-
-        # Extract author
-        author = None
-        if 'Artist' in exif:
-            author = exif['Artist']
-
-        # Extract camera info
-        camera_make = exif.get('Make')
-        camera_model = exif.get('Model')
-        focal_length = exif.get('FocalLength')
-        f_number = exif.get('FNumber')
-        exposure_time = exif.get('ExposureTime')
-        iso = exif.get('ISOSpeedRatings')
-
-        # Reset file pointer to beginning after reading
-        photo_file.seek(0)
-
-        return {
-            'date_taken': date_taken,
-            'author': author,
-            'camera_make': camera_make,
-            'camera_model': camera_model,
-            'focal_length': float(focal_length) if focal_length else None,
-            'f_number': float(f_number) if f_number else None,
-            'exposure_time': str(exposure_time) if exposure_time else None,
-            'iso': int(iso) if iso else None
-        }
+        return _exif_fields(parse_exif_tags(tiff))
     except Exception:
-        # If anything goes wrong, return empty dict
+        # Corrupt metadata must never prevent an upload
         return {}
     finally:
-        # Always make sure to reset the file pointer
         try:
             photo_file.seek(0)
-        except:
+        except Exception:
             pass
+
+def extract_ranged_exif_data(read_range: Callable[[int, int], bytes], header_bytes: int) -> Dict[str, Any]:
+    """
+    Extract EXIF data from a photo read with ranged reads, as from S3.
+
+    Args:
+        read_range: Function reading the given length of the photo from the given offset
+        header_bytes: Bytes read from the start of the photo
+
+    Returns:
+        Dictionary containing EXIF data, as for extract_exif_data
+    """
+    return extract_exif_from_ranges(read_exif_ranges(read_range, header_bytes))
+
+def read_exif_ranges(read_range: Callable[[int, int], bytes], header_bytes: int) -> List[Tuple[int, bytes]]:
+    """
+    Read the parts of a photo holding its EXIF data with ranged reads.
+
+    The first header_bytes hold the metadata of JPEG, PNG and HEIC/AVIF files.
+    The IFD0 of a TIFF file can be anywhere, often after the image data: when
+    the entries at the offset given by its 8-byte header are past the first
+    read, a second read of MAX_EXIF_BYTES starts at that offset.
+
+    Args:
+        read_range: Function reading the given length of the photo from the given offset
+        header_bytes: Bytes read from the start of the photo
+
+    Returns:
+        List of (offset, bytes) parts read, the first one starting at offset 0
+    """
+    header = read_range(0, header_bytes)
+    ranges = [(0, header)]
+    ifd0_offset = _tiff_ifd0_offset(header)
+    # A shorter first read is the whole file
+    if ifd0_offset is not None and len(header) == header_bytes and not _ifd_fits(header, ifd0_offset):
+        ranges.append((ifd0_offset, read_range(ifd0_offset, MAX_EXIF_BYTES)))
+    return ranges
+
+def extract_exif_from_ranges(ranges: List[Tuple[int, bytes]]) -> Dict[str, Any]:
+    """
+    Extract EXIF data from the parts of a photo returned by read_exif_ranges.
+
+    Returns:
+        Dictionary containing EXIF data, as for extract_exif_data
+    """
+    if len(ranges) == 1:
+        return extract_exif_data(BytesIO(ranges[0][1]))
+    try:
+        return _exif_fields(parse_exif_tags(_join_ranges(ranges)))
+    except Exception:
+        return {}
+
+def _exif_fields(tags: Dict[str, Any]) -> Dict[str, Any]:
+    if not tags:
+        return {}
+    latitude, longitude = _gps_coordinates(tags)
+    return {
+        'date_taken': _parse_datetime(
+            tags.get('DateTimeOriginal') or tags.get('DateTimeDigitized') or tags.get('DateTime')
+        ),
+        'author': tags.get('Artist'),
+        'copyright': tags.get('Copyright'),
+        'camera_make': tags.get('Make'),
+        'camera_model': tags.get('Model'),
+        'focal_length': _to_float(tags.get('FocalLength')),
+        'f_number': _to_float(tags.get('FNumber')),
+        'exposure_time': _to_float(tags.get('ExposureTime')),
+        'iso': _to_int(tags.get('ISOSpeedRatings')),
+        'latitude': latitude,
+        'longitude': longitude
+    }
+
+def read_exif_block(photo_file: BinaryIO) -> Optional[bytes]:
+    """
+    Locate and read the TIFF-structured EXIF block of a photo.
+
+    Reads at most MAX_EXIF_BYTES of metadata plus the container headers in front
+    of it, starting from the current position of photo_file. The IFD0 of a bare
+    TIFF file, often written after the image data, is read at the offset given
+    by its header.
+
+    Returns:
+        The EXIF block starting at its TIFF header (bytes, or only the parts
+        read of a large TIFF file), or None when there is none
+    """
+    start = photo_file.tell()
+    head = photo_file.read(12)
+    photo_file.seek(start)
+    if head[:2] == b'\xff\xd8':
+        return _read_jpeg_exif(photo_file, start)
+    if head[:8] == _PNG_SIGNATURE:
+        return _read_png_exif(photo_file, start)
+    if head[:4] in (b'II*\x00', b'MM\x00*'):
+        def read_at(offset):
+            photo_file.seek(start + offset)
+            return photo_file.read(MAX_EXIF_BYTES)
+
+        return _tiff_block(photo_file.read(MAX_EXIF_BYTES), read_at)
+    if head[4:8] == b'ftyp':
+        return _read_isobmff_exif(photo_file, start)
+    return None
+
+def parse_exif_tags(tiff: bytes) -> Dict[str, Any]:
+    """
+    Resolve the supported tags of a TIFF-structured EXIF block.
+
+    Entries of other tags are skipped without reading their values. Offsets
+    pointing outside the block are ignored.
+
+    Returns:
+        Mapping of EXIF tag name to value (str, int, Fraction or a tuple of them)
+    """
+    if tiff[:2] == b'II':
+        order = '<'
+    elif tiff[:2] == b'MM':
+        order = '>'
+    else:
+        return {}
+    if struct.unpack(order + 'H', tiff[2:4])[0] != 42:
+        return {}
+
+    tags: Dict[str, Any] = {}
+    ifd0_offset = struct.unpack(order + 'L', tiff[4:8])[0]
+    pointers = _read_ifd(tiff, order, ifd0_offset, _IFD0_TAGS, tags)
+    if _EXIF_IFD_POINTER in pointers:
+        _read_ifd(tiff, order, pointers[_EXIF_IFD_POINTER], _EXIF_TAGS, tags)
+    if _GPS_IFD_POINTER in pointers:
+        _read_ifd(tiff, order, pointers[_GPS_IFD_POINTER], _GPS_TAGS, tags)
+    return tags
+
+def _tiff_ifd0_offset(header: bytes) -> Optional[int]:
+    """Offset of the IFD0 of a bare TIFF file, from its 8-byte header."""
+    if header[:4] == b'II*\x00':
+        return struct.unpack('<L', header[4:8])[0]
+    if header[:4] == b'MM\x00*':
+        return struct.unpack('>L', header[4:8])[0]
+    return None
+
+def _ifd_fits(tiff: bytes, offset: int) -> bool:
+    """Whether the entries of the IFD at offset are all within tiff."""
+    if offset + 2 > len(tiff):
+        return False
+    order = '<' if tiff[:2] == b'II' else '>'
+    count = struct.unpack(order + 'H', tiff[offset:offset + 2])[0]
+    return offset + 2 + count * 12 <= len(tiff)
+
+def _tiff_block(header: bytes, read_at: Callable[[int], bytes]):
+    """
+    The TIFF block of a bare TIFF file from its first bytes, completed with
+    read_at(offset) at its IFD0 when the IFD0 entries are past those bytes.
+    """
+    ifd0_offset = _tiff_ifd0_offset(header)
+    if ifd0_offset is None or _ifd_fits(header, ifd0_offset):
+        return header
+    return _join_ranges([(0, header), (ifd0_offset, read_at(ifd0_offset))])
+
+def _join_ranges(ranges: List[Tuple[int, bytes]]):
+    """The TIFF block made of the first bytes of a TIFF file and the bytes read at its IFD0."""
+    (_, header), (ifd0_offset, ifd0) = ranges
+    if ifd0_offset <= len(header):
+        return header[:ifd0_offset] + ifd0
+    return _TiffSegments(ranges)
+
+class _TiffSegments:
+    """A TIFF block known only in places: slices outside a single known segment are empty."""
+
+    def __init__(self, segments: List[Tuple[int, bytes]]):
+        self.segments = segments
+
+    def __len__(self) -> int:
+        return max(offset + len(data) for offset, data in self.segments)
+
+    def __getitem__(self, index: slice) -> bytes:
+        start = index.start or 0
+        for offset, data in self.segments:
+            if offset <= start and index.stop <= offset + len(data):
+                return data[start - offset:index.stop - offset]
+        return b''
+
+def _read_ifd(tiff: bytes, order: str, offset: int, wanted: Dict[int, str], tags: Dict[str, Any]) -> Dict[int, int]:
+    """Read the wanted tags of one IFD into tags; return its sub-IFD pointers."""
+    pointers = {}
+    count_bytes = tiff[offset:offset + 2]
+    if len(count_bytes) < 2:
+        return pointers
+    count = struct.unpack(order + 'H', count_bytes)[0]
+    for index in range(count):
+        entry = offset + 2 + index * 12
+        if len(tiff[entry:entry + 12]) < 12:
+            break
+        tag, field_type, value_count = struct.unpack(order + 'HHL', tiff[entry:entry + 8])
+        if tag in (_EXIF_IFD_POINTER, _GPS_IFD_POINTER):
+            pointers[tag] = struct.unpack(order + 'L', tiff[entry + 8:entry + 12])[0]
+        elif tag in wanted and field_type in _TIFF_TYPES:
+            value = _read_value(tiff, order, entry, field_type, value_count)
+            if value is not None:
+                tags[wanted[tag]] = value
+    return pointers
+
+def _read_value(tiff: bytes, order: str, entry: int, field_type: int, count: int):
+    code, size = _TIFF_TYPES[field_type]
+    length = size * count
+    if length <= 4:
+        data = tiff[entry + 8:entry + 8 + length]
+    else:
+        offset = struct.unpack(order + 'L', tiff[entry + 8:entry + 12])[0]
+        data = tiff[offset:offset + length]
+        if len(data) < length:
+            return None
+
+    if field_type == 2:
+        return data.split(b'\x00', 1)[0].decode('utf-8', errors='replace').strip() or None
+    if field_type in (5, 10):
+        values = struct.unpack(order + code * count, data)
+        ratios = tuple(
+            Fraction(numerator, denominator) if denominator else None
+            for numerator, denominator in zip(values[::2], values[1::2])
+        )
+        return ratios[0] if len(ratios) == 1 else ratios
+    values = struct.unpack(order + code * count, data)
+    return values[0] if len(values) == 1 else values
+
+def _read_jpeg_exif(photo_file: BinaryIO, start: int) -> Optional[bytes]:
+    photo_file.seek(start + 2)
+    while photo_file.tell() - start < MAX_SCAN_BYTES:
+        marker = photo_file.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        if marker[1] == 0xFF:
+            # Fill byte before a marker
+            photo_file.seek(-1, 1)
+            continue
+        if marker[1] in (0xD9, 0xDA):
+            # End of image, or start of the compressed data: no metadata follows
+            return None
+        if 0xD0 <= marker[1] <= 0xD7 or marker[1] == 0x01:
+            continue
+        length_bytes = photo_file.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack('>H', length_bytes)[0] - 2
+        if marker[1] == 0xE1 and length >= len(_EXIF_HEADER):
+            segment = photo_file.read(length)
+            if segment.startswith(_EXIF_HEADER):
+                return segment[len(_EXIF_HEADER):]
+        else:
+            photo_file.seek(length, 1)
+    return None
+
+def _read_png_exif(photo_file: BinaryIO, start: int) -> Optional[bytes]:
+    photo_file.seek(start + len(_PNG_SIGNATURE))
+    while photo_file.tell() - start < MAX_SCAN_BYTES:
+        header = photo_file.read(8)
+        if len(header) < 8:
+            return None
+        length, chunk_type = struct.unpack('>L4s', header)
+        if chunk_type == b'eXIf':
+            data = photo_file.read(min(length, MAX_EXIF_BYTES))
+            return data[len(_EXIF_HEADER):] if data.startswith(_EXIF_HEADER) else data
+        if chunk_type in (b'IDAT', b'IEND'):
+            return None
+        photo_file.seek(length + 4, 1)  # chunk data and CRC
+    return None
+
+def _iter_boxes(photo_file: BinaryIO, end: Optional[int]):
+    """Yield (type, payload start, payload end) of the ISO-BMFF boxes up to end."""
+    while end is None or photo_file.tell() + 8 <= end:
+        box_start = photo_file.tell()
+        header = photo_file.read(8)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack('>L4s', header)
+        payload_start = box_start + 8
+        if size == 1:
+            size = struct.unpack('>Q', photo_file.read(8))[0]
+            payload_start += 8
+        elif size == 0:
+            if end is None:
+                return
+            size = end - box_start
+        if size < payload_start - box_start:
+            return
+        yield box_type, payload_start, box_start + size
+        photo_file.seek(box_start + size)
+
+def _read_isobmff_exif(photo_file: BinaryIO, start: int) -> Optional[bytes]:
+    """Read the 'Exif' item of a HEIF container (HEIC, AVIF) through its meta box."""
+    photo_file.seek(start)
+    for box_type, payload_start, box_end in _iter_boxes(photo_file, None):
+        if payload_start - start > MAX_SCAN_BYTES:
+            return None
+        if box_type != b'meta':
+            continue
+        # meta is a full box: skip version and flags
+        photo_file.seek(payload_start + 4)
+        exif_item, locations = None, {}
+        for child_type, child_start, child_end in _iter_boxes(photo_file, box_end):
+            photo_file.seek(child_start)
+            if child_type == b'iinf':
+                exif_item = _find_exif_item(photo_file.read(min(child_end - child_start, MAX_EXIF_BYTES)))
+            elif child_type == b'iloc':
+                locations = _parse_iloc(photo_file.read(min(child_end - child_start, MAX_EXIF_BYTES)))
+        if exif_item is None or exif_item not in locations:
+            return None
+        offset, length = locations[exif_item]
+        photo_file.seek(start + offset)
+        data = photo_file.read(min(length, MAX_EXIF_BYTES))
+        if len(data) < 4:
+            return None
+        # The item starts with the offset of the TIFF header after any 'Exif\0\0' prefix
+        tiff_offset = 4 + struct.unpack('>L', data[:4])[0]
+        return data[tiff_offset:]
+    return None
+
+def _find_exif_item(iinf: bytes) -> Optional[int]:
+    version = iinf[0]
+    position = 4
+    count_format, count_size = ('>L', 4) if version else ('>H', 2)
+    count = struct.unpack(count_format, iinf[position:position + count_size])[0]
+    position += count_size
+    for _ in range(count):
+        if position + 8 > len(iinf):
+            return None
+        size, box_type = struct.unpack('>L4s', iinf[position:position + 8])
+        if box_type == b'infe' and size >= 20:
+            infe_version = iinf[position + 8]
+            body = position + 12
+            if infe_version >= 2:
+                id_format, id_size = ('>H', 2) if infe_version == 2 else ('>L', 4)
+                item_id = struct.unpack(id_format, iinf[body:body + id_size])[0]
+                item_type = iinf[body + id_size + 2:body + id_size + 6]
+                if item_type == b'Exif':
+                    return item_id
+        if size < 8:
+            return None
+        position += size
+    return None
+
+def _parse_iloc(iloc: bytes) -> Dict[int, Tuple[int, int]]:
+    """Map item id to (absolute offset, length) of its first extent."""
+    def read_sized(position: int, size: int) -> Tuple[int, int]:
+        if size == 0:
+            return 0, position
+        value = int.from_bytes(iloc[position:position + size], 'big')
+        return value, position + size
+
+    version = iloc[0]
+    offset_size, length_size = iloc[4] >> 4, iloc[4] & 0x0F
+    base_offset_size, index_size = iloc[5] >> 4, (iloc[5] & 0x0F) if version in (1, 2) else 0
+    position = 6
+    count_size = 4 if version == 2 else 2
+    item_count, position = read_sized(position, count_size)
+    locations = {}
+    for _ in range(item_count):
+        item_id, position = read_sized(position, 4 if version == 2 else 2)
+        if version in (1, 2):
+            position += 2  # construction method
+        position += 2  # data reference index
+        base_offset, position = read_sized(position, base_offset_size)
+        extent_count, position = read_sized(position, 2)
+        for extent in range(extent_count):
+            _, position = read_sized(position, index_size)
+            extent_offset, position = read_sized(position, offset_size)
+            extent_length, position = read_sized(position, length_size)
+            if extent == 0:
+                locations[item_id] = (base_offset + extent_offset, extent_length)
+    return locations
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value.strip(), '%Y:%m:%d %H:%M:%S')
+    except ValueError:
+        return None
+
+def _to_float(value) -> Optional[float]:
+    if not isinstance(value, (int, Fraction)):
+        return None
+    return float(value) if value else None
+
+def _to_int(value) -> Optional[int]:
+    # ISO is sometimes stored as several values; the first one is the speed used
+    if isinstance(value, tuple):
+        value = value[0] if value else None
+    return int(value) if isinstance(value, int) and value else None
+
+def _gps_coordinates(tags: Dict[str, Any]) -> Tuple[Optional[float], Optional[float]]:
+    def to_degrees(value, reference) -> Optional[float]:
+        if not isinstance(value, tuple) or len(value) != 3 or None in value:
+            return None
+        degrees = float(value[0] + value[1] / 60 + value[2] / 3600)
+        return -degrees if reference in ('S', 'W') else degrees
+
+    latitude = to_degrees(tags.get('GPSLatitude'), tags.get('GPSLatitudeRef'))
+    longitude = to_degrees(tags.get('GPSLongitude'), tags.get('GPSLongitudeRef'))
+    if latitude is None or longitude is None:
+        return None, None
+    return round(latitude, 7), round(longitude, 7)
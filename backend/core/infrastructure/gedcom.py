@@ -0,0 +1,184 @@
+"""Streaming reader and writer for GEDCOM 5.5.1 lineage-linked files.
+
+Both directions work one top-level record at a time, so memory use does not
+grow with the size of the file.
+"""
+import codecs
+import io
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple
+
+_MONTHS = ('JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC')
+_LINE = re.compile(r'^\s*(\d+)\s+(?:(@[^@]+@)\s+)?(\S+)(?:\s(.*))?$')
+_EXACT_DATE = re.compile(r'^(\d{1,2})\s+([A-Z]{3})\s+(\d{3,4})$')
+# Longest value written on a single line before continuing with CONC
+_MAX_VALUE_LENGTH = 240
+# Bytes searched for the CHAR line of the header
+_HEADER_BYTES = 64 * 1024
+_CHAR_LINE = re.compile(rb'^\s*1\s+CHAR\s+(\S+)', re.MULTILINE)
+_NEXT_RECORD = re.compile(rb'\n\s*0\s')
+# GEDCOM character set (CHAR) -> Python codec; ANSEL has no Python codec
+_CHARSETS = {'UTF-8': 'utf-8-sig', 'UNICODE': 'utf-16', 'ASCII': 'ascii', 'ANSI': 'cp1252'}
+
+@dataclass
+class GedcomNode:
+    """One GEDCOM line with its nested lines."""
+    level: int
+    tag: str
+    value: str = ''
+    xref: Optional[str] = None
+    children: List['GedcomNode'] = field(default_factory=list)
+
+    def first(self, tag: str) -> Optional['GedcomNode']:
+        """First child with the given tag, or None."""
+        return next((child for child in self.children if child.tag == tag), None)
+
+    def all(self, tag: str) -> List['GedcomNode']:
+        """Every child with the given tag."""
+        return [child for child in self.children if child.tag == tag]
+
+    @property
+    def text(self) -> str:
+        """The value with its CONT (new line) and CONC (same line) continuations."""
+        parts = [self.value]
+        for child in self.children:
+            if child.tag == 'CONT':
+                parts.append('\n' + child.value)
+            elif child.tag == 'CONC':
+                parts.append(child.value)
+        return ''.join(parts)
+
+def gedcom_encoding(header: bytes) -> str:
+    """
+    The Python codec of a GEDCOM file, from its byte order mark or the CHAR line of its header.
+
+    Files without either are read as UTF-8, the GEDCOM 7 encoding.
+
+    Args:
+        header: The first bytes of the file
+
+    Raises:
+        ValueError: If the character set is not supported (ANSEL, unknown names)
+    """
+    if header.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if header.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    # UNICODE files without a byte order mark start with '0' in UTF-16
+    if header.startswith(b'0\x00'):
+        return 'utf-16-le'
+    if header.startswith(b'\x000'):
+        return 'utf-16-be'
+    end = _NEXT_RECORD.search(header)
+    match = _CHAR_LINE.search(header, 0, end.start() if end else len(header))
+    if not match:
+        return 'utf-8-sig'
+    charset = match.group(1).decode('ascii', errors='replace').upper()
+    if charset not in _CHARSETS:
+        raise ValueError(f"Unsupported GEDCOM character set {charset}: convert the file to UTF-8")
+    return _CHARSETS[charset]
+
+def decode_lines(gedcom_file: BinaryIO) -> Iterator[str]:
+    """
+    Read the text lines of a binary GEDCOM file in the character set it declares.
+
+    The file must be seekable: its header is read first to find the character set.
+
+    Raises:
+        ValueError: If the character set is not supported, or the file is not valid in it
+    """
+    encoding = gedcom_encoding(gedcom_file.read(_HEADER_BYTES))
+    gedcom_file.seek(0)
+    text = io.TextIOWrapper(gedcom_file, encoding=encoding)
+    try:
+        yield from text
+    except UnicodeDecodeError as e:
+        raise ValueError(f"The GEDCOM file is not valid {encoding} text: {e.reason}")
+    finally:
+        # The caller owns the file
+        text.detach()
+
+def iter_records(lines: Iterable[str]) -> Iterator[GedcomNode]:
+    """
+    Parse GEDCOM lines into top-level records, yielding each record as soon as
+    the next one starts.
+
+    Blank and malformed lines are skipped.
+
+    Args:
+        lines: Iterable of text lines, e.g. an open text file
+
+    Returns:
+        Iterator of level 0 nodes with their nested lines
+    """
+    stack: List[GedcomNode] = []
+    for line in lines:
+        match = _LINE.match(line.rstrip('\r\n').lstrip('\ufeff'))
+        if not match:
+            continue
+        level, xref, tag, value = match.groups()
+        node = GedcomNode(level=int(level), tag=tag.upper(), value=value or '', xref=xref)
+        if node.level == 0:
+            if stack:
+                yield stack[0]
+            stack = [node]
+            continue
+        while stack and stack[-1].level >= node.level:
+            stack.pop()
+        if not stack:
+            continue
+        stack[-1].children.append(node)
+        stack.append(node)
+    if stack:
+        yield stack[0]
+
+def parse_name(value: str) -> Tuple[str, str]:
+    """Split a NAME value such as 'Jean Marc /Dupont/' into (given names, surname)."""
+    if '/' not in value:
+        return value.strip(), ''
+    given, _, rest = value.partition('/')
+    surname, _, suffix = rest.partition('/')
+    return ' '.join(part for part in (given.strip(), suffix.strip()) if part), surname.strip()
+
+def parse_date(value: str) -> Optional[date]:
+    """
+    Parse an exact GEDCOM date ('12 MAR 1901').
+
+    Returns:
+        The date, or None for partial, approximate or invalid dates
+        ('MAR 1901', 'ABT 1901', 'BET 1900 AND 1910')
+    """
+    match = _EXACT_DATE.match(value.strip().upper())
+    if not match or match.group(2) not in _MONTHS:
+        return None
+    try:
+        return date(int(match.group(3)), _MONTHS.index(match.group(2)) + 1, int(match.group(1)))
+    except ValueError:
+        return None
+
+def format_date(value: date) -> str:
+    """Format a date as a GEDCOM exact date ('12 MAR 1901')."""
+    return f"{value.day} {_MONTHS[value.month - 1]} {value.year}"
+
+def format_lines(level: int, tag: str, value: Optional[str] = None, xref: Optional[str] = None) -> Iterator[str]:
+    """
+    Format one GEDCOM line, splitting multi-line or long values into CONT and
+    CONC continuation lines.
+
+    Returns:
+        Iterator of lines terminated with a newline
+    """
+    prefix = f"{level} {xref} {tag}" if xref else f"{level} {tag}"
+    if value is None or value == '':
+        yield prefix + '\n'
+        return
+    for index, text in enumerate(value.split('\n')):
+        chunks = [text[start:start + _MAX_VALUE_LENGTH] for start in range(0, len(text), _MAX_VALUE_LENGTH)] or ['']
+        for chunk_index, chunk in enumerate(chunks):
+            if index == 0 and chunk_index == 0:
+                head = prefix
+            else:
+                head = f"{level + 1} {'CONT' if chunk_index == 0 else 'CONC'}"
+            yield f"{head} {chunk}\n" if chunk else head + '\n'
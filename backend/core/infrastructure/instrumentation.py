@@ -0,0 +1,467 @@
+"""Request instrumentation: latency histograms, query and S3 timings, profiling.
+
+init_instrumentation wraps the Flask app in an InstrumentationMiddleware that
+measures every request until its body is fully sent, streamed responses
+included, and records per endpoint (the URL rule, so that IDs do not multiply
+the series):
+    - latency and response size histograms, by method and status
+    - the number and time of database queries, from SQLAlchemy cursor events
+    - the number and time of S3 calls, from the botocore events of the clients
+      passed to instrument_s3_client
+
+The metrics are served by GET /metrics in the Prometheus text format, and the
+database and S3 time of each request is sent in its Server-Timing header.
+They are kept per process; with several workers, set a metrics directory
+shared by them (METRICS_DIR) and every scrape reports the sum of all the
+workers (see core.infrastructure.process_snapshots). Without it, each scrape
+reports the worker that answered it.
+
+In ASGI mode the async endpoints are measured by InstrumentationASGIMiddleware
+(latency, response size and status, and the database and S3 calls made from
+the request task); they are not profiled and get no Server-Timing header.
+
+Profiling is opt-in: with a sample rate above 0, that fraction of requests
+runs under cProfile (or pyinstrument), and the profile is written to the
+profile directory when the request took longer than the slow threshold. One
+request is profiled at a time per process.
+"""
+import bisect
+import os
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from flask import Flask, Response, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from core.infrastructure.process_snapshots import ProcessSnapshots
+
+UNMATCHED_ENDPOINT = '<unmatched>'
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Name: (type, help, histogram buckets)
+METRICS = {
+    'http_request_duration_seconds': (
+        'histogram', 'Request latency until the response body is sent', LATENCY_BUCKETS),
+    'http_response_size_bytes': ('histogram', 'Response body size', SIZE_BUCKETS),
+    'http_request_db_queries': ('histogram', 'Database queries per request', QUERY_COUNT_BUCKETS),
+    'db_queries_total': ('counter', 'Database queries run by requests', None),
+    'db_query_duration_seconds_total': ('counter', 'Time requests spent in database queries', None),
+    's3_calls_total': ('counter', 'S3 API calls made by requests', None),
+    's3_call_duration_seconds_total': ('counter', 'Time requests spent in S3 API calls', None),
+    'request_profiles_total': ('counter', 'Profiles written for slow sampled requests', None)
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+@dataclass
+class RequestStats:
+    """What one request spent its time on, filled in while it runs."""
+    method: str
+    endpoint: str = UNMATCHED_ENDPOINT
+    status: str = '500'
+    response_bytes: int = 0
+    db_queries: int = 0
+    db_seconds: float = 0.0
+    # Operation name: [calls, seconds]
+    s3_calls: Dict[str, list] = field(default_factory=dict)
+
+    @property
+    def s3_seconds(self) -> float:
+        return sum(seconds for _, seconds in self.s3_calls.values())
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar('request_stats', default=None)
+
+def current_request_stats() -> Optional[RequestStats]:
+    """The stats of the request being served by this thread, if it is instrumented."""
+    return _request_stats.get()
+
+class Histogram:
+    """Bucketed observations, as a Prometheus histogram."""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # One count per bucket, the last one for values above every bound (+Inf)
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self) -> Iterable[Tuple[str, int]]:
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            yield ('+Inf' if bound == float('inf') else _format_number(bound)), total
+
+class MetricsRegistry:
+    """
+    Thread-safe counters and histograms of the METRICS, by label values.
+
+    With a shared directory, render() reports the metrics of every process
+    publishing to it.
+    """
+
+    def __init__(self, shared_dir: Optional[str] = None):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._shared = ProcessSnapshots(shared_dir, 'metrics', self.snapshot) if shared_dir else None
+
+    def inc(self, name: str, labels: Labels, value: float = 1) -> None:
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + value
+        if self._shared is not None:
+            self._shared.changed()
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if labels not in series:
+                series[labels] = Histogram(METRICS[name][2])
+            series[labels].observe(value)
+        if self._shared is not None:
+            self._shared.changed()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """The metrics of this process, as JSON-serializable data."""
+        with self._lock:
+            return {
+                'counters': {
+                    name: [[list(map(list, labels)), value] for labels, value in series.items()]
+                    for name, series in self._counters.items()
+                },
+                'histograms': {
+                    name: [[list(map(list, labels)), histogram.counts, histogram.sum, histogram.count]
+                           for labels, histogram in series.items()]
+                    for name, series in self._histograms.items()
+                }
+            }
+
+    def merge(self, snapshot: Dict[str, Any]) -> None:
+        """Add the metrics of a snapshot to this registry."""
+        with self._lock:
+            for name, entries in snapshot['counters'].items():
+                series = self._counters.setdefault(name, {})
+                for labels, value in entries:
+                    labels = tuple(map(tuple, labels))
+                    series[labels] = series.get(labels, 0) + value
+            for name, entries in snapshot['histograms'].items():
+                if name not in METRICS:
+                    continue  # Published by a process running another version
+                series = self._histograms.setdefault(name, {})
+                for labels, counts, total, count in entries:
+                    histogram = series.setdefault(tuple(map(tuple, labels)), Histogram(METRICS[name][2]))
+                    if len(counts) != len(histogram.counts):
+                        continue
+                    histogram.counts = [mine + theirs for mine, theirs in zip(histogram.counts, counts)]
+                    histogram.sum += total
+                    histogram.count += count
+
+    def record_request(self, stats: RequestStats, duration: float) -> None:
+        """Add a finished request to the metrics."""
+        endpoint = (('endpoint', stats.endpoint),)
+        labels = (('method', stats.method),) + endpoint + (('status', stats.status),)
+        self.observe('http_request_duration_seconds', labels, duration)
+        self.observe('http_response_size_bytes', labels, stats.response_bytes)
+        self.observe('http_request_db_queries', endpoint, stats.db_queries)
+        if stats.db_queries:
+            self.inc('db_queries_total', endpoint, stats.db_queries)
+            self.inc('db_query_duration_seconds_total', endpoint, stats.db_seconds)
+        for operation, (calls, seconds) in stats.s3_calls.items():
+            s3_labels = endpoint + (('operation', operation),)
+            self.inc('s3_calls_total', s3_labels, calls)
+            self.inc('s3_call_duration_seconds_total', s3_labels, seconds)
+
+    def render(self) -> str:
+        """The metrics in the Prometheus text exposition format, of every process when shared."""
+        if self._shared is not None:
+            merged = MetricsRegistry()
+            for snapshot in self._shared.collect():
+                merged.merge(snapshot)
+            return merged.render()
+        lines = []
+        with self._lock:
+            for name, (kind, description, _) in METRICS.items():
+                series = self._histograms.get(name) if kind == 'histogram' else self._counters.get(name)
+                if not series:
+                    continue
+                lines.append(f"# HELP {name} {description}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in sorted(series.items()):
+                    if kind == 'counter':
+                        lines.append(f"{name}{_format_labels(labels)} {_format_number(value)}")
+                        continue
+                    for bound, count in value.cumulative_counts():
+                        lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_number(value.sum)}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {value.count}")
+        return '\n'.join(lines) + '\n'
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape_label_value(value)}"' for key, value in labels) + '}'
+
+def _escape_label_value(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class RequestProfiler:
+    """
+    Profiles a sample of requests and keeps the profiles of the slow ones.
+
+    cProfile profiles are written as .prof files (python -m pstats, snakeviz),
+    pyinstrument ones as .html pages.
+    """
+
+    def __init__(self, sample_rate: float, slow_ms: int, directory: str, profiler: str = 'cprofile'):
+        if profiler not in ('cprofile', 'pyinstrument'):
+            raise ValueError(f"Unknown profiler: {profiler}")
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.directory = directory
+        self.profiler = profiler
+        # Python allows a single active profiler, so requests are profiled one at a time
+        self._lock = threading.Lock()
+
+    def start(self) -> Optional[Any]:
+        """Start profiling the current request if it is sampled, and return the profiler."""
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            if self.profiler == 'pyinstrument':
+                from pyinstrument import Profiler
+
+                profile = Profiler()
+                profile.start()
+            else:
+                import cProfile
+
+                profile = cProfile.Profile()
+                profile.enable()
+        except Exception:
+            self._lock.release()
+            raise
+        return profile
+
+    def stop(self, profile, stats: RequestStats, duration: float) -> Optional[str]:
+        """
+        Stop profiling and write the profile if the request was slow.
+
+        Returns:
+            Path of the written profile, or None for a fast request
+        """
+        try:
+            if self.profiler == 'pyinstrument':
+                profile.stop()
+            else:
+                profile.disable()
+        finally:
+            self._lock.release()
+
+        elapsed_ms = duration * 1000
+        if elapsed_ms < self.slow_ms:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        endpoint = re.sub(r'[^A-Za-z0-9]+', '_', stats.endpoint).strip('_') or 'root'
+        name = f"{datetime.now():%Y%m%dT%H%M%S%f}-{stats.method}-{endpoint}-{elapsed_ms:.0f}ms"
+        if self.profiler == 'pyinstrument':
+            path = os.path.join(self.directory, f"{name}.html")
+            with open(path, 'w', encoding='utf-8') as output:
+                output.write(profile.output_html())
+        else:
+            path = os.path.join(self.directory, f"{name}.prof")
+            profile.dump_stats(path)
+        return path
+
+class _MeteredBody:
+    """Response body that counts the bytes sent and reports when it is closed."""
+
+    def __init__(self, body: Iterable[bytes], stats: RequestStats, on_close: Callable[[], None]):
+        self._body = body
+        self._stats = stats
+        self._on_close = on_close
+        self._closed = False
+
+    def __iter__(self):
+        for chunk in self._body:
+            self._stats.response_bytes += len(chunk)
+            yield chunk
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if hasattr(self._body, 'close'):
+                self._body.close()
+        finally:
+            self._on_close()
+
+class InstrumentationMiddleware:
+    """WSGI middleware recording the metrics of each request in a MetricsRegistry."""
+
+    def __init__(self, wsgi_app, registry: MetricsRegistry, profiler: Optional[RequestProfiler] = None):
+        self.wsgi_app = wsgi_app
+        self.registry = registry
+        self.profiler = profiler
+
+    def __call__(self, environ, start_response):
+        stats = RequestStats(method=environ.get('REQUEST_METHOD', 'GET'))
+        _request_stats.set(stats)
+        profile = self.profiler.start() if self.profiler else None
+        start = time.perf_counter()
+
+        def finish():
+            duration = time.perf_counter() - start
+            _request_stats.set(None)
+            if profile is not None and self.profiler.stop(profile, stats, duration):
+                self.registry.inc('request_profiles_total', (('endpoint', stats.endpoint),))
+            self.registry.record_request(stats, duration)
+
+        def instrumented_start_response(status, headers, exc_info=None):
+            stats.status = status.split(' ', 1)[0]
+            return start_response(status, headers, exc_info)
+
+        try:
+            body = self.wsgi_app(environ, instrumented_start_response)
+        except BaseException:
+            finish()
+            raise
+        return _MeteredBody(body, stats, finish)
+
+class InstrumentationASGIMiddleware:
+    """
+    ASGI middleware recording the metrics of each HTTP request in a MetricsRegistry.
+
+    endpoint_of returns the URL rule of a request scope, or None when no rule matches.
+    """
+
+    def __init__(self, asgi_app, registry: MetricsRegistry, endpoint_of: Callable[[dict], Optional[str]]):
+        self.asgi_app = asgi_app
+        self.registry = registry
+        self.endpoint_of = endpoint_of
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.asgi_app(scope, receive, send)
+        stats = RequestStats(method=scope['method'], endpoint=self.endpoint_of(scope) or UNMATCHED_ENDPOINT)
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+
+        async def instrumented_send(message):
+            if message['type'] == 'http.response.start':
+                stats.status = str(message['status'])
+            elif message['type'] == 'http.response.body':
+                stats.response_bytes += len(message.get('body', b''))
+            await send(message)
+
+        try:
+            await self.asgi_app(scope, receive, instrumented_send)
+        finally:
+            _request_stats.reset(token)
+            self.registry.record_request(stats, time.perf_counter() - start)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start_time'].pop()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.db_seconds += elapsed
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('query_start_time'):
+        connection.info['query_start_time'].pop()
+
+def instrument_database() -> None:
+    """Time the queries of every engine; a no-op when already done."""
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+
+def _before_s3_call(model, context, **kwargs):
+    context['instrumentation_call'] = (model.name, time.perf_counter())
+
+def _after_s3_call(context, **kwargs):
+    # after-call-error passes the exception instead of the response and model
+    call = context.pop('instrumentation_call', None)
+    stats = _request_stats.get()
+    if call is not None and stats is not None:
+        operation, start = call
+        calls = stats.s3_calls.setdefault(operation, [0, 0.0])
+        calls[0] += 1
+        calls[1] += time.perf_counter() - start
+
+def instrument_s3_client(client) -> None:
+    """Record the calls of a boto3 S3 client, retries included, in the request metrics."""
+    # Emitted for every call, even when a before-call handler answers it (botocore's Stubber)
+    client.meta.events.register('before-parameter-build.s3', _before_s3_call)
+    client.meta.events.register('after-call.s3', _after_s3_call)
+    client.meta.events.register('after-call-error.s3', _after_s3_call)
+
+def init_instrumentation(app: Flask, profiler: Optional[RequestProfiler] = None,
+                         shared_dir: Optional[str] = None) -> MetricsRegistry:
+    """
+    Record the metrics of every request of app and serve them on GET /metrics.
+
+    The registry is also kept in app.extensions['instrumentation'].
+
+    Args:
+        app: Flask application instance
+        profiler: Profiler of sampled slow requests (None disables profiling)
+        shared_dir: Directory shared by the worker processes, to report the metrics of all of them
+
+    Returns:
+        The registry receiving the metrics of the app
+    """
+    registry = MetricsRegistry(shared_dir)
+    instrument_database()
+    app.wsgi_app = InstrumentationMiddleware(app.wsgi_app, registry, profiler)
+    app.extensions['instrumentation'] = registry
+
+    @app.before_request
+    def _record_endpoint():
+        stats = _request_stats.get()
+        if stats is not None and request.url_rule is not None:
+            stats.endpoint = request.url_rule.rule
+
+    @app.after_request
+    def _add_server_timing(response):
+        stats = _request_stats.get()
+        if stats is not None:
+            # Time spent so far; a streamed body may add more after the headers
+            response.headers['Server-Timing'] = (
+                f"db;desc=\"{stats.db_queries} queries\";dur={stats.db_seconds * 1000:.1f}, "
+                f"s3;desc=\"{sum(calls for calls, _ in stats.s3_calls.values())} calls\";dur={stats.s3_seconds * 1000:.1f}"
+            )
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        """Request metrics of the workers, in the Prometheus text format."""
+        return Response(registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+    return registry
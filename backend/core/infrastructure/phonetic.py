@@ -0,0 +1,64 @@
+import unicodedata
+from typing import Optional
+
+# Soundex digit for each consonant; vowels and Y reset the previous code,
+# H and W are transparent (letters on either side are merged when equal).
+_SOUNDEX_CODES = {
+    **dict.fromkeys('BFPV', '1'),
+    **dict.fromkeys('CGJKQSXZ', '2'),
+    **dict.fromkeys('DT', '3'),
+    'L': '4',
+    **dict.fromkeys('MN', '5'),
+    'R': '6'
+}
+
+def phonetic_key(name: Optional[str]) -> Optional[str]:
+    """
+    Compute the Soundex key of a name, folding accents first.
+    
+    Spelling variants common in old civil records share a key, e.g.
+    Jehan/Jean (J500), Marc/Marcq (M620) or Lefèvre/Lefebvre (L116).
+    
+    Args:
+        name: The name to encode
+    
+    Returns:
+        Four character key (letter followed by three digits), or None when the
+        name contains no letter
+    """
+    if not name:
+        return None
+
+    letters = [char for char in fold_name(name).upper() if char != ' ']
+    if not letters:
+        return None
+
+    first = letters[0]
+    digits = []
+    previous = _SOUNDEX_CODES.get(first, '')
+    for char in letters[1:]:
+        if char in 'HW':
+            continue
+        code = _SOUNDEX_CODES.get(char, '')
+        if code and code != previous:
+            digits.append(code)
+        previous = code
+
+    return (first + ''.join(digits) + '000')[:4]
+
+def fold_name(name: Optional[str]) -> str:
+    """
+    Lowercase a name and reduce it to unaccented letters separated by single spaces.
+    
+    Example:
+        >>> fold_name("Lefèvre-Dupré")
+        'lefevre dupre'
+    """
+    if not name:
+        return ''
+    folded = ''.join(
+        char if 'a' <= char <= 'z' else ' '
+        for char in unicodedata.normalize('NFKD', name).lower()
+        if not unicodedata.combining(char)
+    )
+    return ' '.join(folded.split())
@@ -0,0 +1,124 @@
+"""Per-process data shared between the workers of a server through a directory.
+
+Request metrics and the slow query log live in the memory of each process, so
+with several gunicorn or uvicorn workers a report only shows the worker that
+answered it. Given a directory shared by the workers, each process writes a
+JSON snapshot of its data there, at most every PUBLISH_INTERVAL seconds after
+a change and right before answering a report, and reports merge the snapshots
+of every process, as the multiprocess mode of prometheus_client does.
+
+Snapshots of exited workers are kept, so that counters never go backwards:
+the directory is emptied when the server starts (see gunicorn.conf.py).
+"""
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+# Seconds a change waits at most before the snapshot of its process is written
+PUBLISH_INTERVAL = 1.0
+
+class ProcessSnapshots:
+    """
+    The snapshots named name in directory, one per process.
+
+    snapshot returns the JSON-serializable data of the current process.
+    on_clear, when given, is called in every process once clear() was called
+    in any of them.
+    """
+
+    def __init__(self, directory: str, name: str, snapshot: Callable[[], Any],
+                 on_clear: Optional[Callable[[], None]] = None, interval: float = PUBLISH_INTERVAL):
+        self.directory = directory
+        self.name = name
+        self.snapshot = snapshot
+        self.on_clear = on_clear
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._changed = False
+        self._publisher_pid = None
+        self._cleared_at = self._clear_marker_time()
+
+    def changed(self) -> None:
+        """Note a change of the data, published by a background thread within the interval."""
+        with self._lock:
+            self._changed = True
+            # A thread started before a fork does not exist in the worker process
+            if self._publisher_pid != os.getpid():
+                self._publisher_pid = os.getpid()
+                threading.Thread(target=self._publish_periodically, name=f'{self.name}-publisher',
+                                 daemon=True).start()
+
+    def publish(self) -> None:
+        """Write the snapshot of the current process."""
+        self._follow_clear()
+        with self._lock:
+            self._changed = False
+        os.makedirs(self.directory, exist_ok=True)
+        # Written aside and renamed, so that readers never see a partial file
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, prefix=f'.{self.name}-')
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as output:
+                json.dump(self.snapshot(), output)
+            os.replace(temporary, self._path(os.getpid()))
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def collect(self) -> List[Any]:
+        """The snapshots of every process, the current one published first."""
+        self.publish()
+        cleared_at = self._clear_marker_time()
+        snapshots = []
+        for path in sorted(glob.glob(self._path('[0-9]*'))):
+            try:
+                if os.path.getmtime(path) < cleared_at:
+                    continue  # Written before a clear its process has not seen yet
+                with open(path, encoding='utf-8') as snapshot_file:
+                    snapshots.append(json.load(snapshot_file))
+            except (OSError, ValueError):
+                continue  # Removed by a clear in the meantime
+        return snapshots
+
+    def clear(self) -> None:
+        """Drop the snapshots of every process; each of them clears its data when it notices."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path('cleared'), 'w', encoding='utf-8'):
+            pass
+        for path in glob.glob(self._path('[0-9]*')):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        self._follow_clear()
+
+    def _publish_periodically(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            self._follow_clear()
+            with self._lock:
+                changed = self._changed
+            if changed:
+                try:
+                    self.publish()
+                except OSError:
+                    pass  # Published with the next change
+
+    def _follow_clear(self) -> None:
+        cleared_at = self._clear_marker_time()
+        if cleared_at > self._cleared_at:
+            self._cleared_at = cleared_at
+            if self.on_clear is not None:
+                self.on_clear()
+
+    def _clear_marker_time(self) -> float:
+        try:
+            return os.path.getmtime(self._path('cleared'))
+        except OSError:
+            return 0.0
+
+    def _path(self, process: Any) -> str:
+        return os.path.join(self.directory, f'{self.name}-{process}.json')
@@ -0,0 +1,56 @@
+"""Startup check of the database schema revision.
+
+The schema is created and migrated by the Alembic chain in migrations/
+(`alembic upgrade head`, run once per deployment before the workers start).
+Workers only compare the revision stamped in alembic_version with the one
+this code was written for: a single-row query instead of the catalog
+reflection of db.create_all(), however many workers boot at once.
+"""
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+# Head of the migration chain; bump it with every new revision
+SCHEMA_REVISION = '0006_cache_generations'
+
+class SchemaRevisionError(RuntimeError):
+    """The database is not migrated to SCHEMA_REVISION."""
+
+def current_revision(connection) -> Optional[str]:
+    """
+    Revision stamped in the database by Alembic.
+
+    Returns:
+        The revision id, or None when the database was never migrated
+    """
+    try:
+        return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    except DBAPIError:
+        # No alembic_version table; the failed transaction is rolled back when the connection closes
+        return None
+
+def check_schema_revision(engine, expected: str = SCHEMA_REVISION) -> None:
+    """
+    Make sure the database schema is at the expected revision.
+
+    Args:
+        engine: SQLAlchemy engine of the database
+        expected: Revision the application needs
+
+    Raises:
+        SchemaRevisionError: If the database is missing migrations, or was
+            migrated past this version of the application
+    """
+    with engine.connect() as connection:
+        revision = current_revision(connection)
+    if revision == expected:
+        return
+    if revision is None:
+        raise SchemaRevisionError(
+            f"Database schema is not under migration control (expected revision {expected}); "
+            "run 'alembic upgrade head' from the backend directory"
+        )
+    raise SchemaRevisionError(
+        f"Database schema is at revision {revision}, expected {expected}; "
+        "run 'alembic upgrade head' from the backend directory, or deploy the matching application version"
+    )
@@ -0,0 +1,357 @@
+"""Slow query log with sampled query plans.
+
+init_slow_query_log times every statement of every engine. A statement
+slower than the threshold is logged and aggregated in memory by fingerprint,
+the SHA-1 of its normalized SQL: literals and placeholders become ?, and lists
+of placeholders become (?+) so that IN clauses, whose length varies with the
+criteria, share one fingerprint. Each entry keeps the count and time of the
+query shape, the types of its bound parameters and the service methods that
+ran it, so that the report of GET /system/slow-queries points at the
+PhotoService query responsible.
+
+A sample of slow SELECT statements is explained again with EXPLAIN (ANALYZE,
+BUFFERS) on PostgreSQL and EXPLAIN QUERY PLAN on SQLite, and the latest plan is
+kept with the entry. ANALYZE runs the query a second time, which is why plans
+are only captured for a fraction of slow queries, and never in the request:
+a background thread of each process explains them one at a time, on a pooled
+connection of its own and under a short statement timeout, so a failing or
+cancelled EXPLAIN cannot abort the transaction of the request.
+
+The log is kept per process. Given the directory shared by the workers for
+the metrics, the report merges the slow queries of every worker (see
+core.infrastructure.process_snapshots), and clearing it clears them all.
+"""
+import hashlib
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from core.infrastructure.process_snapshots import ProcessSnapshots
+from utils.config import DatabaseConfig
+
+logger = logging.getLogger(__name__)
+
+# Fingerprints kept in memory; the least expensive one makes room for a new one
+MAX_FINGERPRINTS = 500
+# Distinct parameter shapes kept per fingerprint
+MAX_PARAMETER_SHAPES = 5
+# Milliseconds an EXPLAIN may run before PostgreSQL cancels it
+EXPLAIN_TIMEOUT_MS = 5000
+# Plan captures waiting for the background thread; slow queries beyond them are not explained
+MAX_PENDING_EXPLAINS = 10
+# Packages whose frames name the calling service method
+CALLER_MODULE_PREFIX = 'core.services.'
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\?|(?<!:):\w+|\$\d+")
+_NUMBER = re.compile(r"(?<![\w.$])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_READ_ONLY = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+_WRITES = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+
+def normalize_sql(statement: str) -> str:
+    """Replace the literals and placeholders of a statement, keeping its shape."""
+    normalized = _STRING.sub('?', statement)
+    normalized = _PLACEHOLDER.sub('?', normalized)
+    normalized = _NUMBER.sub('?', normalized)
+    normalized = _PLACEHOLDER_LIST.sub('(?+)', normalized)
+    return _WHITESPACE.sub(' ', normalized).strip()
+
+def fingerprint(normalized_sql: str) -> str:
+    return hashlib.sha1(normalized_sql.encode('utf-8')).hexdigest()[:16]
+
+def parameter_shape(parameters, executemany: bool = False) -> str:
+    """
+    The types of the bound parameters, with repeated types counted.
+
+    For example (int, str*3) for an id and three tag names.
+    """
+    prefix = ''
+    if executemany:
+        prefix = f"{len(parameters)} x "
+        parameters = parameters[0] if parameters else ()
+    values = parameters.values() if isinstance(parameters, dict) else (parameters or ())
+    names = ['None' if value is None else type(value).__name__ for value in values]
+
+    groups = []
+    for name in names:
+        if groups and groups[-1][0] == name:
+            groups[-1][1] += 1
+        else:
+            groups.append([name, 1])
+    return prefix + '(' + ', '.join(name if count == 1 else f"{name}*{count}" for name, count in groups) + ')'
+
+def calling_service_method() -> Optional[str]:
+    """The service method that ran the current statement, e.g. PhotoService.search_photos."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        if frame.f_globals.get('__name__', '').startswith(CALLER_MODULE_PREFIX):
+            return frame.f_code.co_qualname
+        frame = frame.f_back
+    return None
+
+class SlowQueryStats:
+    """Aggregated occurrences of one slow query shape."""
+
+    def __init__(self, query_fingerprint: str, sql: str):
+        self.fingerprint = query_fingerprint
+        self.sql = sql
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_seen = None
+        self.callers: Dict[str, int] = {}
+        self.parameter_shapes: List[str] = []
+        self.plan: Optional[str] = None
+        self.plan_captured_at = None
+
+    def record(self, elapsed_ms: float, caller: Optional[str], shape: str) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.last_seen = datetime.now()
+        caller = caller or '<unknown>'
+        self.callers[caller] = self.callers.get(caller, 0) + 1
+        if shape not in self.parameter_shapes and len(self.parameter_shapes) < MAX_PARAMETER_SHAPES:
+            self.parameter_shapes.append(shape)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'fingerprint': self.fingerprint,
+            'sql': self.sql,
+            'count': self.count,
+            'totalMs': round(self.total_ms, 3),
+            'avgMs': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'maxMs': round(self.max_ms, 3),
+            'lastSeen': self.last_seen.isoformat() if self.last_seen else None,
+            'callers': self.callers,
+            'parameterShapes': self.parameter_shapes,
+            'plan': self.plan,
+            'planCapturedAt': self.plan_captured_at.isoformat() if self.plan_captured_at else None
+        }
+
+def merge_reported_queries(entries: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Combine the reported entries of several processes that share a fingerprint."""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for entry in entries:
+        current = merged.get(entry['fingerprint'])
+        if current is None:
+            merged[entry['fingerprint']] = dict(entry, callers=dict(entry['callers']),
+                                                parameterShapes=list(entry['parameterShapes']))
+            continue
+        current['count'] += entry['count']
+        current['totalMs'] = round(current['totalMs'] + entry['totalMs'], 3)
+        current['avgMs'] = round(current['totalMs'] / current['count'], 3) if current['count'] else 0.0
+        current['maxMs'] = max(current['maxMs'], entry['maxMs'])
+        current['lastSeen'] = max(filter(None, (current['lastSeen'], entry['lastSeen'])), default=None)
+        for caller, count in entry['callers'].items():
+            current['callers'][caller] = current['callers'].get(caller, 0) + count
+        for shape in entry['parameterShapes']:
+            if shape not in current['parameterShapes'] and len(current['parameterShapes']) < MAX_PARAMETER_SHAPES:
+                current['parameterShapes'].append(shape)
+        # ISO timestamps of the same clock sort as strings
+        if entry['plan'] is not None and (entry['planCapturedAt'] or '') > (current['planCapturedAt'] or ''):
+            current['plan'] = entry['plan']
+            current['planCapturedAt'] = entry['planCapturedAt']
+    return list(merged.values())
+
+class SlowQueryLog:
+    """
+    Thread-safe in-memory aggregate of the statements slower than threshold_ms.
+
+    With a shared directory, report() and clear() cover every process publishing to it.
+    """
+
+    def __init__(self, threshold_ms: float, explain_rate: float = 0.0, shared_dir: Optional[str] = None):
+        self.threshold_ms = threshold_ms
+        self.explain_rate = explain_rate
+        self._lock = threading.Lock()
+        self._queries: Dict[str, SlowQueryStats] = {}
+        self._pending_plans = set()
+        self._explainer = None
+        self._explainer_pid = None
+        self._shared = None
+        if shared_dir:
+            self._shared = ProcessSnapshots(shared_dir, 'slow-queries', self.snapshot, on_clear=self._clear_local)
+
+    def record(self, connection, statement: str, parameters, executemany: bool, elapsed_ms: float) -> None:
+        """Log and aggregate a statement that took elapsed_ms, if it is slow."""
+        if elapsed_ms < self.threshold_ms:
+            return
+        sql = normalize_sql(statement)
+        query_fingerprint = fingerprint(sql)
+        caller = calling_service_method()
+        shape = parameter_shape(parameters, executemany)
+        logger.warning("Slow query %s (%.1f ms) in %s: %s %s",
+                       query_fingerprint, elapsed_ms, caller or '<unknown>', sql, shape)
+
+        with self._lock:
+            stats = self._queries.get(query_fingerprint)
+            if stats is None:
+                if len(self._queries) >= MAX_FINGERPRINTS:
+                    cheapest = min(self._queries.values(), key=lambda entry: entry.total_ms)
+                    del self._queries[cheapest.fingerprint]
+                stats = self._queries[query_fingerprint] = SlowQueryStats(query_fingerprint, sql)
+            stats.record(elapsed_ms, caller, shape)
+        if self._shared is not None:
+            self._shared.changed()
+
+        if not executemany and self.explain_rate > 0 and random.random() < self.explain_rate:
+            self._schedule_plan(connection.engine, query_fingerprint, statement, parameters)
+
+    def _schedule_plan(self, engine, query_fingerprint: str, statement: str, parameters) -> None:
+        """Queue the capture of a plan, unless one is already pending for the fingerprint."""
+        if not _READ_ONLY.match(statement) or _WRITES.search(statement):
+            return
+        with self._lock:
+            if query_fingerprint in self._pending_plans or len(self._pending_plans) >= MAX_PENDING_EXPLAINS:
+                return
+            self._pending_plans.add(query_fingerprint)
+            # A thread started before a fork does not exist in the worker process
+            if self._explainer is None or self._explainer_pid != os.getpid():
+                self._explainer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='slow-query-explain')
+                self._explainer_pid = os.getpid()
+            explainer = self._explainer
+        # The caller may reuse its parameters once the statement returns
+        parameters = dict(parameters) if isinstance(parameters, dict) else tuple(parameters or ())
+        explainer.submit(self._capture_plan, engine, query_fingerprint, statement, parameters)
+
+    def _capture_plan(self, engine, query_fingerprint: str, statement: str, parameters) -> None:
+        try:
+            plan = explain(engine, statement, parameters)
+        finally:
+            with self._lock:
+                self._pending_plans.discard(query_fingerprint)
+        if plan is None:
+            return
+        with self._lock:
+            stats = self._queries.get(query_fingerprint)
+            if stats is not None:
+                stats.plan = plan
+                stats.plan_captured_at = datetime.now()
+        if self._shared is not None:
+            self._shared.changed()
+
+    def wait_for_plans(self, timeout: float = None) -> None:
+        """Wait until the plans queued so far are captured."""
+        with self._lock:
+            explainer = self._explainer if self._explainer_pid == os.getpid() else None
+        if explainer is not None:
+            explainer.submit(lambda: None).result(timeout)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """The reported entries of this process."""
+        with self._lock:
+            return [entry.to_dict() for entry in self._queries.values()]
+
+    def report(self, limit: int = None) -> Dict[str, Any]:
+        """
+        The slow query shapes, most expensive first, of every process when shared.
+
+        Returns:
+            Dictionary containing:
+                - thresholdMs: float - Duration above which a query is slow
+                - explainRate: float - Fraction of slow queries whose plan is captured
+                - queries: List[Dict] - Per fingerprint: sql, count, totalMs, avgMs, maxMs,
+                  lastSeen, callers, parameterShapes, plan and planCapturedAt
+        """
+        if self._shared is not None:
+            queries = merge_reported_queries(entry for snapshot in self._shared.collect() for entry in snapshot)
+        else:
+            queries = self.snapshot()
+        queries.sort(key=lambda entry: entry['totalMs'], reverse=True)
+        return {
+            'thresholdMs': self.threshold_ms,
+            'explainRate': self.explain_rate,
+            'queries': queries[:limit]
+        }
+
+    def clear(self) -> None:
+        self._clear_local()
+        if self._shared is not None:
+            self._shared.clear()
+
+    def _clear_local(self) -> None:
+        with self._lock:
+            self._queries.clear()
+
+def explain(engine, statement: str, parameters) -> Optional[str]:
+    """
+    The plan of a read-only statement, run on a connection of its own.
+
+    Returns:
+        The plan as text, None for statements that are not explained (writes,
+        other databases), or the error when EXPLAIN itself failed
+    """
+    if not _READ_ONLY.match(statement) or _WRITES.search(statement):
+        return None
+    dialect = engine.dialect.name
+    if dialect == 'postgresql':
+        prefix = 'EXPLAIN (ANALYZE, BUFFERS) '
+    elif dialect == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        return None
+
+    # A raw DB-API connection does not go through the engine events again;
+    # closing it returns it to the pool, which rolls its transaction back
+    explain_connection = engine.raw_connection()
+    try:
+        explain_cursor = explain_connection.cursor()
+        try:
+            if dialect == 'postgresql':
+                explain_cursor.execute(f"SET LOCAL statement_timeout = {EXPLAIN_TIMEOUT_MS}")
+            explain_cursor.execute(prefix + statement, parameters)
+            rows = explain_cursor.fetchall()
+        finally:
+            explain_cursor.close()
+    except Exception as e:
+        return f"EXPLAIN failed: {e}"
+    finally:
+        explain_connection.close()
+    if dialect == 'sqlite':
+        # id, parent, notused, detail
+        return '\n'.join(str(row[-1]) for row in rows)
+    return '\n'.join(str(row[0]) for row in rows)
+
+_slow_query_log: Optional[SlowQueryLog] = None
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._slow_query_start_time = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, '_slow_query_start_time', None)
+    if _slow_query_log is not None and start is not None:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        _slow_query_log.record(conn, statement, parameters, executemany, elapsed_ms)
+
+def init_slow_query_log(database_config: DatabaseConfig, shared_dir: Optional[str] = None) -> Optional[SlowQueryLog]:
+    """
+    Start logging the slow statements of every engine.
+
+    Args:
+        database_config: Slow query threshold (0 disables the log) and explain sample rate
+        shared_dir: Directory shared by the worker processes, to report the slow queries of all of them
+
+    Returns:
+        The log receiving the slow queries, or None when it is disabled
+    """
+    global _slow_query_log
+    if database_config.slow_query_ms <= 0:
+        _slow_query_log = None
+        return None
+    _slow_query_log = SlowQueryLog(database_config.slow_query_ms, database_config.slow_query_explain_rate, shared_dir)
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    return _slow_query_log
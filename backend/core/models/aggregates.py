@@ -0,0 +1,51 @@
+# Description: Rollup tables maintained incrementally alongside the photos they summarize.
+from core.models.db import db
+
+class PhotoDateCount(db.Model):
+    """Number of photos taken on each calendar day (UTC)."""
+    __tablename__ = 'photo_date_counts'
+
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Integer, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __init__(self, year: int, month: int, day: int, count: int = 0):
+        self.year = year
+        self.month = month
+        self.day = day
+        self.count = count
+
+class PhotoCameraCount(db.Model):
+    """Number of photos taken with each camera.
+
+    Photos without camera EXIF data are counted under an empty make and model,
+    so the rows always add up to the number of photos.
+    """
+    __tablename__ = 'photo_camera_counts'
+
+    camera_make = db.Column(db.String(100), primary_key=True)
+    camera_model = db.Column(db.String(100), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __init__(self, camera_make: str, camera_model: str, count: int = 0):
+        self.camera_make = camera_make
+        self.camera_model = camera_model
+        self.count = count
+
+class PersonCooccurrence(db.Model):
+    """Number of photos two people appear in together.
+
+    Each pair is stored in both directions so that the companions of a person
+    are a single primary-key range scan.
+    """
+    __tablename__ = 'person_cooccurrences'
+
+    person_id = db.Column(db.Integer, db.ForeignKey('people.id', ondelete='CASCADE'), primary_key=True)
+    other_person_id = db.Column(db.Integer, db.ForeignKey('people.id', ondelete='CASCADE'), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __init__(self, person_id: int, other_person_id: int, count: int = 0):
+        self.person_id = person_id
+        self.other_person_id = other_person_id
+        self.count = count
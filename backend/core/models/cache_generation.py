@@ -0,0 +1,14 @@
+# Description: Generation counters of the data cached in each worker process.
+from core.models.db import db
+
+class CacheGeneration(db.Model):
+    """A counter bumped in the same transaction as every write to some cached data.
+
+    Worker processes remember the generation their cache was built at and
+    rebuild it when the stored generation has moved, so a write made through
+    one worker reaches the caches of all of them.
+    """
+    __tablename__ = 'cache_generations'
+
+    name = db.Column(db.String(50), primary_key=True)
+    generation = db.Column(db.Integer, nullable=False, default=0)
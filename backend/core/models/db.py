@@ -1,3 +1,4 @@
 from flask_sqlalchemy import SQLAlchemy
+from core.infrastructure.db_routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
@@ -0,0 +1,38 @@
+# Description: Pairs of people suspected to be duplicates, awaiting review.
+from datetime import datetime, timezone
+from core.models.db import db
+
+PENDING = 'pending'
+DISMISSED = 'dismissed'
+
+class DuplicateCandidate(db.Model):
+    """A pair of people that may be the same person, with the scores explaining why.
+
+    Each pair is stored once, with person_id < other_person_id. Dismissed pairs are
+    kept so that later scans do not propose them again.
+    """
+    __tablename__ = 'duplicate_candidates'
+    __table_args__ = (
+        db.Index('ix_duplicate_candidates_status_score', 'status', 'score'),
+    )
+
+    person_id = db.Column(db.Integer, db.ForeignKey('people.id', ondelete='CASCADE'), primary_key=True)
+    other_person_id = db.Column(db.Integer, db.ForeignKey('people.id', ondelete='CASCADE'), primary_key=True)
+    score = db.Column(db.Float, nullable=False)
+    name_score = db.Column(db.Float, nullable=False)
+    date_score = db.Column(db.Float, nullable=False)
+    companion_score = db.Column(db.Float, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=PENDING)
+    detected_at = db.Column(db.DateTime(timezone=True), nullable=False,
+                            default=lambda: datetime.now(timezone.utc))
+
+    def to_dict(self) -> dict:
+        return {
+            'personId': self.person_id,
+            'otherPersonId': self.other_person_id,
+            'score': self.score,
+            'nameScore': self.name_score,
+            'dateScore': self.date_score,
+            'companionScore': self.companion_score,
+            'status': self.status
+        }
@@ -1,7 +1,18 @@
+from sqlalchemy.orm import validates
 from core.models.db import db
+from core.infrastructure.phonetic import phonetic_key
 
 class Person(db.Model):
     __tablename__ = 'people'
+    __table_args__ = (
+        # Trigram indexes (pg_trgm) serve both similarity and ILIKE '%term%' searches
+        db.Index('ix_people_first_name_trgm', 'first_name',
+                 postgresql_using='gin', postgresql_ops={'first_name': 'gin_trgm_ops'}),
+        db.Index('ix_people_last_name_trgm', 'last_name',
+                 postgresql_using='gin', postgresql_ops={'last_name': 'gin_trgm_ops'}),
+        db.Index('ix_people_description_trgm', 'description',
+                 postgresql_using='gin', postgresql_ops={'description': 'gin_trgm_ops'}),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(100), nullable=False)
@@ -9,6 +20,11 @@ class Person(db.Model):
     birth_date = db.Column(db.Date, nullable=True)
     death_date = db.Column(db.Date, nullable=True)
     description = db.Column(db.Text, nullable=True)
+    # Number of photos the person appears in, maintained with photo_people
+    photo_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Phonetic keys of the names, computed on write (see core.infrastructure.phonetic)
+    first_name_phonetic = db.Column(db.String(4), index=True)
+    last_name_phonetic = db.Column(db.String(4), index=True)
 
     def __init__(self, first_name: str, last_name: str, birth_date=None, death_date=None, description=None):
         self.first_name = first_name
@@ -16,6 +32,12 @@ class Person(db.Model):
         self.birth_date = birth_date
         self.death_date = death_date
         self.description = description
+        self.photo_count = 0
+
+    @validates('first_name', 'last_name')
+    def _update_phonetic_key(self, key: str, value: str) -> str:
+        setattr(self, f"{key}_phonetic", phonetic_key(value))
+        return value
 
     def to_dict(self) -> dict:
         return {
@@ -24,5 +46,6 @@ class Person(db.Model):
             'lastName': self.last_name,
             'birthDate': self.birth_date.isoformat() if self.birth_date else None,
             'deathDate': self.death_date.isoformat() if self.death_date else None,
-            'description': self.description
+            'description': self.description,
+            'photoCount': self.photo_count
         }
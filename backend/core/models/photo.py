@@ -18,6 +18,12 @@ photo_people = db.Table('photo_people',
 
 class Photo(db.Model):
     __tablename__ = 'photos'
+    __table_args__ = (
+        # Serve the exposure range filters of get_photos
+        db.Index('ix_photos_iso', 'iso'),
+        db.Index('ix_photos_focal_length', 'focal_length'),
+        db.Index('ix_photos_f_number', 'f_number'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     file_name = db.Column(db.String(255), nullable=False)
@@ -31,6 +37,13 @@ class Photo(db.Model):
     location_name = db.Column(db.String(255))
     latitude = db.Column(db.Float)
     longitude = db.Column(db.Float)
+    # Camera settings read from the EXIF data
+    camera_make = db.Column(db.String(100))
+    camera_model = db.Column(db.String(100))
+    focal_length = db.Column(db.Float)
+    f_number = db.Column(db.Float)
+    exposure_time = db.Column(db.Float)
+    iso = db.Column(db.Integer)
 
     # Relationships
     tags = db.relationship('Tag', secondary=photo_tags, backref=db.backref('photos', lazy='dynamic'))
@@ -39,6 +52,8 @@ class Photo(db.Model):
     def __init__(self, file_name: str, s3_key: str, url: str, title: str = None, description: str = None,
                  upload_date: datetime = None, date_taken: datetime = None, author: str = None,
                  location_name: str = None, latitude: float = None, longitude: float = None,
+                 camera_make: str = None, camera_model: str = None, focal_length: float = None,
+                 f_number: float = None, exposure_time: float = None, iso: int = None,
                  tags: list = None, people: list = None):
         self.file_name = file_name
         self.s3_key = s3_key
@@ -51,6 +66,12 @@ class Photo(db.Model):
         self.location_name = location_name
         self.latitude = latitude
         self.longitude = longitude
+        self.camera_make = camera_make
+        self.camera_model = camera_model
+        self.focal_length = focal_length
+        self.f_number = f_number
+        self.exposure_time = exposure_time
+        self.iso = iso
         if tags:
             self.tags.extend(tags)
         if people:
@@ -70,6 +91,16 @@ class Photo(db.Model):
             'location_name': self.location_name,
             'latitude': self.latitude,
             'longitude': self.longitude,
+            'camera_make': self.camera_make,
+            'camera_model': self.camera_model,
+            'focal_length': self.focal_length,
+            'f_number': self.f_number,
+            'exposure_time': self.exposure_time,
+            'iso': self.iso,
             'tags': [tag.name for tag in self.tags],
             'people': [person.id for person in self.people]
         }
+
+# Case-insensitive camera lookups ("all photos from the Nikon F3") use these expression indexes
+db.Index('ix_photos_camera', db.func.lower(Photo.camera_make), db.func.lower(Photo.camera_model))
+db.Index('ix_photos_camera_model', db.func.lower(Photo.camera_model))
@@ -0,0 +1,54 @@
+# Description: Family relationships between people.
+from core.models.db import db
+
+PARENT = 'parent'
+SPOUSE = 'spouse'
+RELATIONSHIP_TYPES = (PARENT, SPOUSE)
+
+class Relationship(db.Model):
+    """A directed edge of the family graph.
+
+    For 'parent' relationships person_id is the parent of relative_id. 'spouse'
+    relationships are symmetric and stored once, with person_id < relative_id.
+    """
+    __tablename__ = 'relationships'
+    __table_args__ = (
+        # The primary key serves parent -> children lookups, this index child -> parents
+        db.Index('ix_relationships_relative', 'relative_id', 'relationship_type', 'person_id'),
+    )
+
+    person_id = db.Column(db.Integer, db.ForeignKey('people.id', ondelete='CASCADE'), primary_key=True)
+    relative_id = db.Column(db.Integer, db.ForeignKey('people.id', ondelete='CASCADE'), primary_key=True)
+    relationship_type = db.Column(db.String(20), primary_key=True)
+
+    def __init__(self, person_id: int, relative_id: int, relationship_type: str):
+        self.person_id = person_id
+        self.relative_id = relative_id
+        self.relationship_type = relationship_type
+
+    def to_dict(self) -> dict:
+        return {
+            'personId': self.person_id,
+            'relativeId': self.relative_id,
+            'type': self.relationship_type
+        }
+
+class PersonAncestry(db.Model):
+    """Closure of the parent relationships: one row per (ancestor, descendant) pair.
+
+    depth is the shortest number of generations between them (1 for a parent).
+    Maintained incrementally by core.services.ancestry_index.
+    """
+    __tablename__ = 'person_ancestry'
+    __table_args__ = (
+        db.Index('ix_person_ancestry_descendant', 'descendant_id', 'depth', 'ancestor_id'),
+    )
+
+    ancestor_id = db.Column(db.Integer, db.ForeignKey('people.id', ondelete='CASCADE'), primary_key=True)
+    descendant_id = db.Column(db.Integer, db.ForeignKey('people.id', ondelete='CASCADE'), primary_key=True)
+    depth = db.Column(db.Integer, nullable=False)
+
+    def __init__(self, ancestor_id: int, descendant_id: int, depth: int):
+        self.ancestor_id = ancestor_id
+        self.descendant_id = descendant_id
+        self.depth = depth
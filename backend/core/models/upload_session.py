@@ -0,0 +1,65 @@
+# Description: Resumable uploads in progress, stored in S3 as multipart uploads.
+from datetime import datetime, timedelta, timezone
+from core.models.db import db
+
+# Parts are being received
+UPLOADING = 'uploading'
+# The parts were assembled into the file in S3; the photo remains to be created
+ASSEMBLED = 'assembled'
+
+class UploadSession(db.Model):
+    """A file uploaded in fixed-size chunks, each stored as one part of an S3 multipart upload.
+
+    Chunks are only accepted at the current offset, so the parts received are
+    always 1..n and the offset is the sum of their sizes. updated_at moves with
+    every chunk: sessions idle for longer than the upload expiry are swept.
+    """
+    __tablename__ = 'upload_sessions'
+    __table_args__ = (
+        db.Index('ix_upload_sessions_updated_at', 'updated_at'),
+    )
+
+    id = db.Column(db.String(36), primary_key=True)
+    file_name = db.Column(db.String(255), nullable=False)
+    s3_key = db.Column(db.String(255), unique=True, nullable=False)
+    s3_upload_id = db.Column(db.String(1024), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    chunk_size = db.Column(db.Integer, nullable=False)
+    # Title, description, tags, people and location given for the photo
+    photo_metadata = db.Column(db.JSON, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=UPLOADING)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False,
+                           default=lambda: datetime.now(timezone.utc))
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False,
+                           default=lambda: datetime.now(timezone.utc))
+
+    parts = db.relationship('UploadPart', order_by='UploadPart.part_number', cascade='all, delete-orphan')
+
+    @property
+    def offset(self) -> int:
+        """Bytes received so far."""
+        return sum(part.size for part in self.parts)
+
+    def to_dict(self, expiry: timedelta) -> dict:
+        updated_at = self.updated_at
+        if updated_at.tzinfo is None:
+            # SQLite returns naive datetimes
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        return {
+            'id': self.id,
+            'fileName': self.file_name,
+            'size': self.size,
+            'chunkSize': self.chunk_size,
+            'offset': self.offset,
+            'status': self.status,
+            'expiresAt': (updated_at + expiry).isoformat()
+        }
+
+class UploadPart(db.Model):
+    """A chunk of a resumable upload, received as an S3 part."""
+    __tablename__ = 'upload_parts'
+
+    upload_id = db.Column(db.String(36), db.ForeignKey('upload_sessions.id', ondelete='CASCADE'), primary_key=True)
+    part_number = db.Column(db.Integer, primary_key=True)
+    etag = db.Column(db.String(100), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
@@ -0,0 +1,228 @@
+"""Incremental maintenance of the rollup tables in core.models.aggregates.
+
+These helpers change the rollups in the transaction of the given session; the
+caller commits them with the rows they describe, so a rollup can never drift
+from the data it summarizes. Counts are incremented in SQL, never read and
+written back, so concurrent uploads and deletes cannot lose an update.
+"""
+from collections import Counter
+from datetime import datetime, timezone
+from itertools import combinations
+from typing import Iterable, Optional, Tuple
+from sqlalchemy import tuple_, func, select, insert, delete
+from core.models.aggregates import PhotoDateCount, PhotoCameraCount, PersonCooccurrence
+from core.models.person import Person
+from core.models.photo import Photo, photo_people
+
+def _day_key(value: Optional[datetime]) -> Optional[Tuple[int, int, int]]:
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.year, value.month, value.day
+
+def upsert_statement(session, model):
+    """INSERT ... ON CONFLICT statement of the session's database (PostgreSQL or SQLite)."""
+    if session.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(model)
+
+def _apply_counts(session, model, key_columns: list, changes: Counter) -> None:
+    """Add each delta in changes to the count of the row with that key.
+
+    The counts are changed in the database rather than read, changed and
+    written back, so concurrent transactions touching the same keys add up
+    instead of overwriting each other: INSERT ... ON CONFLICT DO UPDATE SET
+    count = count + delta creates or updates each row atomically, then rows
+    that dropped to zero are deleted. Keys are written in sorted order so that
+    transactions sharing keys lock them in the same order.
+    """
+    changes = Counter({key: delta for key, delta in changes.items() if delta})
+    if not changes:
+        return
+
+    key_names = [column.key for column in key_columns]
+    statement = upsert_statement(session, model)
+    statement = statement.on_conflict_do_update(
+        index_elements=key_names,
+        set_={'count': model.__table__.c.count + statement.excluded.count}
+    )
+    session.execute(statement, [
+        {**dict(zip(key_names, key)), 'count': delta} for key, delta in sorted(changes.items())
+    ])
+
+    decreased = [key for key, delta in changes.items() if delta < 0]
+    if decreased:
+        session.execute(
+            delete(model).where(tuple_(*key_columns).in_(sorted(decreased)), model.count <= 0)
+        )
+
+def update_timeline(session, dates: Iterable[Optional[datetime]], delta: int) -> None:
+    """Add delta to the per-day photo count of every date (None dates are ignored).
+
+    Args:
+        session: SQLAlchemy session the changes are staged on
+        dates: Dates taken of the photos being added or removed
+        delta: +1 when photos are added, -1 when they are removed
+    """
+    changes = Counter()
+    for key in map(_day_key, dates):
+        if key is not None:
+            changes[key] += delta
+    _apply_counts(
+        session, PhotoDateCount,
+        [PhotoDateCount.year, PhotoDateCount.month, PhotoDateCount.day],
+        changes
+    )
+
+def camera_key(camera_make: Optional[str], camera_model: Optional[str]) -> Tuple[str, str]:
+    """Key of a camera in photo_camera_counts; unknown values are stored as ''."""
+    return camera_make or '', camera_model or ''
+
+def update_camera_counts(session, cameras: Iterable[Tuple[Optional[str], Optional[str]]], delta: int) -> None:
+    """Add delta to the photo count of every (camera_make, camera_model).
+
+    Args:
+        session: SQLAlchemy session the changes are staged on
+        cameras: Camera make and model of the photos being added or removed
+        delta: +1 when photos are added, -1 when they are removed
+    """
+    changes = Counter()
+    for camera_make, camera_model in cameras:
+        changes[camera_key(camera_make, camera_model)] += delta
+    _apply_counts(
+        session, PhotoCameraCount,
+        [PhotoCameraCount.camera_make, PhotoCameraCount.camera_model],
+        changes
+    )
+
+class PersonIndexDelta:
+    """Accumulates photo_people changes and applies them to the person rollups at once.
+
+    Feed it every change made to the people of a set of photos, then call apply()
+    before committing. Person.photo_count and person_cooccurrences are updated with
+    one statement per distinct count delta and one query per batch of pairs,
+    however many photos were touched.
+    """
+
+    def __init__(self):
+        self.photo_counts = Counter()
+        self.pairs = Counter()
+
+    def people_added(self, existing_ids: Iterable[int], added_ids: Iterable[int]) -> None:
+        """Record that added_ids were linked to a photo already showing existing_ids."""
+        self._change(existing_ids, added_ids, 1)
+
+    def people_removed(self, remaining_ids: Iterable[int], removed_ids: Iterable[int]) -> None:
+        """Record that removed_ids were unlinked from a photo still showing remaining_ids."""
+        self._change(remaining_ids, removed_ids, -1)
+
+    def _change(self, unchanged_ids: Iterable[int], changed_ids: Iterable[int], delta: int) -> None:
+        changed_ids = sorted(set(changed_ids))
+        unchanged_ids = set(unchanged_ids) - set(changed_ids)
+        for person_id in changed_ids:
+            self.photo_counts[person_id] += delta
+            for other_id in unchanged_ids:
+                self.pairs[(person_id, other_id)] += delta
+                self.pairs[(other_id, person_id)] += delta
+        for person_id, other_id in combinations(changed_ids, 2):
+            self.pairs[(person_id, other_id)] += delta
+            self.pairs[(other_id, person_id)] += delta
+
+    def apply(self, session) -> None:
+        """Stage the accumulated changes on session and reset the delta."""
+        by_delta = {}
+        for person_id, delta in self.photo_counts.items():
+            if delta:
+                by_delta.setdefault(delta, []).append(person_id)
+        for delta, person_ids in by_delta.items():
+            session.query(Person).filter(Person.id.in_(person_ids)).update(
+                {Person.photo_count: Person.photo_count + delta},
+                synchronize_session=False
+            )
+        _apply_counts(
+            session, PersonCooccurrence,
+            [PersonCooccurrence.person_id, PersonCooccurrence.other_person_id],
+            self.pairs
+        )
+        self.photo_counts.clear()
+        self.pairs.clear()
+
+def record_photos_added(session, photos: Iterable[Photo]) -> None:
+    """Account for newly created photos in every rollup."""
+    photos = list(photos)
+    update_timeline(session, [photo.date_taken for photo in photos], 1)
+    update_camera_counts(session, [(photo.camera_make, photo.camera_model) for photo in photos], 1)
+    delta = PersonIndexDelta()
+    for photo in photos:
+        delta.people_added([], [person.id for person in photo.people])
+    delta.apply(session)
+
+def record_photos_removed(session, photos: Iterable[Photo]) -> None:
+    """Account for deleted photos in every rollup."""
+    photos = list(photos)
+    update_timeline(session, [photo.date_taken for photo in photos], -1)
+    update_camera_counts(session, [(photo.camera_make, photo.camera_model) for photo in photos], -1)
+    delta = PersonIndexDelta()
+    for photo in photos:
+        delta.people_removed([], [person.id for person in photo.people])
+    delta.apply(session)
+
+def rebuild_timeline(session) -> int:
+    """Recompute the per-day photo counts from the photos table.
+
+    Returns:
+        Number of days with at least one photo
+    """
+    session.query(PhotoDateCount).delete(synchronize_session=False)
+    changes = Counter(
+        key for key in (_day_key(date_taken) for (date_taken,) in
+                        session.query(Photo.date_taken).filter(Photo.date_taken.isnot(None)).yield_per(1000))
+        if key is not None
+    )
+    session.add_all(PhotoDateCount(*key, count=count) for key, count in changes.items())
+    return len(changes)
+
+def rebuild_camera_counts(session) -> int:
+    """Recompute the per-camera photo counts from the photos table.
+
+    Returns:
+        Number of distinct cameras, counting unknown as one
+    """
+    session.query(PhotoCameraCount).delete(synchronize_session=False)
+    changes = Counter()
+    rows = session.query(Photo.camera_make, Photo.camera_model, func.count()).group_by(
+        Photo.camera_make, Photo.camera_model
+    )
+    for camera_make, camera_model, count in rows:
+        changes[camera_key(camera_make, camera_model)] += count
+    session.add_all(PhotoCameraCount(*key, count=count) for key, count in changes.items())
+    return len(changes)
+
+def rebuild_person_index(session) -> int:
+    """Recompute Person.photo_count and person_cooccurrences from photo_people.
+
+    Returns:
+        Number of co-occurrence rows written
+    """
+    photo_count = (
+        select(func.count())
+        .where(photo_people.c.person_id == Person.id)
+        .correlate(Person)
+        .scalar_subquery()
+    )
+    session.query(Person).update({Person.photo_count: photo_count}, synchronize_session=False)
+
+    session.query(PersonCooccurrence).delete(synchronize_session=False)
+    left, right = photo_people.alias('left_link'), photo_people.alias('right_link')
+    pairs = (
+        select(left.c.person_id, right.c.person_id, func.count())
+        .join(right, (right.c.photo_id == left.c.photo_id) & (right.c.person_id != left.c.person_id))
+        .group_by(left.c.person_id, right.c.person_id)
+    )
+    result = session.execute(
+        insert(PersonCooccurrence).from_select(['person_id', 'other_person_id', 'count'], pairs)
+    )
+    return result.rowcount
@@ -0,0 +1,205 @@
+"""Incremental maintenance of the person_ancestry closure table.
+
+Like core.services.aggregate_index, these helpers only stage changes on the
+given session, so the closure is committed together with the relationship rows
+it is derived from.
+"""
+from collections import defaultdict, deque
+from typing import Dict, Iterable, List, Tuple
+from sqlalchemy import tuple_, select, insert, and_, exists
+from core.models.relationship import Relationship, PersonAncestry, PARENT
+
+# Bound on generations walked while rebuilding, which also stops on cyclic data
+MAX_REBUILD_DEPTH = 200
+_BATCH_SIZE = 500
+
+def _ancestors(session, person_ids: Iterable[int]) -> Dict[int, Dict[int, int]]:
+    """Ancestors of several people as {person_id: {ancestor_id: depth}}."""
+    result = {person_id: {} for person_id in person_ids}
+    if result:
+        rows = session.query(PersonAncestry).filter(PersonAncestry.descendant_id.in_(list(result)))
+        for row in rows:
+            result[row.descendant_id][row.ancestor_id] = row.depth
+    return result
+
+def _descendants(session, person_id: int) -> Dict[int, int]:
+    rows = session.query(PersonAncestry.descendant_id, PersonAncestry.depth).filter(
+        PersonAncestry.ancestor_id == person_id
+    )
+    return dict(rows)
+
+def _chunks(items: List, size: int = _BATCH_SIZE):
+    for offset in range(0, len(items), size):
+        yield items[offset:offset + size]
+
+def link_parent(session, parent_id: int, child_id: int) -> None:
+    """Add the closure rows implied by a new parent -> child edge.
+
+    Every ancestor of the parent (and the parent itself) becomes an ancestor of
+    the child and of all of the child's descendants. Existing pairs keep the
+    shorter of the two depths.
+    """
+    ups = {parent_id: 0, **_ancestors(session, [parent_id])[parent_id]}
+    downs = {child_id: 0, **_descendants(session, child_id)}
+    pairs = {
+        (ancestor_id, descendant_id): up_depth + down_depth + 1
+        for ancestor_id, up_depth in ups.items()
+        for descendant_id, down_depth in downs.items()
+    }
+
+    keys = list(pairs)
+    for batch in _chunks(keys):
+        existing = {
+            (row.ancestor_id, row.descendant_id): row
+            for row in session.query(PersonAncestry).filter(
+                tuple_(PersonAncestry.ancestor_id, PersonAncestry.descendant_id).in_(batch)
+            )
+        }
+        for key in batch:
+            row = existing.get(key)
+            if row is None:
+                session.add(PersonAncestry(*key, depth=pairs[key]))
+            elif pairs[key] < row.depth:
+                row.depth = pairs[key]
+
+def unlink_parent(session, parent_id: int, child_id: int) -> None:
+    """Recompute the ancestors of the child's subtree after a parent -> child edge is removed.
+
+    The relationship row must already be deleted (or staged for deletion) on the
+    session. Other paths between the same people, e.g. through the other parent
+    in a pedigree collapse, are preserved.
+    """
+    session.flush()
+    subtree = [child_id, *_descendants(session, child_id)]
+    for batch in _chunks(subtree):
+        session.query(PersonAncestry).filter(
+            PersonAncestry.descendant_id.in_(batch)
+        ).delete(synchronize_session=False)
+
+    parents_of: Dict[int, List[int]] = {person_id: [] for person_id in subtree}
+    for batch in _chunks(subtree):
+        edges = session.query(Relationship.person_id, Relationship.relative_id).filter(
+            Relationship.relationship_type == PARENT, Relationship.relative_id.in_(batch)
+        )
+        for parent, child in edges:
+            parents_of[child].append(parent)
+
+    # Parents outside the subtree still have a valid closure
+    outside = {parent for parents in parents_of.values() for parent in parents if parent not in parents_of}
+    known = _ancestors(session, outside)
+
+    # Kahn's algorithm: handle a person once all of their parents in the subtree are handled
+    pending = {person_id: sum(parent in parents_of for parent in parents) for person_id, parents in parents_of.items()}
+    children_of: Dict[int, List[int]] = {}
+    for person_id, parents in parents_of.items():
+        for parent in parents:
+            if parent in parents_of:
+                children_of.setdefault(parent, []).append(person_id)
+    queue = deque(person_id for person_id, count in pending.items() if count == 0)
+    while queue:
+        person_id = queue.popleft()
+        ancestors: Dict[int, int] = {}
+        for parent in parents_of[person_id]:
+            candidates = [(parent, 1)] + [(ancestor, depth + 1) for ancestor, depth in known[parent].items()]
+            for ancestor, depth in candidates:
+                if depth < ancestors.get(ancestor, depth + 1):
+                    ancestors[ancestor] = depth
+        known[person_id] = ancestors
+        session.add_all(PersonAncestry(ancestor, person_id, depth) for ancestor, depth in ancestors.items())
+        for child in children_of.get(person_id, ()):
+            pending[child] -= 1
+            if pending[child] == 0:
+                queue.append(child)
+
+def link_new_people(session, parent_edges: Iterable[Tuple[int, int]]) -> int:
+    """Add the closure rows of parent -> child edges between people without any other relationship.
+
+    Imported people are all new, so their closure only depends on the imported
+    edges: it is computed in memory, ancestors before descendants, and inserted
+    in batches instead of rebuilding the table of the whole archive. People on
+    a cycle, which add_relationship would have refused, get no closure rows.
+
+    Returns:
+        Number of closure rows written
+    """
+    parents_of: Dict[int, List[int]] = defaultdict(list)
+    children_of: Dict[int, List[int]] = defaultdict(list)
+    for parent_id, child_id in parent_edges:
+        parents_of[child_id].append(parent_id)
+        children_of[parent_id].append(child_id)
+    people = set(parents_of) | set(children_of)
+
+    # Kahn's algorithm: handle a person once all of their parents are handled
+    pending = {person_id: len(parents_of.get(person_id, ())) for person_id in people}
+    queue = deque(person_id for person_id, count in pending.items() if count == 0)
+    known: Dict[int, Dict[int, int]] = {}
+    rows = []
+    while queue:
+        person_id = queue.popleft()
+        ancestors: Dict[int, int] = {}
+        for parent_id in parents_of.get(person_id, ()):
+            candidates = [(parent_id, 1)] + [(ancestor, depth + 1) for ancestor, depth in known[parent_id].items()]
+            for ancestor, depth in candidates:
+                if depth <= MAX_REBUILD_DEPTH and depth < ancestors.get(ancestor, depth + 1):
+                    ancestors[ancestor] = depth
+        known[person_id] = ancestors
+        rows.extend({'ancestor_id': ancestor, 'descendant_id': person_id, 'depth': depth}
+                    for ancestor, depth in ancestors.items())
+        for child_id in children_of.get(person_id, ()):
+            pending[child_id] -= 1
+            if pending[child_id] == 0:
+                queue.append(child_id)
+
+    for batch in _chunks(rows):
+        session.execute(insert(PersonAncestry), batch)
+    return len(rows)
+
+def remove_person(session, person_id: int) -> None:
+    """Drop every closure row mentioning a person whose relationships are already unlinked."""
+    session.query(PersonAncestry).filter(
+        (PersonAncestry.ancestor_id == person_id) | (PersonAncestry.descendant_id == person_id)
+    ).delete(synchronize_session=False)
+
+def rebuild_ancestry(session) -> int:
+    """Recompute the whole closure table from the relationships table.
+
+    Proceeds one generation at a time with INSERT ... SELECT, so the first depth
+    recorded for a pair is always the shortest.
+
+    Returns:
+        Number of closure rows written
+    """
+    session.query(PersonAncestry).delete(synchronize_session=False)
+    total = session.execute(
+        insert(PersonAncestry).from_select(
+            ['ancestor_id', 'descendant_id', 'depth'],
+            select(Relationship.person_id, Relationship.relative_id, 1)
+            .where(Relationship.relationship_type == PARENT)
+        )
+    ).rowcount
+
+    closure = PersonAncestry.__table__
+    for depth in range(2, MAX_REBUILD_DEPTH + 1):
+        current = closure.alias('current_level')
+        known = closure.alias('known')
+        next_level = (
+            select(current.c.ancestor_id, Relationship.relative_id, depth)
+            .join(Relationship, and_(
+                Relationship.person_id == current.c.descendant_id,
+                Relationship.relationship_type == PARENT
+            ))
+            .where(current.c.depth == depth - 1)
+            .where(current.c.ancestor_id != Relationship.relative_id)
+            .where(~exists().where(and_(
+                known.c.ancestor_id == current.c.ancestor_id,
+                known.c.descendant_id == Relationship.relative_id
+            )))
+            .group_by(current.c.ancestor_id, Relationship.relative_id)
+        )
+        inserted = session.execute(
+            insert(PersonAncestry).from_select(['ancestor_id', 'descendant_id', 'depth'], next_level)
+        ).rowcount
+        if not inserted:
+            break
+        total += inserted
+    return total
@@ -0,0 +1,191 @@
+import asyncio
+from io import BytesIO
+from typing import Any, AsyncIterator, Dict, List, Tuple
+from werkzeug.utils import secure_filename
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from core.services.photo_service import PhotoService, ALLOWED_EXTENSIONS, SORT_DATE, allowed_file
+from core.services.async_storage_service import AsyncStorageService
+from core.services.aggregate_index import record_photos_added
+from core.services.cache_generation import PHOTO_INDEX, bump_generation, current_generation
+from core.models.photo import Photo
+from core.models.person import Person
+from core.models.tag import Tag
+from core.infrastructure.exif_utils import extract_exif_data
+
+class AsyncPhotoService:
+    """
+    Photo upload, search and file streaming for the ASGI serving mode (see asgi.py).
+
+    Runs the statements built by PhotoService on an AsyncEngine and overlaps
+    the independent I/O of a request with asyncio.gather: an upload sends the
+    file to S3 while its tags and people are looked up, and a search with
+    facets runs each facet query on its own connection next to the photo
+    query. The facet cache is the one of photo_service, keyed by the same
+    generation, so uploads through either mode invalidate it.
+    """
+
+    def __init__(self, engine, storage: AsyncStorageService, photo_service: PhotoService):
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        self.engine = engine
+        self.sessions = async_sessionmaker(engine, expire_on_commit=False)
+        self.storage = storage
+        self.photo_service = photo_service
+
+    async def close(self) -> None:
+        """Close the storage client and the database connections."""
+        await self.storage.close()
+        await self.engine.dispose()
+
+    async def upload_photo(self, content: bytes, filename: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Upload a photo with metadata, as PhotoService.upload_photo.
+
+        Args:
+            content: The photo file content
+            filename: The name of the uploaded file
+            metadata: Same structure as PhotoService.upload_photo
+        """
+        filename = secure_filename(filename or '')
+        if not allowed_file(filename):
+            raise ValueError(f"Invalid file type. Allowed types: {ALLOWED_EXTENSIONS}")
+        person_ids = self._person_ids(metadata.get('people') or [])
+        exif_data = extract_exif_data(BytesIO(content))
+
+        async with self.sessions() as session:
+            uploaded, links = await asyncio.gather(
+                self.storage.upload_file(content, filename),
+                self._links(session, metadata.get('tags') or [], person_ids),
+                return_exceptions=True
+            )
+            if isinstance(uploaded, BaseException):
+                await session.rollback()
+                raise Exception(f"Failed to upload photo: {str(uploaded)}")
+
+            s3_key, url = uploaded
+            try:
+                if isinstance(links, BaseException):
+                    raise links
+                tags, people = links
+                new_photo = self.photo_service._new_photo(filename, s3_key, url, metadata, exif_data, tags, people)
+                session.add(new_photo)
+                await session.run_sync(lambda sync_session: self._record_photo(sync_session, new_photo))
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                # Clean up S3 file if database operation fails
+                try:
+                    await self.storage.delete_file(s3_key)
+                except Exception:
+                    pass  # Best effort cleanup
+                raise Exception(f"Failed to upload photo: {str(e)}")
+
+        self.photo_service.facet_cache.clear()
+        return new_photo.to_dict()
+
+    async def get_photos(self, search_criteria: Dict[str, Any], page: int = None,
+                         per_page: int = None, sort: str = SORT_DATE) -> List[Dict[str, Any]]:
+        """Get photos based on structured search criteria, as PhotoService.get_photos."""
+        return await self._photos(search_criteria, [], sort, page, per_page, 'get photos')
+
+    async def search_photos(self, query: str, search_criteria: Dict[str, Any] = None, page: int = 1,
+                            per_page: int = None, sort: str = SORT_DATE) -> List[Dict[str, Any]]:
+        """Search photos with free-text terms, as PhotoService.search_photos."""
+        terms = [term.strip() for term in (query or '').split() if term.strip()]
+        if not terms:
+            return []
+        return await self._photos(search_criteria or {}, terms, sort, page, per_page, 'search photos')
+
+    async def get_photo_facets(self, search_criteria: Dict[str, Any], query: str = '') -> Dict[str, Any]:
+        """
+        Count how many photos each filter value would yield, as PhotoService.get_photo_facets.
+
+        The facet queries are independent and run concurrently, each on its
+        own pooled connection.
+        """
+        terms = [term.strip() for term in (query or '').split() if term.strip()]
+        try:
+            async with self.sessions() as session:
+                generation = await session.run_sync(lambda sync_session: current_generation(sync_session, PHOTO_INDEX))
+            cache_key = (generation, self.photo_service._normalize_criteria(search_criteria, terms))
+            cached = self.photo_service.facet_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            statements = self.photo_service._facet_statements(search_criteria, terms)
+            results = await asyncio.gather(*(self._rows(statement) for statement in statements.values()))
+            facets = self.photo_service._facets_from_rows(dict(zip(statements, results)))
+            self.photo_service.facet_cache.set(cache_key, facets)
+            return facets
+        except Exception as e:
+            raise Exception(f"Failed to get photo facets: {str(e)}")
+
+    async def get_photo_content(self, photo_id: int) -> Tuple[AsyncIterator[bytes], str, int]:
+        """
+        Stream the file of a photo from storage.
+
+        Returns:
+            Tuple of the async chunk iterator, the content type and the size in bytes
+
+        Raises:
+            ValueError: If the photo does not exist
+        """
+        try:
+            async with self.sessions() as session:
+                s3_key = await session.scalar(select(Photo.s3_key).where(Photo.id == photo_id))
+            if s3_key is None:
+                raise ValueError(f"Photo with ID {photo_id} not found")
+            return await self.storage.stream_file(s3_key)
+        except ValueError as e:
+            raise e
+        except Exception as e:
+            raise Exception(f"Failed to get photo content: {str(e)}")
+
+    async def _photos(self, search_criteria: Dict[str, Any], terms: List[str], sort: str,
+                      page: int, per_page: int, action: str) -> List[Dict[str, Any]]:
+        # Raises ValueError for an invalid sort or page before touching the database
+        statement = self.photo_service._photo_statement(search_criteria, terms, sort, page, per_page)
+        try:
+            # to_dict reads tags and people, which cannot be lazy-loaded on an AsyncSession
+            statement = statement.options(selectinload(Photo.tags), selectinload(Photo.people))
+            async with self.sessions() as session:
+                return [photo.to_dict() for photo in await session.scalars(statement)]
+        except Exception as e:
+            raise Exception(f"Failed to {action}: {str(e)}")
+
+    async def _rows(self, statement) -> list:
+        async with self.sessions() as session:
+            return (await session.execute(statement)).all()
+
+    @staticmethod
+    def _record_photo(sync_session, photo: Photo) -> None:
+        """Count a new photo in the rollups and invalidate the facets of every worker."""
+        record_photos_added(sync_session, [photo])
+        bump_generation(sync_session, PHOTO_INDEX)
+
+    @staticmethod
+    async def _links(session, tag_names: List[str], person_ids: List[int]) -> Tuple[List[Tag], List[Person]]:
+        """Load the tags (creating missing ones) and the people of an upload, one query each."""
+        tag_names = list(dict.fromkeys(tag_names))
+        known = {}
+        if tag_names:
+            known = {tag.name: tag for tag in await session.scalars(select(Tag).where(Tag.name.in_(tag_names)))}
+        tags = []
+        for tag_name in tag_names:
+            if tag_name not in known:
+                known[tag_name] = Tag(name=tag_name)
+                session.add(known[tag_name])
+            tags.append(known[tag_name])
+
+        people = []
+        if person_ids:
+            people = list(await session.scalars(select(Person).where(Person.id.in_(person_ids))))
+        return tags, people
+
+    @staticmethod
+    def _person_ids(values) -> List[int]:
+        try:
+            return list(dict.fromkeys(int(value) for value in values))
+        except (TypeError, ValueError):
+            raise ValueError("people must be a list of person IDs")
@@ -0,0 +1,102 @@
+import asyncio
+from contextlib import AsyncExitStack
+from typing import AsyncIterator, Tuple
+from core.services.storage_service import STREAM_CHUNK_SIZE, content_type, new_object_key, public_url
+from utils.config import config
+
+# Connections the S3 client keeps open, shared by all concurrent requests
+S3_POOL_SIZE = 50
+
+class AsyncStorageService:
+    """
+    Asynchronous counterpart of StorageService for the ASGI serving mode.
+
+    Uses aiobotocore, imported with the client on first use. The bucket is
+    expected to exist (scripts/init_minio.py creates it), so unlike
+    StorageService.upload_file no HEAD request precedes each upload.
+    """
+
+    def __init__(self):
+        self.bucket_name = config.storage.bucket_name
+        self._exit_stack = None
+        self._s3_client = None
+        self._lock = asyncio.Lock()
+
+    async def s3_client(self):
+        """The shared aiobotocore S3 client, created on first use."""
+        async with self._lock:
+            if self._s3_client is None:
+                from aiobotocore.session import get_session
+                from botocore.config import Config as BotoConfig
+
+                exit_stack = AsyncExitStack()
+                self._s3_client = await exit_stack.enter_async_context(get_session().create_client(
+                    's3',
+                    endpoint_url=f"http://{config.storage.endpoint}",
+                    aws_access_key_id=config.storage.access_key,
+                    aws_secret_access_key=config.storage.secret_key,
+                    region_name=config.storage.region,
+                    config=BotoConfig(
+                        signature_version='s3v4',
+                        retries={'max_attempts': 3},
+                        max_pool_connections=S3_POOL_SIZE
+                    ),
+                    use_ssl=config.storage.use_ssl
+                ))
+                self._exit_stack = exit_stack
+            return self._s3_client
+
+    async def close(self) -> None:
+        """Close the client and its connections."""
+        if self._exit_stack is not None:
+            await self._exit_stack.aclose()
+            self._exit_stack = None
+            self._s3_client = None
+
+    async def upload_file(self, content: bytes, filename: str) -> Tuple[str, str]:
+        """
+        Upload a file to storage and return its key and public URL.
+        """
+        try:
+            s3_key = new_object_key(filename)
+            client = await self.s3_client()
+            await client.put_object(
+                Bucket=self.bucket_name,
+                Key=s3_key,
+                Body=content,
+                ContentType=content_type(filename)
+            )
+            return s3_key, public_url(self.bucket_name, s3_key)
+        except Exception as e:
+            raise Exception(f"Failed to upload file: {str(e)}")
+
+    async def delete_file(self, s3_key: str) -> None:
+        """
+        Delete a file from storage.
+        """
+        try:
+            client = await self.s3_client()
+            await client.delete_object(Bucket=self.bucket_name, Key=s3_key)
+        except Exception as e:
+            raise Exception(f"Failed to delete file: {str(e)}")
+
+    async def stream_file(self, s3_key: str,
+                          chunk_size: int = STREAM_CHUNK_SIZE) -> Tuple[AsyncIterator[bytes], str, int]:
+        """
+        Open a file for streaming without reading it into memory.
+
+        Returns:
+            Tuple of the async chunk iterator, the content type and the size in bytes
+        """
+        try:
+            client = await self.s3_client()
+            response = await client.get_object(Bucket=self.bucket_name, Key=s3_key)
+        except Exception as e:
+            raise Exception(f"Failed to read file: {str(e)}")
+
+        async def chunks():
+            async with response['Body'] as body:
+                while chunk := await body.read(chunk_size):
+                    yield chunk
+
+        return chunks(), response.get('ContentType') or content_type(s3_key), response['ContentLength']
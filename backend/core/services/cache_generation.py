@@ -0,0 +1,26 @@
+"""Generation counters that keep the process-local caches in step across workers.
+
+A write to cached data calls bump_generation before committing; a reader
+compares current_generation with the generation its cached value was built
+at. Checking costs a primary-key lookup, much less than what the caches save.
+"""
+from sqlalchemy import select
+from core.models.cache_generation import CacheGeneration
+from core.services.aggregate_index import upsert_statement
+
+# People and relationships, behind the relationship graph and the tree layouts
+FAMILY_GRAPH = 'family_graph'
+# Photos, their tags and people, and the names of those people, behind the photo facets
+PHOTO_INDEX = 'photo_index'
+
+def bump_generation(session, name: str) -> None:
+    """Move the generation of name forward, in the transaction of session."""
+    statement = upsert_statement(session, CacheGeneration)
+    session.execute(statement.on_conflict_do_update(
+        index_elements=['name'],
+        set_={'generation': CacheGeneration.__table__.c.generation + 1}
+    ), {'name': name, 'generation': 1})
+
+def current_generation(session, name: str) -> int:
+    """The generation of name, 0 when it was never bumped."""
+    return session.scalar(select(CacheGeneration.generation).where(CacheGeneration.name == name)) or 0
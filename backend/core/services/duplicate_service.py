@@ -0,0 +1,262 @@
+from collections import defaultdict
+from datetime import date
+from difflib import SequenceMatcher
+from itertools import combinations
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy import insert
+from core.services.service_context import ServiceContext
+from core.models.person import Person
+from core.models.aggregates import PersonCooccurrence
+from core.models.duplicate_candidate import DuplicateCandidate, PENDING, DISMISSED
+from core.infrastructure.phonetic import fold_name
+
+DEFAULT_MIN_SCORE = 0.7
+# Blocks larger than this (very common names) are skipped to keep scans linear
+MAX_BLOCK_SIZE = 500
+DEFAULT_REVIEW_LIMIT = 50
+NAME_WEIGHT = 0.55
+DATE_WEIGHT = 0.30
+COMPANION_WEIGHT = 0.15
+# Score given to a signal that is missing on either side
+NEUTRAL_SCORE = 0.5
+_BATCH_SIZE = 1000
+
+def blocking_keys(first_name_phonetic: Optional[str], last_name_phonetic: Optional[str],
+                  birth_date: Optional[date]) -> List[tuple]:
+    """
+    Keys of the blocks a person is compared within.
+
+    People are only compared with people sharing a key: the same phonetic
+    surname and either the same phonetic first name or the same birth year. The
+    second key catches first-name variants that Soundex separates (Jean/Johannes).
+    """
+    if not last_name_phonetic:
+        return []
+    keys = []
+    if first_name_phonetic:
+        keys.append(('name', last_name_phonetic, first_name_phonetic))
+    if birth_date:
+        keys.append(('birth', last_name_phonetic, birth_date.year))
+    return keys
+
+def name_similarity(first: Tuple[str, str], second: Tuple[str, str]) -> float:
+    """Average similarity (0 to 1) of the accent-folded first names and last names."""
+    scores = [
+        SequenceMatcher(None, fold_name(a), fold_name(b)).ratio()
+        for a, b in zip(first, second)
+    ]
+    return sum(scores) / len(scores)
+
+def date_similarity(first: Optional[date], second: Optional[date]) -> Optional[float]:
+    """Similarity of two dates, or None when either is unknown.
+
+    The same day scores 1, the same year 0.8, one year apart 0.5 (off-by-one
+    transcriptions), two years 0.2, and anything further apart 0.
+    """
+    if first is None or second is None:
+        return None
+    if first == second:
+        return 1.0
+    return {0: 0.8, 1: 0.5, 2: 0.2}.get(abs(first.year - second.year), 0.0)
+
+def companion_similarity(first: set, second: set) -> float:
+    """Jaccard similarity of the people two records were photographed with."""
+    if not first or not second:
+        return NEUTRAL_SCORE
+    return len(first & second) / len(first | second)
+
+def score_pair(first, second, first_companions: set, second_companions: set) -> Dict[str, float]:
+    """
+    Score how likely two people rows are the same person.
+
+    Args:
+        first, second: Rows with first_name, last_name, birth_date and death_date
+        first_companions, second_companions: IDs of the people each one shares photos with
+
+    Returns:
+        Dictionary with score, nameScore, dateScore and companionScore. The score
+        is 0 when the two appear in the same photo, since a person cannot be
+        photographed next to themselves.
+    """
+    name = name_similarity((first.first_name, first.last_name), (second.first_name, second.last_name))
+    known = [
+        similarity for similarity in (
+            date_similarity(first.birth_date, second.birth_date),
+            date_similarity(first.death_date, second.death_date)
+        ) if similarity is not None
+    ]
+    dates = sum(known) / len(known) if known else NEUTRAL_SCORE
+    companions = companion_similarity(first_companions - {second.id}, second_companions - {first.id})
+    score = NAME_WEIGHT * name + DATE_WEIGHT * dates + COMPANION_WEIGHT * companions
+    if second.id in first_companions:
+        score = 0.0
+    return {
+        'score': round(score, 4),
+        'nameScore': round(name, 4),
+        'dateScore': round(dates, 4),
+        'companionScore': round(companions, 4)
+    }
+
+class DuplicateService:
+    """Service class for finding and reviewing duplicate person records."""
+
+    def __init__(self, context: ServiceContext):
+        """Initialize the DuplicateService with a ServiceContext.
+
+        Args:
+            context: ServiceContext instance providing access to database and other services
+        """
+        self.db = context.db
+
+    def scan_duplicates(self, min_score: float = DEFAULT_MIN_SCORE,
+                        max_block_size: int = MAX_BLOCK_SIZE) -> Dict[str, Any]:
+        """
+        Find likely duplicate people and store them for review.
+
+        People are grouped into blocks by blocking_keys() and only compared within
+        a block, so the number of comparisons grows with the block sizes rather
+        than with the square of the number of people. Each pair is scored on name
+        similarity, birth and death dates and shared photo companions. Pairs
+        scoring at least min_score replace the pending candidates of the previous
+        scan; dismissed pairs are never proposed again.
+
+        Args:
+            min_score: Lowest score (0 to 1) stored as a candidate
+            max_block_size: Blocks with more people are skipped
+
+        Returns:
+            Dictionary containing:
+                - people: int - Number of people scanned
+                - comparisons: int - Number of pairs scored
+                - candidates: int - Number of pending candidates stored
+                - skippedBlocks: int - Number of blocks over max_block_size
+
+        Raises:
+            ValueError: If min_score is not between 0 and 1
+            Exception: If database operation fails
+        """
+        if not 0 <= min_score <= 1:
+            raise ValueError("min_score must be between 0 and 1")
+        try:
+            people = {}
+            blocks = defaultdict(list)
+            rows = self.db.session.query(
+                Person.id, Person.first_name, Person.last_name,
+                Person.first_name_phonetic, Person.last_name_phonetic,
+                Person.birth_date, Person.death_date
+            ).yield_per(_BATCH_SIZE)
+            for row in rows:
+                people[row.id] = row
+                for key in blocking_keys(row.first_name_phonetic, row.last_name_phonetic, row.birth_date):
+                    blocks[key].append(row.id)
+
+            pairs = set()
+            skipped_blocks = 0
+            for members in blocks.values():
+                if len(members) > max_block_size:
+                    skipped_blocks += 1
+                    continue
+                pairs.update(combinations(sorted(members), 2))
+
+            dismissed = {
+                (row.person_id, row.other_person_id)
+                for row in self.db.session.query(DuplicateCandidate.person_id, DuplicateCandidate.other_person_id)
+                .filter(DuplicateCandidate.status == DISMISSED)
+            }
+            companions = self._companions({person_id for pair in pairs for person_id in pair})
+            candidates = []
+            for person_id, other_id in sorted(pairs - dismissed):
+                scores = score_pair(people[person_id], people[other_id],
+                                    companions[person_id], companions[other_id])
+                if scores['score'] >= min_score:
+                    candidates.append({
+                        'person_id': person_id,
+                        'other_person_id': other_id,
+                        'score': scores['score'],
+                        'name_score': scores['nameScore'],
+                        'date_score': scores['dateScore'],
+                        'companion_score': scores['companionScore'],
+                        'status': PENDING
+                    })
+
+            self.db.session.query(DuplicateCandidate).filter(
+                DuplicateCandidate.status == PENDING
+            ).delete(synchronize_session=False)
+            for offset in range(0, len(candidates), _BATCH_SIZE):
+                self.db.session.execute(insert(DuplicateCandidate), candidates[offset:offset + _BATCH_SIZE])
+            self.db.session.commit()
+            return {
+                'people': len(people),
+                'comparisons': len(pairs),
+                'candidates': len(candidates),
+                'skippedBlocks': skipped_blocks
+            }
+        except Exception as e:
+            self.db.session.rollback()
+            raise Exception(f"Failed to scan duplicates: {str(e)}")
+
+    def get_duplicate_candidates(self, min_score: float = 0, limit: int = DEFAULT_REVIEW_LIMIT,
+                                 offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        Get the pending duplicate candidates, most likely first.
+
+        Returns:
+            List of candidate dictionaries with both people ('person', 'otherPerson')
+        """
+        try:
+            candidates = (
+                self.db.session.query(DuplicateCandidate)
+                .filter(DuplicateCandidate.status == PENDING, DuplicateCandidate.score >= min_score)
+                .order_by(DuplicateCandidate.score.desc(), DuplicateCandidate.person_id,
+                          DuplicateCandidate.other_person_id)
+                .offset(offset)
+                .limit(limit)
+                .all()
+            )
+            ids = {person_id for candidate in candidates
+                   for person_id in (candidate.person_id, candidate.other_person_id)}
+            people = {
+                person.id: person.to_dict()
+                for person in self.db.session.query(Person).filter(Person.id.in_(ids))
+            } if ids else {}
+            return [
+                {**candidate.to_dict(), 'person': people.get(candidate.person_id),
+                 'otherPerson': people.get(candidate.other_person_id)}
+                for candidate in candidates
+            ]
+        except Exception as e:
+            raise Exception(f"Failed to get duplicate candidates: {str(e)}")
+
+    def dismiss_duplicate(self, person_id: int, other_id: int) -> bool:
+        """
+        Mark a candidate pair as not being duplicates.
+
+        Raises:
+            ValueError: If the pair is not a candidate
+            Exception: If database operation fails
+        """
+        try:
+            candidate = self.db.session.get(DuplicateCandidate, tuple(sorted((person_id, other_id))))
+            if not candidate:
+                raise ValueError(f"Duplicate candidate {person_id}/{other_id} not found")
+            candidate.status = DISMISSED
+            self.db.session.commit()
+            return True
+        except ValueError as e:
+            self.db.session.rollback()
+            raise e
+        except Exception as e:
+            self.db.session.rollback()
+            raise Exception(f"Failed to dismiss duplicate: {str(e)}")
+
+    def _companions(self, person_ids: set) -> Dict[int, set]:
+        """IDs of the people each person shares photos with, read in batches."""
+        companions = defaultdict(set)
+        person_ids = sorted(person_ids)
+        for offset in range(0, len(person_ids), _BATCH_SIZE):
+            rows = self.db.session.query(PersonCooccurrence.person_id, PersonCooccurrence.other_person_id).filter(
+                PersonCooccurrence.person_id.in_(person_ids[offset:offset + _BATCH_SIZE])
+            )
+            for person_id, other_id in rows:
+                companions[person_id].add(other_id)
+        return companions
@@ -0,0 +1,235 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import Integer, and_, cast, column, or_, update, values
+from core.services.service_context import ServiceContext
+from core.services.storage_service import StorageService
+from core.services.aggregate_index import update_timeline, update_camera_counts
+from core.services.cache_generation import PHOTO_INDEX, bump_generation
+from core.models.photo import Photo
+from core.infrastructure.exif_utils import extract_exif_from_ranges, read_exif_ranges
+
+BACKFILL_BATCH_SIZE = 500
+# Bytes fetched from the start of each photo: covers the 64 KB JPEG APP1 segment
+# and the headers in front of it
+HEADER_BYTES = 128 * 1024
+FETCH_THREADS = 16
+CAMERA_COLUMNS = ('camera_make', 'camera_model', 'focal_length', 'f_number', 'exposure_time', 'iso')
+BACKFILL_COLUMNS = ('date_taken', 'author', 'latitude', 'longitude') + CAMERA_COLUMNS
+_CAMERA_NAME_LENGTH = 100
+
+def parse_header(ranges: List[Tuple[int, bytes]]) -> Dict[str, Any]:
+    """Extract the EXIF data of a photo from the parts fetched of it (runs in the worker processes)."""
+    return extract_exif_from_ranges(ranges)
+
+def backfill_changes(row, exif: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Metadata of a photo row that its EXIF data can fill in.
+
+    Only missing values are filled. A date_taken equal to the upload date is the
+    upload-time fallback and counts as missing; coordinates are only set as a pair
+    and camera settings only on photos without a camera.
+    """
+    changes = {}
+    if exif.get('date_taken') and (row.date_taken is None or row.date_taken == row.upload_date):
+        changes['date_taken'] = exif['date_taken']
+    if exif.get('author') and not row.author:
+        changes['author'] = exif['author']
+    if exif.get('latitude') is not None and (row.latitude is None or row.longitude is None):
+        changes['latitude'] = exif['latitude']
+        changes['longitude'] = exif['longitude']
+    if row.camera_make is None and row.camera_model is None:
+        for name in CAMERA_COLUMNS:
+            if exif.get(name):
+                value = exif[name]
+                changes[name] = value[:_CAMERA_NAME_LENGTH] if isinstance(value, str) else value
+    return changes
+
+class ExifBackfillService:
+    """Service class for filling in photo metadata from the EXIF data of stored files."""
+
+    def __init__(self, context: ServiceContext, storage: Optional[StorageService] = None):
+        """Initialize the ExifBackfillService with a ServiceContext.
+
+        Args:
+            context: ServiceContext instance providing access to database and other services
+            storage: StorageService to read the files from; created when first needed
+        """
+        self.db = context.db
+        self.storage = storage
+
+    def backfill(self, batch_size: int = BACKFILL_BATCH_SIZE, processes: Optional[int] = None,
+                 fetch_threads: int = FETCH_THREADS, header_bytes: int = HEADER_BYTES,
+                 checkpoint_path: Optional[str] = None,
+                 progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Re-read the EXIF data of the photos missing a date taken, author,
+        coordinates or camera and fill those in.
+
+        Photos are streamed from the database in id order, batch_size at a time.
+        For each batch the first header_bytes of every file are fetched with
+        ranged GET requests on fetch_threads threads, with a second request at
+        the IFD0 of the TIFF files whose IFD0 is past them, parsed in a pool of
+        processes, and the changes written with one UPDATE per batch together
+        with the timeline rollup. After each committed batch the last photo id
+        is saved to checkpoint_path, so an interrupted run resumes where it
+        stopped; the checkpoint is removed once every photo has been scanned.
+
+        Args:
+            batch_size: Number of photos per batch
+            processes: Number of parsing processes (None for one per CPU, 0 to parse in-process)
+            fetch_threads: Number of concurrent ranged GET requests
+            header_bytes: Bytes fetched from the start of each file
+            checkpoint_path: JSON file recording the progress of the run
+            progress: Called with the running totals after each batch
+
+        Returns:
+            Dictionary containing:
+                - scanned: int - Number of photos whose header was parsed
+                - updated: int - Number of photos changed
+                - failed: int - Number of files that could not be read
+                - bytesFetched: int - Bytes downloaded
+                - lastId: int - Id of the last photo scanned
+                - elapsedSeconds: float - Duration of this run
+                - photosPerSecond: float - Scan throughput of this run
+
+        Raises:
+            ValueError: If batch_size, fetch_threads or header_bytes is not positive
+            Exception: If the backfill fails
+        """
+        if batch_size < 1 or fetch_threads < 1 or header_bytes < 1:
+            raise ValueError("batch_size, fetch_threads and header_bytes must be positive")
+        if self.storage is None:
+            self.storage = StorageService()
+
+        state = self._load_checkpoint(checkpoint_path)
+        start = time.perf_counter()
+        scanned_before = state['scanned']
+        workers = processes if processes is not None else (os.cpu_count() or 1)
+        pool = ProcessPoolExecutor(workers) if workers else None
+        try:
+            with ThreadPoolExecutor(fetch_threads) as fetcher:
+                while True:
+                    rows = self._next_batch(state['lastId'], batch_size)
+                    if not rows:
+                        break
+                    headers = list(fetcher.map(lambda row: self._fetch_header(row.s3_key, header_bytes), rows))
+                    readable = [(row, header) for row, header in zip(rows, headers) if header is not None]
+                    if pool is not None:
+                        parsed = pool.map(parse_header, [header for _, header in readable],
+                                          chunksize=max(1, len(readable) // (4 * workers)))
+                    else:
+                        parsed = map(parse_header, [header for _, header in readable])
+
+                    updates = []
+                    for (row, _), exif in zip(readable, parsed):
+                        changes = backfill_changes(row, exif)
+                        if changes:
+                            updates.append((row, changes))
+                    self._apply(updates)
+                    self.db.session.commit()
+
+                    state['lastId'] = rows[-1].id
+                    state['scanned'] += len(readable)
+                    state['updated'] += len(updates)
+                    state['failed'] += len(rows) - len(readable)
+                    state['bytesFetched'] += sum(len(data) for _, header in readable for _, data in header)
+                    self._save_checkpoint(checkpoint_path, state)
+                    if progress:
+                        progress(self._summary(state, start, scanned_before))
+        except Exception as e:
+            self.db.session.rollback()
+            raise Exception(f"Failed to backfill EXIF data: {str(e)}")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        return self._summary(state, start, scanned_before)
+
+    def _next_batch(self, last_id: int, batch_size: int) -> List[Any]:
+        """The next photos after last_id that miss metadata EXIF can provide."""
+        return self.db.session.query(
+            Photo.id, Photo.s3_key, Photo.upload_date,
+            *(getattr(Photo, name) for name in BACKFILL_COLUMNS)
+        ).filter(
+            Photo.id > last_id,
+            or_(
+                Photo.date_taken.is_(None), Photo.date_taken == Photo.upload_date,
+                Photo.author.is_(None), Photo.latitude.is_(None), Photo.longitude.is_(None),
+                and_(Photo.camera_make.is_(None), Photo.camera_model.is_(None))
+            )
+        ).order_by(Photo.id).limit(batch_size).all()
+
+    def _fetch_header(self, s3_key: str, header_bytes: int) -> Optional[List[Tuple[int, bytes]]]:
+        try:
+            return read_exif_ranges(
+                lambda offset, length: self.storage.read_range(s3_key, offset, length), header_bytes
+            )
+        except Exception:
+            return None
+
+    def _apply(self, updates: List[tuple]) -> None:
+        """Write the changes with a single statement, move the photos in the rollups and invalidate the facets."""
+        if not updates:
+            return
+        rows = [
+            {'id': row.id, **{name: changes.get(name, getattr(row, name)) for name in BACKFILL_COLUMNS}}
+            for row, changes in updates
+        ]
+        redated = [(row.date_taken, changes['date_taken']) for row, changes in updates if 'date_taken' in changes]
+        update_timeline(self.db.session, [old for old, _ in redated], -1)
+        update_timeline(self.db.session, [new for _, new in redated], 1)
+        camera_changes = [(row, changes) for row, changes in updates
+                      if 'camera_make' in changes or 'camera_model' in changes]
+        update_camera_counts(self.db.session, [(row.camera_make, row.camera_model) for row, _ in camera_changes], -1)
+        update_camera_counts(self.db.session, [(changes.get('camera_make'), changes.get('camera_model'))
+                                               for _, changes in camera_changes], 1)
+        # The years of the photo facets follow the dates taken
+        bump_generation(self.db.session, PHOTO_INDEX)
+
+        if self.db.session.get_bind().dialect.name != 'postgresql':
+            self.db.session.execute(update(Photo), rows)
+            return
+        table = Photo.__table__
+        changes = values(
+            column('id', Integer), *(column(name, table.c[name].type) for name in BACKFILL_COLUMNS),
+            name='changes'
+        ).data([(row['id'], *(row[name] for name in BACKFILL_COLUMNS)) for row in rows])
+        # Casts keep the column types when a VALUES column only holds NULLs
+        self.db.session.execute(
+            update(table)
+            .where(table.c.id == changes.c.id)
+            .values({name: cast(changes.c[name], table.c[name].type) for name in BACKFILL_COLUMNS})
+        )
+
+    @staticmethod
+    def _load_checkpoint(checkpoint_path: Optional[str]) -> Dict[str, Any]:
+        state = {'lastId': 0, 'scanned': 0, 'updated': 0, 'failed': 0, 'bytesFetched': 0}
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as checkpoint:
+                state.update(json.load(checkpoint))
+        return state
+
+    @staticmethod
+    def _save_checkpoint(checkpoint_path: Optional[str], state: Dict[str, Any]) -> None:
+        if not checkpoint_path:
+            return
+        # Write then rename, so a crash never leaves a truncated checkpoint
+        temporary_path = f"{checkpoint_path}.tmp"
+        with open(temporary_path, 'w') as checkpoint:
+            json.dump(state, checkpoint)
+        os.replace(temporary_path, checkpoint_path)
+
+    @staticmethod
+    def _summary(state: Dict[str, Any], start: float, scanned_before: int) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - start
+        scanned = state['scanned'] - scanned_before
+        return {
+            **state,
+            'elapsedSeconds': round(elapsed, 2),
+            'photosPerSecond': round(scanned / elapsed, 1) if elapsed else 0.0
+        }
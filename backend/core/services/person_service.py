@@ -1,10 +1,34 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional
+from collections import defaultdict
 from datetime import date, datetime
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import or_
+from sqlalchemy import or_, and_, case, func, select, literal, insert, update, delete, values, column, cast, Integer
 from core.services.service_context import ServiceContext
 from core.services.service_exceptions import NotFoundException
 from core.models.person import Person
+from core.models.aggregates import PersonCooccurrence
+from core.models.photo import photo_people
+from core.models.duplicate_candidate import DuplicateCandidate
+from core.models.relationship import Relationship, PersonAncestry, RELATIONSHIP_TYPES, PARENT, SPOUSE
+from core.infrastructure.phonetic import phonetic_key
+from core.infrastructure.db_routing import read_replica
+from core.services.relationship_graph import RelationshipGraph, UP, DOWN
+from core.services.ancestry_index import link_parent, unlink_parent, remove_person
+from core.services.query_cache import QueryCache
+from core.services.cache_generation import FAMILY_GRAPH, PHOTO_INDEX, bump_generation, current_generation
+from core.services.aggregate_index import PersonIndexDelta
+from utils.config import config
+
+SEARCH_LIMIT = 50
+DEFAULT_LINEAGE_DEPTH = 10
+MAX_LINEAGE_DEPTH = 50
+DEFAULT_TREE_DEPTH = 4
+TREE_CACHE_TTL_SECONDS = 300
+TREE_CHUNK_SIZE = 200
+MAX_BATCH_SIZE = 5000
+# Fields accepted by the batch operations, in addition to 'id' for updates
+BATCH_FIELDS = ('first_name', 'last_name', 'birth_date', 'death_date', 'description')
+_NAME_LENGTH = 100
 
 class PersonService:
     """Service class for managing person-related operations."""
@@ -16,6 +40,11 @@ class PersonService:
             context: ServiceContext instance providing access to database and other services
         """
         self.db = context.db
+        self.graph = (
+            RelationshipGraph(ttl_seconds=config.relationship_cache_ttl)
+            if config.relationship_cache_ttl else None
+        )
+        self.tree_cache = QueryCache(ttl_seconds=TREE_CACHE_TTL_SECONDS, max_entries=64)
 
     def create_person(self, person_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new person record.
@@ -43,6 +72,7 @@ class PersonService:
             self.db.session.rollback()
             raise Exception(f"Failed to create person: {str(e)}")
 
+    @read_replica
     def get_persons(self, search_criteria: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """Get a list of persons, optionally filtered by search criteria.
 
@@ -119,6 +149,7 @@ class PersonService:
             for key, value in valid_updates.items():
                 setattr(person, key, value)
             
+            self._people_changed()
             self.db.session.commit()
             return person.to_dict()
         except ValueError as e:
@@ -146,7 +177,24 @@ class PersonService:
             if not person:
                 raise ValueError(f"Person with id {person_id} not found")
             
+            self.db.session.query(PersonCooccurrence).filter(or_(
+                PersonCooccurrence.person_id == person_id,
+                PersonCooccurrence.other_person_id == person_id
+            )).delete(synchronize_session=False)
+            # Unlink children one by one so that their other lineages stay in the closure
+            children = self.db.session.query(Relationship.relative_id).filter(
+                Relationship.person_id == person_id, Relationship.relationship_type == PARENT
+            ).all()
+            for (child_id,) in children:
+                self._remove_relationship(person_id, child_id, PARENT)
+            self.db.session.query(Relationship).filter(or_(
+                Relationship.person_id == person_id,
+                Relationship.relative_id == person_id
+            )).delete(synchronize_session=False)
+            self._delete_duplicate_candidates([person_id])
+            remove_person(self.db.session, person_id)
             self.db.session.delete(person)
+            self._people_changed()
             self.db.session.commit()
             return True
         except ValueError as e:
@@ -156,6 +204,310 @@ class PersonService:
             self.db.session.rollback()
             raise Exception(f"Failed to delete person: {str(e)}")
 
+    def create_persons(self, items: List[Dict[str, Any]], all_or_nothing: bool = False) -> Dict[str, Any]:
+        """
+        Create many people in a single transaction.
+
+        Every item is validated first. The valid ones are then inserted with one
+        multi-row INSERT ... RETURNING and committed once.
+
+        Args:
+            items: Person dictionaries (first_name and last_name required,
+                birth_date and death_date as ISO dates, description)
+            all_or_nothing: Write nothing when any item is invalid
+
+        Returns:
+            Dictionary containing:
+                - results: List[Dict] - One entry per item, in order: {index, success, id}
+                  or {index, success, error}
+                - succeeded: int
+                - failed: int
+
+        Raises:
+            ValueError: If items is not a list or has more than MAX_BATCH_SIZE entries
+            Exception: If database operation fails
+
+        Example:
+            >>> person_service.create_persons([{'first_name': 'Jean', 'last_name': 'Marc'}, {'first_name': 'Anne'}])
+            {'results': [{'index': 0, 'success': True, 'id': 12},
+                         {'index': 1, 'success': False, 'error': 'Missing required field: last_name'}],
+             'succeeded': 1, 'failed': 1}
+        """
+        self._check_batch(items)
+        results, rows = [], []
+        for index, item in enumerate(items):
+            try:
+                rows.append((index, self._person_values(item, partial=False)))
+            except ValueError as e:
+                results.append({'index': index, 'success': False, 'error': str(e)})
+        if results and all_or_nothing:
+            return self._batch_summary(results)
+
+        try:
+            if rows:
+                new_ids = self.db.session.scalars(
+                    insert(Person).returning(Person.id, sort_by_parameter_order=True),
+                    [row for _, row in rows]
+                ).all()
+                self.db.session.commit()
+                results.extend(
+                    {'index': index, 'success': True, 'id': new_id}
+                    for (index, _), new_id in zip(rows, new_ids)
+                )
+            return self._batch_summary(results)
+        except Exception as e:
+            self.db.session.rollback()
+            raise Exception(f"Failed to create persons: {str(e)}")
+
+    def update_persons(self, items: List[Dict[str, Any]], all_or_nothing: bool = False) -> Dict[str, Any]:
+        """
+        Update many people in a single transaction.
+
+        Items changing the same set of fields are applied together: on PostgreSQL
+        with one UPDATE ... FROM (VALUES ...) per set of fields, elsewhere with an
+        executemany UPDATE keyed by id.
+
+        Args:
+            items: Dictionaries with the person 'id' and the fields to change
+            all_or_nothing: Write nothing when any item is invalid or not found
+
+        Returns:
+            Same shape as create_persons
+
+        Raises:
+            ValueError: If items is not a list or has more than MAX_BATCH_SIZE entries
+            Exception: If database operation fails
+        """
+        self._check_batch(items)
+        results = []
+        changes: Dict[int, tuple] = {}
+        for index, item in enumerate(items):
+            try:
+                person_id = self._batch_id(item.get('id') if isinstance(item, dict) else None)
+                if person_id in changes:
+                    raise ValueError(f"Person {person_id} appears more than once in the batch")
+                changes[person_id] = (index, self._person_values(
+                    {key: value for key, value in item.items() if key != 'id'}, partial=True
+                ))
+            except ValueError as e:
+                results.append({'index': index, 'success': False, 'error': str(e)})
+
+        try:
+            for person_id in self._missing_ids(changes):
+                index, _ = changes.pop(person_id)
+                results.append({'index': index, 'success': False, 'error': f"Person with id {person_id} not found"})
+            if results and all_or_nothing:
+                return self._batch_summary(results)
+
+            groups = defaultdict(list)
+            for person_id, (_, fields) in changes.items():
+                groups[tuple(sorted(fields))].append({'id': person_id, **fields})
+            for columns, rows in groups.items():
+                self._bulk_update(columns, rows)
+            if changes:
+                self._people_changed()
+            self.db.session.commit()
+            results.extend(
+                {'index': index, 'success': True, 'id': person_id}
+                for person_id, (index, _) in changes.items()
+            )
+            return self._batch_summary(results)
+        except Exception as e:
+            self.db.session.rollback()
+            raise Exception(f"Failed to update persons: {str(e)}")
+
+    def delete_persons(self, person_ids: List[int], all_or_nothing: bool = False) -> Dict[str, Any]:
+        """
+        Delete many people in a single transaction.
+
+        Photo links, co-occurrence rows, relationships and closure rows of the
+        whole batch are removed with one statement each. Parent links to children
+        who are kept are unlinked one by one, so that the children's other
+        lineages stay in the ancestry closure.
+
+        Args:
+            person_ids: IDs of the people to delete
+            all_or_nothing: Delete nothing when any id is invalid or not found
+
+        Returns:
+            Same shape as create_persons
+
+        Raises:
+            ValueError: If person_ids is not a list or has more than MAX_BATCH_SIZE entries
+            Exception: If database operation fails
+        """
+        self._check_batch(person_ids)
+        results = []
+        targets: Dict[int, int] = {}
+        for index, raw_id in enumerate(person_ids):
+            try:
+                person_id = self._batch_id(raw_id)
+                if person_id in targets:
+                    raise ValueError(f"Person {person_id} appears more than once in the batch")
+                targets[person_id] = index
+            except ValueError as e:
+                results.append({'index': index, 'success': False, 'error': str(e)})
+
+        try:
+            for person_id in self._missing_ids(targets):
+                results.append({'index': targets.pop(person_id), 'success': False,
+                                'error': f"Person with id {person_id} not found"})
+            if results and all_or_nothing:
+                return self._batch_summary(results)
+
+            if targets:
+                ids = list(targets)
+                session = self.db.session
+                session.query(PersonCooccurrence).filter(or_(
+                    PersonCooccurrence.person_id.in_(ids),
+                    PersonCooccurrence.other_person_id.in_(ids)
+                )).delete(synchronize_session=False)
+                session.execute(delete(photo_people).where(photo_people.c.person_id.in_(ids)))
+                kept_children = session.query(Relationship.person_id, Relationship.relative_id).filter(
+                    Relationship.person_id.in_(ids),
+                    Relationship.relationship_type == PARENT,
+                    Relationship.relative_id.notin_(ids)
+                ).all()
+                for parent_id, child_id in kept_children:
+                    self._remove_relationship(parent_id, child_id, PARENT)
+                session.query(Relationship).filter(or_(
+                    Relationship.person_id.in_(ids),
+                    Relationship.relative_id.in_(ids)
+                )).delete(synchronize_session=False)
+                session.query(PersonAncestry).filter(or_(
+                    PersonAncestry.ancestor_id.in_(ids),
+                    PersonAncestry.descendant_id.in_(ids)
+                )).delete(synchronize_session=False)
+                self._delete_duplicate_candidates(ids)
+                session.query(Person).filter(Person.id.in_(ids)).delete(synchronize_session=False)
+                self._people_changed()
+                session.commit()
+            results.extend({'index': index, 'success': True, 'id': person_id} for person_id, index in targets.items())
+            return self._batch_summary(results)
+        except Exception as e:
+            self.db.session.rollback()
+            raise Exception(f"Failed to delete persons: {str(e)}")
+
+    def merge_persons(self, keep_id: int, merge_id: int) -> Dict[str, Any]:
+        """
+        Merge a duplicate person into another one and delete the duplicate.
+
+        Photo links are moved with one INSERT ... SELECT and one DELETE, and the
+        photo counts and co-occurrences are adjusted through PersonIndexDelta.
+        Relationships are moved one by one so that the ancestry closure stays
+        correct; those that would duplicate an existing relationship or create a
+        cycle are dropped and reported. Empty fields of the kept person are
+        filled from the duplicate.
+
+        Args:
+            keep_id: ID of the person that remains
+            merge_id: ID of the duplicate to merge into it
+
+        Returns:
+            Dictionary containing:
+                - person: Dict - The merged person
+                - movedPhotos: int - Number of photo links moved
+                - movedRelationships: int - Number of relationships moved
+                - droppedRelationships: List[Dict] - Relationships that could not be moved
+
+        Raises:
+            ValueError: If either person is not found or both ids are the same
+            Exception: If database operation fails
+        """
+        try:
+            if keep_id == merge_id:
+                raise ValueError("Cannot merge a person into themselves")
+            keep = self.db.session.get(Person, keep_id)
+            merged = self.db.session.get(Person, merge_id)
+            for required_id, person in ((keep_id, keep), (merge_id, merged)):
+                if not person:
+                    raise ValueError(f"Person with id {required_id} not found")
+
+            moved_photos = self._move_photo_links(keep_id, merge_id)
+
+            relationships = [
+                (relationship.person_id, relationship.relative_id, relationship.relationship_type)
+                for relationship in self.db.session.query(Relationship).filter(or_(
+                    Relationship.person_id == merge_id, Relationship.relative_id == merge_id
+                ))
+            ]
+            for person_id, relative_id, relationship_type in relationships:
+                self._remove_relationship(person_id, relative_id, relationship_type)
+            self.db.session.flush()
+            moved, dropped = 0, []
+            for person_id, relative_id, relationship_type in relationships:
+                person_id = keep_id if person_id == merge_id else person_id
+                relative_id = keep_id if relative_id == merge_id else relative_id
+                try:
+                    # Validation happens before anything is staged, so a rejected move leaves no trace
+                    self._add_relationship(person_id, relative_id, relationship_type)
+                    moved += 1
+                except ValueError as e:
+                    dropped.append({'personId': person_id, 'relativeId': relative_id,
+                                    'type': relationship_type, 'reason': str(e)})
+
+            for field in ('birth_date', 'death_date', 'description'):
+                if getattr(keep, field) is None and getattr(merged, field) is not None:
+                    setattr(keep, field, getattr(merged, field))
+
+            self.db.session.query(PersonCooccurrence).filter(or_(
+                PersonCooccurrence.person_id == merge_id,
+                PersonCooccurrence.other_person_id == merge_id
+            )).delete(synchronize_session=False)
+            self._delete_duplicate_candidates([merge_id])
+            remove_person(self.db.session, merge_id)
+            self.db.session.delete(merged)
+            self._people_changed()
+            self.db.session.commit()
+            return {
+                'person': keep.to_dict(),
+                'movedPhotos': moved_photos,
+                'movedRelationships': moved,
+                'droppedRelationships': dropped
+            }
+        except ValueError as e:
+            self.db.session.rollback()
+            raise e
+        except Exception as e:
+            self.db.session.rollback()
+            raise Exception(f"Failed to merge persons: {str(e)}")
+
+    def get_frequent_companions(self, person_id: int, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get the people most often photographed with a person.
+
+        Served from the person_cooccurrences rollup, which is maintained whenever
+        photo_people changes, so no photo or association rows are scanned.
+
+        Args:
+            person_id: ID of the person
+            limit: Maximum number of companions to return
+
+        Returns:
+            List of person dictionaries, each with a sharedPhotoCount, most frequent first
+
+        Raises:
+            ValueError: If person is not found
+            Exception: If database operation fails
+        """
+        try:
+            if not self.db.session.get(Person, person_id):
+                raise ValueError(f"Person with id {person_id} not found")
+
+            rows = (
+                self.db.session.query(Person, PersonCooccurrence.count)
+                .join(PersonCooccurrence, PersonCooccurrence.other_person_id == Person.id)
+                .filter(PersonCooccurrence.person_id == person_id)
+                .order_by(PersonCooccurrence.count.desc(), Person.id)
+                .limit(limit)
+                .all()
+            )
+            return [{**person.to_dict(), 'sharedPhotoCount': count} for person, count in rows]
+        except ValueError as e:
+            raise e
+        except Exception as e:
+            raise Exception(f"Failed to get companions: {str(e)}")
+
+    @read_replica
     def get_people(self, search_criteria: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         Get people based on structured search criteria.
@@ -171,7 +523,8 @@ class PersonService:
                 - death_date_start: date - Filter people who died after this date
                 - death_date_end: date - Filter people who died before this date
                 - living: bool - Filter only living people if True, deceased if False
-                - related_to: int - Person ID to filter by relationship
+                - related_to: int - Person ID to filter by relationship (ancestors,
+                  descendants and spouses up to DEFAULT_LINEAGE_DEPTH generations)
         
         Returns:
             List of person dictionaries matching all the provided criteria
@@ -206,9 +559,8 @@ class PersonService:
                     query = query.filter(Person.death_date.isnot(None))
 
             if 'related_to' in search_criteria:
-                # Cette partie nécessiterait une jointure avec la table de relations
-                # À implémenter quand la fonctionnalité de relations sera ajoutée
-                pass
+                related_ids = self._related_ids(search_criteria['related_to'], DEFAULT_LINEAGE_DEPTH)
+                query = query.filter(Person.id.in_(related_ids))
 
             # Order by name
             query = query.order_by(Person.first_name, Person.last_name)
@@ -218,7 +570,295 @@ class PersonService:
         except Exception as e:
             raise Exception(f"Failed to get people: {str(e)}")
 
-    def search_people(self, query: str) -> List[Dict[str, Any]]:
+    def add_relationship(self, person_id: int, relative_id: int, relationship_type: str) -> Dict[str, Any]:
+        """Record a family relationship between two people.
+
+        Args:
+            person_id: ID of the parent (for 'parent') or of either spouse
+            relative_id: ID of the child (for 'parent') or of the other spouse
+            relationship_type: 'parent' or 'spouse'
+
+        Returns:
+            Dictionary containing the relationship
+
+        Raises:
+            ValueError: If a person is not found, the type is unknown, or the
+                relationship would make someone their own ancestor
+            Exception: If database operation fails
+        """
+        try:
+            relationship = self._add_relationship(person_id, relative_id, relationship_type)
+            self._family_changed()
+            self.db.session.commit()
+            return relationship.to_dict()
+        except ValueError as e:
+            self.db.session.rollback()
+            raise e
+        except Exception as e:
+            self.db.session.rollback()
+            raise Exception(f"Failed to add relationship: {str(e)}")
+
+    def remove_relationship(self, person_id: int, relative_id: int, relationship_type: str) -> bool:
+        """Remove a family relationship between two people.
+
+        Args:
+            person_id: ID of the parent (for 'parent') or of either spouse
+            relative_id: ID of the child (for 'parent') or of the other spouse
+            relationship_type: 'parent' or 'spouse'
+
+        Returns:
+            True if the relationship was removed
+
+        Raises:
+            ValueError: If the relationship is not found
+            Exception: If database operation fails
+        """
+        try:
+            self._remove_relationship(person_id, relative_id, relationship_type)
+            self._family_changed()
+            self.db.session.commit()
+            return True
+        except ValueError as e:
+            self.db.session.rollback()
+            raise e
+        except Exception as e:
+            self.db.session.rollback()
+            raise Exception(f"Failed to remove relationship: {str(e)}")
+
+    def get_relationships(self, person_id: int) -> Dict[str, List[Dict[str, Any]]]:
+        """Get the parents, children and spouses of a person.
+
+        Raises:
+            ValueError: If person is not found
+            Exception: If database operation fails
+        """
+        try:
+            if not self.db.session.get(Person, person_id):
+                raise ValueError(f"Person with id {person_id} not found")
+
+            relationships = self.db.session.query(Relationship).filter(or_(
+                Relationship.person_id == person_id,
+                Relationship.relative_id == person_id
+            )).all()
+            groups = {'parents': [], 'children': [], 'spouses': []}
+            for relationship in relationships:
+                if relationship.relationship_type == SPOUSE:
+                    other_id = (relationship.relative_id if relationship.person_id == person_id
+                                else relationship.person_id)
+                    groups['spouses'].append(other_id)
+                elif relationship.person_id == person_id:
+                    groups['children'].append(relationship.relative_id)
+                else:
+                    groups['parents'].append(relationship.person_id)
+
+            people = self._load_people(set().union(*groups.values()))
+            return {
+                group: [people[relative_id].to_dict() for relative_id in sorted(ids)]
+                for group, ids in groups.items()
+            }
+        except ValueError as e:
+            raise e
+        except Exception as e:
+            raise Exception(f"Failed to get relationships: {str(e)}")
+
+    def get_ancestors(self, person_id: int, max_depth: int = DEFAULT_LINEAGE_DEPTH) -> List[Dict[str, Any]]:
+        """Get the ancestors of a person up to max_depth generations.
+
+        Returns:
+            List of person dictionaries with a generation (1 for parents, 2 for
+            grandparents...), closest generations first
+
+        Raises:
+            ValueError: If person is not found or max_depth is out of range
+            Exception: If database operation fails
+        """
+        return self._get_lineage(person_id, UP, max_depth)
+
+    def get_descendants(self, person_id: int, max_depth: int = DEFAULT_LINEAGE_DEPTH) -> List[Dict[str, Any]]:
+        """Get the descendants of a person up to max_depth generations.
+
+        Returns:
+            List of person dictionaries with a generation (1 for children, 2 for
+            grandchildren...), closest generations first
+
+        Raises:
+            ValueError: If person is not found or max_depth is out of range
+            Exception: If database operation fails
+        """
+        return self._get_lineage(person_id, DOWN, max_depth)
+
+    def is_ancestor(self, ancestor_id: int, descendant_id: int) -> bool:
+        """Whether ancestor_id is an ancestor of descendant_id (a single primary-key lookup)."""
+        try:
+            return self.db.session.get(PersonAncestry, (ancestor_id, descendant_id)) is not None
+        except Exception as e:
+            raise Exception(f"Failed to check ancestry: {str(e)}")
+
+    def get_common_ancestors(self, person_id: int, other_id: int) -> List[Dict[str, Any]]:
+        """Get the ancestors shared by two people, closest first.
+
+        Answered by joining the two people's rows of the person_ancestry closure
+        table, so the cost is independent of how deep the tree is.
+
+        Returns:
+            List of person dictionaries with the number of generations separating
+            the ancestor from each person (generationsFromFirst, generationsFromSecond)
+
+        Raises:
+            ValueError: If either person is not found
+            Exception: If database operation fails
+        """
+        try:
+            for required_id in (person_id, other_id):
+                if not self.db.session.get(Person, required_id):
+                    raise ValueError(f"Person with id {required_id} not found")
+            rows = self._common_ancestor_rows(person_id, other_id)
+            people = self._load_people(ancestor_id for ancestor_id, _, _ in rows)
+            return [
+                {**people[ancestor_id].to_dict(), 'generationsFromFirst': first, 'generationsFromSecond': second}
+                for ancestor_id, first, second in rows
+            ]
+        except ValueError as e:
+            raise e
+        except Exception as e:
+            raise Exception(f"Failed to get common ancestors: {str(e)}")
+
+    def get_kinship(self, person_id: int, other_id: int) -> Dict[str, Any]:
+        """
+        Describe how two people are related through their lowest common ancestors.
+        
+        Uses index lookups only: two primary-key probes of the closure table for a
+        direct line, otherwise one join of both people's ancestor rows.
+        
+        Returns:
+            Dictionary containing:
+                - relationship: 'self', 'ancestor' (the first person is an ancestor
+                  of the second), 'descendant', 'sibling', 'aunt_uncle' (the first
+                  person is an aunt or uncle of the second), 'niece_nephew', 'cousin'
+                  or None when unrelated
+                - generations: int - Generations between the two for a direct line
+                - cousinDegree: int - 1 for first cousins, 2 for second cousins...
+                - removed: int - Generation difference for cousins ("once removed")
+                - lowestCommonAncestors: List[int] - Ids of the closest shared ancestors
+        
+        Example:
+            >>> person_service.get_kinship(12, 40)
+            {'relationship': 'cousin', 'cousinDegree': 1, 'removed': 1, 'generations': None,
+             'lowestCommonAncestors': [3, 4]}
+        """
+        kinship = {'relationship': None, 'generations': None, 'cousinDegree': None,
+                   'removed': None, 'lowestCommonAncestors': []}
+        try:
+            for required_id in (person_id, other_id):
+                if not self.db.session.get(Person, required_id):
+                    raise ValueError(f"Person with id {required_id} not found")
+            if person_id == other_id:
+                return {**kinship, 'relationship': 'self', 'generations': 0}
+
+            for first, second, relationship in ((person_id, other_id, 'ancestor'), (other_id, person_id, 'descendant')):
+                direct = self.db.session.get(PersonAncestry, (first, second))
+                if direct:
+                    return {**kinship, 'relationship': relationship, 'generations': direct.depth,
+                            'lowestCommonAncestors': [first]}
+
+            rows = self._common_ancestor_rows(person_id, other_id)
+            if not rows:
+                return kinship
+            closest = min(first + second for _, first, second in rows)
+            lowest = [row for row in rows if row[1] + row[2] == closest]
+            first, second = lowest[0][1], lowest[0][2]
+            degree = min(first, second) - 1
+            if degree:
+                relationship = 'cousin'
+            elif first == second:
+                relationship = 'sibling'
+            else:
+                # One of them is a child of the common ancestor: aunt/uncle and niece/nephew
+                relationship = 'aunt_uncle' if first < second else 'niece_nephew'
+            return {
+                **kinship,
+                'relationship': relationship,
+                'cousinDegree': degree or None,
+                'removed': abs(first - second),
+                'lowestCommonAncestors': sorted(ancestor_id for ancestor_id, _, _ in lowest)
+            }
+        except ValueError as e:
+            raise e
+        except Exception as e:
+            raise Exception(f"Failed to get kinship: {str(e)}")
+
+    def get_tree_layout(self, person_id: int, depth: int = DEFAULT_TREE_DEPTH) -> Dict[str, Any]:
+        """
+        Get the family tree around a person, laid out for rendering.
+        
+        The tree holds the ancestors and descendants of the person up to depth
+        generations (read from the closure table), the spouses of the person and
+        of their descendants, and the parent and spouse edges between them. Each
+        node gets its generation (negative for ancestors) and its order within
+        that generation: children follow the order of their parents, then birth
+        date, and spouses sit next to their partner, so the client only has to
+        map (generation, order) to coordinates.
+        
+        Layouts are cached per (person, depth) for TREE_CACHE_TTL_SECONDS, under
+        the family graph generation, which every change to people or
+        relationships moves whichever worker makes it.
+        
+        Args:
+            person_id: ID of the person at the center of the tree
+            depth: Number of generations to include in each direction
+        
+        Returns:
+            Dictionary containing:
+                - rootId: int
+                - depth: int
+                - generations: List[Dict] - {generation, count} from oldest to youngest
+                - nodes: List[Dict] - Person dictionaries with generation and order,
+                  sorted by generation then order
+                - edges: List[Dict] - Relationship dictionaries between nodes
+        
+        Raises:
+            ValueError: If the person is not found or depth is out of range
+            Exception: If database operation fails
+        """
+        if not 1 <= depth <= MAX_LINEAGE_DEPTH:
+            raise ValueError(f"depth must be between 1 and {MAX_LINEAGE_DEPTH}")
+        try:
+            # Layouts built before a write made by any worker are never found again
+            cache_key = (current_generation(self.db.session, FAMILY_GRAPH), person_id, depth)
+            layout = self.tree_cache.get(cache_key)
+            if layout is None:
+                layout = self._build_tree_layout(person_id, depth)
+                self.tree_cache.set(cache_key, layout)
+            return layout
+        except ValueError as e:
+            raise e
+        except Exception as e:
+            raise Exception(f"Failed to get family tree: {str(e)}")
+
+    def iter_tree_layout(self, person_id: int, depth: int = DEFAULT_TREE_DEPTH,
+                         chunk_size: int = TREE_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+        """
+        Get the family tree layout as a sequence of chunks for streaming.
+        
+        The first chunk ({'type': 'layout'}) carries the tree dimensions. Node chunks
+        ({'type': 'nodes', 'generation', 'nodes'}) follow from the root generation
+        outwards, and each batch of edges ({'type': 'edges', 'edges'}) is sent as soon
+        as both of its ends have been sent, so the client can draw as it reads.
+        
+        The layout is computed before this returns, so errors are raised here rather
+        than in the middle of a response.
+        
+        Raises:
+            ValueError: If the person is not found, depth is out of range or
+                chunk_size is not positive
+            Exception: If database operation fails
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+        return self._tree_chunks(self.get_tree_layout(person_id, depth), chunk_size)
+
+    @read_replica
+    def search_people(self, query: str, limit: int = SEARCH_LIMIT) -> List[Dict[str, Any]]:
         """
         Search people using free-text search across multiple fields.
         
@@ -229,6 +869,9 @@ class PersonService:
         The search is:
         - Case-insensitive
         - Matches partial words
+        - Tolerant to spelling variants of names (Jehan/Jean, Marc/Marcq): on
+          PostgreSQL through pg_trgm similarity, everywhere through the phonetic
+          keys stored with each person
         - Searches across multiple fields
         - Supports multiple search terms (space-separated)
         
@@ -239,40 +882,464 @@ class PersonService:
         Args:
             query: str - Space-separated search terms
                        Example: "John Paris 1980"
+            limit: int - Maximum number of results
         
         Returns:
             List of person dictionaries matching any of the search terms,
-            ordered by name, limited to 50 results
+            best matches first (then ordered by name), limited to `limit` results
         
         Example:
-            >>> people = person_service.search_people("John Paris")
-            # Will find people with "John" or "Paris" in their name or biography
+            >>> people = person_service.search_people("Jehan Marcq")
+            # Will also find "Jean Marc"
         """
         if not query:
             return []
 
         # Split query into terms for better matching
         terms = [term.strip() for term in query.split() if term.strip()]
-        
-        # Build the query
-        base_query = self.db.session.query(Person).distinct()
-
-        # Add text search conditions
-        text_conditions = []
-        for term in terms:
-            term_pattern = f"%{term}%"
-            text_conditions.append(
-                or_(
+        if not terms:
+            return []
+
+        try:
+            use_trigrams = self._is_postgresql()
+            conditions = []
+            scores = []
+            for term in terms:
+                term_pattern = f"%{term}%"
+                key = phonetic_key(term)
+                term_conditions = [
                     Person.first_name.ilike(term_pattern),
                     Person.last_name.ilike(term_pattern),
                     Person.description.ilike(term_pattern)
-                )
+                ]
+                if key:
+                    phonetic_match = or_(Person.first_name_phonetic == key, Person.last_name_phonetic == key)
+                    term_conditions.append(phonetic_match)
+                    scores.append(case((phonetic_match, 0.5), else_=0))
+
+                if use_trigrams:
+                    # `%` is the pg_trgm similarity operator, answered from the GIN indexes
+                    term_conditions.append(Person.first_name.op('%')(term))
+                    term_conditions.append(Person.last_name.op('%')(term))
+                    scores.append(func.greatest(
+                        func.similarity(Person.first_name, term),
+                        func.similarity(Person.last_name, term)
+                    ))
+                else:
+                    scores.append(case(
+                        (or_(Person.first_name.ilike(term_pattern), Person.last_name.ilike(term_pattern)), 1),
+                        else_=0
+                    ))
+                scores.append(case((Person.description.ilike(term_pattern), 0.25), else_=0))
+                conditions.append(or_(*term_conditions))
+
+            score = scores[0]
+            for term_score in scores[1:]:
+                score = score + term_score
+
+            people = (
+                self.db.session.query(Person)
+                .filter(or_(*conditions))
+                .order_by(score.desc(), Person.first_name, Person.last_name)
+                .limit(limit)
             )
-        
-        if text_conditions:
-            base_query = base_query.filter(or_(*text_conditions))
+            return [person.to_dict() for person in people.all()]
+
+        except Exception as e:
+            raise Exception(f"Failed to search people: {str(e)}")
+
+    def _is_postgresql(self) -> bool:
+        """Whether the session is bound to PostgreSQL (pg_trgm is available)."""
+        return self.db.session.get_bind().dialect.name == 'postgresql'
+
+    def _add_relationship(self, person_id: int, relative_id: int, relationship_type: str) -> Relationship:
+        """Validate and stage a relationship without committing."""
+        if relationship_type not in RELATIONSHIP_TYPES:
+            raise ValueError(f"Invalid relationship type '{relationship_type}'. Allowed types: {list(RELATIONSHIP_TYPES)}")
+        if person_id == relative_id:
+            raise ValueError("A person cannot be related to themselves")
+        for required_id in (person_id, relative_id):
+            if not self.db.session.get(Person, required_id):
+                raise ValueError(f"Person with id {required_id} not found")
+
+        if relationship_type == SPOUSE:
+            person_id, relative_id = sorted((person_id, relative_id))
+        elif self.db.session.get(PersonAncestry, (relative_id, person_id)):
+            raise ValueError(f"Person {person_id} is a descendant of {relative_id} and cannot be their parent")
+
+        if self.db.session.get(Relationship, (person_id, relative_id, relationship_type)):
+            raise ValueError("Relationship already exists")
 
-        # Order by name and limit results
-        people = base_query.order_by(Person.first_name, Person.last_name).limit(50)
+        relationship = Relationship(person_id, relative_id, relationship_type)
+        self.db.session.add(relationship)
+        if relationship_type == PARENT:
+            link_parent(self.db.session, person_id, relative_id)
+        return relationship
+
+    def _remove_relationship(self, person_id: int, relative_id: int, relationship_type: str) -> None:
+        """Stage the removal of a relationship without committing."""
+        if relationship_type == SPOUSE:
+            person_id, relative_id = sorted((person_id, relative_id))
+        relationship = self.db.session.get(Relationship, (person_id, relative_id, relationship_type))
+        if not relationship:
+            raise ValueError(f"Relationship between {person_id} and {relative_id} not found")
+        self.db.session.delete(relationship)
+        if relationship_type == PARENT:
+            unlink_parent(self.db.session, person_id, relative_id)
+
+    def _get_lineage(self, person_id: int, direction: str, max_depth: int) -> List[Dict[str, Any]]:
+        if not 1 <= max_depth <= MAX_LINEAGE_DEPTH:
+            raise ValueError(f"depth must be between 1 and {MAX_LINEAGE_DEPTH}")
+        try:
+            if not self.db.session.get(Person, person_id):
+                raise ValueError(f"Person with id {person_id} not found")
+
+            depths = self._traverse(person_id, direction, max_depth)
+            people = self._load_people(depths)
+            lineage = sorted(
+                people.values(),
+                key=lambda person: (depths[person.id], person.last_name, person.first_name, person.id)
+            )
+            return [{**person.to_dict(), 'generation': depths[person.id]} for person in lineage]
+        except ValueError as e:
+            raise e
+        except Exception as e:
+            raise Exception(f"Failed to get lineage: {str(e)}")
+
+    def _traverse(self, person_id: int, direction: str, max_depth: int) -> Dict[int, int]:
+        """
+        Find every ancestor (direction 'up') or descendant ('down') of a person.
+        
+        Uses the in-memory graph when it is enabled, otherwise a recursive CTE that
+        walks one generation per iteration. The depth bound guarantees termination
+        even on cyclic data, UNION drops rows already produced at the same depth
+        (pedigree collapse), and the outer MIN keeps the shortest distance.
         
-        return [person.to_dict() for person in people.all()]
+        Returns:
+            Mapping of person id to distance in generations
+        """
+        if self.graph is not None:
+            self.graph.ensure_loaded(self.db.session)
+            return self.graph.traverse(person_id, direction, max_depth)
+
+        if direction == UP:
+            reached, origin = Relationship.person_id, Relationship.relative_id
+        else:
+            reached, origin = Relationship.relative_id, Relationship.person_id
+
+        lineage = (
+            select(reached.label('id'), literal(1).label('depth'))
+            .where(origin == person_id, Relationship.relationship_type == PARENT)
+            .cte('lineage', recursive=True)
+        )
+        lineage = lineage.union(
+            select(reached, lineage.c.depth + 1)
+            .join(lineage, origin == lineage.c.id)
+            .where(Relationship.relationship_type == PARENT, lineage.c.depth < max_depth)
+        )
+        rows = self.db.session.execute(
+            select(lineage.c.id, func.min(lineage.c.depth)).group_by(lineage.c.id)
+        )
+        return {relative_id: depth for relative_id, depth in rows if relative_id != person_id}
+
+    def _related_ids(self, person_id: int, max_depth: int) -> set:
+        """Ids of the ancestors, descendants and spouses of a person."""
+        related = set(self._traverse(person_id, UP, max_depth))
+        related.update(self._traverse(person_id, DOWN, max_depth))
+        spouses = self.db.session.query(Relationship.person_id, Relationship.relative_id).filter(
+            Relationship.relationship_type == SPOUSE,
+            or_(Relationship.person_id == person_id, Relationship.relative_id == person_id)
+        )
+        for first_id, second_id in spouses:
+            related.add(second_id if first_id == person_id else first_id)
+        return related
+
+    def _load_people(self, person_ids) -> Dict[int, Person]:
+        """Load people by id with a single query."""
+        person_ids = list(person_ids)
+        if not person_ids:
+            return {}
+        return {
+            person.id: person
+            for person in self.db.session.query(Person).filter(Person.id.in_(person_ids))
+        }
+
+    def _people_changed(self) -> None:
+        """Invalidate as _family_changed, and the photo facets naming people, for a write to people."""
+        self._family_changed()
+        bump_generation(self.db.session, PHOTO_INDEX)
+
+    def _family_changed(self) -> None:
+        """Invalidate the graph and tree layouts of every worker, in the transaction of the write."""
+        bump_generation(self.db.session, FAMILY_GRAPH)
+        self.tree_cache.clear()
+        if self.graph is not None:
+            self.graph.invalidate()
+
+    @staticmethod
+    def _check_batch(items) -> None:
+        if not isinstance(items, list):
+            raise ValueError("Expected a list of items")
+        if len(items) > MAX_BATCH_SIZE:
+            raise ValueError(f"A batch can hold at most {MAX_BATCH_SIZE} items")
+
+    @staticmethod
+    def _batch_id(value) -> int:
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise ValueError("id must be an integer")
+        return value
+
+    @staticmethod
+    def _batch_summary(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        results = sorted(results, key=lambda result: result['index'])
+        succeeded = sum(1 for result in results if result['success'])
+        return {'results': results, 'succeeded': succeeded, 'failed': len(results) - succeeded}
+
+    @staticmethod
+    def _person_values(item: Dict[str, Any], partial: bool) -> Dict[str, Any]:
+        """
+        Validate a batch item and convert it to column values.
+
+        Phonetic keys are included because bulk statements bypass the model
+        validators that maintain them.
+        """
+        if not isinstance(item, dict):
+            raise ValueError("Each item must be an object")
+        unknown = sorted(set(item) - set(BATCH_FIELDS))
+        if unknown:
+            raise ValueError(f"Unknown fields: {unknown}")
+
+        fields = {}
+        for name in ('first_name', 'last_name'):
+            if name not in item:
+                if not partial:
+                    raise ValueError(f"Missing required field: {name}")
+                continue
+            value = item[name]
+            if not isinstance(value, str) or not value.strip():
+                raise ValueError(f"{name} must be a non-empty string")
+            if len(value) > _NAME_LENGTH:
+                raise ValueError(f"{name} must be at most {_NAME_LENGTH} characters")
+            fields[name] = value
+            fields[f"{name}_phonetic"] = phonetic_key(value)
+        for name in ('birth_date', 'death_date'):
+            if name in item:
+                value = item[name]
+                if isinstance(value, str):
+                    try:
+                        value = date.fromisoformat(value)
+                    except ValueError:
+                        raise ValueError(f"{name} must be an ISO date (YYYY-MM-DD)")
+                elif value is not None and not isinstance(value, date):
+                    raise ValueError(f"{name} must be an ISO date (YYYY-MM-DD)")
+                fields[name] = value
+        if 'description' in item:
+            if item['description'] is not None and not isinstance(item['description'], str):
+                raise ValueError("description must be a string")
+            fields['description'] = item['description']
+        if not fields:
+            raise ValueError("No valid fields to update")
+        if not partial:
+            fields['photo_count'] = 0
+        return fields
+
+    def _missing_ids(self, person_ids) -> List[int]:
+        """Ids among person_ids that do not exist, found with a single query."""
+        person_ids = list(person_ids)
+        if not person_ids:
+            return []
+        existing = set(self.db.session.scalars(select(Person.id).where(Person.id.in_(person_ids))))
+        return [person_id for person_id in person_ids if person_id not in existing]
+
+    def _bulk_update(self, columns: tuple, rows: List[Dict[str, Any]]) -> None:
+        """Apply rows of {'id', *columns} with a single statement."""
+        if not self._is_postgresql():
+            self.db.session.execute(update(Person), rows)
+            return
+        table = Person.__table__
+        changes = values(
+            column('id', Integer), *(column(name, table.c[name].type) for name in columns),
+            name='changes'
+        ).data([(row['id'], *(row[name] for name in columns)) for row in rows])
+        # Casts keep the column types when a VALUES column only holds NULLs
+        self.db.session.execute(
+            update(table)
+            .where(table.c.id == changes.c.id)
+            .values({name: cast(changes.c[name], table.c[name].type) for name in columns})
+        )
+
+    def _move_photo_links(self, keep_id: int, merge_id: int) -> int:
+        """Re-point the photo links of merge_id to keep_id and update the person rollups."""
+        session = self.db.session
+        others = {}
+        merged_links = photo_people.alias('merged_links')
+        rows = session.execute(
+            select(merged_links.c.photo_id, photo_people.c.person_id)
+            .outerjoin(photo_people, and_(
+                photo_people.c.photo_id == merged_links.c.photo_id,
+                photo_people.c.person_id != merge_id
+            ))
+            .where(merged_links.c.person_id == merge_id)
+        )
+        for photo_id, other_id in rows:
+            people = others.setdefault(photo_id, set())
+            if other_id is not None:
+                people.add(other_id)
+
+        delta = PersonIndexDelta()
+        moved = 0
+        for photo_id, people in others.items():
+            delta.people_removed(people, [merge_id])
+            if keep_id not in people:
+                delta.people_added(people, [keep_id])
+                moved += 1
+        already_linked = photo_people.alias('already_linked')
+        session.execute(insert(photo_people).from_select(
+            ['photo_id', 'person_id'],
+            select(photo_people.c.photo_id, literal(keep_id))
+            .where(photo_people.c.person_id == merge_id)
+            .where(~select(already_linked.c.photo_id).where(
+                already_linked.c.photo_id == photo_people.c.photo_id,
+                already_linked.c.person_id == keep_id
+            ).exists())
+        ))
+        session.execute(delete(photo_people).where(photo_people.c.person_id == merge_id))
+        delta.apply(session)
+        return moved
+
+    def _delete_duplicate_candidates(self, person_ids: List[int]) -> None:
+        self.db.session.query(DuplicateCandidate).filter(or_(
+            DuplicateCandidate.person_id.in_(person_ids),
+            DuplicateCandidate.other_person_id.in_(person_ids)
+        )).delete(synchronize_session=False)
+
+    def _build_tree_layout(self, person_id: int, depth: int) -> Dict[str, Any]:
+        root = self.db.session.get(Person, person_id)
+        if not root:
+            raise ValueError(f"Person with id {person_id} not found")
+
+        generations = {person_id: 0}
+        ancestors = self.db.session.query(PersonAncestry.ancestor_id, PersonAncestry.depth).filter(
+            PersonAncestry.descendant_id == person_id, PersonAncestry.depth <= depth
+        )
+        generations.update((ancestor_id, -distance) for ancestor_id, distance in ancestors)
+        descendants = self.db.session.query(PersonAncestry.descendant_id, PersonAncestry.depth).filter(
+            PersonAncestry.ancestor_id == person_id, PersonAncestry.depth <= depth
+        )
+        generations.update(descendants)
+
+        # Spouses of the root and of descendants join the tree at their partner's generation
+        spouses = defaultdict(list)
+        in_law_ids = set()
+        spouse_rows = self.db.session.query(Relationship.person_id, Relationship.relative_id).filter(
+            Relationship.relationship_type == SPOUSE,
+            or_(Relationship.person_id.in_(list(generations)), Relationship.relative_id.in_(list(generations)))
+        ).all()
+        for first_id, second_id in spouse_rows:
+            for member_id, partner_id in ((first_id, second_id), (second_id, first_id)):
+                if generations.get(member_id, -1) >= 0 and partner_id not in generations:
+                    generations[partner_id] = generations[member_id]
+                    in_law_ids.add(partner_id)
+        for first_id, second_id in spouse_rows:
+            if first_id in generations and second_id in generations:
+                spouses[first_id].append(second_id)
+                spouses[second_id].append(first_id)
+
+        edges = self.db.session.query(Relationship).filter(
+            Relationship.person_id.in_(list(generations)),
+            Relationship.relative_id.in_(list(generations))
+        ).order_by(Relationship.relationship_type, Relationship.person_id, Relationship.relative_id).all()
+        neighbours = defaultdict(list)
+        for edge in edges:
+            if edge.relationship_type == PARENT:
+                neighbours[edge.relative_id].append(edge.person_id)
+                neighbours[edge.person_id].append(edge.relative_id)
+
+        people = self._load_people(generations)
+        by_generation = defaultdict(list)
+        for member_id, generation in generations.items():
+            if member_id not in in_law_ids:
+                by_generation[generation].append(member_id)
+
+        def by_birth(member_id):
+            person = people[member_id]
+            return (person.birth_date is None, person.birth_date or date.min,
+                    person.last_name, person.first_name, member_id)
+
+        order = {}
+        outward = sorted(by_generation, key=lambda generation: (abs(generation), generation))
+        for generation in outward:
+            inner = generation - 1 if generation > 0 else generation + 1
+            members = sorted(by_generation[generation], key=lambda member_id: (
+                # Anchor on the closest already placed parent (descendants) or child (ancestors)
+                min((order[other_id] for other_id in neighbours[member_id]
+                     if generations.get(other_id) == inner and other_id in order), default=0),
+                by_birth(member_id)
+            ))
+            placed = []
+            for member_id in members:
+                placed.append(member_id)
+                placed.extend(sorted(
+                    (partner_id for partner_id in spouses[member_id] if partner_id in in_law_ids
+                     and partner_id not in order and partner_id not in placed),
+                    key=by_birth
+                ))
+            order.update((member_id, position) for position, member_id in enumerate(placed))
+
+        nodes = sorted(
+            ({**people[member_id].to_dict(), 'generation': generation, 'order': order[member_id]}
+             for member_id, generation in generations.items()),
+            key=lambda node: (node['generation'], node['order'])
+        )
+        counts = defaultdict(int)
+        for node in nodes:
+            counts[node['generation']] += 1
+        return {
+            'rootId': person_id,
+            'depth': depth,
+            'generations': [{'generation': generation, 'count': count} for generation, count in sorted(counts.items())],
+            'nodes': nodes,
+            'edges': [edge.to_dict() for edge in edges]
+        }
+
+    @staticmethod
+    def _tree_chunks(layout: Dict[str, Any], chunk_size: int) -> Iterator[Dict[str, Any]]:
+        yield {
+            'type': 'layout',
+            'rootId': layout['rootId'],
+            'depth': layout['depth'],
+            'generations': layout['generations'],
+            'nodeCount': len(layout['nodes']),
+            'edgeCount': len(layout['edges'])
+        }
+        by_generation = defaultdict(list)
+        for node in layout['nodes']:
+            by_generation[node['generation']].append(node)
+        outward = sorted(by_generation, key=lambda generation: (abs(generation), generation))
+        rank = {generation: position for position, generation in enumerate(outward)}
+        generation_of = {node['id']: node['generation'] for node in layout['nodes']}
+        # An edge is ready once the later of its two generations has been sent
+        ready_edges = defaultdict(list)
+        for edge in layout['edges']:
+            ready_at = max(rank[generation_of[edge['personId']]], rank[generation_of[edge['relativeId']]])
+            ready_edges[ready_at].append(edge)
+
+        for position, generation in enumerate(outward):
+            nodes = by_generation[generation]
+            for start in range(0, len(nodes), chunk_size):
+                yield {'type': 'nodes', 'generation': generation, 'nodes': nodes[start:start + chunk_size]}
+            edges = ready_edges[position]
+            for start in range(0, len(edges), chunk_size):
+                yield {'type': 'edges', 'edges': edges[start:start + chunk_size]}
+
+    def _common_ancestor_rows(self, person_id: int, other_id: int) -> List[tuple]:
+        """(ancestor_id, depth from person, depth from other) for every shared ancestor."""
+        first = PersonAncestry.__table__.alias('first_line')
+        second = PersonAncestry.__table__.alias('second_line')
+        rows = self.db.session.execute(
+            select(first.c.ancestor_id, first.c.depth, second.c.depth)
+            .join(second, second.c.ancestor_id == first.c.ancestor_id)
+            .where(first.c.descendant_id == person_id, second.c.descendant_id == other_id)
+            .order_by(first.c.depth + second.c.depth, first.c.ancestor_id)
+        )
+        return [tuple(row) for row in rows]
@@ -1,15 +1,46 @@
+from collections import defaultdict
 from datetime import datetime, timezone
-from typing import Dict, Any, List, BinaryIO
+from typing import Dict, Any, List, BinaryIO, Iterator, Tuple
 from werkzeug.utils import secure_filename
-from sqlalchemy import or_
+from sqlalchemy import (
+    or_, func, extract, case, select, insert, delete, exists, and_, true, cast, null, literal, union_all,
+    Integer, String
+)
+from sqlalchemy.orm import Query
 from core.services.service_context import ServiceContext
 from core.services.storage_service import StorageService
-from core.models.photo import Photo
+from core.services.query_cache import QueryCache
+from core.services.cache_generation import PHOTO_INDEX, bump_generation, current_generation
+from core.services.aggregate_index import (
+    record_photos_added, record_photos_removed, update_timeline, update_camera_counts, PersonIndexDelta
+)
+from core.models.photo import Photo, photo_tags, photo_people
+from core.models.aggregates import PhotoDateCount, PhotoCameraCount
 from core.models.person import Person
 from core.models.tag import Tag
 from core.infrastructure.exif_utils import extract_exif_data
-
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+from core.infrastructure.db_routing import read_replica
+
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'tif', 'tiff'}
+FACET_LIMIT = 10
+FACET_CACHE_TTL_SECONDS = 60
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+SORT_DATE = 'date'
+SORT_RELEVANCE = 'relevance'
+SORT_OPTIONS = {SORT_DATE, SORT_RELEVANCE}
+TIMELINE_GRANULARITIES = ('year', 'month', 'day')
+# Photos handled per statement (and per commit for deletes) by the bulk operations
+BULK_BATCH_SIZE = 1000
+MAX_BULK_ITEMS = 10000
+# Length of the camera make and model columns
+_CAMERA_NAME_LENGTH = 100
+# Exposure criteria of get_photos: criterion -> (column name, comparison)
+EXPOSURE_RANGES = {
+    'min_iso': ('iso', '>='), 'max_iso': ('iso', '<='),
+    'min_focal_length': ('focal_length', '>='), 'max_focal_length': ('focal_length', '<='),
+    'min_f_number': ('f_number', '>='), 'max_f_number': ('f_number', '<=')
+}
 
 def allowed_file(filename: str) -> bool:
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -18,6 +49,7 @@ class PhotoService:
     def __init__(self, context: ServiceContext):
         self.db = context.db
         self.storage = None  # Will be initialized in upload_photo
+        self.facet_cache = QueryCache(ttl_seconds=FACET_CACHE_TTL_SECONDS)
 
     def upload_photo(self, photo_file: BinaryIO, metadata: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -53,42 +85,8 @@ class PhotoService:
             # Upload to S3
             s3_key, url = self.storage.upload_file(photo_file, filename)
             
-            # Create or get tags
-            tags = []
-            for tag_name in metadata.get('tags', []):
-                tag = self.db.session.query(Tag).get(tag_name)
-                if not tag:
-                    tag = Tag(name=tag_name)
-                    self.db.session.add(tag)
-                tags.append(tag)
-
-            # Get people
-            people = []
-            for person_id in metadata.get('people', []):
-                person = self.db.session.query(Person).get(person_id)
-                if person:
-                    people.append(person)
-
-            # Create photo record
-            location = metadata.get('location') or {}
-            current_time = datetime.now(timezone.utc)
-            new_photo = Photo(
-                file_name=filename,
-                s3_key=s3_key,
-                url=url,
-                title=metadata.get('title', filename),
-                upload_date=current_time,
-                description=metadata.get('description', ''),
-                location_name=location.get('name'),
-                latitude=location.get('latitude'),
-                longitude=location.get('longitude'),
-                date_taken=exif_data.get('date_taken') or current_time,
-                author=exif_data.get('author'),
-                tags=tags,
-                people=people
-            )
-
-            self.db.session.add(new_photo)
+            new_photo = self.add_photo(filename, s3_key, url, metadata, exif_data)
+            self._photos_changed()
             self.db.session.commit()
             
             return new_photo.to_dict()
@@ -103,7 +101,45 @@ class PhotoService:
                     pass  # Best effort cleanup
             raise Exception(f"Failed to upload photo: {str(e)}")
 
-    def get_photos(self, search_criteria: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def add_photo(self, filename: str, s3_key: str, url: str, metadata: Dict[str, Any],
+                  exif_data: Dict[str, Any]) -> Photo:
+        """
+        Add the Photo of a file already in storage to the session, without committing.
+
+        Args:
+            filename: Secure name of the uploaded file
+            s3_key: Key of the file in storage
+            url: Public URL of the file
+            metadata: Upload metadata, as for upload_photo
+            exif_data: EXIF data of the file
+
+        Returns:
+            The new photo, counted in the rollups
+        """
+        # Create or get tags
+        tags = []
+        for tag_name in metadata.get('tags', []):
+            tag = self.db.session.query(Tag).get(tag_name)
+            if not tag:
+                tag = Tag(name=tag_name)
+                self.db.session.add(tag)
+            tags.append(tag)
+
+        # Get people
+        people = []
+        for person_id in metadata.get('people', []):
+            person = self.db.session.query(Person).get(person_id)
+            if person:
+                people.append(person)
+
+        new_photo = self._new_photo(filename, s3_key, url, metadata, exif_data, tags, people)
+        self.db.session.add(new_photo)
+        record_photos_added(self.db.session, [new_photo])
+        return new_photo
+
+    @read_replica
+    def get_photos(self, search_criteria: Dict[str, Any], page: int = None,
+                   per_page: int = None, sort: str = SORT_DATE) -> List[Dict[str, Any]]:
         """
         Get photos based on structured search criteria.
         
@@ -118,6 +154,14 @@ class PhotoService:
                 - start_date: datetime - Filter photos taken after this date
                 - end_date: datetime - Filter photos taken before this date
                 - location: str - Exact location name to filter by
+                - camera_make: str - Camera maker, case-insensitive (e.g. 'Nikon')
+                - camera_model: str - Camera model, case-insensitive (e.g. 'F3')
+                - min_iso, max_iso: int - ISO speed range
+                - min_focal_length, max_focal_length: float - Focal length range in mm
+                - min_f_number, max_f_number: float - Aperture range
+            page: int - 1-based page number (optional, all results when omitted)
+            per_page: int - Page size, required together with page
+            sort: str - 'date' (most recent first) or 'relevance'
         
         Returns:
             List of photo dictionaries matching all the provided criteria
@@ -131,28 +175,11 @@ class PhotoService:
             >>> photos = photo_service.get_photos(criteria)
         """
         try:
-            query = self.db.session.query(Photo)
-
-            if 'tags' in search_criteria and search_criteria['tags']:
-                # Use AND condition for tags - photo must have ALL specified tags
-                for tag_name in search_criteria['tags']:
-                    query = query.filter(Photo.tags.any(Tag.name == tag_name))
-
-            if 'people' in search_criteria:
-                query = query.filter(Photo.people.any(Person.id.in_(search_criteria['people'])))
-
-            if 'start_date' in search_criteria:
-                query = query.filter(Photo.date_taken >= search_criteria['start_date'])
-
-            if 'end_date' in search_criteria:
-                query = query.filter(Photo.date_taken <= search_criteria['end_date'])
-
-            if 'location' in search_criteria:
-                query = query.filter(Photo.location_name.ilike(f"%{search_criteria['location']}%"))
-
-            photos = query.order_by(Photo.date_taken.desc()).all()
-            return [photo.to_dict() for photo in photos]
+            query = self._build_photo_query(search_criteria, [], sort, page, per_page)
+            return [photo.to_dict() for photo in query.all()]
 
+        except ValueError as e:
+            raise e
         except Exception as e:
             raise Exception(f"Failed to get photos: {str(e)}")
 
@@ -166,6 +193,28 @@ class PhotoService:
         except Exception as e:
             raise Exception(f"Failed to get photo: {str(e)}")
 
+    def get_photo_content(self, photo_id: int) -> Tuple[Iterator[bytes], str, int]:
+        """
+        Stream the file of a photo from storage.
+        
+        Returns:
+            Tuple of the chunk iterator, the content type and the size in bytes
+        
+        Raises:
+            ValueError: If the photo does not exist
+        """
+        try:
+            s3_key = self.db.session.scalar(select(Photo.s3_key).where(Photo.id == photo_id))
+            if s3_key is None:
+                raise ValueError(f"Photo with ID {photo_id} not found")
+            if self.storage is None:
+                self.storage = StorageService()
+            return self.storage.stream_file(s3_key)
+        except ValueError as e:
+            raise e
+        except Exception as e:
+            raise Exception(f"Failed to get photo content: {str(e)}")
+
     def delete_photo(self, photo_id: int) -> bool:
         """Delete a photo and its S3 object.
         
@@ -193,7 +242,9 @@ class PhotoService:
                 self.storage.delete_file(photo.s3_key)
 
                 # Delete from database
+                record_photos_removed(self.db.session, [photo])
                 self.db.session.delete(photo)
+                self._photos_changed()
                 self.db.session.commit()
                 return True
 
@@ -205,6 +256,184 @@ class PhotoService:
             self.db.session.rollback()
             raise e
 
+    def tag_photos(self, photo_ids: List[int], tag_names: List[str]) -> Dict[str, Any]:
+        """
+        Add tags to many photos at once.
+        
+        Unknown tags are created, then every missing (photo, tag) link is inserted
+        with one INSERT ... SELECT per batch of photos. Links that already exist
+        are left alone, so the call can be repeated safely.
+        
+        Args:
+            photo_ids: IDs of the photos to tag
+            tag_names: Names of the tags to add
+        
+        Returns:
+            Dictionary containing:
+                - photos: int - Number of photos found
+                - changed: int - Number of links added
+                - missingPhotoIds: List[int] - IDs that match no photo
+        
+        Raises:
+            ValueError: If the ids or tag names are invalid
+            Exception: If database operation fails
+        """
+        photo_ids = self._bulk_ids(photo_ids, 'photo_ids')
+        tag_names = self._bulk_tag_names(tag_names)
+        try:
+            found = self._existing_photo_ids(photo_ids)
+            known_tags = set(self.db.session.scalars(select(Tag.name).where(Tag.name.in_(tag_names))))
+            new_tags = [{'name': name} for name in tag_names if name not in known_tags]
+            if new_tags:
+                self.db.session.execute(insert(Tag), new_tags)
+
+            changed = 0
+            for batch in self._batches(found):
+                missing_links = (
+                    select(Photo.id, Tag.name)
+                    .join_from(Photo, Tag, true())
+                    .where(Photo.id.in_(batch), Tag.name.in_(tag_names))
+                    .where(~exists().where(and_(
+                        photo_tags.c.photo_id == Photo.id,
+                        photo_tags.c.tag_name == Tag.name
+                    )))
+                )
+                changed += self.db.session.execute(
+                    insert(photo_tags).from_select(['photo_id', 'tag_name'], missing_links)
+                ).rowcount
+            self._photos_changed()
+            self.db.session.commit()
+            return self._bulk_result(photo_ids, found, changed)
+        except Exception as e:
+            self.db.session.rollback()
+            raise Exception(f"Failed to tag photos: {str(e)}")
+
+    def untag_photos(self, photo_ids: List[int], tag_names: List[str]) -> Dict[str, Any]:
+        """
+        Remove tags from many photos at once, with one DELETE per batch of photos.
+        
+        Returns:
+            Same shape as tag_photos, changed being the number of links removed
+        
+        Raises:
+            ValueError: If the ids or tag names are invalid
+            Exception: If database operation fails
+        """
+        photo_ids = self._bulk_ids(photo_ids, 'photo_ids')
+        tag_names = self._bulk_tag_names(tag_names)
+        try:
+            found = self._existing_photo_ids(photo_ids)
+            changed = 0
+            for batch in self._batches(found):
+                changed += self.db.session.execute(
+                    delete(photo_tags).where(photo_tags.c.photo_id.in_(batch), photo_tags.c.tag_name.in_(tag_names))
+                ).rowcount
+            self._photos_changed()
+            self.db.session.commit()
+            return self._bulk_result(photo_ids, found, changed)
+        except Exception as e:
+            self.db.session.rollback()
+            raise Exception(f"Failed to untag photos: {str(e)}")
+
+    def add_people_to_photos(self, photo_ids: List[int], person_ids: List[int]) -> Dict[str, Any]:
+        """
+        Link people to many photos at once.
+        
+        The current people of each batch of photos are read with one query, the
+        missing links are inserted with one executemany INSERT, and the person
+        photo counts and co-occurrences are updated through PersonIndexDelta.
+        
+        Args:
+            photo_ids: IDs of the photos
+            person_ids: IDs of the people shown in all of them
+        
+        Returns:
+            Same shape as tag_photos
+        
+        Raises:
+            ValueError: If the ids are invalid or a person is not found
+            Exception: If database operation fails
+        """
+        return self._change_photo_people(photo_ids, person_ids, add=True)
+
+    def remove_people_from_photos(self, photo_ids: List[int], person_ids: List[int]) -> Dict[str, Any]:
+        """
+        Unlink people from many photos at once (see add_people_to_photos).
+        
+        Returns:
+            Same shape as tag_photos, changed being the number of links removed
+        
+        Raises:
+            ValueError: If the ids are invalid
+            Exception: If database operation fails
+        """
+        return self._change_photo_people(photo_ids, person_ids, add=False)
+
+    def delete_photos(self, photo_ids: List[int]) -> Dict[str, Any]:
+        """
+        Delete many photos and their S3 objects.
+        
+        Photos are processed BULK_BATCH_SIZE at a time: the objects are removed
+        with S3 DeleteObjects, then the rows, their tag and people links and the
+        rollups are removed with one statement each, and the batch is committed.
+        S3 goes first so that an interruption can never leave an object without a
+        row pointing to it. Deleting a missing S3 object succeeds and photos that
+        are already gone are only reported, so an interrupted call can be repeated
+        with the same ids to finish the job.
+        
+        Args:
+            photo_ids: IDs of the photos to delete
+        
+        Returns:
+            Dictionary containing:
+                - deleted: int - Number of photos deleted
+                - missingPhotoIds: List[int] - IDs that match no photo (e.g. already deleted)
+                - failedPhotoIds: List[int] - Photos kept because their S3 object could not be deleted
+        
+        Raises:
+            ValueError: If the ids are invalid
+            Exception: If deletion fails; batches committed before the failure stay deleted
+        """
+        photo_ids = self._bulk_ids(photo_ids, 'photo_ids')
+        if self.storage is None:
+            self.storage = StorageService()
+
+        deleted, found, failed = 0, set(), []
+        try:
+            for batch in self._batches(photo_ids):
+                photos = self.db.session.query(
+                    Photo.id, Photo.s3_key, Photo.date_taken, Photo.camera_make, Photo.camera_model
+                ).filter(Photo.id.in_(batch)).all()
+                found.update(photo.id for photo in photos)
+                failed_keys = set(self.storage.delete_files([photo.s3_key for photo in photos]))
+                failed.extend(photo.id for photo in photos if photo.s3_key in failed_keys)
+                photos = [photo for photo in photos if photo.s3_key not in failed_keys]
+                if not photos:
+                    continue
+
+                ids = [photo.id for photo in photos]
+                update_timeline(self.db.session, [photo.date_taken for photo in photos], -1)
+                update_camera_counts(self.db.session, [(photo.camera_make, photo.camera_model) for photo in photos], -1)
+                delta = PersonIndexDelta()
+                for people in self._photo_people(ids).values():
+                    delta.people_removed([], people)
+                delta.apply(self.db.session)
+                self.db.session.execute(delete(photo_tags).where(photo_tags.c.photo_id.in_(ids)))
+                self.db.session.execute(delete(photo_people).where(photo_people.c.photo_id.in_(ids)))
+                self.db.session.query(Photo).filter(Photo.id.in_(ids)).delete(synchronize_session=False)
+                self._photos_changed()
+                self.db.session.commit()
+                deleted += len(ids)
+            return {
+                'deleted': deleted,
+                'missingPhotoIds': [photo_id for photo_id in photo_ids if photo_id not in found],
+                'failedPhotoIds': failed
+            }
+        except Exception as e:
+            self.db.session.rollback()
+            raise Exception(f"Failed to delete photos: {str(e)}")
+
+    @read_replica
     def get_tags(self) -> List[str]:
         """Get all unique tags."""
         try:
@@ -213,13 +442,16 @@ class PhotoService:
         except Exception as e:
             raise Exception(f"Failed to get tags: {str(e)}")
 
-    def search_photos(self, query: str) -> List[Dict[str, Any]]:
+    @read_replica
+    def search_photos(self, query: str, search_criteria: Dict[str, Any] = None, page: int = 1,
+                      per_page: int = DEFAULT_PAGE_SIZE, sort: str = SORT_DATE) -> List[Dict[str, Any]]:
         """
         Search photos using free-text search across multiple fields.
         
         This method performs a fuzzy text search across various photo fields including
         title, description, tags, location, and associated people's names. It's ideal
-        for search bar functionality where users can enter any keywords.
+        for search bar functionality where users can enter any keywords. Structured
+        criteria (see get_photos) can be combined with the text terms.
         
         The search is:
         - Case-insensitive
@@ -237,46 +469,543 @@ class PhotoService:
         Args:
             query: str - Space-separated search terms
                        Example: "Paris vacation 2024"
+            search_criteria: Optional structured criteria, same structure as get_photos
+            page: int - 1-based page number
+            per_page: int - Page size (at most MAX_PAGE_SIZE)
+            sort: str - 'date' (most recent first) or 'relevance'
+                  (photos matching more terms in more important fields first)
         
         Returns:
-            List of photo dictionaries matching any of the search terms,
-            ordered by date taken (most recent first), limited to 50 results
+            List of photo dictionaries matching any of the search terms and all of
+            the criteria, ordered by the requested sort
         
         Example:
-            >>> photos = photo_service.search_photos("Paris summer")
-            # Will find photos with "Paris" or "summer" in any of the searchable fields
+            >>> photos = photo_service.search_photos("Paris summer", {'tags': ['family']})
+            # Will find family photos with "Paris" or "summer" in any of the searchable fields
         """
         if not query:
             return []
 
         # Split query into terms for better matching
         terms = [term.strip() for term in query.split() if term.strip()]
+        if not terms:
+            return []
+
+        try:
+            photos = self._build_photo_query(search_criteria or {}, terms, sort, page, per_page)
+            return [photo.to_dict() for photo in photos.all()]
+
+        except ValueError as e:
+            raise e
+        except Exception as e:
+            raise Exception(f"Failed to search photos: {str(e)}")
+
+    @read_replica
+    def get_timeline(self, search_criteria: Dict[str, Any], granularity: str = 'month') -> List[Dict[str, Any]]:
+        """
+        Count photos per year, month or day of date_taken.
+        
+        Without criteria the counts come from the photo_date_counts rollup, which is
+        maintained on every upload and delete and holds at most one row per day, so
+        the cost does not depend on the number of photos. With criteria the counts
+        are aggregated over the ids of the matching photos (see get_photos).
         
-        # Start with the base query from get_photos
-        search_criteria = {}
-        base_query = self.db.session.query(Photo).distinct()
+        Args:
+            search_criteria: Same structure as get_photos (may be empty)
+            granularity: str - 'year', 'month' or 'day'
+        
+        Returns:
+            List of buckets in chronological order, each containing the date parts
+            down to the requested granularity and a count
+        
+        Example:
+            >>> photo_service.get_timeline({}, granularity='year')
+            [{'year': 1998, 'count': 12}, {'year': 1999, 'count': 40}]
+        """
+        if granularity not in TIMELINE_GRANULARITIES:
+            raise ValueError(f"Invalid granularity '{granularity}'. Allowed values: {list(TIMELINE_GRANULARITIES)}")
+        parts = TIMELINE_GRANULARITIES[:TIMELINE_GRANULARITIES.index(granularity) + 1]
 
-        # Add text search conditions
-        text_conditions = []
-        for term in terms:
-            term_pattern = f"%{term}%"
-            text_conditions.append(
-                or_(
-                    Photo.title.ilike(term_pattern),
-                    Photo.description.ilike(term_pattern),
-                    Photo.location_name.ilike(term_pattern),
-                    Photo.tags.any(Tag.name.ilike(term_pattern)),
-                    Photo.people.any(or_(
-                        Person.first_name.ilike(term_pattern),
-                        Person.last_name.ilike(term_pattern)
-                    ))
+        try:
+            session = self.db.session
+            if search_criteria:
+                columns = [extract(part, Photo.date_taken) for part in parts]
+                query = (
+                    session.query(*columns, func.count(Photo.id))
+                    .filter(*self._plan_filters(search_criteria, []))
+                    .filter(Photo.date_taken.isnot(None))
                 )
-            )
+            else:
+                columns = [getattr(PhotoDateCount, part) for part in parts]
+                query = session.query(*columns, func.sum(PhotoDateCount.count))
+
+            rows = query.group_by(*columns).order_by(*columns).all()
+            return [
+                {**{part: int(value) for part, value in zip(parts, row[:-1])}, 'count': int(row[-1])}
+                for row in rows
+            ]
+
+        except Exception as e:
+            raise Exception(f"Failed to get timeline: {str(e)}")
+
+    def get_equipment_stats(self) -> Dict[str, Any]:
+        """
+        Count photos per camera and per camera maker.
+        
+        The counts come from the photo_camera_counts rollup, which is maintained on
+        every upload and delete and holds one row per camera, so the photos table
+        is never scanned.
+        
+        Returns:
+            Dictionary containing:
+                - total: int - Number of photos
+                - unknown: int - Photos without camera EXIF data
+                - makes: List of {make, count}, most frequent first
+                - cameras: List of {make, model, count}, most frequent first
         
-        if text_conditions:
-            base_query = base_query.filter(or_(*text_conditions))
+        Example:
+            >>> photo_service.get_equipment_stats()['cameras'][0]
+            {'make': 'Nikon', 'model': 'F3', 'count': 812}
+        """
+        try:
+            rows = self.db.session.query(
+                PhotoCameraCount.camera_make, PhotoCameraCount.camera_model, PhotoCameraCount.count
+            ).all()
+            makes = defaultdict(int)
+            cameras = []
+            unknown = 0
+            for camera_make, camera_model, count in rows:
+                if not camera_make and not camera_model:
+                    unknown += count
+                    continue
+                makes[camera_make or None] += count
+                cameras.append({'make': camera_make or None, 'model': camera_model or None, 'count': count})
+            return {
+                'total': sum(row.count for row in rows),
+                'unknown': unknown,
+                'makes': [
+                    {'make': make, 'count': count}
+                    for make, count in sorted(makes.items(), key=lambda item: (-item[1], item[0] or ''))
+                ],
+                'cameras': sorted(cameras, key=lambda camera: (-camera['count'], camera['make'] or '',
+                                                               camera['model'] or ''))
+            }
+        except Exception as e:
+            raise Exception(f"Failed to get equipment stats: {str(e)}")
 
-        # Get photos with text search applied
-        photos = base_query.order_by(Photo.date_taken.desc()).limit(50)
+    @read_replica
+    def get_photo_facets(self, search_criteria: Dict[str, Any], query: str = '') -> Dict[str, Any]:
+        """
+        Count how many photos each filter value would yield within a result set.
+        
+        The result set is the one described by the structured search criteria (see
+        get_photos) optionally narrowed by free-text terms (see search_photos). The
+        facets are aggregates over the ids of the filtered photos, computed once
+        and counted in a single statement, so photo rows are never loaded.
+        Results are cached per normalized query for FACET_CACHE_TTL_SECONDS, and
+        invalidated in every worker by the writes to photos and people.
+        
+        Args:
+            search_criteria: Same structure as get_photos
+            query: str - Optional space-separated free-text terms
+        
+        Returns:
+            Dictionary containing:
+                - total: int - Number of photos in the result set
+                - tags: List of {name, count}, most frequent first
+                - people: List of {id, name, count}, most frequent first
+                - years: List of {year, count}, in chronological order
+                - locations: List of {name, count}, most frequent first
+        
+        Example:
+            >>> facets = photo_service.get_photo_facets({'tags': ['family']})
+            >>> facets['years']
+            [{'year': 1998, 'count': 12}, {'year': 1999, 'count': 40}]
+        """
+        terms = [term.strip() for term in (query or '').split() if term.strip()]
+        try:
+            # Facets counted before a write made by any worker are never found again
+            cache_key = (current_generation(self.db.session, PHOTO_INDEX),
+                         self._normalize_criteria(search_criteria, terms))
+            cached = self.facet_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            rows = defaultdict(list)
+            for row in self.db.session.execute(self._facet_statement(search_criteria, terms)):
+                rows[row.facet].append((row.name, row.last_name, row.number, row.count))
+            facets = self._facets_from_rows(rows)
+            self.facet_cache.set(cache_key, facets)
+            return facets
+
+        except Exception as e:
+            raise Exception(f"Failed to get photo facets: {str(e)}")
+
+    def _facet_statement(self, search_criteria: Dict[str, Any], terms: List[str]):
+        """
+        Build a single statement returning the rows of every facet, tagged by facet
+        name and ordered by position within the facet.
+        
+        The ids of the filtered photos are a CTE shared by the facets, which
+        PostgreSQL and SQLite materialize once since it is referenced several times.
+        """
+        photo_ids = select(Photo.id).where(*self._plan_filters(search_criteria, terms)).cte('photo_ids')
+        branches = []
+        limited = []
+        for name, (query, order, limit) in self._facet_selects(photo_ids).items():
+            position = func.row_number().over(order_by=order) if order else literal(1, Integer)
+            branches.append(query.add_columns(literal(name, String).label('facet'), position.label('position')))
+            if limit:
+                limited.append(name)
+        facets = union_all(*branches).subquery('facets')
+        return (
+            select(facets)
+            .where(or_(facets.c.facet.notin_(limited), facets.c.position <= FACET_LIMIT))
+            .order_by(facets.c.facet, facets.c.position)
+        )
+
+    def _facet_statements(self, search_criteria: Dict[str, Any], terms: List[str]) -> Dict[str, Any]:
+        """
+        Build one aggregate SELECT per facet over the ids of the filtered photos.
+        
+        The statements are independent of each other, so they can run on
+        separate connections at the same time (see async_photo_service).
+        """
+        photo_ids = select(Photo.id).where(*self._plan_filters(search_criteria, terms)).subquery()
+        return {
+            name: query.order_by(*order).limit(FACET_LIMIT if limit else None)
+            for name, (query, order, limit) in self._facet_selects(photo_ids).items()
+        }
+
+    @staticmethod
+    def _facet_selects(photo_ids) -> Dict[str, Tuple[Any, list, bool]]:
+        """
+        The aggregate SELECT of each facet over photo_ids, with the order of its
+        values and whether only the first FACET_LIMIT values are kept.
         
-        return [photo.to_dict() for photo in photos.all()]
+        Every SELECT returns the columns name, last_name, number and count, NULL
+        where the facet has no such value.
+        """
+        def columns(name=None, last_name=None, number=None):
+            return (
+                (name if name is not None else cast(null(), String)).label('name'),
+                (last_name if last_name is not None else cast(null(), String)).label('last_name'),
+                (number if number is not None else cast(null(), Integer)).label('number')
+            )
+
+        tag_count = func.count(photo_tags.c.photo_id)
+        person_count = func.count(photo_people.c.photo_id)
+        year = extract('year', Photo.date_taken)
+        location_count = func.count(Photo.id)
+        return {
+            'total': (select(*columns(), func.count().label('count')).select_from(photo_ids), [], False),
+            'tags': (
+                select(*columns(name=photo_tags.c.tag_name), tag_count.label('count'))
+                .join(photo_ids, photo_ids.c.id == photo_tags.c.photo_id)
+                .group_by(photo_tags.c.tag_name),
+                [tag_count.desc(), photo_tags.c.tag_name],
+                True
+            ),
+            'people': (
+                select(*columns(Person.first_name, Person.last_name, Person.id), person_count.label('count'))
+                .join(photo_people, photo_people.c.person_id == Person.id)
+                .join(photo_ids, photo_ids.c.id == photo_people.c.photo_id)
+                .group_by(Person.id, Person.first_name, Person.last_name),
+                [person_count.desc(), Person.id],
+                True
+            ),
+            'years': (
+                select(*columns(number=cast(year, Integer)), func.count(Photo.id).label('count'))
+                .join(photo_ids, photo_ids.c.id == Photo.id)
+                .where(Photo.date_taken.isnot(None))
+                .group_by(year),
+                [year],
+                False
+            ),
+            'locations': (
+                select(*columns(name=Photo.location_name), location_count.label('count'))
+                .join(photo_ids, photo_ids.c.id == Photo.id)
+                .where(Photo.location_name.isnot(None))
+                .group_by(Photo.location_name),
+                [location_count.desc(), Photo.location_name],
+                True
+            )
+        }
+
+    @staticmethod
+    def _facets_from_rows(rows: Dict[str, list]) -> Dict[str, Any]:
+        """Shape the (name, last_name, number, count) rows of each facet into the facets dictionary."""
+        return {
+            'total': rows['total'][0][3],
+            'tags': [{'name': name, 'count': count} for name, _, _, count in rows['tags']],
+            'people': [
+                {'id': person_id, 'name': f"{first_name} {last_name}", 'count': count}
+                for first_name, last_name, person_id, count in rows['people']
+            ],
+            'years': [{'year': int(year_value), 'count': count} for _, _, year_value, count in rows['years']],
+            'locations': [{'name': name, 'count': count} for name, _, _, count in rows['locations']]
+        }
+
+    def _photos_changed(self) -> None:
+        """Invalidate the facets of every worker, in the transaction of the write."""
+        bump_generation(self.db.session, PHOTO_INDEX)
+        self.facet_cache.clear()
+
+    @staticmethod
+    def _new_photo(filename: str, s3_key: str, url: str, metadata: Dict[str, Any], exif_data: Dict[str, Any],
+                   tags: List[Tag], people: List[Person]) -> Photo:
+        """Create the Photo of an uploaded file from the upload metadata and its EXIF data."""
+        location = metadata.get('location') or {}
+        current_time = datetime.now(timezone.utc)
+        return Photo(
+            file_name=filename,
+            s3_key=s3_key,
+            url=url,
+            title=metadata.get('title', filename),
+            upload_date=current_time,
+            description=metadata.get('description', ''),
+            location_name=location.get('name'),
+            # Coordinates given with the upload win over the camera's GPS position
+            latitude=location.get('latitude', exif_data.get('latitude')),
+            longitude=location.get('longitude', exif_data.get('longitude')),
+            date_taken=exif_data.get('date_taken') or current_time,
+            author=exif_data.get('author'),
+            camera_make=(exif_data.get('camera_make') or '')[:_CAMERA_NAME_LENGTH] or None,
+            camera_model=(exif_data.get('camera_model') or '')[:_CAMERA_NAME_LENGTH] or None,
+            focal_length=exif_data.get('focal_length'),
+            f_number=exif_data.get('f_number'),
+            exposure_time=exif_data.get('exposure_time'),
+            iso=exif_data.get('iso'),
+            tags=tags,
+            people=people
+        )
+
+    def _build_photo_query(self, search_criteria: Dict[str, Any], terms: List[str], sort: str,
+                           page: int = None, per_page: int = None, query: Query = None):
+        """
+        Build the single query used by every photo listing and search.
+        
+        Filters are applied most selective first (see _plan_filters) and every
+        many-to-many criterion is an EXISTS sub-query, so a photo row can never be
+        produced twice and no DISTINCT (which would sort whole photo rows) is needed.
+        Ties are broken on id so that pages are stable. query defaults to a
+        query on the Flask-SQLAlchemy session (see _photo_statement for others).
+        """
+        if sort not in SORT_OPTIONS:
+            raise ValueError(f"Invalid sort '{sort}'. Allowed values: {sorted(SORT_OPTIONS)}")
+
+        query = self.db.session.query(Photo) if query is None else query
+        filters = self._plan_filters(search_criteria, terms)
+        if filters:
+            query = query.filter(*filters)
+
+        if sort == SORT_RELEVANCE and terms:
+            query = query.order_by(self._relevance_score(terms).desc(), Photo.date_taken.desc(), Photo.id.desc())
+        else:
+            query = query.order_by(Photo.date_taken.desc(), Photo.id.desc())
+
+        if page is not None or per_page is not None:
+            page = page or 1
+            per_page = per_page or DEFAULT_PAGE_SIZE
+            if page < 1 or not 1 <= per_page <= MAX_PAGE_SIZE:
+                raise ValueError(f"page must be >= 1 and per_page between 1 and {MAX_PAGE_SIZE}")
+            query = query.limit(per_page).offset((page - 1) * per_page)
+
+        return query
+
+    def _photo_statement(self, search_criteria: Dict[str, Any], terms: List[str], sort: str,
+                         page: int = None, per_page: int = None):
+        """The SELECT of _build_photo_query, bound to no session (see async_photo_service)."""
+        return self._build_photo_query(search_criteria, terms, sort, page, per_page, query=Query(Photo)).statement
+
+    def _plan_filters(self, search_criteria: Dict[str, Any], terms: List[str]) -> list:
+        """
+        Turn structured criteria and free-text terms into filter clauses, cheapest first.
+        
+        Each clause gets a rank reflecting how selective and cheap it usually is:
+        person ids and exact tags hit primary-key indexes of the association tables,
+        date ranges narrow the photos table, while location and text patterns need a
+        pattern match on every remaining row. Evaluating them in that order lets the
+        cheap predicates discard most rows before the pattern matches run.
+        """
+        ranked = []
+
+        if search_criteria.get('people'):
+            ranked.append((1, Photo.people.any(Person.id.in_(search_criteria['people']))))
+
+        # Use AND condition for tags - photo must have ALL specified tags
+        for tag_name in search_criteria.get('tags') or []:
+            ranked.append((2, Photo.tags.any(Tag.name == tag_name)))
+
+        if search_criteria.get('start_date'):
+            ranked.append((3, Photo.date_taken >= search_criteria['start_date']))
+
+        if search_criteria.get('end_date'):
+            ranked.append((3, Photo.date_taken <= search_criteria['end_date']))
+
+        for name in ('camera_make', 'camera_model'):
+            if search_criteria.get(name):
+                column = getattr(Photo, name)
+                ranked.append((2, func.lower(column) == search_criteria[name].strip().lower()))
+
+        for name, (column_name, comparison) in EXPOSURE_RANGES.items():
+            if search_criteria.get(name) is not None:
+                column = getattr(Photo, column_name)
+                value = search_criteria[name]
+                ranked.append((3, column >= value if comparison == '>=' else column <= value))
+
+        if search_criteria.get('location'):
+            ranked.append((4, Photo.location_name.ilike(f"%{search_criteria['location']}%")))
+
+        if terms:
+            ranked.append((5, or_(*[self._term_condition(term) for term in terms])))
+
+        return [clause for _, clause in sorted(ranked, key=lambda item: item[0])]
+
+    def _term_condition(self, term: str):
+        """Build the condition matching photos where term appears in a searchable field."""
+        term_pattern = f"%{term}%"
+        return or_(
+            Photo.title.ilike(term_pattern),
+            Photo.description.ilike(term_pattern),
+            Photo.location_name.ilike(term_pattern),
+            Photo.tags.any(Tag.name.ilike(term_pattern)),
+            Photo.people.any(or_(
+                Person.first_name.ilike(term_pattern),
+                Person.last_name.ilike(term_pattern)
+            ))
+        )
+
+    def _relevance_score(self, terms: List[str]):
+        """Score a photo by how many terms it matches, weighting titles highest."""
+        score = None
+        for term in terms:
+            term_pattern = f"%{term}%"
+            for condition, weight in (
+                (Photo.title.ilike(term_pattern), 4),
+                (Photo.tags.any(Tag.name.ilike(term_pattern)), 3),
+                (Photo.people.any(or_(
+                    Person.first_name.ilike(term_pattern),
+                    Person.last_name.ilike(term_pattern)
+                )), 3),
+                (Photo.location_name.ilike(term_pattern), 2),
+                (Photo.description.ilike(term_pattern), 1)
+            ):
+                term_score = case((condition, weight), else_=0)
+                score = term_score if score is None else score + term_score
+        return score
+
+    @staticmethod
+    def _normalize_criteria(search_criteria: Dict[str, Any], terms: List[str]) -> tuple:
+        """Build a hashable cache key that is identical for equivalent searches."""
+        def _date_key(value):
+            return value.isoformat() if value is not None else None
+
+        return (
+            tuple(sorted(set(search_criteria.get('tags') or []))),
+            tuple(sorted(set(search_criteria['people']))) if 'people' in search_criteria else None,
+            _date_key(search_criteria.get('start_date')),
+            _date_key(search_criteria.get('end_date')),
+            (search_criteria.get('location') or '').strip().lower() or None,
+            tuple((search_criteria.get(name) or '').strip().lower() or None
+                  for name in ('camera_make', 'camera_model')),
+            tuple(search_criteria.get(name) for name in EXPOSURE_RANGES),
+            tuple(sorted({term.lower() for term in terms}))
+        )
+
+    def _change_photo_people(self, photo_ids: List[int], person_ids: List[int], add: bool) -> Dict[str, Any]:
+        photo_ids = self._bulk_ids(photo_ids, 'photo_ids')
+        person_ids = self._bulk_ids(person_ids, 'person_ids')
+        try:
+            if add:
+                known_people = set(self.db.session.scalars(select(Person.id).where(Person.id.in_(person_ids))))
+                missing_people = [person_id for person_id in person_ids if person_id not in known_people]
+                if missing_people:
+                    raise ValueError(f"Person with id {missing_people[0]} not found")
+
+            found = self._existing_photo_ids(photo_ids)
+            delta = PersonIndexDelta()
+            changed = 0
+            for batch in self._batches(found):
+                current = self._photo_people(batch)
+                if add:
+                    links = []
+                    for photo_id in batch:
+                        added = [person_id for person_id in person_ids if person_id not in current[photo_id]]
+                        if added:
+                            delta.people_added(current[photo_id], added)
+                            links.extend({'photo_id': photo_id, 'person_id': person_id} for person_id in added)
+                    if links:
+                        self.db.session.execute(insert(photo_people), links)
+                    changed += len(links)
+                else:
+                    for photo_id in batch:
+                        removed = current[photo_id] & set(person_ids)
+                        if removed:
+                            delta.people_removed(current[photo_id] - removed, removed)
+                            changed += len(removed)
+                    self.db.session.execute(delete(photo_people).where(
+                        photo_people.c.photo_id.in_(batch), photo_people.c.person_id.in_(person_ids)
+                    ))
+            delta.apply(self.db.session)
+            self._photos_changed()
+            self.db.session.commit()
+            return self._bulk_result(photo_ids, found, changed)
+        except ValueError as e:
+            self.db.session.rollback()
+            raise e
+        except Exception as e:
+            self.db.session.rollback()
+            raise Exception(f"Failed to {'add people to' if add else 'remove people from'} photos: {str(e)}")
+
+    def _photo_people(self, photo_ids: List[int]) -> Dict[int, set]:
+        """People of each photo, read with a single query."""
+        people = defaultdict(set)
+        rows = self.db.session.execute(
+            select(photo_people.c.photo_id, photo_people.c.person_id).where(photo_people.c.photo_id.in_(photo_ids))
+        )
+        for photo_id, person_id in rows:
+            people[photo_id].add(person_id)
+        return people
+
+    def _existing_photo_ids(self, photo_ids: List[int]) -> List[int]:
+        found = set()
+        for batch in self._batches(photo_ids):
+            found.update(self.db.session.scalars(select(Photo.id).where(Photo.id.in_(batch))))
+        return [photo_id for photo_id in photo_ids if photo_id in found]
+
+    @staticmethod
+    def _batches(items: List, size: int = BULK_BATCH_SIZE):
+        for offset in range(0, len(items), size):
+            yield items[offset:offset + size]
+
+    @staticmethod
+    def _bulk_ids(values, name: str) -> List[int]:
+        """Validate a list of ids for a bulk operation, dropping duplicates."""
+        if not isinstance(values, list) or not values:
+            raise ValueError(f"{name} must be a non-empty list")
+        if len(values) > MAX_BULK_ITEMS:
+            raise ValueError(f"{name} can hold at most {MAX_BULK_ITEMS} ids")
+        if not all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+            raise ValueError(f"{name} must only contain integers")
+        return list(dict.fromkeys(values))
+
+    @staticmethod
+    def _bulk_tag_names(values) -> List[str]:
+        if not isinstance(values, list) or not values:
+            raise ValueError("tags must be a non-empty list")
+        names = []
+        for value in values:
+            if not isinstance(value, str) or not value.strip() or len(value.strip()) > 50:
+                raise ValueError("tags must be non-empty strings of at most 50 characters")
+            names.append(value.strip())
+        return list(dict.fromkeys(names))
+
+    @staticmethod
+    def _bulk_result(photo_ids: List[int], found: List[int], changed: int) -> Dict[str, Any]:
+        found = set(found)
+        return {
+            'photos': len(found),
+            'changed': changed,
+            'missingPhotoIds': [photo_id for photo_id in photo_ids if photo_id not in found]
+        }
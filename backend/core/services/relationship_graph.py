@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Dict, Set
+from core.models.relationship import Relationship, PARENT
+from core.services.cache_generation import FAMILY_GRAPH, current_generation
+
+UP = 'up'
+DOWN = 'down'
+
+class RelationshipGraph:
+    """In-memory parent/child adjacency lists of the whole family graph.
+
+    A 50k-person tree fits in a few megabytes, and breadth-first traversals over
+    dictionaries answer deep lineage queries without a database round trip per
+    generation. The graph is reloaded when the family graph generation moved,
+    which every write to people or relationships does in whichever worker it
+    is made, after ttl_seconds at the latest, or after invalidate().
+    """
+
+    def __init__(self, ttl_seconds: float = 300):
+        self.ttl_seconds = ttl_seconds
+        self._parents: Dict[int, Set[int]] = defaultdict(set)
+        self._children: Dict[int, Set[int]] = defaultdict(set)
+        self._loaded_at = None
+        self._generation = None
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        """Force a reload on next use."""
+        with self._lock:
+            self._loaded_at = None
+
+    def ensure_loaded(self, session) -> None:
+        """Load the parent edges from the database if the graph is missing, outdated or expired."""
+        generation = current_generation(session, FAMILY_GRAPH)
+        with self._lock:
+            if (self._loaded_at is not None and generation == self._generation
+                    and time.monotonic() - self._loaded_at < self.ttl_seconds):
+                return
+            parents, children = defaultdict(set), defaultdict(set)
+            edges = session.query(Relationship.person_id, Relationship.relative_id).filter(
+                Relationship.relationship_type == PARENT
+            )
+            for parent_id, child_id in edges.yield_per(10000):
+                parents[child_id].add(parent_id)
+                children[parent_id].add(child_id)
+            self._parents, self._children = parents, children
+            self._loaded_at = time.monotonic()
+            self._generation = generation
+
+    def traverse(self, person_id: int, direction: str, max_depth: int) -> Dict[int, int]:
+        """Walk up (ancestors) or down (descendants) from person_id.
+
+        Returns:
+            Mapping of every reached person id to its shortest distance in generations.
+            A visited set guards against cycles in inconsistent data.
+        """
+        edges = self._parents if direction == UP else self._children
+        depths: Dict[int, int] = {}
+        queue = deque([(person_id, 0)])
+        visited = {person_id}
+        while queue:
+            current, depth = queue.popleft()
+            if depth == max_depth:
+                continue
+            for relative_id in edges.get(current, ()):
+                if relative_id not in visited:
+                    visited.add(relative_id)
+                    depths[relative_id] = depth + 1
+                    queue.append((relative_id, depth + 1))
+        return depths
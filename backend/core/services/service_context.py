@@ -2,6 +2,11 @@ import os
 from typing import Optional
 from flask import Flask
 from core.models.db import db
+from core.infrastructure.db_pool import engine_options, pool_status
+from core.infrastructure.db_routing import REPLICA_BIND, init_replica_routing
+from core.infrastructure.schema import check_schema_revision
+from core.infrastructure.slow_queries import init_slow_query_log
+from utils.config import config, DatabaseConfig
 
 class ServiceContext:
     _instance: Optional['ServiceContext'] = None
@@ -16,18 +21,20 @@ class ServiceContext:
         # Initialize only once
         if not self._initialized:
             self._db = db
+            self._slow_query_log = None
 
     @property
     def db(self):
         return self._db
     
-    def initialize(self, app: Flask, database_url: str) -> None:
+    def initialize(self, app: Flask, database_url: str, database_config: Optional[DatabaseConfig] = None) -> None:
         """Initialize the service context with database configuration.
         
         Args:
             app: Flask application instance
             database_url: Full database URL for SQLAlchemy. This should be provided
                         by the application setup code, not hardcoded here.
+            database_config: Pool, timeout and replica settings (defaults to config.database)
         """
         if not self.__class__._initialized:
             if not database_url:
@@ -35,11 +42,56 @@ class ServiceContext:
 
             app.config['SQLALCHEMY_DATABASE_URI'] = database_url
             app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+            database_config = database_config or config.database
+            app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(database_url, database_config)
+            if database_config.replica_url:
+                # Read-only service methods are routed to this bind
+                app.config['SQLALCHEMY_BINDS'] = {REPLICA_BIND: {
+                    'url': database_config.replica_url,
+                    **engine_options(database_config.replica_url, database_config)
+                }}
+                init_replica_routing(app, database_config.replica_stickiness)
 
             try:
                 self._db.init_app(app)
+                self._app = app
                 with app.app_context():
-                    self._db.create_all()
+                    # The schema itself is managed by the migrations (alembic upgrade head)
+                    check_schema_revision(self._db.engine)
+                self._slow_query_log = init_slow_query_log(database_config, config.metrics_dir)
             except Exception as e:
                 raise RuntimeError(f"Failed to initialize the database: {e}")
             self.__class__._initialized = True
+
+    def pool_status(self) -> dict:
+        """Occupancy and checkout wait metrics of the database connection pool."""
+        return pool_status(self._db.engine)
+
+    def slow_query_report(self, limit: int = None) -> dict:
+        """Slow query shapes by fingerprint, most expensive first (see core.infrastructure.slow_queries)."""
+        if self._slow_query_log is None:
+            return {'thresholdMs': 0, 'explainRate': 0.0, 'queries': []}
+        return self._slow_query_log.report(limit)
+
+    def clear_slow_queries(self) -> None:
+        """Forget the slow queries recorded so far."""
+        if self._slow_query_log is not None:
+            self._slow_query_log.clear()
+
+    def reset_after_fork(self) -> None:
+        """Drop the pooled connections inherited from the parent process.
+
+        With a pre-fork server (gunicorn --preload) the app and its engines are
+        built once in the master; sockets shared with the master must not be
+        used by the workers, which open their own connections on first use.
+        """
+        with self._app.app_context():
+            for engine in self._db.engines.values():
+                # close=False leaves the parent's connections usable by the parent
+                engine.dispose(close=False)
+
+def _reset_after_fork() -> None:
+    if ServiceContext._initialized and ServiceContext._instance is not None:
+        ServiceContext._instance.reset_after_fork()
+
+os.register_at_fork(after_in_child=_reset_after_fork)
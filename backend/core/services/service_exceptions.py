@@ -1,2 +1,5 @@
 class NotFoundException(Exception):
-    pass
\ No newline at end of file
+    pass
+
+class ConflictException(Exception):
+    pass
@@ -1,33 +1,80 @@
 import os
-from typing import BinaryIO, Tuple
-import boto3
-from botocore.config import Config as BotoConfig
-from botocore.exceptions import ClientError
+from datetime import datetime
+from typing import BinaryIO, Iterable, Iterator, List, Tuple
 from werkzeug.utils import secure_filename
 import uuid
+from core.infrastructure.instrumentation import instrument_s3_client
 from utils.config import config
 
+# Largest number of keys accepted by a single S3 DeleteObjects request
+DELETE_BATCH_SIZE = 1000
+# Bytes read from S3 at a time when streaming a file to a client
+STREAM_CHUNK_SIZE = 256 * 1024
+
+CONTENT_TYPES = {
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+    'gif': 'image/gif',
+    'tif': 'image/tiff',
+    'tiff': 'image/tiff'
+}
+
+def content_type(filename: str) -> str:
+    """Get the content type based on file extension."""
+    extension = os.path.splitext(filename)[1].split('.')[-1]
+    return CONTENT_TYPES.get(extension.lower(), 'application/octet-stream')
+
+def new_object_key(filename: str) -> str:
+    """Generate a unique key keeping the file extension, to avoid collisions."""
+    return f"{uuid.uuid4()}{os.path.splitext(filename)[1]}"
+
+def public_url(bucket_name: str, s3_key: str) -> str:
+    return f"http://{config.storage.endpoint}/{bucket_name}/{s3_key}"
+
 class StorageService:
     def __init__(self):
-        # S3-compatible storage configuration
-        self.s3_client = boto3.client(
-            's3',
-            endpoint_url=f"http://{config.storage.endpoint}",
-            aws_access_key_id=config.storage.access_key,
-            aws_secret_access_key=config.storage.secret_key,
-            region_name=config.storage.region,
-            config=BotoConfig(
-                signature_version='s3v4',
-                retries={'max_attempts': 3}
-            ),
-            use_ssl=config.storage.use_ssl
-        )
         self.bucket_name = config.storage.bucket_name
+        self._s3_client = None
+        self._client_pid = None
+
+    @property
+    def s3_client(self):
+        """
+        S3 client, created on first use and again in every forked process.
+
+        boto3 is imported here rather than with the module: it is the largest
+        import of the application and only upload, delete and backfill need it.
+        A client built before a fork shares its connection pool with the
+        parent, so each worker process builds its own.
+        """
+        if self._s3_client is None or self._client_pid != os.getpid():
+            import boto3
+            from botocore.config import Config as BotoConfig
+
+            # S3-compatible storage configuration
+            self._s3_client = boto3.client(
+                's3',
+                endpoint_url=f"http://{config.storage.endpoint}",
+                aws_access_key_id=config.storage.access_key,
+                aws_secret_access_key=config.storage.secret_key,
+                region_name=config.storage.region,
+                config=BotoConfig(
+                    signature_version='s3v4',
+                    retries={'max_attempts': 3}
+                ),
+                use_ssl=config.storage.use_ssl
+            )
+            instrument_s3_client(self._s3_client)
+            self._client_pid = os.getpid()
+        return self._s3_client
 
     def _ensure_bucket_exists(self) -> None:
         """
         Ensure the storage bucket exists, create it if it doesn't.
         """
+        from botocore.exceptions import ClientError
+
         try:
             self.s3_client.head_bucket(Bucket=self.bucket_name)
             return  # Bucket exists, we can return early
@@ -63,8 +110,7 @@ class StorageService:
             self._ensure_bucket_exists()
             
             # Generate a unique filename to avoid collisions
-            extension = os.path.splitext(filename)[1]
-            s3_key = f"{uuid.uuid4()}{extension}"
+            s3_key = new_object_key(filename)
             
             # Upload the file
             self.s3_client.upload_fileobj(
@@ -75,7 +121,7 @@ class StorageService:
             )
             
             # Generate the public URL
-            url = f"http://{config.storage.endpoint}/{self.bucket_name}/{s3_key}"
+            url = public_url(self.bucket_name, s3_key)
             
             return s3_key, url
         except Exception as e:
@@ -99,13 +145,183 @@ class StorageService:
         except Exception as e:
             raise Exception(f"Failed to delete file: {str(e)}")
 
+    def delete_files(self, s3_keys: Iterable[str]) -> List[str]:
+        """
+        Delete many files from storage, DELETE_BATCH_SIZE keys per request.
+        
+        Deleting a key that does not exist succeeds, so an interrupted call can
+        simply be repeated.
+        
+        Args:
+            s3_keys: The keys of the files to delete
+        
+        Returns:
+            The keys that could not be deleted
+        """
+        try:
+            self._ensure_bucket_exists()
+
+            s3_keys = list(s3_keys)
+            failed = []
+            for offset in range(0, len(s3_keys), DELETE_BATCH_SIZE):
+                response = self.s3_client.delete_objects(
+                    Bucket=self.bucket_name,
+                    Delete={
+                        'Objects': [{'Key': key} for key in s3_keys[offset:offset + DELETE_BATCH_SIZE]],
+                        'Quiet': True
+                    }
+                )
+                failed.extend(error['Key'] for error in response.get('Errors', []))
+            return failed
+        except Exception as e:
+            raise Exception(f"Failed to delete files: {str(e)}")
+
+    def create_multipart_upload(self, filename: str) -> Tuple[str, str]:
+        """
+        Start a multipart upload of a new file.
+
+        Args:
+            filename: Name of the uploaded file, whose extension the key keeps
+
+        Returns:
+            Tuple of the key of the file and the id of the multipart upload
+        """
+        try:
+            self._ensure_bucket_exists()
+
+            s3_key = new_object_key(filename)
+            response = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=s3_key,
+                ContentType=self._get_content_type(filename)
+            )
+            return s3_key, response['UploadId']
+        except Exception as e:
+            raise Exception(f"Failed to start upload: {str(e)}")
+
+    def upload_part(self, s3_key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        """
+        Upload one part of a multipart upload.
+
+        Uploading a part number again replaces the part, so a chunk whose
+        response was lost can simply be sent again.
+
+        Args:
+            s3_key: The key of the file
+            upload_id: The id of the multipart upload
+            part_number: 1-based position of the part
+            data: Content of the part
+
+        Returns:
+            The ETag of the part, needed to complete the upload
+        """
+        try:
+            response = self.s3_client.upload_part(
+                Bucket=self.bucket_name,
+                Key=s3_key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=data
+            )
+            return response['ETag']
+        except Exception as e:
+            raise Exception(f"Failed to upload part: {str(e)}")
+
+    def complete_multipart_upload(self, s3_key: str, upload_id: str, parts: List[Tuple[int, str]]) -> str:
+        """
+        Assemble the parts of a multipart upload into the file.
+
+        Args:
+            s3_key: The key of the file
+            upload_id: The id of the multipart upload
+            parts: Part numbers and ETags, in order
+
+        Returns:
+            The public URL of the file
+        """
+        try:
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=s3_key,
+                UploadId=upload_id,
+                MultipartUpload={'Parts': [{'PartNumber': number, 'ETag': etag} for number, etag in parts]}
+            )
+            return public_url(self.bucket_name, s3_key)
+        except Exception as e:
+            raise Exception(f"Failed to complete upload: {str(e)}")
+
+    def abort_multipart_upload(self, s3_key: str, upload_id: str) -> None:
+        """
+        Abort a multipart upload, freeing the storage of its parts.
+
+        Aborting an upload that no longer exists succeeds.
+        """
+        from botocore.exceptions import ClientError
+
+        try:
+            self.s3_client.abort_multipart_upload(Bucket=self.bucket_name, Key=s3_key, UploadId=upload_id)
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'NoSuchUpload':
+                raise Exception(f"Failed to abort upload: {str(e)}")
+
+    def list_multipart_uploads(self) -> Iterator[Tuple[str, str, datetime]]:
+        """
+        List the multipart uploads in progress in the bucket.
+
+        Returns:
+            Iterator of the key, upload id and start time of each upload
+        """
+        try:
+            paginator = self.s3_client.get_paginator('list_multipart_uploads')
+            for page in paginator.paginate(Bucket=self.bucket_name):
+                for upload in page.get('Uploads', []):
+                    yield upload['Key'], upload['UploadId'], upload['Initiated']
+        except Exception as e:
+            raise Exception(f"Failed to list uploads: {str(e)}")
+
+    def read_range(self, s3_key: str, offset: int, length: int) -> bytes:
+        """
+        Read part of a file with a ranged GET request.
+
+        Args:
+            s3_key: The key of the file to read
+            offset: Position of the first byte
+            length: Number of bytes to read; fewer are returned past the end of the file
+
+        Returns:
+            The bytes read
+        """
+        try:
+            response = self.s3_client.get_object(
+                Bucket=self.bucket_name,
+                Key=s3_key,
+                Range=f"bytes={offset}-{offset + length - 1}"
+            )
+            return response['Body'].read()
+        except Exception as e:
+            raise Exception(f"Failed to read file: {str(e)}")
+
+    def stream_file(self, s3_key: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Tuple[Iterator[bytes], str, int]:
+        """
+        Open a file for streaming without reading it into memory.
+
+        Args:
+            s3_key: The key of the file to read
+            chunk_size: Bytes per chunk
+
+        Returns:
+            Tuple of the chunk iterator, the content type and the size in bytes
+        """
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=s3_key)
+            return (
+                response['Body'].iter_chunks(chunk_size),
+                response.get('ContentType') or content_type(s3_key),
+                response['ContentLength']
+            )
+        except Exception as e:
+            raise Exception(f"Failed to read file: {str(e)}")
+
     def _get_content_type(self, filename: str) -> str:
         """Get the content type based on file extension."""
-        content_types = {
-            'jpg': 'image/jpeg',
-            'jpeg': 'image/jpeg',
-            'png': 'image/png',
-            'gif': 'image/gif'
-        }
-        extension = os.path.splitext(filename)[1].split('.')[-1]
-        return content_types.get(extension.lower(), 'application/octet-stream')
+        return content_type(filename)
@@ -0,0 +1,303 @@
+import math
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, BinaryIO, Dict, Optional
+from sqlalchemy.exc import IntegrityError
+from werkzeug.utils import secure_filename
+from core.services.service_context import ServiceContext
+from core.services.storage_service import StorageService, public_url
+from core.services.photo_service import PhotoService, ALLOWED_EXTENSIONS, allowed_file
+from core.services.exif_backfill_service import HEADER_BYTES
+from core.services.service_exceptions import NotFoundException, ConflictException
+from core.models.upload_session import UploadSession, UploadPart, UPLOADING, ASSEMBLED
+from core.infrastructure.exif_utils import extract_ranged_exif_data
+from utils.config import config
+
+# Largest number of parts of an S3 multipart upload
+MAX_PARTS = 10000
+
+def check_upload_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Check the types of the metadata of an upload, stored until the upload completes.
+
+    Returns:
+        The metadata, with the people as integer IDs
+
+    Raises:
+        ValueError: If title or description is not a string, tags not a list of
+            strings, people not a list of person IDs or location not an object
+    """
+    for name in ('title', 'description'):
+        if metadata.get(name) is not None and not isinstance(metadata[name], str):
+            raise ValueError(f"{name} must be a string")
+    tags = metadata.get('tags') or []
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        raise ValueError("tags must be a list of strings")
+    people = metadata.get('people') or []
+    if not isinstance(people, list) or any(isinstance(person_id, (bool, float)) for person_id in people):
+        raise ValueError("people must be a list of person IDs")
+    try:
+        people = [int(person_id) for person_id in people]
+    except (TypeError, ValueError):
+        raise ValueError("people must be a list of person IDs")
+    location = metadata.get('location')
+    if location is not None and not isinstance(location, dict):
+        raise ValueError("location must be an object or null")
+    return {**metadata, 'tags': tags, 'people': people, 'location': location}
+
+class UploadService:
+    """
+    Resumable photo uploads, for files too large to send in a single request.
+
+    The client creates an upload with the size and metadata of the file, then
+    sends chunks of chunkSize bytes (the last one shorter) at the current
+    offset. Each chunk is stored straight away as the next part of an S3
+    multipart upload and recorded in upload_parts, so after an interruption the
+    client asks for the offset and resumes from there. Completing the upload
+    assembles the parts and creates the Photo. Uploads idle for longer than
+    the expiry are aborted by sweep_expired_uploads (scripts/sweep_uploads.py).
+    """
+
+    def __init__(self, context: ServiceContext, photo_service: PhotoService = None,
+                 chunk_size: int = None, max_size: int = None, expiry_hours: int = None):
+        self.db = context.db
+        self.photo_service = photo_service or PhotoService(context)
+        self.storage = None  # Will be initialized on first use
+        self.chunk_size = chunk_size or config.upload_chunk_size
+        self.max_size = max_size or config.upload_max_size
+        self.expiry = timedelta(hours=expiry_hours or config.upload_expiry_hours)
+
+    def create_upload(self, filename: str, size: int, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Start a resumable upload.
+
+        Args:
+            filename: Name of the file
+            size: Size of the file in bytes
+            metadata: Metadata of the photo, as for PhotoService.upload_photo
+
+        Returns:
+            Dictionary containing id, fileName, size, chunkSize, offset (0), status and expiresAt
+
+        Raises:
+            ValueError: If the file type or size is not accepted, or the metadata
+                has the wrong types
+        """
+        filename = secure_filename(filename or '')
+        if not allowed_file(filename):
+            raise ValueError(f"Invalid file type. Allowed types: {ALLOWED_EXTENSIONS}")
+        if not isinstance(size, int) or isinstance(size, bool) or size < 1:
+            raise ValueError("size must be a positive integer")
+        if size > self.max_size:
+            raise ValueError(f"File too large: {size} bytes, at most {self.max_size} accepted")
+        if math.ceil(size / self.chunk_size) > MAX_PARTS:
+            raise ValueError(f"File too large for chunks of {self.chunk_size} bytes")
+        metadata = check_upload_metadata(metadata)
+
+        try:
+            s3_key, s3_upload_id = self._storage().create_multipart_upload(filename)
+            session = UploadSession(
+                id=str(uuid.uuid4()),
+                file_name=filename,
+                s3_key=s3_key,
+                s3_upload_id=s3_upload_id,
+                size=size,
+                chunk_size=self.chunk_size,
+                photo_metadata=metadata,
+                status=UPLOADING
+            )
+            self.db.session.add(session)
+            self.db.session.commit()
+            return session.to_dict(self.expiry)
+        except Exception as e:
+            self.db.session.rollback()
+            # Abort the multipart upload if the session could not be stored
+            if 's3_upload_id' in locals():
+                try:
+                    self.storage.abort_multipart_upload(s3_key, s3_upload_id)
+                except Exception:
+                    pass  # Best effort cleanup, the sweeper aborts it otherwise
+            raise Exception(f"Failed to create upload: {str(e)}")
+
+    def get_upload(self, upload_id: str) -> Dict[str, Any]:
+        """
+        Get the state of an upload, with the offset to resume from.
+
+        Raises:
+            NotFoundException: If the upload does not exist (completed, aborted or expired)
+        """
+        return self._get_session(upload_id).to_dict(self.expiry)
+
+    def upload_chunk(self, upload_id: str, offset: int, stream: BinaryIO, length: Optional[int]) -> Dict[str, Any]:
+        """
+        Store the chunk of an upload starting at offset.
+
+        The length announced for the chunk is checked before anything is read,
+        so a body larger than a chunk is never loaded into memory.
+
+        Args:
+            upload_id: ID of the upload
+            offset: Position of the chunk in the file, which must be the current offset
+            stream: Stream of the chunk: chunkSize bytes, or the rest of the file for the last chunk
+            length: Announced length of the chunk (the Content-Length of the request)
+
+        Returns:
+            The state of the upload, with the new offset
+
+        Raises:
+            NotFoundException: If the upload does not exist
+            ConflictException: If offset is not the current offset, or the file was already received
+            ValueError: If the chunk does not have the expected size
+        """
+        session = self._get_session(upload_id)
+        current = session.offset
+        if session.status != UPLOADING or current == session.size:
+            raise ConflictException(f"All {session.size} bytes of upload {upload_id} were received")
+        if offset != current:
+            raise ConflictException(f"Upload {upload_id} is at offset {current}, not {offset}")
+        expected = min(session.chunk_size, session.size - current)
+        if length is None:
+            raise ValueError(f"The length of the chunk at offset {offset} must be given, {expected} bytes")
+        if length != expected:
+            raise ValueError(f"The chunk at offset {offset} must hold {expected} bytes, not {length}")
+        data = stream.read(length)
+        if len(data) != length:
+            raise ValueError(f"The chunk at offset {offset} ended after {len(data)} of {length} bytes")
+
+        try:
+            part_number = len(session.parts) + 1
+            etag = self._storage().upload_part(session.s3_key, session.s3_upload_id, part_number, data)
+            session.parts.append(UploadPart(part_number=part_number, etag=etag, size=len(data)))
+            session.updated_at = datetime.now(timezone.utc)
+            self.db.session.commit()
+            return session.to_dict(self.expiry)
+        except IntegrityError:
+            # Another request stored this part first
+            self.db.session.rollback()
+            raise ConflictException(f"The chunk at offset {offset} of upload {upload_id} was already received")
+        except Exception as e:
+            self.db.session.rollback()
+            raise Exception(f"Failed to upload chunk: {str(e)}")
+
+    def complete_upload(self, upload_id: str) -> Dict[str, Any]:
+        """
+        Assemble the chunks of an upload and create its photo.
+
+        Completing again after a failure resumes where the previous call stopped.
+
+        Returns:
+            The new photo
+
+        Raises:
+            NotFoundException: If the upload does not exist
+            ConflictException: If chunks are missing
+        """
+        session = self._get_session(upload_id)
+        if session.status == UPLOADING:
+            if session.offset != session.size:
+                raise ConflictException(
+                    f"Upload {upload_id} received {session.offset} of {session.size} bytes"
+                )
+            try:
+                self._storage().complete_multipart_upload(
+                    session.s3_key, session.s3_upload_id, [(part.part_number, part.etag) for part in session.parts]
+                )
+                session.status = ASSEMBLED
+                session.updated_at = datetime.now(timezone.utc)
+                self.db.session.commit()
+            except Exception as e:
+                self.db.session.rollback()
+                raise Exception(f"Failed to complete upload: {str(e)}")
+
+        try:
+            exif_data = extract_ranged_exif_data(
+                lambda offset, length: self._storage().read_range(session.s3_key, offset, length), HEADER_BYTES
+            )
+            url = public_url(self.storage.bucket_name, session.s3_key)
+            new_photo = self.photo_service.add_photo(
+                session.file_name, session.s3_key, url, session.photo_metadata, exif_data
+            )
+            self.db.session.delete(session)
+            self.photo_service._photos_changed()
+            self.db.session.commit()
+            return new_photo.to_dict()
+        except Exception as e:
+            self.db.session.rollback()
+            raise Exception(f"Failed to complete upload: {str(e)}")
+
+    def abort_upload(self, upload_id: str) -> None:
+        """
+        Abort an upload and free the storage of its chunks.
+
+        Raises:
+            NotFoundException: If the upload does not exist
+        """
+        session = self._get_session(upload_id)
+        try:
+            self._discard(session)
+            self.db.session.commit()
+        except Exception as e:
+            self.db.session.rollback()
+            raise Exception(f"Failed to abort upload: {str(e)}")
+
+    def sweep_expired_uploads(self) -> Dict[str, int]:
+        """
+        Abort the uploads idle for longer than the expiry.
+
+        Multipart uploads of the bucket that have no session (their session
+        could not be stored) are aborted as well once they are as old. Each
+        upload is committed on its own, so an interrupted sweep is resumed by
+        running it again.
+
+        Returns:
+            Dictionary containing:
+                - expired: int - Sessions aborted
+                - orphaned: int - Multipart uploads without a session aborted
+                - failed: int - Uploads that could not be aborted, left for the next sweep
+        """
+        cutoff = datetime.now(timezone.utc) - self.expiry
+        result = {'expired': 0, 'orphaned': 0, 'failed': 0}
+        try:
+            expired = self.db.session.query(UploadSession).filter(UploadSession.updated_at < cutoff).all()
+            for session in expired:
+                try:
+                    self._discard(session)
+                    self.db.session.commit()
+                    result['expired'] += 1
+                except Exception:
+                    self.db.session.rollback()
+                    result['failed'] += 1
+
+            known = {row.s3_upload_id for row in self.db.session.query(UploadSession.s3_upload_id)}
+            for s3_key, s3_upload_id, initiated in self._storage().list_multipart_uploads():
+                if initiated >= cutoff or s3_upload_id in known:
+                    continue
+                try:
+                    self.storage.abort_multipart_upload(s3_key, s3_upload_id)
+                    result['orphaned'] += 1
+                except Exception:
+                    result['failed'] += 1
+            return result
+        except Exception as e:
+            self.db.session.rollback()
+            raise Exception(f"Failed to sweep uploads: {str(e)}")
+
+    def _get_session(self, upload_id: str) -> UploadSession:
+        session = self.db.session.get(UploadSession, upload_id)
+        if session is None:
+            raise NotFoundException(f"Upload {upload_id} not found")
+        return session
+
+    def _discard(self, session: UploadSession) -> None:
+        """Free the storage of an upload and delete its session, without committing."""
+        if session.status == UPLOADING:
+            self._storage().abort_multipart_upload(session.s3_key, session.s3_upload_id)
+        else:
+            # The parts were already assembled into the file
+            self._storage().delete_file(session.s3_key)
+        self.db.session.delete(session)
+
+    def _storage(self) -> StorageService:
+        if self.storage is None:
+            self.storage = StorageService()
+        return self.storage
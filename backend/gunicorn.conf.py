@@ -0,0 +1,27 @@
+"""Gunicorn settings for the API.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+The app is loaded once in the master (preload_app) and forked into the
+workers, which start without importing anything. Database engines drop the
+inherited connections after the fork (ServiceContext.reset_after_fork) and
+the S3 client is built again in each worker (StorageService.s3_client).
+
+With METRICS_DIR set, the workers publish their metrics and slow queries
+there; the snapshots of a previous run are removed when the server starts.
+"""
+import glob
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', str(multiprocessing.cpu_count() * 2 + 1)))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+preload_app = True
+
+def on_starting(server):
+    """Remove the metrics snapshots left by a previous run of the server."""
+    metrics_dir = os.getenv('METRICS_DIR')
+    if metrics_dir:
+        for path in glob.glob(os.path.join(metrics_dir, '*.json')):
+            os.unlink(path)
@@ -0,0 +1,58 @@
+"""Alembic environment: runs the migrations against DATABASE_URL."""
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import engine_from_config, pool
+
+from utils.config import config as app_config
+from core.models.db import db
+# Register every table on db.metadata
+import core.models.photo  # noqa: F401
+import core.models.person  # noqa: F401
+import core.models.tag  # noqa: F401
+import core.models.relationship  # noqa: F401
+import core.models.aggregates  # noqa: F401
+import core.models.duplicate_candidate  # noqa: F401
+import core.models.upload_session  # noqa: F401
+import core.models.cache_generation  # noqa: F401
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+if not config.get_main_option('sqlalchemy.url'):
+    # '%' is the interpolation character of the ini file
+    config.set_main_option('sqlalchemy.url', app_config.database.url.replace('%', '%%'))
+
+target_metadata = db.metadata
+
+def run_migrations_offline():
+    """Emit the migration SQL without connecting (alembic upgrade head --sql)."""
+    context.configure(
+        url=config.get_main_option('sqlalchemy.url'),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={'paramstyle': 'named'}
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    """Run the migrations in one transaction on a dedicated connection."""
+    connectable = engine_from_config(
+        config.get_section(config.config_ini_section, {}),
+        prefix='sqlalchemy.',
+        poolclass=pool.NullPool
+    )
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            render_as_batch=connection.dialect.name == 'sqlite'
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,36 @@
+"""Schema checks shared by the revisions.
+
+Databases created before the migration chain were built by db.create_all()
+and already hold some of the tables, columns and indexes the revisions add.
+The revisions skip those, so `alembic upgrade head` adopts such a database
+instead of failing on the first existing table.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+def has_table(table: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(table)
+
+def has_column(table: str, column: str) -> bool:
+    return column in {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+def create_table(table: str, *columns, **kwargs) -> bool:
+    """Create a table unless it exists; returns whether it was created."""
+    if has_table(table):
+        return False
+    op.create_table(table, *columns, **kwargs)
+    return True
+
+def add_column(table: str, column: sa.Column) -> None:
+    if not has_column(table, column.name):
+        op.add_column(table, column)
+
+def create_index(index: str, table: str, columns, **kwargs) -> None:
+    # IF NOT EXISTS rather than reflection, which skips expression indexes on SQLite
+    op.create_index(index, table, columns, if_not_exists=True, **kwargs)
+
+def drop_index(index: str, table: str) -> None:
+    op.drop_index(index, table_name=table, if_exists=True)
+
+def is_postgresql() -> bool:
+    return op.get_bind().dialect.name == 'postgresql'
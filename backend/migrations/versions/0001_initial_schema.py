@@ -0,0 +1,61 @@
+"""Initial schema: photos, people, tags and their links
+
+Revision ID: 0001_initial_schema
+Revises:
+Create Date: 2024-03-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from migrations.helpers import create_table
+
+# revision identifiers, used by Alembic.
+revision = '0001_initial_schema'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    create_table(
+        'tags',
+        sa.Column('name', sa.String(50), primary_key=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False)
+    )
+    create_table(
+        'people',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('first_name', sa.String(100), nullable=False),
+        sa.Column('last_name', sa.String(100), nullable=False),
+        sa.Column('birth_date', sa.Date()),
+        sa.Column('death_date', sa.Date()),
+        sa.Column('description', sa.Text())
+    )
+    create_table(
+        'photos',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('file_name', sa.String(255), nullable=False),
+        sa.Column('s3_key', sa.String(255), nullable=False, unique=True),
+        sa.Column('url', sa.String(1024), nullable=False),
+        sa.Column('title', sa.String(255)),
+        sa.Column('description', sa.Text()),
+        sa.Column('upload_date', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('date_taken', sa.DateTime(timezone=True)),
+        sa.Column('author', sa.String(255)),
+        sa.Column('location_name', sa.String(255)),
+        sa.Column('latitude', sa.Float()),
+        sa.Column('longitude', sa.Float())
+    )
+    create_table(
+        'photo_tags',
+        sa.Column('photo_id', sa.Integer(), sa.ForeignKey('photos.id'), primary_key=True),
+        sa.Column('tag_name', sa.String(50), sa.ForeignKey('tags.name'), primary_key=True)
+    )
+    create_table(
+        'photo_people',
+        sa.Column('photo_id', sa.Integer(), sa.ForeignKey('photos.id'), primary_key=True),
+        sa.Column('person_id', sa.Integer(), sa.ForeignKey('people.id'), primary_key=True)
+    )
+
+def downgrade():
+    for table in ('photo_people', 'photo_tags', 'photos', 'people', 'tags'):
+        op.drop_table(table)
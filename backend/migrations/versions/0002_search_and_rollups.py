@@ -0,0 +1,161 @@
+"""Name search indexes and photo rollups
+
+Adds the phonetic keys and trigram indexes used by people search, the
+per-person photo counts and co-occurrences, and the per-day timeline counts.
+Rollups created here are filled from the existing photos.
+
+Revision ID: 0002_search_and_rollups
+Revises: 0001_initial_schema
+Create Date: 2024-05-06 09:00:00.000000
+
+"""
+import unicodedata
+from collections import Counter
+from datetime import timezone
+from alembic import op
+import sqlalchemy as sa
+from migrations.helpers import create_table, add_column, create_index, drop_index, is_postgresql
+
+# revision identifiers, used by Alembic.
+revision = '0002_search_and_rollups'
+down_revision = '0001_initial_schema'
+branch_labels = None
+depends_on = None
+
+TRIGRAM_COLUMNS = ('first_name', 'last_name', 'description')
+
+# The revision works on its own copies of the tables and of the application logic
+# it needs, as they were when it was written, so that later changes to the
+# models and services cannot change what it does.
+people = sa.table('people', sa.column('id'), sa.column('first_name'), sa.column('last_name'),
+                  sa.column('first_name_phonetic'), sa.column('last_name_phonetic'), sa.column('photo_count'))
+photos = sa.table('photos', sa.column('id'), sa.column('date_taken', sa.DateTime(timezone=True)))
+photo_people = sa.table('photo_people', sa.column('photo_id'), sa.column('person_id'))
+photo_date_counts = sa.table('photo_date_counts', sa.column('year'), sa.column('month'), sa.column('day'),
+                             sa.column('count'))
+person_cooccurrences = sa.table('person_cooccurrences', sa.column('person_id'), sa.column('other_person_id'),
+                                sa.column('count'))
+
+# Soundex digit of each consonant (core.infrastructure.phonetic)
+_SOUNDEX_CODES = {
+    **dict.fromkeys('BFPV', '1'),
+    **dict.fromkeys('CGJKQSXZ', '2'),
+    **dict.fromkeys('DT', '3'),
+    'L': '4',
+    **dict.fromkeys('MN', '5'),
+    'R': '6'
+}
+
+def _phonetic_key(name):
+    """Soundex key of a name with its accents folded (core.infrastructure.phonetic.phonetic_key)."""
+    if not name:
+        return None
+    folded = ''.join(
+        char if 'a' <= char <= 'z' else ' '
+        for char in unicodedata.normalize('NFKD', name).lower()
+        if not unicodedata.combining(char)
+    )
+    letters = [char for char in folded.upper() if char != ' ']
+    if not letters:
+        return None
+    first = letters[0]
+    digits = []
+    previous = _SOUNDEX_CODES.get(first, '')
+    for char in letters[1:]:
+        if char in 'HW':
+            continue
+        code = _SOUNDEX_CODES.get(char, '')
+        if code and code != previous:
+            digits.append(code)
+        previous = code
+    return (first + ''.join(digits) + '000')[:4]
+
+def _fill_phonetic_keys():
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(people.c.id, people.c.first_name, people.c.last_name)
+        .where(people.c.first_name_phonetic.is_(None) & people.c.last_name_phonetic.is_(None))
+    ).all()
+    if rows:
+        connection.execute(
+            people.update().where(people.c.id == sa.bindparam('person_id')),
+            [{'person_id': person_id,
+              'first_name_phonetic': _phonetic_key(first_name),
+              'last_name_phonetic': _phonetic_key(last_name)} for person_id, first_name, last_name in rows]
+        )
+
+def _fill_timeline():
+    """Count the photos of each day, in UTC (core.services.aggregate_index.rebuild_timeline)."""
+    connection = op.get_bind()
+    days = Counter()
+    for (date_taken,) in connection.execute(sa.select(photos.c.date_taken).where(photos.c.date_taken.isnot(None))):
+        if date_taken.tzinfo is not None:
+            date_taken = date_taken.astimezone(timezone.utc)
+        days[date_taken.year, date_taken.month, date_taken.day] += 1
+    if days:
+        connection.execute(photo_date_counts.insert(), [
+            {'year': year, 'month': month, 'day': day, 'count': count} for (year, month, day), count in days.items()
+        ])
+
+def _fill_person_index():
+    """Count the photos and co-occurrences of each person (core.services.aggregate_index.rebuild_person_index)."""
+    connection = op.get_bind()
+    photo_count = (
+        sa.select(sa.func.count())
+        .where(photo_people.c.person_id == people.c.id)
+        .scalar_subquery()
+    )
+    connection.execute(people.update().values(photo_count=photo_count))
+    left, right = photo_people.alias('left_link'), photo_people.alias('right_link')
+    pairs = (
+        sa.select(left.c.person_id, right.c.person_id, sa.func.count())
+        .join(right, (right.c.photo_id == left.c.photo_id) & (right.c.person_id != left.c.person_id))
+        .group_by(left.c.person_id, right.c.person_id)
+    )
+    connection.execute(person_cooccurrences.insert().from_select(['person_id', 'other_person_id', 'count'], pairs))
+
+def upgrade():
+    if is_postgresql():
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    add_column('people', sa.Column('photo_count', sa.Integer(), nullable=False, server_default='0'))
+    add_column('people', sa.Column('first_name_phonetic', sa.String(4)))
+    add_column('people', sa.Column('last_name_phonetic', sa.String(4)))
+    create_index('ix_people_first_name_phonetic', 'people', ['first_name_phonetic'])
+    create_index('ix_people_last_name_phonetic', 'people', ['last_name_phonetic'])
+    for column in TRIGRAM_COLUMNS:
+        create_index(f'ix_people_{column}_trgm', 'people', [column],
+                     postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'})
+    _fill_phonetic_keys()
+
+    timeline_created = create_table(
+        'photo_date_counts',
+        sa.Column('year', sa.Integer(), primary_key=True),
+        sa.Column('month', sa.Integer(), primary_key=True),
+        sa.Column('day', sa.Integer(), primary_key=True),
+        sa.Column('count', sa.Integer(), nullable=False)
+    )
+    cooccurrences_created = create_table(
+        'person_cooccurrences',
+        sa.Column('person_id', sa.Integer(), sa.ForeignKey('people.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('other_person_id', sa.Integer(), sa.ForeignKey('people.id', ondelete='CASCADE'),
+                  primary_key=True),
+        sa.Column('count', sa.Integer(), nullable=False)
+    )
+
+    if timeline_created:
+        _fill_timeline()
+    if cooccurrences_created:
+        _fill_person_index()
+
+def downgrade():
+    op.drop_table('person_cooccurrences')
+    op.drop_table('photo_date_counts')
+    for column in TRIGRAM_COLUMNS:
+        drop_index(f'ix_people_{column}_trgm', 'people')
+    drop_index('ix_people_last_name_phonetic', 'people')
+    drop_index('ix_people_first_name_phonetic', 'people')
+    with op.batch_alter_table('people') as batch:
+        batch.drop_column('last_name_phonetic')
+        batch.drop_column('first_name_phonetic')
+        batch.drop_column('photo_count')
@@ -0,0 +1,94 @@
+"""Family graph: relationships, ancestry closure and duplicate candidates
+
+Revision ID: 0003_family_graph
+Revises: 0002_search_and_rollups
+Create Date: 2024-07-15 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from migrations.helpers import create_table, create_index
+
+# revision identifiers, used by Alembic.
+revision = '0003_family_graph'
+down_revision = '0002_search_and_rollups'
+branch_labels = None
+depends_on = None
+
+# Copies of the tables as of this revision, independent of the models
+relationships = sa.table('relationships', sa.column('person_id'), sa.column('relative_id'),
+                         sa.column('relationship_type'))
+person_ancestry = sa.table('person_ancestry', sa.column('ancestor_id'), sa.column('descendant_id'),
+                           sa.column('depth'))
+# Deepest lineage followed when filling the closure
+MAX_DEPTH = 200
+
+def _fill_ancestry():
+    """
+    Fill the closure table from the parent relationships, one generation at a
+    time (core.services.ancestry_index.rebuild_ancestry as of this revision).
+    """
+    connection = op.get_bind()
+    parent = relationships.c.relationship_type == 'parent'
+    connection.execute(person_ancestry.insert().from_select(
+        ['ancestor_id', 'descendant_id', 'depth'],
+        sa.select(relationships.c.person_id, relationships.c.relative_id, sa.literal(1)).where(parent)
+    ))
+    for depth in range(2, MAX_DEPTH + 1):
+        current = person_ancestry.alias('current_level')
+        known = person_ancestry.alias('known')
+        next_level = (
+            sa.select(current.c.ancestor_id, relationships.c.relative_id, sa.literal(depth))
+            .join(relationships, (relationships.c.person_id == current.c.descendant_id) & parent)
+            .where(current.c.depth == depth - 1)
+            .where(current.c.ancestor_id != relationships.c.relative_id)
+            .where(~sa.exists().where(
+                (known.c.ancestor_id == current.c.ancestor_id) & (known.c.descendant_id == relationships.c.relative_id)
+            ))
+            .group_by(current.c.ancestor_id, relationships.c.relative_id)
+        )
+        inserted = connection.execute(
+            person_ancestry.insert().from_select(['ancestor_id', 'descendant_id', 'depth'], next_level)
+        ).rowcount
+        if not inserted:
+            break
+
+def _person_column(name):
+    return sa.Column(name, sa.Integer(), sa.ForeignKey('people.id', ondelete='CASCADE'), primary_key=True)
+
+def upgrade():
+    create_table(
+        'relationships',
+        _person_column('person_id'),
+        _person_column('relative_id'),
+        sa.Column('relationship_type', sa.String(20), primary_key=True)
+    )
+    create_index('ix_relationships_relative', 'relationships', ['relative_id', 'relationship_type', 'person_id'])
+
+    ancestry_created = create_table(
+        'person_ancestry',
+        _person_column('ancestor_id'),
+        _person_column('descendant_id'),
+        sa.Column('depth', sa.Integer(), nullable=False)
+    )
+    create_index('ix_person_ancestry_descendant', 'person_ancestry', ['descendant_id', 'depth', 'ancestor_id'])
+    if ancestry_created:
+        _fill_ancestry()
+
+    create_table(
+        'duplicate_candidates',
+        _person_column('person_id'),
+        _person_column('other_person_id'),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('name_score', sa.Float(), nullable=False),
+        sa.Column('date_score', sa.Float(), nullable=False),
+        sa.Column('companion_score', sa.Float(), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('detected_at', sa.DateTime(timezone=True), nullable=False)
+    )
+    create_index('ix_duplicate_candidates_status_score', 'duplicate_candidates', ['status', 'score'])
+
+def downgrade():
+    op.drop_table('duplicate_candidates')
+    op.drop_table('person_ancestry')
+    op.drop_table('relationships')
@@ -0,0 +1,75 @@
+"""Camera settings of photos and per-camera counts
+
+Revision ID: 0004_photo_camera_metadata
+Revises: 0003_family_graph
+Create Date: 2024-09-02 09:00:00.000000
+
+"""
+from collections import Counter
+from alembic import op
+import sqlalchemy as sa
+from migrations.helpers import create_table, add_column, create_index, drop_index
+
+# revision identifiers, used by Alembic.
+revision = '0004_photo_camera_metadata'
+down_revision = '0003_family_graph'
+branch_labels = None
+depends_on = None
+
+CAMERA_COLUMNS = (
+    ('camera_make', sa.String(100)),
+    ('camera_model', sa.String(100)),
+    ('focal_length', sa.Float()),
+    ('f_number', sa.Float()),
+    ('exposure_time', sa.Float()),
+    ('iso', sa.Integer())
+)
+RANGE_INDEXES = ('iso', 'focal_length', 'f_number')
+
+# Copies of the tables as of this revision, independent of the models
+photos = sa.table('photos', sa.column('camera_make'), sa.column('camera_model'))
+photo_camera_counts = sa.table('photo_camera_counts', sa.column('camera_make'), sa.column('camera_model'),
+                               sa.column('count'))
+
+def _fill_camera_counts():
+    """
+    Count the photos of each camera, unknown values stored as ''
+    (core.services.aggregate_index.rebuild_camera_counts as of this revision).
+    """
+    connection = op.get_bind()
+    cameras = Counter()
+    rows = connection.execute(
+        sa.select(photos.c.camera_make, photos.c.camera_model, sa.func.count())
+        .group_by(photos.c.camera_make, photos.c.camera_model)
+    )
+    for camera_make, camera_model, count in rows:
+        cameras[camera_make or '', camera_model or ''] += count
+    if cameras:
+        connection.execute(photo_camera_counts.insert(), [
+            {'camera_make': camera_make, 'camera_model': camera_model, 'count': count}
+            for (camera_make, camera_model), count in cameras.items()
+        ])
+
+def upgrade():
+    for name, type_ in CAMERA_COLUMNS:
+        add_column('photos', sa.Column(name, type_))
+    for column in RANGE_INDEXES:
+        create_index(f'ix_photos_{column}', 'photos', [column])
+    create_index('ix_photos_camera', 'photos', [sa.text('lower(camera_make)'), sa.text('lower(camera_model)')])
+    create_index('ix_photos_camera_model', 'photos', [sa.text('lower(camera_model)')])
+
+    if create_table(
+        'photo_camera_counts',
+        sa.Column('camera_make', sa.String(100), primary_key=True),
+        sa.Column('camera_model', sa.String(100), primary_key=True),
+        sa.Column('count', sa.Integer(), nullable=False)
+    ):
+        _fill_camera_counts()
+
+def downgrade():
+    op.drop_table('photo_camera_counts')
+    for index in ('ix_photos_camera_model', 'ix_photos_camera') + tuple(f'ix_photos_{c}' for c in RANGE_INDEXES):
+        drop_index(index, 'photos')
+    with op.batch_alter_table('photos') as batch:
+        for name, _ in reversed(CAMERA_COLUMNS):
+            batch.drop_column(name)
@@ -0,0 +1,45 @@
+"""Resumable upload sessions and their parts
+
+Revision ID: 0005_upload_sessions
+Revises: 0004_photo_camera_metadata
+Create Date: 2024-10-07 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from migrations.helpers import create_table, create_index
+
+# revision identifiers, used by Alembic.
+revision = '0005_upload_sessions'
+down_revision = '0004_photo_camera_metadata'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    create_table(
+        'upload_sessions',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('file_name', sa.String(255), nullable=False),
+        sa.Column('s3_key', sa.String(255), nullable=False, unique=True),
+        sa.Column('s3_upload_id', sa.String(1024), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('chunk_size', sa.Integer(), nullable=False),
+        sa.Column('photo_metadata', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False)
+    )
+    create_index('ix_upload_sessions_updated_at', 'upload_sessions', ['updated_at'])
+
+    create_table(
+        'upload_parts',
+        sa.Column('upload_id', sa.String(36), sa.ForeignKey('upload_sessions.id', ondelete='CASCADE'),
+                  primary_key=True),
+        sa.Column('part_number', sa.Integer(), primary_key=True),
+        sa.Column('etag', sa.String(100), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False)
+    )
+
+def downgrade():
+    op.drop_table('upload_parts')
+    op.drop_table('upload_sessions')
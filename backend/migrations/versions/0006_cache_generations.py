@@ -0,0 +1,26 @@
+"""Generation counters of the process-local caches
+
+Revision ID: 0006_cache_generations
+Revises: 0005_upload_sessions
+Create Date: 2024-10-21 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from migrations.helpers import create_table
+
+# revision identifiers, used by Alembic.
+revision = '0006_cache_generations'
+down_revision = '0005_upload_sessions'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    create_table(
+        'cache_generations',
+        sa.Column('name', sa.String(50), primary_key=True),
+        sa.Column('generation', sa.Integer(), nullable=False)
+    )
+
+def downgrade():
+    op.drop_table('cache_generations')
@@ -0,0 +1,58 @@
+"""Fill in the date taken, author, coordinates and camera of photos from their EXIF data.
+
+Photos uploaded before EXIF extraction read those fields carry the upload time
+as their date taken and no author or coordinates. Only the first bytes of each
+file are downloaded. Progress is saved to the checkpoint file after every batch,
+so an interrupted run is resumed by running the same command again.
+
+Usage:
+    python scripts/backfill_exif.py [--batch-size 500] [--processes 8] [--checkpoint exif_backfill.json]
+"""
+import argparse
+import os
+import sys
+
+# Add the backend directory to the Python path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from app import app
+from core.services.service_context import ServiceContext
+from core.services.exif_backfill_service import (
+    ExifBackfillService, BACKFILL_BATCH_SIZE, FETCH_THREADS, HEADER_BYTES
+)
+
+def report(totals):
+    print(f"Photo {totals['lastId']}: {totals['scanned']} scanned, {totals['updated']} updated, "
+          f"{totals['failed']} failed, {totals['photosPerSecond']} photos/s, "
+          f"{totals['bytesFetched'] / 1024 / 1024:.1f} MB fetched")
+
+def main():
+    """Run the backfill, resuming from the checkpoint when there is one"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=BACKFILL_BATCH_SIZE, help='Photos per batch')
+    parser.add_argument('--processes', type=int, help='Parsing processes (default: one per CPU)')
+    parser.add_argument('--fetch-threads', type=int, default=FETCH_THREADS, help='Concurrent ranged GET requests')
+    parser.add_argument('--header-bytes', type=int, default=HEADER_BYTES, help='Bytes fetched per file')
+    parser.add_argument('--checkpoint', default='exif_backfill.json', help='Checkpoint file')
+    args = parser.parse_args()
+
+    with app.app_context():
+        try:
+            result = ExifBackfillService(ServiceContext()).backfill(
+                batch_size=args.batch_size,
+                processes=args.processes,
+                fetch_threads=args.fetch_threads,
+                header_bytes=args.header_bytes,
+                checkpoint_path=args.checkpoint,
+                progress=report
+            )
+            print(f"Done in {result['elapsedSeconds']}s: {result['updated']} of {result['scanned']} "
+                  f"photos updated, {result['failed']} unreadable")
+        except Exception as e:
+            print(str(e))
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -94,8 +94,10 @@ def main():
         sys.exit(1)
     create_bucket()
     
-    # Start Flask from backend directory
+    # Start Flask from backend directory, with the schema migrated to the head revision
     os.chdir(backend_dir)
+    if os.system('alembic upgrade head') != 0:
+        sys.exit(1)
     os.system('python -m flask run --debug')
 
 if __name__ == '__main__':
@@ -0,0 +1,36 @@
+"""Scan every person for likely duplicates and store them for review.
+
+Run after large imports, or periodically; the candidates are listed by
+GET /persons/duplicates.
+
+Usage:
+    python scripts/find_duplicates.py [min_score]
+"""
+import os
+import sys
+
+# Add the backend directory to the Python path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from app import app
+from core.services.service_context import ServiceContext
+from core.services.duplicate_service import DuplicateService, DEFAULT_MIN_SCORE
+
+def main():
+    """Run a full duplicate scan"""
+    min_score = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_MIN_SCORE
+    with app.app_context():
+        try:
+            result = DuplicateService(ServiceContext()).scan_duplicates(min_score=min_score)
+            print(f"Scanned {result['people']} people with {result['comparisons']} comparisons")
+            print(f"Found {result['candidates']} duplicate candidates")
+            if result['skippedBlocks']:
+                print(f"Skipped {result['skippedBlocks']} oversized blocks")
+        except Exception as e:
+            print(str(e))
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
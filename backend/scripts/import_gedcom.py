@@ -0,0 +1,36 @@
+"""Import a GEDCOM file from the command line.
+
+Usage:
+    python scripts/import_gedcom.py path/to/tree.ged
+"""
+import os
+import sys
+
+# Add the backend directory to the Python path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from app import app
+from core.services.service_context import ServiceContext
+from core.services.gedcom_service import GedcomService
+from core.infrastructure.gedcom import decode_lines
+
+def main():
+    """Import the file given as first argument in a single transaction"""
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(2)
+    with app.app_context():
+        try:
+            with open(sys.argv[1], 'rb') as gedcom_file:
+                result = GedcomService(ServiceContext()).import_gedcom(decode_lines(gedcom_file))
+            print(f"Imported {result['people']} people and {result['relationships']} relationships")
+            if result['unresolvedReferences']:
+                print(f"Skipped {result['unresolvedReferences']} references to unknown individuals")
+        except Exception as e:
+            print(str(e))
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""Recompute the rollup tables from the source tables.
+
+Run once after deploying a new rollup table, or whenever one is suspected to
+have drifted from the data it summarizes.
+"""
+import os
+import sys
+
+# Add the backend directory to the Python path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from app import app
+from core.models.db import db
+from core.services.aggregate_index import rebuild_timeline, rebuild_camera_counts, rebuild_person_index
+from core.services.ancestry_index import rebuild_ancestry
+
+def main():
+    """Rebuild every rollup in a single transaction"""
+    with app.app_context():
+        try:
+            days = rebuild_timeline(db.session)
+            cameras = rebuild_camera_counts(db.session)
+            pairs = rebuild_person_index(db.session)
+            ancestry = rebuild_ancestry(db.session)
+            db.session.commit()
+            print(f"Timeline rebuilt: {days} days with photos")
+            print(f"Camera counts rebuilt: {cameras} cameras")
+            print(f"Person index rebuilt: {pairs} co-occurrence rows")
+            print(f"Ancestry closure rebuilt: {ancestry} rows")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Failed to rebuild aggregates: {str(e)}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Abort the resumable uploads abandoned for longer than UPLOAD_EXPIRY_HOURS.
+
+Frees the S3 storage of their parts and deletes their sessions, along with
+multipart uploads left in the bucket without a session. Run it periodically,
+from cron or with --interval to keep it running.
+
+Usage:
+    python scripts/sweep_uploads.py [--interval 3600]
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add the backend directory to the Python path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from app import app
+from core.services.service_context import ServiceContext
+from core.services.upload_service import UploadService
+
+def sweep(upload_service):
+    result = upload_service.sweep_expired_uploads()
+    print(f"{result['expired']} expired uploads and {result['orphaned']} orphaned multipart uploads aborted, "
+          f"{result['failed']} failed")
+    return result
+
+def main():
+    """Sweep once, or every --interval seconds"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--interval', type=int, help='Seconds between sweeps (default: sweep once)')
+    args = parser.parse_args()
+
+    with app.app_context():
+        upload_service = UploadService(ServiceContext())
+        while True:
+            try:
+                sweep(upload_service)
+            except Exception as e:
+                print(str(e))
+                if args.interval is None:
+                    sys.exit(1)
+            if args.interval is None:
+                break
+            time.sleep(args.interval)
+
+if __name__ == '__main__':
+    main()
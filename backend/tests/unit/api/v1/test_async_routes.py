@@ -0,0 +1,68 @@
+import asyncio
+from io import BytesIO
+import pytest
+from unittest.mock import patch, AsyncMock
+from werkzeug.datastructures import FileStorage
+
+pytest.importorskip('quart')
+from quart import Quart
+from api.v1.async_routes import async_api
+
+@pytest.fixture
+def app():
+    app = Quart(__name__)
+    app.register_blueprint(async_api)
+    return app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def mock_async_photo_service():
+    mock_instance = AsyncMock()
+    with patch('api.v1.async_routes.get_async_photo_service', return_value=mock_instance):
+        yield mock_instance
+
+def test_upload_photo(client, mock_async_photo_service):
+    # Arrange
+    mock_async_photo_service.upload_photo.return_value = {"id": 1}
+    
+    # Act
+    response = asyncio.run(client.post('/photos', form={'title': 'Picnic', 'tags[]': 'family'},
+                                       files={'photo': FileStorage(BytesIO(b'jpeg'), filename='picnic.jpg')}))
+    
+    # Assert
+    assert response.status_code == 200
+    content, filename, metadata = mock_async_photo_service.upload_photo.call_args.args
+    assert (content, filename) == (b'jpeg', 'picnic.jpg')
+    assert metadata['title'] == 'Picnic'
+
+def test_upload_photo_without_file(client, mock_async_photo_service):
+    response = asyncio.run(client.post('/photos', form={'title': 'Picnic'}))
+    
+    assert response.status_code == 400
+    assert asyncio.run(response.get_json())['error']['code'] == 'NO_PHOTO_PROVIDED'
+
+def test_search_with_facets_gathers_both(client, mock_async_photo_service):
+    # Arrange
+    mock_async_photo_service.search_photos.return_value = [{"id": 1}]
+    mock_async_photo_service.get_photo_facets.return_value = {"total": 1}
+    
+    # Act
+    response = asyncio.run(client.get('/photos/search?q=Paris&tags[]=family&facets=true'))
+    
+    # Assert
+    assert response.status_code == 200
+    assert asyncio.run(response.get_json())['data'] == {"photos": [{"id": 1}], "facets": {"total": 1}}
+    mock_async_photo_service.search_photos.assert_awaited_once_with(
+        'Paris', {'tags': ['family']}, page=1, per_page=50, sort='date'
+    )
+    mock_async_photo_service.get_photo_facets.assert_awaited_once_with({'tags': ['family']}, 'Paris')
+
+def test_get_photo_content_not_found(client, mock_async_photo_service):
+    mock_async_photo_service.get_photo_content.side_effect = ValueError("Photo with ID 1 not found")
+    
+    response = asyncio.run(client.get('/photos/1/content'))
+    
+    assert response.status_code == 404
@@ -1,3 +1,5 @@
+import io
+import json
 import pytest
 from unittest.mock import patch, Mock
 from flask import Flask
@@ -269,3 +271,227 @@ def test_list_persons_error(client, mock_person_service):
     assert response.status_code == 500
     assert response.json['success'] is False
     assert response.json['error']['code'] == 'INTERNAL_ERROR'
+
+def test_get_companions_success(client, mock_person_service):
+    # Arrange
+    mock_person_service.get_frequent_companions.return_value = [{'id': 2, 'sharedPhotoCount': 3}]
+    
+    # Act
+    response = client.get('/persons/1/companions?limit=5')
+    
+    # Assert
+    assert response.status_code == 200
+    assert response.json['data'] == [{'id': 2, 'sharedPhotoCount': 3}]
+    mock_person_service.get_frequent_companions.assert_called_once_with(1, limit=5)
+
+def test_get_companions_errors(client, mock_person_service):
+    assert client.get('/persons/1/companions?limit=0').status_code == 400
+    assert client.get('/persons/1/companions?limit=-3').json['error']['code'] == 'VALIDATION_ERROR'
+    mock_person_service.get_frequent_companions.assert_not_called()
+    mock_person_service.get_frequent_companions.side_effect = ValueError("Person 9 not found")
+    assert client.get('/persons/9/companions').status_code == 404
+    mock_person_service.get_frequent_companions.assert_called_once_with(9, limit=10)
+
+def test_add_relationship_success(client, mock_person_service):
+    # Arrange
+    mock_person_service.add_relationship.return_value = {'personId': 1, 'relativeId': 2, 'type': 'parent'}
+    
+    # Act
+    response = client.post('/persons/1/relationships', json={'relative_id': 2, 'type': 'parent'})
+    
+    # Assert
+    assert response.status_code == 200
+    mock_person_service.add_relationship.assert_called_once_with(1, 2, 'parent')
+
+def test_add_relationship_missing_fields(client, mock_person_service):
+    # Act
+    response = client.post('/persons/1/relationships', json={'type': 'parent'})
+    
+    # Assert
+    assert response.status_code == 400
+    assert response.json['error']['code'] == 'VALIDATION_ERROR'
+    mock_person_service.add_relationship.assert_not_called()
+
+def test_get_ancestors_success(client, mock_person_service):
+    # Arrange
+    mock_person_service.get_ancestors.return_value = [{'id': 2, 'generation': 1}]
+    
+    # Act
+    response = client.get('/persons/1/ancestors?depth=3')
+    
+    # Assert
+    assert response.status_code == 200
+    assert response.json['data'] == [{'id': 2, 'generation': 1}]
+    mock_person_service.get_ancestors.assert_called_once_with(1, max_depth=3)
+
+def test_get_descendants_not_found(client, mock_person_service):
+    # Arrange
+    mock_person_service.get_descendants.side_effect = ValueError("Person with id 1 not found")
+    
+    # Act
+    response = client.get('/persons/1/descendants')
+    
+    # Assert
+    assert response.status_code == 404
+    assert response.json['error']['code'] == 'NOT_FOUND'
+
+def test_get_kinship_success(client, mock_person_service):
+    # Arrange
+    mock_person_service.get_kinship.return_value = {'relationship': 'cousin', 'cousinDegree': 1}
+    
+    # Act
+    response = client.get('/persons/1/kinship/2')
+    
+    # Assert
+    assert response.status_code == 200
+    assert response.json['data']['relationship'] == 'cousin'
+    mock_person_service.get_kinship.assert_called_once_with(1, 2)
+
+def test_get_common_ancestors_not_found(client, mock_person_service):
+    # Arrange
+    mock_person_service.get_common_ancestors.side_effect = ValueError("Person with id 2 not found")
+    
+    # Act
+    response = client.get('/persons/1/common-ancestors/2')
+    
+    # Assert
+    assert response.status_code == 404
+    assert response.json['error']['code'] == 'NOT_FOUND'
+
+def test_get_family_tree_streams_ndjson(client, mock_person_service):
+    # Arrange
+    mock_person_service.iter_tree_layout.return_value = iter([
+        {'type': 'layout', 'rootId': 1, 'nodeCount': 1},
+        {'type': 'nodes', 'generation': 0, 'nodes': [{'id': 1}]}
+    ])
+    
+    # Act
+    response = client.get('/persons/1/tree?depth=2')
+    
+    # Assert
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line['type'] for line in lines] == ['layout', 'nodes']
+    mock_person_service.iter_tree_layout.assert_called_once_with(1, depth=2, chunk_size=200)
+
+def test_get_family_tree_not_found(client, mock_person_service):
+    # Arrange
+    mock_person_service.iter_tree_layout.side_effect = ValueError("Person with id 1 not found")
+    
+    # Act
+    response = client.get('/persons/1/tree')
+    
+    # Assert
+    assert response.status_code == 404
+
+@pytest.fixture
+def mock_gedcom_service(mock_service_context):
+    mock_instance = Mock()
+    with patch('api.v1.routes.get_gedcom_service', return_value=mock_instance):
+        yield mock_instance
+
+def test_import_gedcom_success(client, mock_gedcom_service):
+    # Arrange
+    mock_gedcom_service.import_gedcom.side_effect = lambda lines: {'people': len(list(lines))}
+    data = {'file': (io.BytesIO(b"0 HEAD\n0 TRLR\n"), 'tree.ged')}
+    
+    # Act
+    response = client.post('/persons/gedcom', data=data, content_type='multipart/form-data')
+    
+    # Assert
+    assert response.status_code == 200
+    assert response.json['data'] == {'people': 2}
+
+def test_import_gedcom_invalid_file(client, mock_gedcom_service):
+    # Arrange
+    mock_gedcom_service.import_gedcom.side_effect = lambda lines: {'people': len(list(lines))}
+    data = {'file': (io.BytesIO("0 HEAD\n1 CHAR UTF-8\n1 NOTE Hélène\n".encode('latin-1')), 'tree.ged')}
+    
+    # Act
+    response = client.post('/persons/gedcom', data=data, content_type='multipart/form-data')
+    
+    # Assert
+    assert response.status_code == 400
+    assert response.json['error']['code'] == 'VALIDATION_ERROR'
+
+def test_import_gedcom_no_file(client, mock_gedcom_service):
+    # Act
+    response = client.post('/persons/gedcom', data={}, content_type='multipart/form-data')
+    
+    # Assert
+    assert response.status_code == 400
+    assert response.json['error']['code'] == 'NO_FILE_PROVIDED'
+
+def test_export_gedcom_streams_file(client, mock_gedcom_service):
+    # Arrange
+    mock_gedcom_service.export_gedcom.return_value = iter(["0 HEAD\n", "0 TRLR\n"])
+    
+    # Act
+    response = client.get('/persons/gedcom')
+    
+    # Assert
+    assert response.status_code == 200
+    assert response.get_data(as_text=True) == "0 HEAD\n0 TRLR\n"
+    assert 'attachment' in response.headers['Content-Disposition']
+
+def test_create_persons_batch(client, mock_person_service):
+    # Arrange
+    mock_person_service.create_persons.return_value = {'results': [], 'succeeded': 2, 'failed': 0}
+    persons = [{'first_name': 'Jean', 'last_name': 'Marc'}, {'first_name': 'Anne', 'last_name': 'Marc'}]
+    
+    # Act
+    response = client.post('/persons/batch', json={'persons': persons, 'all_or_nothing': True})
+    
+    # Assert
+    assert response.status_code == 200
+    assert response.json['data']['succeeded'] == 2
+    mock_person_service.create_persons.assert_called_once_with(persons, all_or_nothing=True)
+
+def test_delete_persons_batch_validation_error(client, mock_person_service):
+    # Arrange
+    mock_person_service.delete_persons.side_effect = ValueError("Expected a list of items")
+    
+    # Act
+    response = client.delete('/persons/batch', json={})
+    
+    # Assert
+    assert response.status_code == 400
+    mock_person_service.delete_persons.assert_called_once_with(None, all_or_nothing=False)
+
+@pytest.fixture
+def mock_duplicate_service(mock_service_context):
+    mock_instance = Mock()
+    with patch('api.v1.routes.get_duplicate_service', return_value=mock_instance):
+        yield mock_instance
+
+def test_get_duplicate_candidates(client, mock_duplicate_service):
+    # Arrange
+    mock_duplicate_service.get_duplicate_candidates.return_value = [{'personId': 1, 'otherPersonId': 2, 'score': 0.9}]
+    
+    # Act
+    response = client.get('/persons/duplicates?min_score=0.8&limit=10')
+    
+    # Assert
+    assert response.status_code == 200
+    assert response.json['data'][0]['score'] == 0.9
+    mock_duplicate_service.get_duplicate_candidates.assert_called_once_with(min_score=0.8, limit=10, offset=0)
+
+def test_merge_persons_success(client, mock_person_service):
+    # Arrange
+    mock_person_service.merge_persons.return_value = {'person': {'id': 1}, 'movedPhotos': 3}
+    
+    # Act
+    response = client.post('/persons/1/merge', json={'person_id': 2})
+    
+    # Assert
+    assert response.status_code == 200
+    mock_person_service.merge_persons.assert_called_once_with(1, 2)
+
+def test_merge_persons_requires_person_id(client, mock_person_service):
+    # Act
+    response = client.post('/persons/1/merge', json={})
+    
+    # Assert
+    assert response.status_code == 400
+    mock_person_service.merge_persons.assert_not_called()
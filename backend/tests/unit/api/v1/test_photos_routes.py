@@ -89,3 +89,246 @@ def test_upload_photo_service_error(client, mock_photo_service):
     assert response.json['success'] is False
     assert response.json['error']['code'] == 'INTERNAL_ERROR'
     mock_photo_service.upload_photo.assert_called_once()
+
+def test_get_photos_with_facets(client, mock_photo_service):
+    # Arrange
+    mock_photo_service.get_photos.return_value = [{"id": 1}]
+    mock_photo_service.get_photo_facets.return_value = {"total": 1, "tags": []}
+    
+    # Act
+    response = client.get('/photos?tags[]=family&facets=true')
+    
+    # Assert
+    assert response.status_code == 200
+    assert response.json['data'] == {"photos": [{"id": 1}], "facets": {"total": 1, "tags": []}}
+    mock_photo_service.get_photo_facets.assert_called_once_with({'tags': ['family']})
+
+def test_search_photos_combines_query_and_criteria(client, mock_photo_service):
+    # Arrange
+    mock_photo_service.search_photos.return_value = [{"id": 1}]
+    
+    # Act
+    response = client.get('/photos/search?q=Paris&tags[]=family&page=2&per_page=10&sort=relevance')
+    
+    # Assert
+    assert response.status_code == 200
+    mock_photo_service.search_photos.assert_called_once_with(
+        'Paris', {'tags': ['family']}, page=2, per_page=10, sort='relevance'
+    )
+    mock_photo_service.get_photos.assert_not_called()
+
+def test_get_photo_content_streams_file(client, mock_photo_service):
+    # Arrange
+    mock_photo_service.get_photo_content.return_value = (iter([b"jpeg", b"data"]), 'image/jpeg', 8)
+    
+    # Act
+    response = client.get('/photos/1/content')
+    
+    # Assert
+    assert response.status_code == 200
+    assert response.data == b"jpegdata"
+    assert response.mimetype == 'image/jpeg'
+    assert response.headers['Content-Length'] == '8'
+    mock_photo_service.get_photo_content.assert_called_once_with(1)
+
+def test_get_photo_content_not_found(client, mock_photo_service):
+    # Arrange
+    mock_photo_service.get_photo_content.side_effect = ValueError("Photo with ID 1 not found")
+    
+    # Act
+    response = client.get('/photos/1/content')
+    
+    # Assert
+    assert response.status_code == 404
+    assert response.json['error']['code'] == 'NOT_FOUND'
+
+def test_get_timeline(client, mock_photo_service):
+    # Arrange
+    mock_photo_service.get_timeline.return_value = [{"year": 1998, "count": 2}]
+    
+    # Act
+    response = client.get('/photos/timeline?granularity=year&location=Paris')
+    
+    # Assert
+    assert response.status_code == 200
+    assert response.json['data'] == [{"year": 1998, "count": 2}]
+    mock_photo_service.get_timeline.assert_called_once_with({'location': 'Paris'}, granularity='year')
+
+def test_get_photos_with_camera_criteria(client, mock_photo_service):
+    # Arrange
+    mock_photo_service.get_photos.return_value = []
+    
+    # Act
+    response = client.get('/photos?camera_make=Nikon&camera_model=F3&min_iso=3200&max_f_number=2.8')
+    
+    # Assert
+    assert response.status_code == 200
+    criteria = mock_photo_service.get_photos.call_args.args[0]
+    assert criteria == {'camera_make': 'Nikon', 'camera_model': 'F3', 'min_iso': 3200, 'max_f_number': 2.8}
+
+def test_get_photos_invalid_exposure_range(client, mock_photo_service):
+    # Act
+    response = client.get('/photos?min_iso=high')
+    
+    # Assert
+    assert response.status_code == 400
+    mock_photo_service.get_photos.assert_not_called()
+
+def test_get_equipment_stats(client, mock_photo_service):
+    # Arrange
+    stats = {'total': 3, 'unknown': 1, 'makes': [{'make': 'Nikon', 'count': 2}],
+             'cameras': [{'make': 'Nikon', 'model': 'F3', 'count': 2}]}
+    mock_photo_service.get_equipment_stats.return_value = stats
+    
+    # Act
+    response = client.get('/photos/equipment')
+    
+    # Assert
+    assert response.status_code == 200
+    assert response.json['data'] == stats
+
+def test_tag_photos_success(client, mock_photo_service):
+    # Arrange
+    mock_photo_service.tag_photos.return_value = {'photos': 2, 'changed': 2, 'missingPhotoIds': []}
+    
+    # Act
+    response = client.post('/photos/batch/tags', json={'photo_ids': [1, 2], 'tags': ['family']})
+    
+    # Assert
+    assert response.status_code == 200
+    assert response.json['data']['changed'] == 2
+    mock_photo_service.tag_photos.assert_called_once_with([1, 2], ['family'])
+
+def test_add_people_to_photos_person_not_found(client, mock_photo_service):
+    # Arrange
+    mock_photo_service.add_people_to_photos.side_effect = ValueError("Person with id 9 not found")
+    
+    # Act
+    response = client.post('/photos/batch/people', json={'photo_ids': [1], 'person_ids': [9]})
+    
+    # Assert
+    assert response.status_code == 404
+    assert response.json['error']['code'] == 'NOT_FOUND'
+
+def test_delete_photos_success(client, mock_photo_service):
+    # Arrange
+    mock_photo_service.delete_photos.return_value = {'deleted': 2, 'missingPhotoIds': [], 'failedPhotoIds': []}
+    
+    # Act
+    response = client.delete('/photos/batch', json={'photo_ids': [1, 2]})
+    
+    # Assert
+    assert response.status_code == 200
+    assert response.json['data']['deleted'] == 2
+    mock_photo_service.delete_photos.assert_called_once_with([1, 2])
+
+def test_delete_photos_validation_error(client, mock_photo_service):
+    # Arrange
+    mock_photo_service.delete_photos.side_effect = ValueError("photo_ids must be a non-empty list")
+    
+    # Act
+    response = client.delete('/photos/batch', json={})
+    
+    # Assert
+    assert response.status_code == 400
+
+def test_get_db_pool_metrics(client):
+    # Arrange
+    context = Mock()
+    context.pool_status.return_value = {'pool': 'InstrumentedQueuePool', 'checkedOut': 2, 'saturation': 0.1}
+    
+    # Act
+    with patch('api.v1.routes.get_service_context', return_value=context):
+        response = client.get('/system/db-pool')
+    
+    # Assert
+    assert response.status_code == 200
+    assert response.json['data']['checkedOut'] == 2
+
+def test_get_slow_queries(client):
+    # Arrange
+    context = Mock()
+    context.slow_query_report.return_value = {'thresholdMs': 200, 'queries': [{'fingerprint': 'abc', 'count': 3}]}
+    
+    # Act
+    with patch('api.v1.routes.get_service_context', return_value=context):
+        response = client.get('/system/slow-queries?limit=5')
+    
+    # Assert
+    assert response.status_code == 200
+    assert response.json['data']['queries'][0]['count'] == 3
+    context.slow_query_report.assert_called_once_with(5)
+
+def test_get_slow_queries_invalid_limit(client):
+    with patch('api.v1.routes.get_service_context'):
+        response = client.get('/system/slow-queries?limit=0')
+    
+    assert response.status_code == 400
+
+@pytest.fixture
+def mock_upload_service():
+    mock_instance = Mock()
+    with patch('api.v1.routes.get_upload_service', return_value=mock_instance):
+        yield mock_instance
+
+def test_create_upload(client, mock_upload_service):
+    # Arrange
+    mock_upload_service.create_upload.return_value = {'id': 'u1', 'size': 10, 'chunkSize': 4, 'offset': 0}
+    
+    # Act
+    response = client.post('/photos/uploads', json={'filename': 'scan.tiff', 'size': 10, 'tags': ['wedding']})
+    
+    # Assert
+    assert response.status_code == 201
+    assert response.json['data']['chunkSize'] == 4
+    filename, size, metadata = mock_upload_service.create_upload.call_args.args
+    assert (filename, size, metadata['tags']) == ('scan.tiff', 10, ['wedding'])
+
+@pytest.mark.parametrize('field, value', [
+    ('tags', 'wedding'),
+    ('tags', [1, 2]),
+    ('people', ['Jane']),
+    ('people', 'abc'),
+    ('location', 'Paris'),
+])
+def test_create_upload_rejects_invalid_metadata(client, mock_upload_service, field, value):
+    # Act
+    response = client.post('/photos/uploads', json={'filename': 'scan.tiff', 'size': 10, field: value})
+
+    # Assert
+    assert response.status_code == 400
+    assert response.json['error']['code'] == 'VALIDATION_ERROR'
+    mock_upload_service.create_upload.assert_not_called()
+
+def test_create_upload_coerces_person_ids(client, mock_upload_service):
+    # Arrange
+    mock_upload_service.create_upload.return_value = {'id': 'u1', 'size': 10, 'chunkSize': 4, 'offset': 0}
+
+    # Act
+    response = client.post('/photos/uploads', json={'filename': 'scan.tiff', 'size': 10, 'people': ['3', 4]})
+
+    # Assert
+    assert response.status_code == 201
+    assert mock_upload_service.create_upload.call_args.args[2]['people'] == [3, 4]
+
+def test_upload_chunk(client, mock_upload_service):
+    # Arrange
+    mock_upload_service.upload_chunk.return_value = {'id': 'u1', 'size': 10, 'chunkSize': 4, 'offset': 8}
+    
+    # Act
+    response = client.patch('/photos/uploads/u1', data=b'efgh', headers={'Upload-Offset': '4'})
+    
+    # Assert
+    assert response.status_code == 200
+    assert response.headers['Upload-Offset'] == '8'
+    upload_id, offset, stream, length = mock_upload_service.upload_chunk.call_args.args
+    assert (upload_id, offset, length) == ('u1', 4, 4)
+
+def test_upload_chunk_errors(client, mock_upload_service):
+    from core.services.service_exceptions import ConflictException, NotFoundException
+    
+    assert client.patch('/photos/uploads/u1', data=b'efgh').status_code == 400
+    mock_upload_service.upload_chunk.side_effect = ConflictException("Upload u1 is at offset 8, not 4")
+    assert client.patch('/photos/uploads/u1', data=b'efgh', headers={'Upload-Offset': '4'}).status_code == 409
+    mock_upload_service.get_upload.side_effect = NotFoundException("Upload u2 not found")
+    assert client.get('/photos/uploads/u2').status_code == 404
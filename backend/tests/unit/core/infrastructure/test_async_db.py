@@ -0,0 +1,26 @@
+import pytest
+from core.infrastructure.async_db import async_database_url, async_engine_options
+from utils.config import DatabaseConfig
+
+@pytest.fixture
+def database_config():
+    return DatabaseConfig(url='', name='test', pool_size=5, max_overflow=2, pool_timeout=3,
+                          pool_recycle=600, connect_timeout=4, statement_timeout=1500)
+
+def test_async_database_url_uses_asyncio_drivers():
+    assert async_database_url('postgresql://user:secret@db/nexus') == 'postgresql+asyncpg://user:secret@db/nexus'
+    assert async_database_url('postgresql+psycopg2://db/nexus') == 'postgresql+asyncpg://db/nexus'
+    assert async_database_url('sqlite:///nexus.db') == 'sqlite+aiosqlite:///nexus.db'
+
+def test_async_database_url_rejects_unsupported_backend():
+    with pytest.raises(ValueError):
+        async_database_url('mysql://db/nexus')
+
+def test_async_engine_options_postgresql(database_config):
+    options = async_engine_options('postgresql://db/nexus', database_config)
+
+    assert (options['pool_size'], options['max_overflow'], options['pool_timeout'], options['pool_recycle']) == (5, 2, 3, 600)
+    assert options['connect_args'] == {'timeout': 4, 'server_settings': {'statement_timeout': '1500'}}
+
+def test_async_engine_options_sqlite(database_config):
+    assert async_engine_options('sqlite:///nexus.db', database_config) == {'pool_pre_ping': True}
@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from core.infrastructure.db_pool import InstrumentedQueuePool, engine_options, pool_status
+from utils.config import DatabaseConfig
+
+@pytest.fixture
+def database_config():
+    return DatabaseConfig(url='', name='test', pool_size=5, max_overflow=2, pool_timeout=3,
+                          pool_recycle=600, connect_timeout=4, statement_timeout=1500)
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedQueuePool,
+                           pool_size=1, max_overflow=0, pool_timeout=0.05)
+    yield engine
+    engine.dispose()
+
+def test_engine_options_postgresql(database_config):
+    options = engine_options('postgresql://user:secret@db/nexus', database_config)
+
+    assert options['poolclass'] is InstrumentedQueuePool
+    assert (options['pool_size'], options['max_overflow'], options['pool_timeout'], options['pool_recycle']) == (5, 2, 3, 600)
+    assert options['pool_pre_ping'] is True
+    assert options['connect_args'] == {'connect_timeout': 4, 'options': '-c statement_timeout=1500'}
+
+def test_engine_options_without_statement_timeout(database_config):
+    database_config.statement_timeout = 0
+
+    options = engine_options('postgresql+psycopg2://db/nexus', database_config)
+
+    assert options['connect_args'] == {'connect_timeout': 4}
+
+def test_engine_options_sqlite_keeps_default_pool(database_config):
+    assert engine_options('sqlite:///:memory:', database_config) == {'pool_pre_ping': True}
+
+def test_pool_status_tracks_checkouts_and_saturation(engine):
+    connection = engine.connect()
+
+    status = pool_status(engine)
+
+    assert status['pool'] == 'InstrumentedQueuePool'
+    assert (status['size'], status['checkedOut'], status['saturation']) == (1, 1, 1.0)
+    assert status['checkouts'] == 1
+    assert status['waitMsMax'] >= 0
+    connection.close()
+    assert pool_status(engine)['checkedOut'] == 0
+
+def test_pool_status_counts_timeouts(engine):
+    connection = engine.connect()
+
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+
+    assert pool_status(engine)['timeouts'] == 1
+    connection.close()
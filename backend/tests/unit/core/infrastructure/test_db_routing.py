@@ -0,0 +1,82 @@
+import time
+import pytest
+from flask import Flask, jsonify
+from core.models.db import db
+from core.models.tag import Tag
+from core.infrastructure.db_routing import (
+    REPLICA_BIND, PRIMARY_UNTIL_COOKIE, init_replica_routing, read_replica
+)
+
+@read_replica
+def _replica_tags():
+    return sorted(tag.name for tag in db.session.query(Tag))
+
+def _primary_tags():
+    return sorted(tag.name for tag in db.session.query(Tag))
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'primary.db'}"
+    app.config['SQLALCHEMY_BINDS'] = {REPLICA_BIND: f"sqlite:///{tmp_path / 'replica.db'}"}
+    db.init_app(app)
+    init_replica_routing(app, stickiness_seconds=5)
+
+    @app.route('/tags', methods=['GET'])
+    def list_tags():
+        return jsonify(_replica_tags())
+
+    @app.route('/tags/<name>', methods=['POST'])
+    def add_tag(name):
+        db.session.add(Tag(name=name))
+        db.session.commit()
+        return jsonify(_replica_tags())
+
+    with app.app_context():
+        db.create_all()
+        replica = db.engines[REPLICA_BIND]
+        db.metadata.create_all(replica)
+        with replica.begin() as connection:
+            connection.execute(Tag.__table__.insert(), [{'name': 'replicated'}])
+        db.session.add(Tag(name='replicated'))
+        db.session.commit()
+        yield app
+        db.session.remove()
+    # init_app registered the bind's metadata on the shared db; other apps have no replica
+    db.metadatas.pop(REPLICA_BIND, None)
+
+def test_read_only_methods_use_the_replica(app):
+    client = app.test_client()
+    with app.app_context():
+        db.session.add(Tag(name='not-replicated-yet'))
+        db.session.commit()
+        assert _primary_tags() == ['not-replicated-yet', 'replicated']
+
+    response = client.get('/tags')
+
+    assert response.json == ['replicated']
+    assert PRIMARY_UNTIL_COOKIE not in response.headers.get('Set-Cookie', '')
+
+def test_writes_pin_the_request_and_the_client_to_the_primary(app):
+    client = app.test_client()
+
+    written = client.post('/tags/new')
+    followed = client.get('/tags')
+
+    # Read-your-writes within the request and for the stickiness window
+    assert written.json == ['new', 'replicated']
+    assert PRIMARY_UNTIL_COOKIE in written.headers['Set-Cookie']
+    assert followed.json == ['new', 'replicated']
+
+def test_stickiness_expires(app):
+    client = app.test_client()
+    client.post('/tags/new')
+    client.set_cookie(PRIMARY_UNTIL_COOKIE, f"{time.time() - 1:.3f}")
+
+    assert client.get('/tags').json == ['replicated']
+
+def test_invalid_cookie_is_ignored(app):
+    client = app.test_client()
+    client.set_cookie(PRIMARY_UNTIL_COOKIE, 'forever')
+
+    assert client.get('/tags').json == ['replicated']
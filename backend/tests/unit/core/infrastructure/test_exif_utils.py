@@ -0,0 +1,162 @@
+import struct
+import pytest
+from datetime import datetime
+from io import BytesIO
+from PIL import Image
+from PIL.TiffImagePlugin import IFDRational
+from core.infrastructure.exif_utils import extract_exif_data, extract_ranged_exif_data, read_exif_block
+
+def _camera_exif():
+    exif = Image.Exif()
+    exif[0x010F] = 'Canon'
+    exif[0x0110] = 'EOS 5D'
+    exif[0x013B] = 'Jane Doe'
+    details = exif.get_ifd(0x8769)
+    details[0x9003] = '2001:02:03 04:05:06'
+    details[0x829D] = IFDRational(28, 10)
+    details[0x829A] = IFDRational(1, 250)
+    details[0x8827] = 400
+    details[0x920A] = IFDRational(50, 1)
+    gps = exif.get_ifd(0x8825)
+    gps[1] = 'N'
+    gps[2] = (IFDRational(48, 1), IFDRational(51, 1), IFDRational(2958, 100))
+    gps[3] = 'W'
+    gps[4] = (IFDRational(2, 1), IFDRational(17, 1), IFDRational(40, 1))
+    return exif
+
+def _image(image_format, exif=None):
+    img_io = BytesIO()
+    if exif is None:
+        Image.new('RGB', (100, 100)).save(img_io, image_format)
+    else:
+        Image.new('RGB', (100, 100)).save(img_io, image_format, exif=exif)
+    img_io.seek(0)
+    return img_io
+
+def _box(box_type, payload, version=None):
+    if version is not None:
+        payload = bytes([version, 0, 0, 0]) + payload
+    return struct.pack('>L4s', 8 + len(payload), box_type) + payload
+
+def _heif(tiff):
+    """A minimal HEIF container holding an Exif item in its mdat box."""
+    item = struct.pack('>L', 6) + b'Exif\x00\x00' + tiff
+    ftyp = _box(b'ftyp', b'heic' + b'\x00' * 4 + b'mif1heic')
+
+    def meta(offset):
+        infe = _box(b'infe', struct.pack('>HH4s', 1, 0, b'Exif') + b'\x00', version=2)
+        iinf = _box(b'iinf', struct.pack('>H', 1) + infe, version=0)
+        iloc = _box(b'iloc', bytes([0x44, 0]) + struct.pack('>HHHHLL', 1, 1, 0, 1, offset, len(item)), version=0)
+        return _box(b'meta', iloc + iinf, version=0)
+
+    mdat_offset = len(ftyp) + len(meta(0)) + 8
+    return BytesIO(ftyp + meta(mdat_offset) + _box(b'mdat', item + b'\x00' * 512))
+
+def _tiff_with_trailing_ifd(image_bytes):
+    """A little-endian TIFF whose IFD0, with Make and Model, follows image_bytes of image data."""
+    ifd0_offset = 8 + image_bytes
+    values_offset = ifd0_offset + 2 + 2 * 12 + 4
+    ifd0 = struct.pack('<H', 2)
+    ifd0 += struct.pack('<HHLL', 0x010F, 2, 6, values_offset)
+    ifd0 += struct.pack('<HHLL', 0x0110, 2, 7, values_offset + 6)
+    ifd0 += struct.pack('<L', 0)
+    return b'II*\x00' + struct.pack('<L', ifd0_offset) + b'\x00' * image_bytes + ifd0 + b'Canon\x00EOS 5D\x00'
+
+@pytest.fixture
+def sample_image_with_exif():
+    # Create a test image with EXIF data
+    return _image('JPEG', Image.Exif())
+
+@pytest.fixture
+def sample_image_without_exif():
+    # Create a test image without EXIF data
+    return _image('PNG')
+
+def test_extract_exif_data_with_exif(sample_image_with_exif):
+    exif_data = extract_exif_data(sample_image_with_exif)
+    assert isinstance(exif_data, dict)
+
+def test_extract_exif_data_without_exif(sample_image_without_exif):
+    exif_data = extract_exif_data(sample_image_without_exif)
+    assert isinstance(exif_data, dict)
+    assert len(exif_data) == 0
+
+@pytest.mark.parametrize('image_format', ['JPEG', 'PNG'])
+def test_extract_exif_data_resolves_camera_and_gps_tags(image_format):
+    exif_data = extract_exif_data(_image(image_format, _camera_exif()))
+
+    assert exif_data['date_taken'] == datetime(2001, 2, 3, 4, 5, 6)
+    assert exif_data['author'] == 'Jane Doe'
+    assert exif_data['camera_make'] == 'Canon'
+    assert exif_data['camera_model'] == 'EOS 5D'
+    assert exif_data['f_number'] == 2.8
+    assert exif_data['exposure_time'] == pytest.approx(0.004)
+    assert exif_data['iso'] == 400
+    assert exif_data['focal_length'] == 50.0
+    assert exif_data['latitude'] == pytest.approx(48.8582167)
+    assert exif_data['longitude'] == pytest.approx(-2.2944444)
+
+def test_extract_exif_data_reads_heif_exif_item():
+    tiff = _camera_exif().tobytes()[len(b'Exif\x00\x00'):]
+
+    exif_data = extract_exif_data(_heif(tiff))
+
+    assert exif_data['camera_model'] == 'EOS 5D'
+    assert exif_data['latitude'] == pytest.approx(48.8582167)
+
+def test_read_exif_block_stops_at_image_data():
+    photo = BytesIO()
+    Image.effect_noise((256, 256), 64).save(photo, 'JPEG')
+    photo.seek(0)
+
+    assert read_exif_block(photo) is None
+    # Only the headers in front of the compressed data were read
+    assert photo.tell() < len(photo.getvalue()) // 4
+
+def test_extract_exif_data_ignores_corrupt_offsets():
+    tiff = bytearray(_camera_exif().tobytes()[len(b'Exif\x00\x00'):])
+    tiff[4:8] = struct.pack('<L', 10 ** 6)
+
+    assert extract_exif_data(BytesIO(bytes(tiff))) == {}
+
+def test_extract_exif_data_rewinds_file():
+    photo = _image('JPEG', _camera_exif())
+
+    extract_exif_data(photo)
+
+    assert photo.tell() == 0
+
+def test_extract_exif_data_reads_trailing_tiff_ifd():
+    photo = BytesIO(_tiff_with_trailing_ifd(1000 * 1000))
+
+    exif_data = extract_exif_data(photo)
+
+    assert (exif_data['camera_make'], exif_data['camera_model']) == ('Canon', 'EOS 5D')
+    assert photo.tell() == 0
+
+def test_extract_ranged_exif_data_reads_trailing_tiff_ifd():
+    tiff = _tiff_with_trailing_ifd(1024 * 1024)
+    reads = []
+
+    def read_range(offset, length):
+        reads.append(offset)
+        return tiff[offset:offset + length]
+
+    exif_data = extract_ranged_exif_data(read_range, 128 * 1024)
+
+    assert (exif_data['camera_make'], exif_data['camera_model']) == ('Canon', 'EOS 5D')
+    # The header, then the IFD0 at the offset it gives
+    assert reads == [0, 8 + 1024 * 1024]
+
+def test_extract_ranged_exif_data_reads_leading_metadata_once():
+    photo = _image('JPEG', _camera_exif()).getvalue()
+    reads = []
+
+    def read_range(offset, length):
+        reads.append(offset)
+        return photo[offset:offset + length]
+
+    assert extract_ranged_exif_data(read_range, 128 * 1024)['camera_make'] == 'Canon'
+    assert extract_ranged_exif_data(lambda offset, length: _tiff_with_trailing_ifd(16)[offset:offset + length],
+                                    128 * 1024)['camera_model'] == 'EOS 5D'
+    assert reads == [0]
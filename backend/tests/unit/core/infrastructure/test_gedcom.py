@@ -0,0 +1,73 @@
+import pytest
+from datetime import date
+from io import BytesIO
+from core.infrastructure.gedcom import (
+    decode_lines, gedcom_encoding, iter_records, parse_name, parse_date, format_date, format_lines
+)
+
+def test_iter_records_nests_lines_by_level():
+    lines = [
+        "0 HEAD\n",
+        "1 CHAR UTF-8\n",
+        "0 @I1@ INDI\n",
+        "1 NAME Jean /Dupont/\n",
+        "1 BIRT\n",
+        "2 DATE 12 MAR 1901\n",
+        "1 NOTE First line\n",
+        "2 CONT second\n",
+        "2 CONC  line\n",
+        "\n",
+        "0 TRLR\n",
+    ]
+
+    records = list(iter_records(lines))
+
+    assert [record.tag for record in records] == ['HEAD', 'INDI', 'TRLR']
+    person = records[1]
+    assert person.xref == '@I1@'
+    assert person.first('BIRT').first('DATE').value == '12 MAR 1901'
+    assert person.first('NOTE').text == "First line\nsecond line"
+
+def test_parse_name():
+    assert parse_name("Jean Marc /Dupont/") == ("Jean Marc", "Dupont")
+    assert parse_name("Jean /Dupont/ Jr") == ("Jean Jr", "Dupont")
+    assert parse_name("Jean") == ("Jean", "")
+
+def test_parse_date_accepts_exact_dates_only():
+    assert parse_date("12 MAR 1901") == date(1901, 3, 12)
+    assert parse_date("3 dec 1850") == date(1850, 12, 3)
+    assert parse_date("MAR 1901") is None
+    assert parse_date("ABT 1901") is None
+    assert parse_date("31 FEB 1901") is None
+    assert format_date(date(1901, 3, 12)) == "12 MAR 1901"
+
+def test_format_lines_round_trips_long_and_multiline_values():
+    value = "x" * 500 + "\nsecond"
+
+    lines = list(format_lines(1, 'NOTE', value))
+    record = next(iter_records(["0 @I1@ INDI\n"] + lines))
+
+    assert lines[0].startswith("1 NOTE ")
+    assert all(len(line) < 256 for line in lines)
+    assert record.first('NOTE').text == value
+
+def test_decode_lines_honours_the_declared_character_set():
+    ansi = "0 HEAD\n1 CHAR ANSI\n0 @I1@ INDI\n1 NAME Hélène /Lefèvre/\n0 TRLR\n".encode('cp1252')
+    unicode = "0 HEAD\n1 CHAR UNICODE\n0 @I1@ INDI\n1 NAME Hélène /Lefèvre/\n".encode('utf-16')
+    utf8 = "\ufeff0 HEAD\n1 CHAR UTF-8\n0 @I1@ INDI\n1 NAME Hélène /Lefèvre/\n".encode('utf-8')
+
+    for content in (ansi, unicode, utf8):
+        gedcom_file = BytesIO(content)
+        lines = list(decode_lines(gedcom_file))
+        assert lines[3] == "1 NAME Hélène /Lefèvre/\n"
+        assert not gedcom_file.closed
+
+def test_decode_lines_rejects_unsupported_or_invalid_files():
+    with pytest.raises(ValueError, match="Unsupported GEDCOM character set ANSEL"):
+        gedcom_encoding(b"0 HEAD\n1 SOUR PAF\n1 CHAR ANSEL\n0 @I1@ INDI\n")
+    # Only the CHAR line of the header counts
+    assert gedcom_encoding(b"0 HEAD\n0 @N1@ NOTE\n1 CHAR ANSEL\n") == 'utf-8-sig'
+
+    latin1 = "0 HEAD\n1 CHAR UTF-8\n0 @I1@ INDI\n1 NAME Hélène\n".encode('latin-1')
+    with pytest.raises(ValueError, match="not valid utf-8-sig text"):
+        list(decode_lines(BytesIO(latin1)))
@@ -0,0 +1,157 @@
+import asyncio
+import pytest
+from flask import Flask, Response
+from sqlalchemy import create_engine, text
+from core.infrastructure.instrumentation import (
+    InstrumentationASGIMiddleware, MetricsRegistry, RequestProfiler, RequestStats, current_request_stats,
+    init_instrumentation, instrument_s3_client
+)
+
+@pytest.fixture
+def engine():
+    engine = create_engine('sqlite:///:memory:')
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def app(engine):
+    app = Flask(__name__)
+
+    @app.route('/photos/<int:photo_id>')
+    def get_photo(photo_id):
+        with engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+            connection.execute(text('SELECT 2'))
+        return {'id': photo_id}
+
+    @app.route('/stream')
+    def stream():
+        return Response(iter([b'abc', b'defg']), mimetype='application/octet-stream')
+
+    return app
+
+def test_request_metrics_per_endpoint(app):
+    registry = init_instrumentation(app)
+    client = app.test_client()
+
+    response = client.get('/photos/1', buffered=True)
+    client.get('/photos/2', buffered=True)
+    client.get('/missing', buffered=True)
+
+    assert response.headers['Server-Timing'].startswith('db;desc="2 queries";dur=')
+    metrics = registry.render()
+    assert 'http_request_duration_seconds_count{method="GET",endpoint="/photos/<int:photo_id>",status="200"} 2' in metrics
+    assert 'http_request_duration_seconds_bucket{method="GET",endpoint="/photos/<int:photo_id>",status="200",le="+Inf"} 2' in metrics
+    assert 'http_request_duration_seconds_count{method="GET",endpoint="<unmatched>",status="404"} 1' in metrics
+    assert 'db_queries_total{endpoint="/photos/<int:photo_id>"} 4' in metrics
+    assert 'http_request_db_queries_bucket{endpoint="/photos/<int:photo_id>",le="1"} 0' in metrics
+    assert 'http_request_db_queries_bucket{endpoint="/photos/<int:photo_id>",le="2"} 2' in metrics
+    assert current_request_stats() is None
+
+def test_streamed_response_size(app):
+    registry = init_instrumentation(app)
+
+    app.test_client().get('/stream', buffered=True)
+
+    assert 'http_response_size_bytes_sum{method="GET",endpoint="/stream",status="200"} 7' in registry.render()
+
+def test_metrics_endpoint(app):
+    init_instrumentation(app)
+    client = app.test_client()
+    client.get('/stream', buffered=True)
+
+    response = client.get('/metrics', buffered=True)
+
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    assert '# TYPE http_request_duration_seconds histogram' in response.get_data(as_text=True)
+
+def test_s3_calls_are_recorded(app):
+    boto3 = pytest.importorskip('boto3')
+    from botocore.stub import Stubber
+
+    client = boto3.client('s3', region_name='us-east-1', aws_access_key_id='key', aws_secret_access_key='secret')
+    instrument_s3_client(client)
+    stubber = Stubber(client)
+    stubber.add_response('delete_object', {})
+    stubber.add_client_error('delete_object', 'NoSuchKey')
+
+    @app.route('/photos/<int:photo_id>', methods=['DELETE'])
+    def delete_photo(photo_id):
+        try:
+            client.delete_object(Bucket='photos', Key=f"{photo_id}.jpg")
+        except client.exceptions.NoSuchKey:
+            return {}, 404
+        return {}
+
+    registry = init_instrumentation(app)
+    with stubber:
+        app.test_client().delete('/photos/1', buffered=True)
+        app.test_client().delete('/photos/2', buffered=True)
+
+    assert 's3_calls_total{endpoint="/photos/<int:photo_id>",operation="DeleteObject"} 2' in registry.render()
+
+def test_slow_requests_are_profiled(app, tmp_path):
+    registry = init_instrumentation(app, RequestProfiler(1.0, 0, str(tmp_path)))
+
+    app.test_client().get('/photos/1', buffered=True)
+
+    profiles = list(tmp_path.iterdir())
+    assert len(profiles) == 1
+    assert profiles[0].suffix == '.prof'
+    assert '-GET-photos_int_photo_id-' in profiles[0].name
+    assert 'request_profiles_total{endpoint="/photos/<int:photo_id>"} 1' in registry.render()
+
+def test_fast_requests_are_not_profiled(app, tmp_path):
+    init_instrumentation(app, RequestProfiler(1.0, 60000, str(tmp_path)))
+
+    app.test_client().get('/photos/1', buffered=True)
+
+    assert not list(tmp_path.iterdir())
+
+def test_render_escapes_label_values():
+    registry = MetricsRegistry()
+    registry.record_request(RequestStats(method='GET', endpoint='/a"b\\c', status='200'), 0.2)
+
+    assert 'endpoint="/a\\"b\\\\c"' in registry.render()
+
+def test_merged_registries_add_up():
+    stats = RequestStats(method='GET', endpoint='/photos', status='200', db_queries=2, db_seconds=0.5)
+    worker = MetricsRegistry()
+    worker.record_request(stats, 0.2)
+    merged = MetricsRegistry()
+    merged.record_request(stats, 3.0)
+
+    merged.merge(worker.snapshot())
+
+    metrics = merged.render()
+    assert 'http_request_duration_seconds_count{method="GET",endpoint="/photos",status="200"} 2' in metrics
+    assert 'http_request_duration_seconds_bucket{method="GET",endpoint="/photos",status="200",le="0.25"} 1' in metrics
+    assert 'db_queries_total{endpoint="/photos"} 4' in metrics
+
+def test_shared_registry_renders_the_published_metrics(app, tmp_path):
+    registry = init_instrumentation(app, shared_dir=str(tmp_path))
+
+    app.test_client().get('/stream', buffered=True)
+
+    assert 'http_response_size_bytes_sum{method="GET",endpoint="/stream",status="200"} 7' in registry.render()
+    assert list(tmp_path.glob('metrics-*.json'))
+
+def test_asgi_requests_are_recorded():
+    async def asgi_app(scope, receive, send):
+        await send({'type': 'http.response.start', 'status': 201, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b'abc', 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b'de'})
+
+    async def send(message):
+        pass
+
+    registry = MetricsRegistry()
+    middleware = InstrumentationASGIMiddleware(asgi_app, registry, lambda scope: '/photos')
+
+    asyncio.run(middleware({'type': 'http', 'method': 'POST', 'path': '/photos'}, None, send))
+
+    metrics = registry.render()
+    assert 'http_request_duration_seconds_count{method="POST",endpoint="/photos",status="201"} 1' in metrics
+    assert 'http_response_size_bytes_sum{method="POST",endpoint="/photos",status="201"} 5' in metrics
+    assert current_request_stats() is None
@@ -0,0 +1,26 @@
+import pytest
+from core.infrastructure.phonetic import phonetic_key, fold_name
+
+@pytest.mark.parametrize("first, second", [
+    ("Jehan", "Jean"),
+    ("Marc", "Marcq"),
+    ("Lefèvre", "Lefebvre"),
+    ("Robert", "Rupert"),
+])
+def test_spelling_variants_share_key(first, second):
+    assert phonetic_key(first) == phonetic_key(second)
+
+def test_standard_soundex_values():
+    assert phonetic_key("Ashcraft") == "A261"
+    assert phonetic_key("Tymczak") == "T522"
+    assert phonetic_key("Lee") == "L000"
+
+def test_no_letters():
+    assert phonetic_key("") is None
+    assert phonetic_key(None) is None
+    assert phonetic_key("1815") is None
+
+def test_fold_name():
+    assert fold_name("Lefèvre-Dupré") == "lefevre dupre"
+    assert fold_name("  JEAN  ") == "jean"
+    assert fold_name(None) == ""
@@ -0,0 +1,54 @@
+import os
+import time
+from core.infrastructure.process_snapshots import ProcessSnapshots
+
+def _in_child_process(work):
+    """Run work in a forked process, as a server worker would."""
+    pid = os.fork()
+    if pid == 0:
+        status = 0
+        try:
+            work()
+        except BaseException:
+            status = 1
+        finally:
+            os._exit(status)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+
+def test_collect_returns_the_snapshots_of_every_process(tmp_path):
+    data = {'requests': 1}
+    snapshots = ProcessSnapshots(str(tmp_path), 'metrics', lambda: dict(data))
+
+    def worker():
+        data['requests'] = 5
+        snapshots.publish()
+
+    _in_child_process(worker)
+
+    assert sorted(snapshot['requests'] for snapshot in snapshots.collect()) == [1, 5]
+
+def test_changes_are_published_in_the_background(tmp_path):
+    snapshots = ProcessSnapshots(str(tmp_path), 'metrics', lambda: {'requests': 1}, interval=0.01)
+
+    snapshots.changed()
+
+    snapshot_path = tmp_path / f'metrics-{os.getpid()}.json'
+    deadline = time.monotonic() + 5
+    while not snapshot_path.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert snapshot_path.exists()
+
+def test_clear_reaches_every_process(tmp_path):
+    data = {'queries': 3}
+
+    def clear_data():
+        data['queries'] = 0
+
+    snapshots = ProcessSnapshots(str(tmp_path), 'slow-queries', lambda: dict(data), on_clear=clear_data)
+    snapshots.publish()
+
+    _in_child_process(lambda: ProcessSnapshots(str(tmp_path), 'slow-queries', dict).clear())
+
+    # The snapshot written before the clear is gone, and the data is cleared before publishing again
+    assert snapshots.collect() == [{'queries': 0}]
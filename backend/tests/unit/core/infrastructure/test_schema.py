@@ -0,0 +1,141 @@
+import ast
+import os
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from core.models.db import db
+# Register every table on db.metadata
+from core.models import photo, person, tag, relationship, aggregates, duplicate_candidate, upload_session, cache_generation  # noqa: F401
+from core.infrastructure.schema import SCHEMA_REVISION, SchemaRevisionError, check_schema_revision
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', 'migrations')
+
+def _engine(tmp_path, revision=None):
+    engine = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    if revision:
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) PRIMARY KEY)"))
+            connection.execute(text("INSERT INTO alembic_version VALUES (:revision)"), {'revision': revision})
+    return engine
+
+def _revisions():
+    revisions = {}
+    versions_dir = os.path.join(MIGRATIONS_DIR, 'versions')
+    for name in os.listdir(versions_dir):
+        if name.endswith('.py'):
+            with open(os.path.join(versions_dir, name)) as f:
+                assignments = {
+                    node.targets[0].id: node.value.value for node in ast.parse(f.read()).body
+                    if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant)
+                }
+            revisions[assignments['revision']] = assignments['down_revision']
+    return revisions
+
+def test_check_passes_at_expected_revision(tmp_path):
+    check_schema_revision(_engine(tmp_path, SCHEMA_REVISION))
+
+def test_check_rejects_unmigrated_database(tmp_path):
+    with pytest.raises(SchemaRevisionError, match="not under migration control"):
+        check_schema_revision(_engine(tmp_path))
+
+def test_check_rejects_other_revision(tmp_path):
+    with pytest.raises(SchemaRevisionError, match="at revision 0001_initial_schema"):
+        check_schema_revision(_engine(tmp_path, '0001_initial_schema'))
+
+def test_schema_revision_is_head_of_migration_chain():
+    revisions = _revisions()
+    assert set(revisions) - set(revisions.values()) == {SCHEMA_REVISION}
+    # A single linear chain down to the initial revision
+    chain, revision = [], SCHEMA_REVISION
+    while revision is not None:
+        chain.append(revision)
+        revision = revisions[revision]
+    assert len(chain) == len(revisions)
+
+def _upgrade(database_url, monkeypatch, revision='head'):
+    pytest.importorskip('alembic')
+    from alembic import command
+    from alembic.config import Config
+
+    alembic_config = Config(os.path.join(MIGRATIONS_DIR, '..', 'alembic.ini'))
+    alembic_config.set_main_option('script_location', MIGRATIONS_DIR)
+    alembic_config.set_main_option('sqlalchemy.url', database_url)
+    monkeypatch.syspath_prepend(os.path.join(MIGRATIONS_DIR, '..'))
+    command.upgrade(alembic_config, revision)
+
+def test_migrations_build_the_model_schema(tmp_path, monkeypatch):
+    database_url = f"sqlite:///{tmp_path / 'migrated.db'}"
+
+    _upgrade(database_url, monkeypatch)
+
+    engine = create_engine(database_url)
+    check_schema_revision(engine)
+    inspector = inspect(engine)
+    for table in db.metadata.sorted_tables:
+        assert {c['name'] for c in inspector.get_columns(table.name)} == set(table.columns.keys())
+    with engine.connect() as connection:
+        indexes = set(connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+    assert indexes >= {index.name for table in db.metadata.sorted_tables for index in table.indexes}
+
+def test_migrations_adopt_a_database_built_by_create_all(tmp_path, monkeypatch):
+    database_url = f"sqlite:///{tmp_path / 'legacy.db'}"
+    engine = create_engine(database_url)
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO photo_camera_counts VALUES ('nikon', 'f3', 7)"))
+
+    _upgrade(database_url, monkeypatch)
+
+    check_schema_revision(engine)
+    with engine.connect() as connection:
+        # Existing rollups are kept, not rebuilt
+        assert connection.execute(text("SELECT count FROM photo_camera_counts")).scalar() == 7
+
+def test_migrations_fill_the_rollups_of_existing_data(tmp_path, monkeypatch):
+    database_url = f"sqlite:///{tmp_path / 'filled.db'}"
+    _upgrade(database_url, monkeypatch, '0001_initial_schema')
+    engine = create_engine(database_url)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO people (id, first_name, last_name) VALUES "
+                                "(1, 'Hélène', 'Lefèvre'), (2, 'Jean', 'Marc')"))
+        connection.execute(text(
+            "INSERT INTO photos (id, file_name, s3_key, url, upload_date, date_taken) VALUES "
+            "(1, 'a.jpg', 'a.jpg', 'u', '2024-01-01 00:00:00', '1954-06-12 10:00:00'), "
+            "(2, 'b.jpg', 'b.jpg', 'u', '2024-01-01 00:00:00', '1954-06-12 18:00:00'), "
+            "(3, 'c.jpg', 'c.jpg', 'u', '2024-01-01 00:00:00', NULL)"
+        ))
+        connection.execute(text("INSERT INTO photo_people VALUES (1, 1), (1, 2), (2, 1), (3, 1)"))
+
+    _upgrade(database_url, monkeypatch)
+
+    with engine.connect() as connection:
+        assert connection.execute(text(
+            "SELECT first_name_phonetic, last_name_phonetic, photo_count FROM people ORDER BY id"
+        )).all() == [('H450', 'L116', 3), ('J500', 'M620', 1)]
+        assert connection.execute(text("SELECT year, month, day, count FROM photo_date_counts")).all() == [
+            (1954, 6, 12, 2)
+        ]
+        assert connection.execute(text(
+            "SELECT person_id, other_person_id, count FROM person_cooccurrences ORDER BY person_id"
+        )).all() == [(1, 2, 1), (2, 1, 1)]
+        assert connection.execute(text("SELECT * FROM photo_camera_counts")).all() == [('', '', 3)]
+        assert connection.execute(text("SELECT count(*) FROM person_ancestry")).scalar() == 0
+
+def test_family_graph_migration_fills_the_closure_of_existing_relationships(tmp_path, monkeypatch):
+    database_url = f"sqlite:///{tmp_path / 'family.db'}"
+    _upgrade(database_url, monkeypatch, '0002_search_and_rollups')
+    engine = create_engine(database_url)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO people (id, first_name, last_name) VALUES "
+                                "(1, 'Paul', 'Marc'), (2, 'Louis', 'Marc'), (3, 'Rose', 'Marc'), (4, 'Anne', 'Roy')"))
+        # Relationships stored by an older create_all, before the closure table existed
+        connection.execute(text("CREATE TABLE relationships (person_id INTEGER, relative_id INTEGER, "
+                                "relationship_type VARCHAR(20), PRIMARY KEY (person_id, relative_id, relationship_type))"))
+        connection.execute(text("INSERT INTO relationships VALUES "
+                                "(1, 2, 'parent'), (2, 3, 'parent'), (1, 4, 'spouse')"))
+
+    _upgrade(database_url, monkeypatch)
+
+    with engine.connect() as connection:
+        assert connection.execute(text(
+            "SELECT ancestor_id, descendant_id, depth FROM person_ancestry ORDER BY depth, ancestor_id"
+        )).all() == [(1, 2, 1), (2, 3, 1), (1, 3, 2)]
@@ -0,0 +1,122 @@
+import pytest
+from sqlalchemy import create_engine, text
+import core.infrastructure.slow_queries as slow_queries
+from core.infrastructure.slow_queries import (
+    SlowQueryLog, init_slow_query_log, merge_reported_queries, normalize_sql, parameter_shape
+)
+from utils.config import DatabaseConfig
+
+class PhotoQueries:
+    """Stands in for a service class: calling_service_method looks at the module name."""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def search(self, tag_names):
+        placeholders = ', '.join(f":tag_{index}" for index in range(len(tag_names)))
+        with self.engine.connect() as connection:
+            return connection.execute(
+                text(f"SELECT name FROM tags WHERE name IN ({placeholders}) AND id > 0"),
+                {f"tag_{index}": name for index, name in enumerate(tag_names)}
+            ).all()
+
+@pytest.fixture
+def engine(tmp_path):
+    # A file, so that plans captured on another connection see the same tables
+    engine = create_engine(f"sqlite:///{tmp_path / 'slow.db'}")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE tags (id INTEGER PRIMARY KEY, name TEXT)"))
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def slow_query_log(monkeypatch):
+    # Every statement counts as slow and is explained
+    monkeypatch.setattr(slow_queries, 'CALLER_MODULE_PREFIX', __name__)
+    log = init_slow_query_log(DatabaseConfig(url='', name='test', slow_query_ms=0.000001,
+                                             slow_query_explain_rate=1.0))
+    yield log
+    monkeypatch.setattr(slow_queries, '_slow_query_log', None)
+
+def test_normalize_sql():
+    statement = """SELECT photos.id FROM photos
+        WHERE photos.title = 'Noël ''24' AND photos.id IN (%(id_1)s, %(id_2)s, %(id_3)s)
+        AND photos.taken::date > $1 LIMIT 20"""
+
+    assert normalize_sql(statement) == (
+        "SELECT photos.id FROM photos WHERE photos.title = ? AND photos.id IN (?+) "
+        "AND photos.taken::date > ? LIMIT ?"
+    )
+
+def test_parameter_shape():
+    assert parameter_shape({'id': 1, 'a': 'x', 'b': 'y', 'c': None}) == '(int, str*2, None)'
+    assert parameter_shape([(1, 'x'), (2, 'y')], executemany=True) == '2 x (int, str)'
+
+def test_slow_queries_are_aggregated_by_fingerprint(engine, slow_query_log):
+    queries = PhotoQueries(engine)
+
+    queries.search(['family'])
+    queries.search(['family', 'holiday', 'beach'])
+    slow_query_log.wait_for_plans(timeout=5)
+
+    report = slow_query_log.report()
+    entry = next(query for query in report['queries'] if 'FROM tags' in query['sql'])
+    assert entry['sql'] == 'SELECT name FROM tags WHERE name IN (?+) AND id > ?'
+    assert entry['count'] == 2
+    assert entry['callers'] == {'PhotoQueries.search': 2}
+    assert entry['parameterShapes'] == ['(str)', '(str*3)']
+    assert entry['plan'].startswith('SEARCH tags')
+
+def test_writes_are_not_explained(engine, slow_query_log):
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO tags (name) VALUES (:name)"), {'name': 'family'})
+
+    entry = slow_query_log.report()['queries'][0]
+    assert entry['sql'] == 'INSERT INTO tags (name) VALUES (?+)'
+    assert entry['plan'] is None
+    assert entry['callers'] == {'test_writes_are_not_explained': 1}
+
+def test_failed_explain_leaves_the_request_transaction_usable(engine, slow_query_log):
+    with engine.begin() as connection:
+        # A temporary table only exists for this connection, so EXPLAIN fails elsewhere
+        connection.execute(text("CREATE TEMP TABLE scratch (name TEXT)"))
+        connection.execute(text("SELECT name FROM scratch")).all()
+        slow_query_log.wait_for_plans(timeout=5)
+        connection.execute(text("INSERT INTO tags (name) VALUES ('family')"))
+
+    entry = next(query for query in slow_query_log.report()['queries'] if 'FROM scratch' in query['sql'])
+    assert entry['plan'].startswith('EXPLAIN failed')
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT name FROM tags")).scalars().all() == ['family']
+
+def test_fast_queries_are_ignored():
+    log = SlowQueryLog(threshold_ms=100)
+
+    log.record(None, 'SELECT 1', (), False, elapsed_ms=5)
+
+    assert log.report()['queries'] == []
+
+def test_slow_query_log_disabled():
+    assert init_slow_query_log(DatabaseConfig(url='', name='test', slow_query_ms=0)) is None
+
+def test_reports_of_several_processes_are_merged():
+    first, second = SlowQueryLog(100), SlowQueryLog(100)
+    first.record(None, "SELECT * FROM photos WHERE id = 1", (1,), False, 300)
+    second.record(None, "SELECT * FROM photos WHERE id = 2", ('2',), False, 200)
+    second.record(None, "SELECT * FROM people", (), False, 150)
+
+    queries = merge_reported_queries(first.snapshot() + second.snapshot())
+
+    photos = next(entry for entry in queries if 'photos' in entry['sql'])
+    assert (photos['count'], photos['totalMs'], photos['avgMs'], photos['maxMs']) == (2, 500.0, 250.0, 300.0)
+    assert photos['parameterShapes'] == ['(int)', '(str)']
+    assert len(queries) == 2
+
+def test_shared_slow_query_log_clears_every_process(tmp_path):
+    log = SlowQueryLog(100, shared_dir=str(tmp_path))
+    log.record(None, "SELECT * FROM photos WHERE id = 1", (1,), False, 300)
+    assert log.report()['queries'][0]['count'] == 1
+
+    log.clear()
+
+    assert log.report()['queries'] == []
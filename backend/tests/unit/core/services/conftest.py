@@ -0,0 +1,16 @@
+import pytest
+from flask import Flask
+from core.models.db import db
+
+@pytest.fixture
+def sqlite_db():
+    """Real in-memory SQLite database for tests that exercise generated SQL."""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield db
+        db.session.remove()
+        db.drop_all()
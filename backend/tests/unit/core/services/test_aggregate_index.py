@@ -0,0 +1,139 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from core.models.db import db
+from core.models.aggregates import PersonCooccurrence, PhotoDateCount, PhotoCameraCount
+from core.models.person import Person
+from core.models.photo import Photo
+from core.services.aggregate_index import (
+    PersonIndexDelta, record_photos_added, record_photos_removed, rebuild_person_index,
+    update_timeline, update_camera_counts
+)
+
+@pytest.fixture
+def people(sqlite_db):
+    people = [Person(first_name=name, last_name="Doe") for name in ("Ann", "Bob", "Cid")]
+    sqlite_db.session.add_all(people)
+    sqlite_db.session.commit()
+    return people
+
+def _photo(name, people):
+    return Photo(file_name=name, s3_key=name, url=f"http://test/{name}",
+                 date_taken=datetime(2000, 1, 1), people=people)
+
+def _pairs(db):
+    return {
+        (row.person_id, row.other_person_id): row.count
+        for row in db.session.query(PersonCooccurrence)
+    }
+
+def test_record_photos_maintains_counts_and_pairs(sqlite_db, people):
+    ann, bob, cid = people
+    photos = [_photo("a.jpg", [ann, bob]), _photo("b.jpg", [ann, bob, cid])]
+    sqlite_db.session.add_all(photos)
+    record_photos_added(sqlite_db.session, photos)
+    sqlite_db.session.commit()
+    sqlite_db.session.expire_all()
+
+    assert [p.photo_count for p in people] == [2, 2, 1]
+    assert _pairs(sqlite_db)[(ann.id, bob.id)] == 2
+    assert _pairs(sqlite_db)[(cid.id, ann.id)] == 1
+
+    record_photos_removed(sqlite_db.session, photos[1:])
+    sqlite_db.session.commit()
+    sqlite_db.session.expire_all()
+
+    assert [p.photo_count for p in people] == [1, 1, 0]
+    assert _pairs(sqlite_db) == {(ann.id, bob.id): 1, (bob.id, ann.id): 1}
+
+def test_person_index_delta_handles_partial_changes(sqlite_db, people):
+    ann, bob, cid = people
+    delta = PersonIndexDelta()
+    delta.people_added([], [ann.id])
+    delta.people_added([ann.id], [bob.id, cid.id])
+    delta.people_removed([bob.id, cid.id], [ann.id])
+    delta.apply(sqlite_db.session)
+    sqlite_db.session.commit()
+    sqlite_db.session.expire_all()
+
+    assert [p.photo_count for p in people] == [0, 1, 1]
+    assert _pairs(sqlite_db) == {(bob.id, cid.id): 1, (cid.id, bob.id): 1}
+
+def test_rebuild_person_index(sqlite_db, people):
+    ann, bob, cid = people
+    sqlite_db.session.add_all([_photo("a.jpg", [ann, bob]), _photo("b.jpg", [bob, cid])])
+    sqlite_db.session.commit()
+
+    assert rebuild_person_index(sqlite_db.session) == 4
+    sqlite_db.session.commit()
+    sqlite_db.session.expire_all()
+
+    assert [p.photo_count for p in people] == [1, 2, 1]
+    assert _pairs(sqlite_db)[(bob.id, cid.id)] == 1
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rollups.db'}")
+    db.metadata.create_all(engine)
+    return engine
+
+def test_overlapping_timeline_deltas_add_up(engine):
+    first, second = Session(engine), Session(engine)
+    day, other_day = datetime(1954, 6, 12), datetime(1954, 6, 13)
+    update_timeline(first, [day], 1)
+    first.commit()
+    # The second transaction holds the rows as they were before the first one commits
+    stale = {(row.year, row.month, row.day): row for row in second.query(PhotoDateCount)}
+    assert stale[(1954, 6, 12)].count == 1
+
+    update_timeline(first, [day, other_day], 1)
+    first.commit()
+    update_timeline(second, [day, other_day], 1)
+    second.commit()
+
+    counts = {(row.year, row.month, row.day): row.count for row in Session(engine).query(PhotoDateCount)}
+    assert counts == {(1954, 6, 12): 3, (1954, 6, 13): 2}
+
+    update_timeline(first, [other_day, other_day], -1)
+    first.commit()
+    assert Session(engine).query(PhotoDateCount).count() == 1
+
+def _link(session, person_ids):
+    delta = PersonIndexDelta()
+    delta.people_added([], person_ids)
+    delta.apply(session)
+    session.commit()
+
+def test_overlapping_cooccurrence_deltas_add_up(engine):
+    first, second = Session(engine), Session(engine)
+    people = [Person(first_name=name, last_name="Doe") for name in ("Ann", "Bob", "Cid")]
+    first.add_all(people)
+    first.commit()
+    ann, bob, cid = (person.id for person in people)
+    _link(first, [ann, bob])
+    # The second transaction holds the pairs as they were before the next photo of Ann and Bob
+    assert second.get(PersonCooccurrence, (ann, bob)).count == 1
+
+    _link(first, [ann, bob])
+    _link(second, [ann, bob, cid])
+
+    pairs = {(row.person_id, row.other_person_id): row.count for row in Session(engine).query(PersonCooccurrence)}
+    assert pairs[(ann, bob)] == pairs[(bob, ann)] == 3
+    assert pairs[(bob, cid)] == 1
+
+def test_overlapping_camera_deltas_add_up(engine):
+    first, second = Session(engine), Session(engine)
+    update_camera_counts(first, [('Epson', 'V600'), (None, None)], 1)
+    first.commit()
+    # The second transaction holds the counts as they were before the next scan
+    assert second.get(PhotoCameraCount, ('Epson', 'V600')).count == 1
+
+    update_camera_counts(first, [('Epson', 'V600')], 1)
+    first.commit()
+    update_camera_counts(second, [('Epson', 'V600'), ('Canon', 'AE-1')], 1)
+    update_camera_counts(second, [(None, None)], -1)
+    second.commit()
+
+    counts = {(row.camera_make, row.camera_model): row.count for row in Session(engine).query(PhotoCameraCount)}
+    assert counts == {('Epson', 'V600'): 3, ('Canon', 'AE-1'): 1}
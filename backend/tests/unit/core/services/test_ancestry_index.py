@@ -0,0 +1,53 @@
+import random
+from core.models.person import Person
+from core.models.relationship import Relationship, PersonAncestry, PARENT
+from core.services.ancestry_index import link_parent, unlink_parent, rebuild_ancestry
+
+def _closure(db):
+    return {(row.ancestor_id, row.descendant_id): row.depth for row in db.session.query(PersonAncestry)}
+
+def _expected_closure(edges):
+    """Shortest ancestor distances computed by brute force."""
+    children = {}
+    for parent, child in edges:
+        children.setdefault(parent, set()).add(child)
+    closure = {}
+    for start in list(children):
+        frontier, depth, seen = {start}, 0, set()
+        while frontier:
+            depth += 1
+            frontier = {child for node in frontier for child in children.get(node, ())} - seen
+            seen |= frontier
+            for node in frontier:
+                closure.setdefault((start, node), depth)
+    return closure
+
+def test_incremental_closure_matches_rebuild(sqlite_db):
+    rng = random.Random(3)
+    people = [Person(first_name=f"P{i}", last_name="Doe") for i in range(30)]
+    sqlite_db.session.add_all(people)
+    sqlite_db.session.flush()
+    ids = [person.id for person in people]
+
+    # Random DAG: parents always have a lower index than their children
+    edges = set()
+    for index in range(1, len(ids)):
+        for parent in rng.sample(ids[:index], min(2, index)):
+            edges.add((parent, ids[index]))
+    for parent, child in sorted(edges):
+        sqlite_db.session.add(Relationship(parent, child, PARENT))
+        link_parent(sqlite_db.session, parent, child)
+    sqlite_db.session.commit()
+    assert _closure(sqlite_db) == _expected_closure(edges)
+
+    for parent, child in rng.sample(sorted(edges), 8):
+        sqlite_db.session.delete(sqlite_db.session.get(Relationship, (parent, child, PARENT)))
+        unlink_parent(sqlite_db.session, parent, child)
+        edges.discard((parent, child))
+    sqlite_db.session.commit()
+    incremental = _closure(sqlite_db)
+    assert incremental == _expected_closure(edges)
+
+    rebuild_ancestry(sqlite_db.session)
+    sqlite_db.session.commit()
+    assert _closure(sqlite_db) == incremental
@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+from unittest.mock import Mock, AsyncMock
+from sqlalchemy import create_engine, select
+
+pytest.importorskip('greenlet')
+pytest.importorskip('aiosqlite')
+from core.models.db import db
+from core.models.aggregates import PhotoDateCount
+from core.models.person import Person
+from core.infrastructure.async_db import create_async_database_engine
+from core.services.async_photo_service import AsyncPhotoService
+from core.services.photo_service import PhotoService
+from utils.config import DatabaseConfig
+
+@pytest.fixture
+def database_url(tmp_path):
+    database_url = f"sqlite:///{tmp_path / 'photos.db'}"
+    engine = create_engine(database_url)
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(Person.__table__.insert(), [{'id': 1, 'first_name': 'Jane', 'last_name': 'Doe'}])
+    engine.dispose()
+    return database_url
+
+@pytest.fixture
+def storage():
+    storage = AsyncMock()
+    storage.upload_file.return_value = ('key.jpg', 'http://test/key.jpg')
+    return storage
+
+@pytest.fixture
+def async_photo_service(database_url, storage):
+    engine = create_async_database_engine(database_url, DatabaseConfig(url=database_url, name='test'))
+    return AsyncPhotoService(engine, storage, PhotoService(Mock()))
+
+def _run(service, coroutine):
+    """Run coroutine on a new event loop, closing the connections opened on it."""
+    async def run():
+        try:
+            return await coroutine
+        finally:
+            await service.engine.dispose()
+    return asyncio.run(run())
+
+def test_upload_then_search(async_photo_service, storage, database_url):
+    async def scenario():
+        uploaded = await async_photo_service.upload_photo(
+            b'not a jpeg', 'picnic.jpg', {'title': 'Picnic', 'tags': ['family'], 'people': ['1']}
+        )
+        found, facets = await asyncio.gather(
+            async_photo_service.search_photos('picnic'),
+            async_photo_service.get_photo_facets({}, 'picnic')
+        )
+        return uploaded, found, facets
+
+    uploaded, found, facets = _run(async_photo_service, scenario())
+
+    assert (uploaded['s3_key'], uploaded['tags'], uploaded['people']) == ('key.jpg', ['family'], [1])
+    assert [photo['id'] for photo in found] == [uploaded['id']]
+    assert facets['total'] == 1
+    assert facets['tags'] == [{'name': 'family', 'count': 1}]
+    # The rollups follow the upload
+    with create_engine(database_url).connect() as connection:
+        assert connection.execute(select(Person.photo_count)).scalar() == 1
+        assert connection.execute(select(PhotoDateCount.count)).scalar() == 1
+
+def test_upload_removes_file_when_database_fails(async_photo_service, storage):
+    storage.upload_file.return_value = ('key.jpg', 'http://test/key.jpg')
+    async_photo_service.photo_service._new_photo = Mock(side_effect=RuntimeError("boom"))
+
+    with pytest.raises(Exception, match="Failed to upload photo"):
+        _run(async_photo_service, async_photo_service.upload_photo(b'jpeg', 'picnic.jpg', {}))
+
+    storage.delete_file.assert_awaited_once_with('key.jpg')
+
+def test_upload_rejects_invalid_file_type(async_photo_service, storage):
+    with pytest.raises(ValueError):
+        _run(async_photo_service, async_photo_service.upload_photo(b'text', 'notes.txt', {}))
+
+    storage.upload_file.assert_not_called()
+
+def test_get_photo_content_not_found(async_photo_service):
+    with pytest.raises(ValueError, match="not found"):
+        _run(async_photo_service, async_photo_service.get_photo_content(404))
@@ -0,0 +1,74 @@
+import pytest
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import Mock, PropertyMock
+from core.services.service_context import ServiceContext
+from core.services.duplicate_service import (
+    DuplicateService, blocking_keys, date_similarity, score_pair, DEFAULT_MIN_SCORE
+)
+from core.models.person import Person
+
+@pytest.fixture
+def duplicate_service(sqlite_db):
+    context = Mock(ServiceContext)
+    type(context).db = PropertyMock(return_value=sqlite_db)
+    return DuplicateService(context)
+
+def _row(person_id, first_name, last_name, birth_date=None, death_date=None):
+    return SimpleNamespace(id=person_id, first_name=first_name, last_name=last_name,
+                           birth_date=birth_date, death_date=death_date)
+
+def test_blocking_keys():
+    assert blocking_keys("J500", "D153", date(1901, 3, 12)) == [('name', 'D153', 'J500'), ('birth', 'D153', 1901)]
+    assert blocking_keys("J500", None, date(1901, 3, 12)) == []
+
+def test_date_similarity():
+    assert date_similarity(date(1901, 3, 12), date(1901, 3, 12)) == 1.0
+    assert date_similarity(date(1901, 3, 12), date(1902, 1, 1)) == 0.5
+    assert date_similarity(date(1901, 3, 12), date(1920, 1, 1)) == 0.0
+    assert date_similarity(None, date(1920, 1, 1)) is None
+
+def test_score_pair():
+    jehan = _row(1, "Jehan", "Dupont", date(1901, 3, 12))
+    jean = _row(2, "Jean", "Dupont", date(1901, 3, 12))
+    older_jean = _row(3, "Jean", "Dupont", date(1850, 1, 1))
+
+    assert score_pair(jehan, jean, set(), set())['score'] >= DEFAULT_MIN_SCORE
+    assert score_pair(jean, older_jean, set(), set())['score'] < DEFAULT_MIN_SCORE
+    # Photographed together, so two different people
+    assert score_pair(jehan, jean, {2}, {1})['score'] == 0.0
+
+def test_scan_duplicates_stores_candidates_and_keeps_dismissals(duplicate_service, sqlite_db):
+    people = [
+        Person(first_name="Jehan", last_name="Dupont", birth_date=date(1901, 3, 12)),
+        Person(first_name="Jean", last_name="Dupond", birth_date=date(1901, 3, 12)),
+        Person(first_name="Johannes", last_name="Dupont", birth_date=date(1901, 3, 12)),
+        Person(first_name="Marie", last_name="Curie", birth_date=date(1867, 11, 7)),
+    ]
+    sqlite_db.session.add_all(people)
+    sqlite_db.session.commit()
+
+    result = duplicate_service.scan_duplicates()
+
+    assert result['people'] == 4
+    assert result['comparisons'] == 3
+    candidates = duplicate_service.get_duplicate_candidates()
+    assert (candidates[0]['personId'], candidates[0]['otherPersonId']) == (people[0].id, people[1].id)
+    assert candidates[0]['person']['firstName'] == "Jehan"
+    assert all("Marie" not in (c['person']['firstName'], c['otherPerson']['firstName']) for c in candidates)
+
+    duplicate_service.dismiss_duplicate(people[1].id, people[0].id)
+    duplicate_service.scan_duplicates()
+    assert (people[0].id, people[1].id) not in {
+        (c['personId'], c['otherPersonId']) for c in duplicate_service.get_duplicate_candidates()
+    }
+    with pytest.raises(ValueError):
+        duplicate_service.dismiss_duplicate(people[0].id, people[3].id)
+
+def test_scan_duplicates_skips_oversized_blocks(duplicate_service, sqlite_db):
+    sqlite_db.session.add_all(Person(first_name="John", last_name="Smith") for _ in range(4))
+    sqlite_db.session.commit()
+
+    result = duplicate_service.scan_duplicates(max_block_size=3)
+
+    assert result == {'people': 4, 'comparisons': 0, 'candidates': 0, 'skippedBlocks': 1}
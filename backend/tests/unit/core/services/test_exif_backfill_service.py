@@ -0,0 +1,174 @@
+import json
+import struct
+import pytest
+from datetime import datetime
+from io import BytesIO
+from unittest.mock import Mock, PropertyMock
+from PIL import Image
+from PIL.TiffImagePlugin import IFDRational
+from core.services.service_context import ServiceContext
+from core.services.exif_backfill_service import ExifBackfillService
+from core.services.aggregate_index import rebuild_timeline, rebuild_camera_counts
+from core.models.aggregates import PhotoDateCount, PhotoCameraCount
+from core.models.photo import Photo
+
+UPLOADED = datetime(2024, 6, 1, 12, 0, 0)
+
+def _jpeg(date_taken=None, author=None, gps=False, camera=None):
+    exif = Image.Exif()
+    if camera:
+        exif[0x010F], exif[0x0110] = camera
+        exif.get_ifd(0x8769)[0x8827] = 400
+    if author:
+        exif[0x013B] = author
+    if date_taken:
+        exif.get_ifd(0x8769)[0x9003] = date_taken
+    if gps:
+        coordinates = exif.get_ifd(0x8825)
+        coordinates[1], coordinates[2] = 'N', (IFDRational(45, 1), IFDRational(30, 1), IFDRational(0, 1))
+        coordinates[3], coordinates[4] = 'E', (IFDRational(4, 1), IFDRational(0, 1), IFDRational(0, 1))
+    buffer = BytesIO()
+    Image.new('RGB', (64, 64)).save(buffer, 'JPEG', exif=exif)
+    return buffer.getvalue()
+
+def _tiff_with_trailing_ifd(image_bytes):
+    """A little-endian TIFF whose IFD0, with Make and Model, follows image_bytes of image data."""
+    ifd0_offset = 8 + image_bytes
+    values_offset = ifd0_offset + 2 + 2 * 12 + 4
+    ifd0 = struct.pack('<H', 2)
+    ifd0 += struct.pack('<HHLL', 0x010F, 2, 6, values_offset)
+    ifd0 += struct.pack('<HHLL', 0x0110, 2, 7, values_offset + 6)
+    ifd0 += struct.pack('<L', 0)
+    return b'II*\x00' + struct.pack('<L', ifd0_offset) + b'\x00' * image_bytes + ifd0 + b'Canon\x00EOS 5D\x00'
+
+@pytest.fixture
+def storage():
+    storage = Mock()
+    storage.files = {}
+    storage.read_range.side_effect = lambda key, offset, length: storage.files[key][offset:offset + length]
+    return storage
+
+@pytest.fixture
+def backfill_service(sqlite_db, storage):
+    context = Mock(ServiceContext)
+    type(context).db = PropertyMock(return_value=sqlite_db)
+    return ExifBackfillService(context, storage=storage)
+
+def _add_photo(db, storage, name, content, **columns):
+    columns.setdefault('date_taken', UPLOADED)
+    photo = Photo(file_name=f"{name}.jpg", s3_key=f"{name}.jpg", url=f"http://test/{name}.jpg",
+                  upload_date=UPLOADED, **columns)
+    db.session.add(photo)
+    storage.files[photo.s3_key] = content
+    return photo
+
+def test_backfill_fills_missing_metadata(backfill_service, sqlite_db, storage):
+    fallback = _add_photo(sqlite_db, storage, "fallback",
+                          _jpeg('1987:08:09 10:11:12', 'Jane Doe', gps=True))
+    dated = _add_photo(sqlite_db, storage, "dated", _jpeg('1990:01:01 00:00:00', 'Someone'),
+                       date_taken=datetime(1950, 5, 5), author="Grandpa")
+    sqlite_db.session.commit()
+    rebuild_timeline(sqlite_db.session)
+    sqlite_db.session.commit()
+
+    result = backfill_service.backfill(processes=0)
+
+    assert result['scanned'] == 2
+    assert result['updated'] == 1
+    assert result['failed'] == 0
+    assert result['bytesFetched'] == len(storage.files['fallback.jpg']) + len(storage.files['dated.jpg'])
+    sqlite_db.session.expire_all()
+    assert fallback.date_taken.replace(tzinfo=None) == datetime(1987, 8, 9, 10, 11, 12)
+    assert fallback.author == "Jane Doe"
+    assert fallback.latitude == pytest.approx(45.5)
+    assert fallback.longitude == pytest.approx(4.0)
+    # Existing metadata is kept
+    assert dated.date_taken.replace(tzinfo=None) == datetime(1950, 5, 5)
+    assert dated.author == "Grandpa"
+    # The timeline rollup follows the new date
+    days = {(row.year, row.month, row.day): row.count for row in sqlite_db.session.query(PhotoDateCount)}
+    assert days == {(1987, 8, 9): 1, (1950, 5, 5): 1}
+
+def test_backfill_only_fetches_header_bytes(backfill_service, sqlite_db, storage):
+    _add_photo(sqlite_db, storage, "photo", _jpeg(author="Jane Doe"))
+    sqlite_db.session.commit()
+
+    backfill_service.backfill(processes=0, header_bytes=4096)
+
+    storage.read_range.assert_called_once_with("photo.jpg", 0, 4096)
+
+def test_backfill_reads_trailing_tiff_ifd(backfill_service, sqlite_db, storage):
+    content = _tiff_with_trailing_ifd(200 * 1024)
+    photo = _add_photo(sqlite_db, storage, "scan", content)
+    sqlite_db.session.commit()
+
+    result = backfill_service.backfill(processes=0, header_bytes=4096)
+
+    assert (photo.camera_make, photo.camera_model) == ('Canon', 'EOS 5D')
+    # The header, then the IFD0 up to the end of the file
+    assert result['bytesFetched'] == 4096 + len(content) - (8 + 200 * 1024)
+
+def test_backfill_counts_unreadable_files(backfill_service, sqlite_db, storage):
+    _add_photo(sqlite_db, storage, "missing", b"")
+    sqlite_db.session.commit()
+    del storage.files["missing.jpg"]
+
+    result = backfill_service.backfill(processes=0)
+
+    assert result['failed'] == 1
+    assert result['scanned'] == 0
+
+def test_backfill_resumes_from_checkpoint(backfill_service, sqlite_db, storage, tmp_path):
+    first = _add_photo(sqlite_db, storage, "first", _jpeg(author="First"))
+    second = _add_photo(sqlite_db, storage, "second", _jpeg(author="Second"))
+    sqlite_db.session.commit()
+    checkpoint = tmp_path / "backfill.json"
+    checkpoint.write_text(json.dumps({'lastId': first.id, 'scanned': 1, 'updated': 0,
+                                      'failed': 0, 'bytesFetched': 0}))
+
+    result = backfill_service.backfill(processes=0, checkpoint_path=str(checkpoint))
+
+    storage.read_range.assert_called_once_with("second.jpg", 0, 128 * 1024)
+    assert result['scanned'] == 2
+    assert result['lastId'] == second.id
+    assert first.author is None
+    assert second.author == "Second"
+    # A finished run leaves no checkpoint behind
+    assert not checkpoint.exists()
+
+def test_backfill_checkpoints_each_batch(backfill_service, sqlite_db, storage, tmp_path):
+    for index in range(3):
+        _add_photo(sqlite_db, storage, f"photo{index}", _jpeg(author="Jane"))
+    sqlite_db.session.commit()
+    checkpoint = tmp_path / "backfill.json"
+    saved = []
+
+    backfill_service.backfill(batch_size=2, processes=0, checkpoint_path=str(checkpoint),
+                              progress=lambda totals: saved.append(json.loads(checkpoint.read_text())))
+
+    assert [state['scanned'] for state in saved] == [2, 3]
+
+def test_backfill_parses_in_process_pool(backfill_service, sqlite_db, storage):
+    photo = _add_photo(sqlite_db, storage, "photo", _jpeg(author="Jane Doe"))
+    sqlite_db.session.commit()
+
+    result = backfill_service.backfill(processes=2)
+
+    assert result['updated'] == 1
+    assert photo.author == "Jane Doe"
+
+def test_backfill_fills_camera_settings(backfill_service, sqlite_db, storage):
+    photo = _add_photo(sqlite_db, storage, "scan", _jpeg(camera=('NIKON', 'F3')))
+    sqlite_db.session.commit()
+    rebuild_camera_counts(sqlite_db.session)
+    sqlite_db.session.commit()
+
+    backfill_service.backfill(processes=0)
+
+    assert (photo.camera_make, photo.camera_model, photo.iso) == ('NIKON', 'F3', 400)
+    counts = {(row.camera_make, row.camera_model): row.count for row in sqlite_db.session.query(PhotoCameraCount)}
+    assert counts == {('NIKON', 'F3'): 1}
+
+def test_backfill_rejects_invalid_batch_size(backfill_service):
+    with pytest.raises(ValueError):
+        backfill_service.backfill(batch_size=0)
@@ -0,0 +1,131 @@
+import pytest
+from datetime import date
+from io import BytesIO
+from unittest.mock import Mock, PropertyMock
+from core.services.service_context import ServiceContext
+from core.services.gedcom_service import GedcomService
+from core.infrastructure.gedcom import decode_lines
+from core.models.person import Person
+from core.models.relationship import Relationship, PersonAncestry, PARENT, SPOUSE
+
+GEDCOM = """0 HEAD
+1 CHAR UTF-8
+0 @I1@ INDI
+1 NAME Pierre /Martin/
+1 BIRT
+2 DATE ABT 1850
+0 @I2@ INDI
+1 NAME Marie /Durand/
+1 NOTE Née à Lyon
+0 @I3@ INDI
+1 NAME Jean /Martin/
+1 BIRT
+2 DATE 12 MAR 1880
+0 @F1@ FAM
+1 HUSB @I1@
+1 WIFE @I2@
+1 CHIL @I3@
+1 CHIL @I9@
+0 TRLR
+"""
+
+@pytest.fixture
+def gedcom_service(sqlite_db):
+    context = Mock(ServiceContext)
+    type(context).db = PropertyMock(return_value=sqlite_db)
+    return GedcomService(context)
+
+def test_import_gedcom(gedcom_service, sqlite_db):
+    result = gedcom_service.import_gedcom(GEDCOM.splitlines(keepends=True), batch_size=2)
+
+    assert result['people'] == 3
+    assert result['relationships'] == 3
+    assert result['unresolvedReferences'] == 1
+    jean = sqlite_db.session.get(Person, result['idMap']['@I3@'])
+    assert (jean.first_name, jean.last_name, jean.birth_date) == ("Jean", "Martin", date(1880, 3, 12))
+    assert jean.last_name_phonetic == "M635"
+    pierre = sqlite_db.session.get(Person, result['idMap']['@I1@'])
+    assert pierre.birth_date is None
+    assert pierre.description == "Birth: ABT 1850"
+    assert sqlite_db.session.get(Relationship, (result['idMap']['@I1@'], jean.id, PARENT))
+    assert sqlite_db.session.query(PersonAncestry).count() == 2
+
+def test_export_gedcom_round_trips(gedcom_service, sqlite_db):
+    first = gedcom_service.import_gedcom(GEDCOM.splitlines(keepends=True))
+    single = Person(first_name="Anne", last_name="Leroy", death_date=date(1999, 1, 2))
+    sqlite_db.session.add(single)
+    sqlite_db.session.commit()
+
+    exported = list(gedcom_service.export_gedcom(batch_size=2))
+    sqlite_db.session.query(PersonAncestry).delete()
+    sqlite_db.session.query(Relationship).delete()
+    sqlite_db.session.query(Person).delete()
+    sqlite_db.session.commit()
+    second = gedcom_service.import_gedcom(exported)
+
+    assert exported[0] == "0 HEAD\n"
+    assert exported[-1] == "0 TRLR\n"
+    assert second['people'] == 4
+    assert second['relationships'] == first['relationships']
+    assert second['unresolvedReferences'] == 0
+    people = {(p.first_name, p.last_name, p.birth_date, p.death_date, p.description)
+              for p in sqlite_db.session.query(Person)}
+    assert ("Anne", "Leroy", None, date(1999, 1, 2), None) in people
+    assert ("Marie", "Durand", None, None, "Née à Lyon") in people
+    spouses = sqlite_db.session.query(Relationship).filter_by(relationship_type=SPOUSE).count()
+    assert spouses == 1
+
+def test_import_gedcom_rolls_back_on_failure(gedcom_service, sqlite_db):
+    def broken():
+        yield "0 @I1@ INDI\n"
+        yield "1 NAME Jean /Martin/\n"
+        raise IOError("connection reset")
+
+    with pytest.raises(Exception) as exc_info:
+        gedcom_service.import_gedcom(broken(), batch_size=1)
+
+    assert "Failed to import GEDCOM" in str(exc_info.value)
+    assert sqlite_db.session.query(Person).count() == 0
+
+def test_import_gedcom_extends_the_archive_lineage(gedcom_service, sqlite_db):
+    from core.services.person_service import PersonService
+    from core.services.relationship_graph import RelationshipGraph
+    context = Mock(ServiceContext)
+    type(context).db = PropertyMock(return_value=sqlite_db)
+    person_service = PersonService(context)
+    person_service.graph = RelationshipGraph(ttl_seconds=3600)
+    first = gedcom_service.import_gedcom(GEDCOM.splitlines(keepends=True))
+    pierre_id = first['idMap']['@I1@']
+    assert [p['firstName'] for p in person_service.get_descendants(pierre_id)] == ["Jean"]
+    grandchild = """0 @I1@ INDI
+1 NAME Paul /Martin/
+0 @I2@ INDI
+1 NAME Louis /Martin/
+0 @I3@ INDI
+1 NAME Rose /Martin/
+0 @F1@ FAM
+1 HUSB @I1@
+1 CHIL @I2@
+0 @F2@ FAM
+1 HUSB @I2@
+1 CHIL @I3@
+"""
+
+    second = gedcom_service.import_gedcom(grandchild.splitlines(keepends=True))
+
+    closure = {(row.ancestor_id, row.descendant_id): row.depth for row in sqlite_db.session.query(PersonAncestry)}
+    paul, louis, rose = (second['idMap'][xref] for xref in ('@I1@', '@I2@', '@I3@'))
+    assert closure == {
+        (pierre_id, first['idMap']['@I3@']): 1, (first['idMap']['@I2@'], first['idMap']['@I3@']): 1,
+        (paul, louis): 1, (louis, rose): 1, (paul, rose): 2
+    }
+    # The cached graph follows the import
+    assert [p['firstName'] for p in person_service.get_descendants(paul)] == ["Louis", "Rose"]
+
+def test_import_gedcom_rejects_undecodable_files(gedcom_service, sqlite_db):
+    content = GEDCOM.replace("Pierre", "Jérôme").encode('latin-1')
+
+    with pytest.raises(ValueError, match="not valid"):
+        gedcom_service.import_gedcom(decode_lines(BytesIO(content)), batch_size=1)
+
+    assert sqlite_db.session.query(Person).count() == 0
@@ -6,6 +6,7 @@ from core.services.person_service import PersonService
 from core.services.service_context import ServiceContext
 from core.services.service_exceptions import NotFoundException
 from core.models.person import Person
+from core.models.relationship import Relationship
 
 @pytest.fixture
 def app():
@@ -206,3 +207,338 @@ def test_delete_person_not_found(person_service, mock_db):
     with pytest.raises(ValueError) as exc_info:
         person_service.delete_person(person_id)
     assert f"Person with id {person_id} not found" in str(exc_info.value)
+
+def test_get_frequent_companions(sqlite_db):
+    from core.models.photo import Photo
+    from core.services.aggregate_index import record_photos_added
+    context = Mock(ServiceContext)
+    type(context).db = PropertyMock(return_value=sqlite_db)
+    service = PersonService(context)
+    ann, bob, cid = (Person(first_name=name, last_name="Doe") for name in ("Ann", "Bob", "Cid"))
+    photos = [
+        Photo(file_name=f"{i}.jpg", s3_key=f"{i}.jpg", url=f"http://test/{i}.jpg", people=people)
+        for i, people in enumerate([[ann, bob], [ann, bob, cid], [bob, cid]])
+    ]
+    sqlite_db.session.add_all(photos)
+    sqlite_db.session.flush()
+    record_photos_added(sqlite_db.session, photos)
+    sqlite_db.session.commit()
+
+    result = service.get_frequent_companions(bob.id)
+
+    assert [(p['firstName'], p['sharedPhotoCount']) for p in result] == [("Ann", 2), ("Cid", 2)]
+    assert result[0]['photoCount'] == 2
+
+def test_get_frequent_companions_not_found(person_service, mock_db):
+    mock_db.session.get.return_value = None
+    with pytest.raises(ValueError):
+        person_service.get_frequent_companions(999)
+
+@pytest.fixture
+def sqlite_person_service(sqlite_db):
+    context = Mock(ServiceContext)
+    type(context).db = PropertyMock(return_value=sqlite_db)
+    return PersonService(context)
+
+def test_search_people_matches_spelling_variants(sqlite_person_service, sqlite_db):
+    sqlite_db.session.add_all([
+        Person(first_name="Jean", last_name="Marc"),
+        Person(first_name="Pierre", last_name="Durand", description="Cousin de Jean"),
+        Person(first_name="Paul", last_name="Martin")
+    ])
+    sqlite_db.session.commit()
+
+    results = sqlite_person_service.search_people("Jehan Marcq")
+
+    assert [(p['firstName'], p['lastName']) for p in results] == [("Jean", "Marc")]
+
+def test_search_people_ranks_name_matches_first(sqlite_person_service, sqlite_db):
+    sqlite_db.session.add_all([
+        Person(first_name="Pierre", last_name="Durand", description="Cousin de Jean"),
+        Person(first_name="Jean", last_name="Valjean")
+    ])
+    sqlite_db.session.commit()
+
+    results = sqlite_person_service.search_people("jean", limit=1)
+
+    assert [p['firstName'] for p in results] == ["Jean"]
+
+def test_search_people_uses_trigram_similarity_on_postgresql(person_service, mock_db):
+    mock_db.session.get_bind.return_value.dialect.name = 'postgresql'
+    mock_query = mock_db.session.query.return_value
+    mock_query.filter.return_value.order_by.return_value.limit.return_value.all.return_value = []
+
+    person_service.search_people("Jehan")
+
+    condition = mock_query.filter.call_args[0][0]
+    score = mock_query.filter.return_value.order_by.call_args[0][0]
+    from sqlalchemy.dialects import postgresql
+    assert '%%' in str(condition.compile(dialect=postgresql.dialect()))
+    assert 'similarity' in str(score.compile(dialect=postgresql.dialect()))
+
+@pytest.fixture
+def family(sqlite_person_service, sqlite_db):
+    """grandpa -> dad -> (kid, kid2), mom spouse of dad and parent of kid."""
+    people = {
+        name: Person(first_name=name.capitalize(), last_name="Doe")
+        for name in ("grandpa", "dad", "mom", "kid", "kid2", "stranger")
+    }
+    sqlite_db.session.add_all(people.values())
+    sqlite_db.session.commit()
+    service = sqlite_person_service
+    service.add_relationship(people["grandpa"].id, people["dad"].id, "parent")
+    service.add_relationship(people["dad"].id, people["kid"].id, "parent")
+    service.add_relationship(people["dad"].id, people["kid2"].id, "parent")
+    service.add_relationship(people["mom"].id, people["kid"].id, "parent")
+    service.add_relationship(people["mom"].id, people["dad"].id, "spouse")
+    return people
+
+@pytest.mark.parametrize("use_graph", [False, True])
+def test_get_ancestors_and_descendants(sqlite_person_service, family, use_graph):
+    from core.services.relationship_graph import RelationshipGraph
+    if use_graph:
+        sqlite_person_service.graph = RelationshipGraph()
+
+    ancestors = sqlite_person_service.get_ancestors(family["kid"].id)
+    descendants = sqlite_person_service.get_descendants(family["grandpa"].id, max_depth=1)
+
+    assert [(p['firstName'], p['generation']) for p in ancestors] == [("Dad", 1), ("Mom", 1), ("Grandpa", 2)]
+    assert [(p['firstName'], p['generation']) for p in descendants] == [("Dad", 1)]
+
+def test_add_relationship_rejects_cycles(sqlite_person_service, family):
+    with pytest.raises(ValueError) as exc_info:
+        sqlite_person_service.add_relationship(family["kid"].id, family["grandpa"].id, "parent")
+    assert "descendant" in str(exc_info.value)
+
+def test_add_relationship_validation(sqlite_person_service, family):
+    with pytest.raises(ValueError):
+        sqlite_person_service.add_relationship(family["kid"].id, family["kid"].id, "parent")
+    with pytest.raises(ValueError):
+        sqlite_person_service.add_relationship(family["kid"].id, family["kid2"].id, "sibling")
+    with pytest.raises(ValueError):
+        sqlite_person_service.add_relationship(family["dad"].id, family["mom"].id, "spouse")
+
+def test_get_relationships_and_related_to(sqlite_person_service, family):
+    relationships = sqlite_person_service.get_relationships(family["dad"].id)
+    related = sqlite_person_service.get_people({'related_to': family["dad"].id})
+
+    assert [p['firstName'] for p in relationships['parents']] == ["Grandpa"]
+    assert [p['firstName'] for p in relationships['children']] == ["Kid", "Kid2"]
+    assert [p['firstName'] for p in relationships['spouses']] == ["Mom"]
+    assert sorted(p['firstName'] for p in related) == ["Grandpa", "Kid", "Kid2", "Mom"]
+
+def test_remove_relationship(sqlite_person_service, family):
+    sqlite_person_service.remove_relationship(family["dad"].id, family["mom"].id, "spouse")
+
+    assert sqlite_person_service.get_relationships(family["mom"].id)['spouses'] == []
+    with pytest.raises(ValueError):
+        sqlite_person_service.remove_relationship(family["dad"].id, family["mom"].id, "spouse")
+
+def test_get_kinship(sqlite_person_service, sqlite_db, family):
+    service = sqlite_person_service
+    aunt = Person(first_name="Aunt", last_name="Doe")
+    cousin = Person(first_name="Cousin", last_name="Doe")
+    sqlite_db.session.add_all([aunt, cousin])
+    sqlite_db.session.commit()
+    service.add_relationship(family["grandpa"].id, aunt.id, "parent")
+    service.add_relationship(aunt.id, cousin.id, "parent")
+
+    assert service.is_ancestor(family["grandpa"].id, family["kid"].id)
+    assert service.get_kinship(family["grandpa"].id, family["kid"].id)['relationship'] == 'ancestor'
+    assert service.get_kinship(family["kid"].id, family["kid2"].id)['relationship'] == 'sibling'
+    assert service.get_kinship(aunt.id, family["kid"].id)['relationship'] == 'aunt_uncle'
+    assert service.get_kinship(family["kid"].id, family["stranger"].id)['relationship'] is None
+    kinship = service.get_kinship(family["kid"].id, cousin.id)
+    assert kinship['relationship'] == 'cousin'
+    assert kinship['cousinDegree'] == 1
+    assert kinship['removed'] == 0
+    assert kinship['lowestCommonAncestors'] == [family["grandpa"].id]
+    assert [p['firstName'] for p in service.get_common_ancestors(family["kid"].id, cousin.id)] == ["Grandpa"]
+    with pytest.raises(ValueError, match="not found"):
+        service.get_common_ancestors(family["kid"].id, 99999)
+
+def test_delete_person_keeps_other_lineages(sqlite_person_service, sqlite_db, family):
+    sqlite_person_service.delete_person(family["dad"].id)
+
+    assert not sqlite_person_service.is_ancestor(family["grandpa"].id, family["kid"].id)
+    assert sqlite_person_service.is_ancestor(family["mom"].id, family["kid"].id)
+    assert sqlite_person_service.get_relationships(family["mom"].id)['spouses'] == []
+
+def test_get_tree_layout(sqlite_person_service, sqlite_db, family):
+    family["kid2"].birth_date = date(1990, 1, 1)
+    family["kid"].birth_date = date(1995, 1, 1)
+    sqlite_db.session.commit()
+
+    layout = sqlite_person_service.get_tree_layout(family["grandpa"].id, depth=2)
+
+    assert [(n['firstName'], n['generation'], n['order']) for n in layout['nodes']] == [
+        ("Grandpa", 0, 0), ("Dad", 1, 0), ("Mom", 1, 1), ("Kid2", 2, 0), ("Kid", 2, 1)
+    ]
+    assert layout['generations'] == [{'generation': 0, 'count': 1}, {'generation': 1, 'count': 2},
+                                     {'generation': 2, 'count': 2}]
+    assert len(layout['edges']) == 5
+
+    ancestors = sqlite_person_service.get_tree_layout(family["kid"].id, depth=1)
+    assert {(n['firstName'], n['generation']) for n in ancestors['nodes']} == {("Kid", 0), ("Dad", -1), ("Mom", -1)}
+
+def test_get_tree_layout_is_cached_until_relationships_change(sqlite_person_service, sqlite_db, family):
+    service = sqlite_person_service
+    first = service.get_tree_layout(family["dad"].id)
+    assert service.get_tree_layout(family["dad"].id) is first
+
+    service.add_relationship(family["dad"].id, family["stranger"].id, "parent")
+
+    assert "Stranger" in [n['firstName'] for n in service.get_tree_layout(family["dad"].id)['nodes']]
+
+def test_iter_tree_layout_streams_generations_outwards(sqlite_person_service, family):
+    chunks = list(sqlite_person_service.iter_tree_layout(family["dad"].id, depth=1, chunk_size=1))
+
+    assert chunks[0]['type'] == 'layout'
+    assert chunks[0]['nodeCount'] == 5
+    assert [c['generation'] for c in chunks if c['type'] == 'nodes'] == [0, 0, -1, 1, 1]
+    sent = set()
+    for chunk in chunks[1:]:
+        if chunk['type'] == 'nodes':
+            sent.update(node['id'] for node in chunk['nodes'])
+        else:
+            assert {chunk['edges'][0]['personId'], chunk['edges'][0]['relativeId']} <= sent
+    assert sum(len(c['edges']) for c in chunks if c['type'] == 'edges') == chunks[0]['edgeCount']
+
+def test_iter_tree_layout_validation(sqlite_person_service, family):
+    with pytest.raises(ValueError):
+        sqlite_person_service.iter_tree_layout(family["dad"].id, depth=0)
+    with pytest.raises(ValueError) as exc_info:
+        sqlite_person_service.iter_tree_layout(9999)
+    assert "not found" in str(exc_info.value)
+
+def test_create_persons_reports_each_item(sqlite_person_service, sqlite_db):
+    result = sqlite_person_service.create_persons([
+        {'first_name': 'Jean', 'last_name': 'Marc', 'birth_date': '1901-03-12'},
+        {'first_name': 'Anne'},
+        {'first_name': 'Paul', 'last_name': 'Durand', 'birth_date': '12/03/1901'},
+        {'first_name': 'Luc', 'last_name': 'Martin', 'nickname': 'Lulu'},
+    ])
+
+    assert (result['succeeded'], result['failed']) == (1, 3)
+    assert [r['success'] for r in result['results']] == [True, False, False, False]
+    assert "last_name" in result['results'][1]['error']
+    jean = sqlite_db.session.get(Person, result['results'][0]['id'])
+    assert jean.birth_date == date(1901, 3, 12)
+    assert jean.last_name_phonetic == "M620"
+
+def test_create_persons_all_or_nothing(sqlite_person_service, sqlite_db):
+    result = sqlite_person_service.create_persons(
+        [{'first_name': 'Jean', 'last_name': 'Marc'}, {'first_name': ''}], all_or_nothing=True
+    )
+
+    assert result['succeeded'] == 0
+    assert sqlite_db.session.query(Person).count() == 0
+
+def test_create_persons_rejects_oversized_batch(sqlite_person_service):
+    from core.services.person_service import MAX_BATCH_SIZE
+    with pytest.raises(ValueError):
+        sqlite_person_service.create_persons([{}] * (MAX_BATCH_SIZE + 1))
+
+def test_update_persons(sqlite_person_service, sqlite_db, family):
+    result = sqlite_person_service.update_persons([
+        {'id': family["kid"].id, 'first_name': 'Jehan'},
+        {'id': family["kid2"].id, 'first_name': 'Lou', 'description': 'Youngest'},
+        {'id': family["dad"].id, 'birth_date': '1950-01-01'},
+        {'id': 9999, 'first_name': 'Ghost'},
+        {'id': family["kid"].id, 'last_name': 'Twice'},
+    ])
+
+    assert [r['success'] for r in result['results']] == [True, True, True, False, False]
+    assert "not found" in result['results'][3]['error']
+    sqlite_db.session.expire_all()
+    kid = sqlite_db.session.get(Person, family["kid"].id)
+    assert (kid.first_name, kid.first_name_phonetic, kid.last_name) == ("Jehan", "J500", "Doe")
+    assert sqlite_db.session.get(Person, family["kid2"].id).description == 'Youngest'
+    assert sqlite_db.session.get(Person, family["dad"].id).birth_date == date(1950, 1, 1)
+
+def test_update_persons_uses_values_list_on_postgresql(person_service, mock_db):
+    mock_db.session.get_bind.return_value.dialect.name = 'postgresql'
+
+    person_service._bulk_update(('birth_date', 'first_name'), [
+        {'id': 1, 'first_name': 'Jean', 'birth_date': None},
+        {'id': 2, 'first_name': 'Anne', 'birth_date': date(1901, 3, 12)},
+    ])
+
+    from sqlalchemy.dialects import postgresql
+    statement = str(mock_db.session.execute.call_args[0][0].compile(dialect=postgresql.dialect()))
+    assert 'FROM (VALUES' in statement
+    assert 'CAST(changes.birth_date AS DATE)' in statement
+
+def test_delete_persons(sqlite_person_service, sqlite_db, family):
+    result = sqlite_person_service.delete_persons([family["dad"].id, family["kid2"].id, 9999])
+
+    assert [r['success'] for r in result['results']] == [True, True, False]
+    remaining = {p.first_name for p in sqlite_db.session.query(Person)}
+    assert remaining == {"Grandpa", "Mom", "Kid", "Stranger"}
+    assert not sqlite_person_service.is_ancestor(family["grandpa"].id, family["kid"].id)
+    assert sqlite_person_service.is_ancestor(family["mom"].id, family["kid"].id)
+    assert sqlite_db.session.query(Relationship).count() == 1
+
+def test_merge_persons_moves_photos_and_relationships(sqlite_person_service, sqlite_db, family):
+    from datetime import datetime, timezone
+    from core.models.photo import Photo
+    from core.models.aggregates import PersonCooccurrence
+    from core.services.aggregate_index import record_photos_added
+    service = sqlite_person_service
+    duplicate = Person(first_name="Kidd", last_name="Doe", birth_date=date(1990, 1, 1))
+    sqlite_db.session.add(duplicate)
+    sqlite_db.session.flush()
+    photos = [
+        Photo(file_name=f"{i}.jpg", s3_key=f"{i}.jpg", url="u", title="t",
+              date_taken=datetime(2020, 1, 1, tzinfo=timezone.utc), people=people)
+        for i, people in enumerate([[duplicate, family["mom"]], [duplicate, family["kid"]]])
+    ]
+    sqlite_db.session.add_all(photos)
+    sqlite_db.session.flush()
+    record_photos_added(sqlite_db.session, photos)
+    sqlite_db.session.commit()
+    service.add_relationship(family["dad"].id, duplicate.id, "parent")
+    service.add_relationship(duplicate.id, family["stranger"].id, "parent")
+
+    result = service.merge_persons(family["kid"].id, duplicate.id)
+
+    assert result['movedPhotos'] == 1
+    assert result['movedRelationships'] == 1
+    assert [d['personId'] for d in result['droppedRelationships']] == [family["dad"].id]
+    assert result['person']['birthDate'] == '1990-01-01'
+    assert sqlite_db.session.get(Person, duplicate.id) is None
+    kid = sqlite_db.session.get(Person, family["kid"].id)
+    assert kid.photo_count == 2
+    assert sqlite_db.session.get(PersonCooccurrence, (family["kid"].id, family["mom"].id)).count == 1
+    assert sqlite_db.session.query(PersonCooccurrence).filter_by(person_id=duplicate.id).count() == 0
+    assert service.is_ancestor(family["grandpa"].id, family["stranger"].id)
+
+def test_merge_persons_validation(sqlite_person_service, family):
+    with pytest.raises(ValueError):
+        sqlite_person_service.merge_persons(family["kid"].id, family["kid"].id)
+    with pytest.raises(ValueError) as exc_info:
+        sqlite_person_service.merge_persons(family["kid"].id, 9999)
+    assert "not found" in str(exc_info.value)
+
+def test_relationship_graph_follows_writes_of_other_workers(sqlite_db, family):
+    from core.services.relationship_graph import RelationshipGraph
+    context = Mock(ServiceContext)
+    type(context).db = PropertyMock(return_value=sqlite_db)
+    reader, writer = PersonService(context), PersonService(context)
+    reader.graph = RelationshipGraph(ttl_seconds=3600)
+    assert [p['firstName'] for p in reader.get_descendants(family["dad"].id)] == ["Kid", "Kid2"]
+
+    writer.add_relationship(family["kid"].id, family["stranger"].id, "parent")
+
+    assert [p['firstName'] for p in reader.get_descendants(family["dad"].id)] == ["Kid", "Kid2", "Stranger"]
+
+def test_tree_layout_cache_follows_writes_of_other_workers(sqlite_db, family):
+    context = Mock(ServiceContext)
+    type(context).db = PropertyMock(return_value=sqlite_db)
+    reader, writer = PersonService(context), PersonService(context)
+    first = reader.get_tree_layout(family["dad"].id)
+    assert reader.get_tree_layout(family["dad"].id) is first
+
+    writer.add_relationship(family["dad"].id, family["stranger"].id, "parent")
+
+    assert "Stranger" in [n['firstName'] for n in reader.get_tree_layout(family["dad"].id)['nodes']]
@@ -4,10 +4,12 @@ from datetime import datetime, timezone
 from io import BytesIO
 from flask import Flask
 from core.services.photo_service import PhotoService
+from core.services.person_service import PersonService
 from core.services.service_context import ServiceContext
 from core.models.photo import Photo
 from core.models.tag import Tag
 from core.models.person import Person
+from core.services.aggregate_index import record_photos_added, record_photos_removed, rebuild_timeline
 
 @pytest.fixture
 def app():
@@ -79,6 +81,7 @@ def test_upload_photo_success(photo_service, mock_db, mock_storage, app):
     with app.app_context():
         with patch('core.services.photo_service.Tag', mock_tag_class), \
              patch('core.services.photo_service.Photo', mock_photo_class), \
+             patch('core.services.photo_service.record_photos_added') as mock_record, \
              patch('core.services.photo_service.extract_exif_data') as mock_extract:
             mock_extract.return_value = {
                 'date_taken': datetime(2024, 1, 1, tzinfo=timezone.utc),
@@ -90,6 +93,7 @@ def test_upload_photo_success(photo_service, mock_db, mock_storage, app):
             
             # Assert
             mock_storage.upload_file.assert_called_once()
+            mock_record.assert_called_once()
             mock_db.session.add.assert_called()
             mock_db.session.commit.assert_called_once()
             assert result is not None
@@ -126,12 +130,13 @@ def test_delete_photo_success(photo_service, mock_db, mock_storage, app):
     mock_query.get.return_value = mock_photo
     mock_db.session.query.return_value = mock_query
     
-    with app.app_context():
+    with app.app_context(), patch('core.services.photo_service.record_photos_removed') as mock_record:
         # Act
         result = photo_service.delete_photo(photo_id)
         
         # Assert
         assert result is True
+        mock_record.assert_called_once_with(mock_db.session, [mock_photo])
         mock_storage.delete_file.assert_called_once_with('test_s3_key')
         mock_db.session.delete.assert_called_once_with(mock_photo)
         mock_db.session.commit.assert_called_once()
@@ -291,3 +296,297 @@ def test_search_photos_case_insensitive(photo_service, mock_db):
 
     assert len(results1) == len(results2) == len(results3) == 1
     assert results1[0]["id"] == results2[0]["id"] == results3[0]["id"]
+
+@pytest.fixture
+def sqlite_photo_service(sqlite_db):
+    context = Mock(ServiceContext)
+    type(context).db = PropertyMock(return_value=sqlite_db)
+    return PhotoService(context)
+
+def _add_photo(db, name, date_taken, location=None, tags=None, people=None):
+    photo = Photo(
+        file_name=f"{name}.jpg",
+        s3_key=f"{name}.jpg",
+        url=f"http://test/{name}.jpg",
+        title=name,
+        date_taken=date_taken,
+        location_name=location,
+        tags=tags,
+        people=people
+    )
+    db.session.add(photo)
+    return photo
+
+def test_get_photo_facets_counts(sqlite_photo_service, sqlite_db):
+    family, travel = Tag(name="family"), Tag(name="travel")
+    john = Person(first_name="John", last_name="Doe")
+    jane = Person(first_name="Jane", last_name="Doe")
+    sqlite_db.session.add_all([family, travel, john, jane])
+    _add_photo(sqlite_db, "a", datetime(1998, 5, 1), "Paris", [family], [john])
+    _add_photo(sqlite_db, "b", datetime(1998, 7, 1), "Paris", [family, travel], [john, jane])
+    _add_photo(sqlite_db, "c", datetime(2001, 1, 1), "Lyon", [travel], [jane])
+    sqlite_db.session.commit()
+
+    facets = sqlite_photo_service.get_photo_facets({})
+
+    assert facets['total'] == 3
+    assert facets['tags'] == [{'name': 'family', 'count': 2}, {'name': 'travel', 'count': 2}]
+    assert {p['name']: p['count'] for p in facets['people']} == {'John Doe': 2, 'Jane Doe': 2}
+    assert facets['years'] == [{'year': 1998, 'count': 2}, {'year': 2001, 'count': 1}]
+    assert facets['locations'][0] == {'name': 'Paris', 'count': 2}
+
+def test_get_photo_facets_respects_filters(sqlite_photo_service, sqlite_db):
+    family, travel = Tag(name="family"), Tag(name="travel")
+    sqlite_db.session.add_all([family, travel])
+    _add_photo(sqlite_db, "a", datetime(1998, 5, 1), "Paris", [family])
+    _add_photo(sqlite_db, "b", datetime(2001, 7, 1), "Lyon", [family, travel])
+    _add_photo(sqlite_db, "c", datetime(2001, 1, 1), "Lyon", [travel])
+    sqlite_db.session.commit()
+
+    facets = sqlite_photo_service.get_photo_facets({'tags': ['travel']}, query="lyon")
+
+    assert facets['total'] == 2
+    assert facets['tags'] == [{'name': 'travel', 'count': 2}, {'name': 'family', 'count': 1}]
+    assert facets['years'] == [{'year': 2001, 'count': 2}]
+
+def test_get_photo_facets_cached_per_normalized_query(sqlite_photo_service, sqlite_db):
+    _add_photo(sqlite_db, "a", datetime(1998, 5, 1), "Paris")
+    sqlite_db.session.commit()
+
+    first = sqlite_photo_service.get_photo_facets({'location': 'Paris '}, query="A")
+    _add_photo(sqlite_db, "a2", datetime(1998, 5, 2), "Paris")
+    sqlite_db.session.commit()
+    second = sqlite_photo_service.get_photo_facets({'location': 'paris'}, query="a")
+
+    assert second is first
+    sqlite_photo_service.facet_cache.clear()
+    assert sqlite_photo_service.get_photo_facets({'location': 'paris'}, query="a")['total'] == 2
+
+def test_get_photo_facets_invalidated_by_writes_of_other_workers(sqlite_photo_service, sqlite_db):
+    john = Person(first_name="John", last_name="Doe")
+    photo = _add_photo(sqlite_db, "a", datetime(1998, 5, 1), "Paris", people=[john])
+    sqlite_db.session.commit()
+    context = Mock(ServiceContext)
+    type(context).db = PropertyMock(return_value=sqlite_db)
+    # Services of another worker, with caches of their own
+    other_photo_service, other_person_service = PhotoService(context), PersonService(context)
+
+    assert sqlite_photo_service.get_photo_facets({})['tags'] == []
+    other_photo_service.tag_photos([photo.id], ["family"])
+    assert sqlite_photo_service.get_photo_facets({})['tags'] == [{'name': 'family', 'count': 1}]
+    other_person_service.update_person(john.id, {'first_name': 'Johnny'})
+    assert sqlite_photo_service.get_photo_facets({})['people'][0]['name'] == 'Johnny Doe'
+
+def test_search_photos_combines_text_and_criteria(sqlite_photo_service, sqlite_db):
+    family = Tag(name="family")
+    sqlite_db.session.add(family)
+    _add_photo(sqlite_db, "Paris with family", datetime(2020, 1, 1), tags=[family])
+    _add_photo(sqlite_db, "Paris alone", datetime(2021, 1, 1))
+    _add_photo(sqlite_db, "Lyon with family", datetime(2022, 1, 1), tags=[family])
+    sqlite_db.session.commit()
+
+    results = sqlite_photo_service.search_photos("paris", {'tags': ['family']})
+
+    assert [photo['title'] for photo in results] == ["Paris with family"]
+
+def test_search_photos_paginates_and_sorts_by_relevance(sqlite_photo_service, sqlite_db):
+    _add_photo(sqlite_db, "Summer", datetime(2022, 1, 1), location="Paris")
+    _add_photo(sqlite_db, "Paris in summer", datetime(2020, 1, 1))
+    _add_photo(sqlite_db, "Winter", datetime(2021, 1, 1), location="Paris")
+    sqlite_db.session.commit()
+
+    by_relevance = sqlite_photo_service.search_photos("paris summer", sort='relevance')
+    by_date = sqlite_photo_service.search_photos("paris summer", page=2, per_page=2)
+
+    assert [photo['title'] for photo in by_relevance] == ["Paris in summer", "Summer", "Winter"]
+    assert [photo['title'] for photo in by_date] == ["Paris in summer"]
+
+def test_search_photos_invalid_sort(sqlite_photo_service):
+    with pytest.raises(ValueError):
+        sqlite_photo_service.search_photos("paris", sort='popularity')
+
+def test_build_photo_query_orders_filters_without_distinct(sqlite_photo_service):
+    query = sqlite_photo_service._build_photo_query(
+        {'location': 'Paris', 'people': [1], 'tags': ['family']}, ['summer'], 'date', 1, 10
+    )
+    sql = str(query.statement.compile())
+    where = sql[sql.index('WHERE'):]
+
+    assert 'DISTINCT' not in sql
+    assert where.index('photo_people') < where.index('photo_tags') < where.index('photos.location_name')
+
+def test_get_timeline_from_rollup(sqlite_photo_service, sqlite_db):
+    for name, taken in (("a", datetime(1998, 5, 1)), ("b", datetime(1998, 5, 20)), ("c", datetime(2001, 1, 1))):
+        photo = _add_photo(sqlite_db, name, taken)
+        record_photos_added(sqlite_db.session, [photo])
+    sqlite_db.session.commit()
+
+    assert sqlite_photo_service.get_timeline({}, 'year') == [
+        {'year': 1998, 'count': 2}, {'year': 2001, 'count': 1}
+    ]
+    assert sqlite_photo_service.get_timeline({}, 'month') == [
+        {'year': 1998, 'month': 5, 'count': 2}, {'year': 2001, 'month': 1, 'count': 1}
+    ]
+
+def test_get_timeline_with_criteria_matches_rollup(sqlite_photo_service, sqlite_db):
+    family = Tag(name="family")
+    sqlite_db.session.add(family)
+    photos = [
+        _add_photo(sqlite_db, "a", datetime(1998, 5, 1), tags=[family]),
+        _add_photo(sqlite_db, "b", datetime(1998, 5, 1)),
+        _add_photo(sqlite_db, "c", datetime(2001, 1, 1), tags=[family])
+    ]
+    record_photos_added(sqlite_db.session, photos)
+    sqlite_db.session.commit()
+
+    assert sqlite_photo_service.get_timeline({'tags': ['family']}, 'day') == [
+        {'year': 1998, 'month': 5, 'day': 1, 'count': 1},
+        {'year': 2001, 'month': 1, 'day': 1, 'count': 1}
+    ]
+
+    record_photos_removed(sqlite_db.session, photos[:2])
+    sqlite_db.session.commit()
+    assert sqlite_photo_service.get_timeline({}, 'day') == [{'year': 2001, 'month': 1, 'day': 1, 'count': 1}]
+    assert rebuild_timeline(sqlite_db.session) == 2
+
+def test_get_timeline_invalid_granularity(sqlite_photo_service):
+    with pytest.raises(ValueError):
+        sqlite_photo_service.get_timeline({}, 'week')
+
+def _snapshot_rollups(db):
+    from core.models.aggregates import PersonCooccurrence, PhotoDateCount, PhotoCameraCount
+    return (
+        sorted((r.camera_make, r.camera_model, r.count) for r in db.session.query(PhotoCameraCount)),
+        sorted((p.id, p.photo_count) for p in db.session.query(Person)),
+        sorted((r.person_id, r.other_person_id, r.count) for r in db.session.query(PersonCooccurrence)),
+        sorted((r.year, r.month, r.day, r.count) for r in db.session.query(PhotoDateCount))
+    )
+
+def _assert_rollups_consistent(db):
+    from core.services.aggregate_index import rebuild_person_index, rebuild_camera_counts
+    incremental = _snapshot_rollups(db)
+    rebuild_timeline(db.session)
+    rebuild_camera_counts(db.session)
+    rebuild_person_index(db.session)
+    db.session.commit()
+    assert _snapshot_rollups(db) == incremental
+
+def test_tag_and_untag_photos(sqlite_photo_service, sqlite_db):
+    taken = datetime(2020, 5, 1, tzinfo=timezone.utc)
+    existing = Tag(name="family")
+    photos = [_add_photo(sqlite_db, f"p{i}", taken, tags=[existing] if i == 0 else []) for i in range(3)]
+    sqlite_db.session.commit()
+    ids = [photo.id for photo in photos]
+
+    result = sqlite_photo_service.tag_photos(ids + [999], ["family", "summer"])
+
+    assert result == {'photos': 3, 'changed': 5, 'missingPhotoIds': [999]}
+    assert sqlite_photo_service.tag_photos(ids, ["family"])['changed'] == 0
+    assert sorted(t.name for t in sqlite_db.session.get(Photo, ids[2]).tags) == ["family", "summer"]
+
+    assert sqlite_photo_service.untag_photos(ids[:2], ["summer"])['changed'] == 2
+    sqlite_db.session.expire_all()
+    assert [t.name for t in sqlite_db.session.get(Photo, ids[0]).tags] == ["family"]
+
+def test_bulk_people_changes_keep_rollups_consistent(sqlite_photo_service, sqlite_db):
+    taken = datetime(2020, 5, 1, tzinfo=timezone.utc)
+    ann, bob, cid = (Person(first_name=name, last_name="Doe") for name in ("Ann", "Bob", "Cid"))
+    photos = [_add_photo(sqlite_db, "p0", taken, people=[ann]), _add_photo(sqlite_db, "p1", taken)]
+    sqlite_db.session.add_all([bob, cid])
+    sqlite_db.session.flush()
+    record_photos_added(sqlite_db.session, photos)
+    sqlite_db.session.commit()
+    ids = [photo.id for photo in photos]
+
+    added = sqlite_photo_service.add_people_to_photos(ids, [ann.id, bob.id, cid.id])
+    _assert_rollups_consistent(sqlite_db)
+    removed = sqlite_photo_service.remove_people_from_photos(ids, [ann.id])
+    _assert_rollups_consistent(sqlite_db)
+
+    assert added['changed'] == 5
+    assert removed['changed'] == 2
+    assert sqlite_db.session.get(Person, bob.id).photo_count == 2
+    with pytest.raises(ValueError) as exc_info:
+        sqlite_photo_service.add_people_to_photos(ids, [999])
+    assert "not found" in str(exc_info.value)
+
+def test_delete_photos_is_resumable(sqlite_photo_service, sqlite_db):
+    taken = datetime(2020, 5, 1, tzinfo=timezone.utc)
+    ann = Person(first_name="Ann", last_name="Doe")
+    photos = [_add_photo(sqlite_db, f"p{i}", taken, tags=[Tag(name=f"t{i}")], people=[ann]) for i in range(3)]
+    sqlite_db.session.flush()
+    record_photos_added(sqlite_db.session, photos)
+    sqlite_db.session.commit()
+    ids = [photo.id for photo in photos]
+    sqlite_photo_service.storage = Mock()
+    sqlite_photo_service.storage.delete_files.side_effect = lambda keys: [key for key in keys if key == "p2.jpg"]
+
+    first = sqlite_photo_service.delete_photos(ids)
+    _assert_rollups_consistent(sqlite_db)
+    sqlite_photo_service.storage.delete_files.side_effect = lambda keys: []
+    second = sqlite_photo_service.delete_photos(ids)
+
+    assert first == {'deleted': 2, 'missingPhotoIds': [], 'failedPhotoIds': [ids[2]]}
+    assert second == {'deleted': 1, 'missingPhotoIds': ids[:2], 'failedPhotoIds': []}
+    assert sqlite_db.session.query(Photo).count() == 0
+    assert sqlite_db.session.get(Person, ann.id).photo_count == 0
+    _assert_rollups_consistent(sqlite_db)
+
+def test_bulk_ids_validation(sqlite_photo_service):
+    with pytest.raises(ValueError):
+        sqlite_photo_service.tag_photos([], ["family"])
+    with pytest.raises(ValueError):
+        sqlite_photo_service.tag_photos([1, "2"], ["family"])
+    with pytest.raises(ValueError):
+        sqlite_photo_service.untag_photos([1], [""])
+
+def _add_camera_photo(db, name, make, model, iso=None, focal_length=None):
+    photo = _add_photo(db, name, datetime(2020, 5, 1, tzinfo=timezone.utc))
+    photo.camera_make, photo.camera_model, photo.iso, photo.focal_length = make, model, iso, focal_length
+    return photo
+
+def test_get_photos_camera_filters(sqlite_photo_service, sqlite_db):
+    _add_camera_photo(sqlite_db, "scan1", "NIKON", "F3", iso=100, focal_length=50)
+    _add_camera_photo(sqlite_db, "scan2", "NIKON", "F3", iso=6400, focal_length=35)
+    _add_camera_photo(sqlite_db, "phone", "Apple", "iPhone 12", iso=3200, focal_length=4.2)
+    _add_camera_photo(sqlite_db, "unknown", None, None)
+    sqlite_db.session.commit()
+
+    def titles(criteria):
+        return sorted(photo['title'] for photo in sqlite_photo_service.get_photos(criteria))
+
+    assert titles({'camera_make': 'nikon', 'camera_model': 'f3'}) == ["scan1", "scan2"]
+    assert titles({'camera_model': 'iPhone 12'}) == ["phone"]
+    assert titles({'min_iso': 3200}) == ["phone", "scan2"]
+    assert titles({'camera_make': 'Nikon', 'max_iso': 3200}) == ["scan1"]
+    assert titles({'min_focal_length': 30, 'max_focal_length': 40}) == ["scan2"]
+
+def test_get_equipment_stats_follows_uploads_and_deletes(sqlite_photo_service, sqlite_db):
+    photos = [
+        _add_camera_photo(sqlite_db, "scan1", "NIKON", "F3"),
+        _add_camera_photo(sqlite_db, "scan2", "NIKON", "F3"),
+        _add_camera_photo(sqlite_db, "fm2", "NIKON", "FM2"),
+        _add_camera_photo(sqlite_db, "phone", "Apple", "iPhone 12"),
+        _add_camera_photo(sqlite_db, "unknown", None, None)
+    ]
+    sqlite_db.session.flush()
+    record_photos_added(sqlite_db.session, photos)
+    sqlite_db.session.commit()
+
+    stats = sqlite_photo_service.get_equipment_stats()
+
+    assert stats['total'] == 5
+    assert stats['unknown'] == 1
+    assert stats['makes'] == [{'make': 'NIKON', 'count': 3}, {'make': 'Apple', 'count': 1}]
+    assert stats['cameras'][0] == {'make': 'NIKON', 'model': 'F3', 'count': 2}
+    _assert_rollups_consistent(sqlite_db)
+
+    sqlite_photo_service.storage = Mock()
+    sqlite_photo_service.storage.delete_files.return_value = []
+    sqlite_photo_service.delete_photos([photos[0].id, photos[3].id])
+
+    stats = sqlite_photo_service.get_equipment_stats()
+    assert stats['total'] == 3
+    assert stats['cameras'] == [{'make': 'NIKON', 'model': 'F3', 'count': 1},
+                                {'make': 'NIKON', 'model': 'FM2', 'count': 1}]
+    _assert_rollups_consistent(sqlite_db)
@@ -0,0 +1,36 @@
+from core.models.person import Person
+from core.models.relationship import Relationship
+from core.services.relationship_graph import RelationshipGraph, UP, DOWN
+
+def test_traverse_stops_on_cycles_and_depth(sqlite_db):
+    people = [Person(first_name=f"P{i}", last_name="Doe") for i in range(4)]
+    sqlite_db.session.add_all(people)
+    sqlite_db.session.flush()
+    a, b, c, d = (person.id for person in people)
+    # a -> b -> c -> a is inconsistent data the traversal must survive
+    sqlite_db.session.add_all([
+        Relationship(a, b, 'parent'), Relationship(b, c, 'parent'),
+        Relationship(c, a, 'parent'), Relationship(c, d, 'parent')
+    ])
+    sqlite_db.session.commit()
+    graph = RelationshipGraph()
+    graph.ensure_loaded(sqlite_db.session)
+
+    assert graph.traverse(a, DOWN, 10) == {b: 1, c: 2, d: 3}
+    assert graph.traverse(a, DOWN, 2) == {b: 1, c: 2}
+    assert graph.traverse(d, UP, 10) == {c: 1, b: 2, a: 3}
+
+def test_invalidate_reloads(sqlite_db):
+    people = [Person(first_name=f"P{i}", last_name="Doe") for i in range(2)]
+    sqlite_db.session.add_all(people)
+    sqlite_db.session.commit()
+    graph = RelationshipGraph()
+    graph.ensure_loaded(sqlite_db.session)
+    sqlite_db.session.add(Relationship(people[0].id, people[1].id, 'parent'))
+    sqlite_db.session.commit()
+
+    graph.ensure_loaded(sqlite_db.session)
+    assert graph.traverse(people[0].id, DOWN, 5) == {}
+    graph.invalidate()
+    graph.ensure_loaded(sqlite_db.session)
+    assert graph.traverse(people[0].id, DOWN, 5) == {people[1].id: 1}
@@ -5,7 +5,8 @@ from core.services.service_context import ServiceContext
 
 @pytest.fixture
 def mock_db():
-    with patch('core.services.service_context.db') as mock_db:
+    with patch('core.services.service_context.db') as mock_db, \
+         patch('core.services.service_context.check_schema_revision'):
         yield mock_db
 
 @pytest.fixture(autouse=True)
@@ -14,6 +15,8 @@ def reset_service_context():
     ServiceContext._instance = None
     ServiceContext._initialized = False
     yield
+    ServiceContext._instance = None
+    ServiceContext._initialized = False
 
 def test_singleton_pattern():
     # Test that ServiceContext follows singleton pattern
@@ -54,3 +57,57 @@ def test_initialize_with_url(mock_db):
     assert app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] is False
     assert ServiceContext._initialized is True
     mock_db.init_app.assert_called_once_with(app)
+
+def test_initialize_sets_pool_options(mock_db):
+    # Test that the pool settings of the database config reach the engine options
+    from utils.config import DatabaseConfig
+    app = Flask(__name__)
+    context = ServiceContext()
+    database_config = DatabaseConfig(url='', name='test', pool_size=3, statement_timeout=500)
+    
+    context.initialize(app, database_url="postgresql://db/nexus", database_config=database_config)
+    
+    options = app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    assert options['pool_size'] == 3
+    assert options['pool_pre_ping'] is True
+    assert options['connect_args']['options'] == '-c statement_timeout=500'
+
+def test_initialize_with_replica(mock_db):
+    # Test that a replica URL adds the replica bind used by read-only methods
+    from utils.config import DatabaseConfig
+    app = Flask(__name__)
+    context = ServiceContext()
+    database_config = DatabaseConfig(url='', name='test', replica_url="postgresql://replica/nexus")
+    
+    context.initialize(app, database_url="postgresql://db/nexus", database_config=database_config)
+    
+    replica = app.config['SQLALCHEMY_BINDS']['replica']
+    assert replica['url'] == "postgresql://replica/nexus"
+    assert replica['pool_pre_ping'] is True
+
+def test_initialize_checks_schema_revision(mock_db):
+    # Test that a database behind the migrations stops the startup
+    from core.infrastructure.schema import SchemaRevisionError
+    app = Flask(__name__)
+    context = ServiceContext()
+    
+    with patch('core.services.service_context.check_schema_revision',
+               side_effect=SchemaRevisionError("run 'alembic upgrade head'")) as check:
+        with pytest.raises(RuntimeError, match="alembic upgrade head"):
+            context.initialize(app, database_url="sqlite:///:memory:")
+    
+    check.assert_called_once_with(mock_db.engine)
+    mock_db.create_all.assert_not_called()
+    assert ServiceContext._initialized is False
+
+def test_reset_after_fork_disposes_engines_without_closing(mock_db):
+    # Test that a forked worker drops the connections inherited from the master
+    app = Flask(__name__)
+    engine = Mock()
+    mock_db.engines = {None: engine}
+    context = ServiceContext()
+    context.initialize(app, database_url="sqlite:///:memory:")
+    
+    context.reset_after_fork()
+    
+    engine.dispose.assert_called_once_with(close=False)
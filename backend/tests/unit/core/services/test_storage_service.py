@@ -45,6 +45,37 @@ def test_delete_file_success(storage_service, mock_s3_client):
         Key=test_s3_key
     )
 
+def test_delete_files_batches_requests(storage_service, mock_s3_client):
+    # Arrange
+    keys = [f"{i}.jpg" for i in range(2500)]
+    mock_s3_client.delete_objects.side_effect = [
+        {},
+        {'Errors': [{'Key': '1500.jpg', 'Code': 'AccessDenied'}]},
+        {}
+    ]
+    
+    # Act
+    failed = storage_service.delete_files(keys)
+    
+    # Assert
+    assert failed == ['1500.jpg']
+    batches = [call.kwargs['Delete']['Objects'] for call in mock_s3_client.delete_objects.call_args_list]
+    assert [len(batch) for batch in batches] == [1000, 1000, 500]
+    assert batches[2][-1] == {'Key': '2499.jpg'}
+
+def test_read_range_requests_byte_range(storage_service, mock_s3_client):
+    # Arrange
+    mock_s3_client.get_object.return_value = {'Body': BytesIO(b"header")}
+    
+    # Act
+    content = storage_service.read_range("photos/test.jpg", 0, 131072)
+    
+    # Assert
+    assert content == b"header"
+    mock_s3_client.get_object.assert_called_once_with(
+        Bucket=storage_service.bucket_name, Key="photos/test.jpg", Range="bytes=0-131071"
+    )
+
 def test_ensure_bucket_exists_success(storage_service, mock_s3_client):
     # Arrange
     mock_s3_client.head_bucket.return_value = True
@@ -72,3 +103,58 @@ def test_ensure_bucket_exists_create(storage_service, mock_s3_client):
     mock_s3_client.head_bucket.assert_called_once_with(Bucket='family-nexus-photos')
     mock_s3_client.create_bucket.assert_called_once_with(Bucket='family-nexus-photos')
     mock_s3_client.put_bucket_policy.assert_called_once()
+
+def test_s3_client_is_rebuilt_in_forked_process(storage_service, mock_s3_client, monkeypatch):
+    # Test that a worker forked after the client was built gets its own client
+    import boto3
+    client = storage_service.s3_client
+    assert storage_service.s3_client is client
+    boto3.client.return_value = Mock()
+    monkeypatch.setattr('os.getpid', lambda: -1)
+    
+    assert storage_service.s3_client is boto3.client.return_value
+
+def test_stream_file_returns_chunks(storage_service, mock_s3_client):
+    # Arrange
+    body = Mock()
+    body.iter_chunks.return_value = iter([b"abc", b"def"])
+    mock_s3_client.get_object.return_value = {'Body': body, 'ContentType': 'image/jpeg', 'ContentLength': 6}
+    
+    # Act
+    chunks, content_type, length = storage_service.stream_file("photo.jpg", chunk_size=3)
+    
+    # Assert
+    assert list(chunks) == [b"abc", b"def"]
+    assert (content_type, length) == ('image/jpeg', 6)
+    body.iter_chunks.assert_called_once_with(3)
+
+def test_multipart_upload(storage_service, mock_s3_client):
+    # Arrange
+    mock_s3_client.create_multipart_upload.return_value = {'UploadId': 'upload-1'}
+    mock_s3_client.upload_part.return_value = {'ETag': '"etag-1"'}
+    
+    # Act
+    s3_key, upload_id = storage_service.create_multipart_upload("scan.tiff")
+    etag = storage_service.upload_part(s3_key, upload_id, 1, b"chunk")
+    url = storage_service.complete_multipart_upload(s3_key, upload_id, [(1, etag)])
+    
+    # Assert
+    assert s3_key.endswith(".tiff") and upload_id == 'upload-1'
+    assert mock_s3_client.create_multipart_upload.call_args.kwargs['ContentType'] == 'image/tiff'
+    mock_s3_client.upload_part.assert_called_once_with(
+        Bucket=storage_service.bucket_name, Key=s3_key, UploadId='upload-1', PartNumber=1, Body=b"chunk"
+    )
+    mock_s3_client.complete_multipart_upload.assert_called_once_with(
+        Bucket=storage_service.bucket_name, Key=s3_key, UploadId='upload-1',
+        MultipartUpload={'Parts': [{'PartNumber': 1, 'ETag': '"etag-1"'}]}
+    )
+    assert url.endswith(f"/{storage_service.bucket_name}/{s3_key}")
+
+def test_abort_multipart_upload_ignores_missing_upload(storage_service, mock_s3_client):
+    # Arrange
+    mock_s3_client.abort_multipart_upload.side_effect = ClientError(
+        {'Error': {'Code': 'NoSuchUpload', 'Message': 'Not found'}}, 'AbortMultipartUpload'
+    )
+    
+    # Act / Assert
+    storage_service.abort_multipart_upload("scan.tiff", "upload-1")
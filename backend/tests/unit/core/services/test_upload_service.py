@@ -0,0 +1,149 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
+from unittest.mock import Mock, PropertyMock
+from core.services.service_context import ServiceContext
+from core.services.photo_service import PhotoService
+from core.services.upload_service import UploadService
+from core.services.service_exceptions import NotFoundException, ConflictException
+from core.models.photo import Photo
+from core.models.upload_session import UploadSession, UploadPart
+
+CHUNK_SIZE = 4
+
+@pytest.fixture
+def storage():
+    storage = Mock()
+    storage.bucket_name = 'family-nexus-photos'
+    storage.create_multipart_upload.return_value = ('abc.tiff', 'upload-1')
+    storage.upload_part.side_effect = lambda key, upload_id, number, data: f'"etag-{number}"'
+    storage.read_range.return_value = b''
+    storage.list_multipart_uploads.return_value = []
+    return storage
+
+@pytest.fixture
+def upload_service(sqlite_db, storage):
+    context = Mock(ServiceContext)
+    type(context).db = PropertyMock(return_value=sqlite_db)
+    service = UploadService(context, PhotoService(context), chunk_size=CHUNK_SIZE, max_size=100, expiry_hours=24)
+    service.storage = storage
+    return service
+
+def _create(upload_service, size=10):
+    return upload_service.create_upload('scan 1954.tiff', size, {'title': 'Wedding', 'tags': ['wedding']})
+
+def _chunk(upload_service, upload_id, offset, data):
+    return upload_service.upload_chunk(upload_id, offset, BytesIO(data), len(data))
+
+def test_create_upload_starts_multipart_upload(upload_service, storage):
+    upload = _create(upload_service)
+
+    assert upload['fileName'] == 'scan_1954.tiff'
+    assert (upload['size'], upload['chunkSize'], upload['offset']) == (10, CHUNK_SIZE, 0)
+    storage.create_multipart_upload.assert_called_once_with('scan_1954.tiff')
+
+def test_create_upload_rejects_invalid_files(upload_service, storage):
+    with pytest.raises(ValueError, match="Invalid file type"):
+        upload_service.create_upload('scan.bmp', 10, {})
+    with pytest.raises(ValueError, match="too large"):
+        upload_service.create_upload('scan.tiff', 101, {})
+    with pytest.raises(ValueError, match="positive integer"):
+        upload_service.create_upload('scan.tiff', '10', {})
+    storage.create_multipart_upload.assert_not_called()
+
+def test_create_upload_rejects_invalid_metadata(upload_service, storage):
+    with pytest.raises(ValueError, match="tags"):
+        upload_service.create_upload('scan.tiff', 10, {'tags': 'wedding'})
+    with pytest.raises(ValueError, match="people"):
+        upload_service.create_upload('scan.tiff', 10, {'people': ['Jane']})
+    with pytest.raises(ValueError, match="location"):
+        upload_service.create_upload('scan.tiff', 10, {'location': 'Paris'})
+    storage.create_multipart_upload.assert_not_called()
+
+def test_upload_chunk_resumes_at_offset(upload_service, storage):
+    upload_id = _create(upload_service)['id']
+
+    assert _chunk(upload_service, upload_id, 0, b'abcd')['offset'] == 4
+    # A chunk sent again after a lost response is refused with the offset to resume from
+    with pytest.raises(ConflictException, match="at offset 4, not 0"):
+        _chunk(upload_service, upload_id, 0, b'abcd')
+    with pytest.raises(ValueError, match="must hold 4 bytes"):
+        _chunk(upload_service, upload_id, 4, b'ef')
+    # The announced length is checked before the body is read
+    body = BytesIO(b'efgh' * 1000)
+    with pytest.raises(ValueError, match="must hold 4 bytes, not 4000"):
+        upload_service.upload_chunk(upload_id, 4, body, 4000)
+    assert body.tell() == 0
+    with pytest.raises(ValueError, match="must be given"):
+        upload_service.upload_chunk(upload_id, 4, body, None)
+    with pytest.raises(ValueError, match="ended after 2 of 4 bytes"):
+        upload_service.upload_chunk(upload_id, 4, BytesIO(b'ef'), 4)
+    assert upload_service.get_upload(upload_id)['offset'] == 4
+
+    _chunk(upload_service, upload_id, 4, b'efgh')
+    assert _chunk(upload_service, upload_id, 8, b'ij')['offset'] == 10
+    assert [call.args[2] for call in storage.upload_part.call_args_list] == [1, 2, 3]
+
+def test_complete_upload_creates_photo(upload_service, storage, sqlite_db):
+    upload_id = _create(upload_service, size=6)['id']
+    _chunk(upload_service, upload_id, 0, b'abcd')
+    with pytest.raises(ConflictException, match="received 4 of 6 bytes"):
+        upload_service.complete_upload(upload_id)
+    _chunk(upload_service, upload_id, 4, b'ef')
+
+    photo = upload_service.complete_upload(upload_id)
+
+    storage.complete_multipart_upload.assert_called_once_with(
+        'abc.tiff', 'upload-1', [(1, '"etag-1"'), (2, '"etag-2"')]
+    )
+    assert photo['title'] == 'Wedding'
+    assert sqlite_db.session.query(Photo).count() == 1
+    assert sqlite_db.session.query(UploadSession).count() == 0
+    assert sqlite_db.session.query(UploadPart).count() == 0
+    with pytest.raises(NotFoundException):
+        upload_service.get_upload(upload_id)
+
+def test_complete_upload_retries_after_failure(upload_service, storage, sqlite_db):
+    upload_id = _create(upload_service, size=2)['id']
+    _chunk(upload_service, upload_id, 0, b'ab')
+    storage.read_range.side_effect = [Exception("connection reset"), b'']
+
+    with pytest.raises(Exception, match="connection reset"):
+        upload_service.complete_upload(upload_id)
+    assert upload_service.get_upload(upload_id)['status'] == 'assembled'
+    upload_service.complete_upload(upload_id)
+
+    # The parts are only assembled once
+    storage.complete_multipart_upload.assert_called_once()
+    assert sqlite_db.session.query(Photo).count() == 1
+
+def test_abort_upload(upload_service, storage, sqlite_db):
+    upload_id = _create(upload_service)['id']
+    _chunk(upload_service, upload_id, 0, b'abcd')
+
+    upload_service.abort_upload(upload_id)
+
+    storage.abort_multipart_upload.assert_called_once_with('abc.tiff', 'upload-1')
+    assert sqlite_db.session.query(UploadSession).count() == 0
+    assert sqlite_db.session.query(UploadPart).count() == 0
+
+def test_sweep_expired_uploads(upload_service, storage, sqlite_db):
+    storage.create_multipart_upload.side_effect = [('old.tiff', 'upload-old'), ('new.tiff', 'upload-new')]
+    old_id = _create(upload_service)['id']
+    new_id = _create(upload_service)['id']
+    sqlite_db.session.get(UploadSession, old_id).updated_at = datetime.now(timezone.utc) - timedelta(hours=25)
+    sqlite_db.session.commit()
+    long_ago = datetime.now(timezone.utc) - timedelta(days=2)
+    storage.list_multipart_uploads.return_value = [
+        ('new.tiff', 'upload-new', long_ago),
+        ('lost.tiff', 'upload-lost', long_ago),
+        ('recent.tiff', 'upload-recent', datetime.now(timezone.utc))
+    ]
+
+    result = upload_service.sweep_expired_uploads()
+
+    assert result == {'expired': 1, 'orphaned': 1, 'failed': 0}
+    assert [call.args for call in storage.abort_multipart_upload.call_args_list] == [
+        ('old.tiff', 'upload-old'), ('lost.tiff', 'upload-lost')
+    ]
+    assert [session.id for session in sqlite_db.session.query(UploadSession)] == [new_id]
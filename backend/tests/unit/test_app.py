@@ -0,0 +1,13 @@
+import subprocess
+import sys
+import os
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def test_importing_app_is_lazy():
+    # Importing the app module neither creates the app nor loads boto3
+    code = "import sys, app; print('app' in vars(app), 'boto3' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', code], cwd=BACKEND_DIR, capture_output=True, text=True,
+                            env={**os.environ, 'DATABASE_URL': 'postgresql://unreachable.invalid/nexus'})
+    
+    assert result.stdout.split() == ['False', 'False']